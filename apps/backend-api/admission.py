@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Coroutine, Deque, Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+from metrics import REGISTRY
+
+ADMISSION_REJECTED = REGISTRY.counter(
+  "http_admission_rejected_total", "Requests shed by admission control.", ("method", "route", "reason"),
+)
+ADMISSION_LIMIT = REGISTRY.gauge(
+  "http_admission_limit", "Current concurrency limit per route.", ("method", "route"),
+)
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+  "http_admission_in_flight", "Requests holding an admission slot per route.", ("method", "route"),
+)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+  raw = os.getenv(name)
+  return default if raw is None else raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class AdmissionSettings:
+  """Limits for one route. ``adaptive`` lets the limit float in [min_limit, max_limit]."""
+
+  limit: int = 32
+  max_queue: int = 64
+  queue_timeout: float = 1.0
+  retry_after: int = 1
+  adaptive: bool = False
+  min_limit: int = 1
+  max_limit: int = 256
+  latency_tolerance: float = 2.0
+
+  @classmethod
+  def from_env(cls) -> "AdmissionSettings":
+    return cls(
+      limit=int(os.getenv("BACKEND_ADMISSION_LIMIT", "32")),
+      max_queue=int(os.getenv("BACKEND_ADMISSION_QUEUE", "64")),
+      queue_timeout=float(os.getenv("BACKEND_ADMISSION_QUEUE_TIMEOUT", "1.0")),
+      retry_after=int(os.getenv("BACKEND_ADMISSION_RETRY_AFTER", "1")),
+      adaptive=_env_bool("BACKEND_ADMISSION_ADAPTIVE", False),
+    )
+
+
+class AdmissionLimiter:
+  """Concurrency limit with a bounded FIFO wait queue.
+
+  ``acquire`` admits immediately while below the limit, waits in the queue
+  (up to ``queue_timeout``) while the queue has room, and otherwise returns a
+  rejection reason at once. With ``adaptive`` set, the limit follows a
+  gradient of the best observed latency over the recent average: it grows
+  while latency stays near the best seen and shrinks as queueing inflates it.
+  """
+
+  _WINDOW = 20
+  _SMOOTHING = 0.2
+
+  def __init__(self, settings: AdmissionSettings) -> None:
+    self.settings = settings
+    self._limit = float(settings.limit)
+    self._in_flight = 0
+    self._waiters: Deque["asyncio.Future[None]"] = deque()
+    self._min_latency = math.inf
+    self._latency_sum = 0.0
+    self._samples = 0
+
+  @property
+  def limit(self) -> int:
+    return max(1, int(self._limit))
+
+  @property
+  def in_flight(self) -> int:
+    return self._in_flight
+
+  @property
+  def queued(self) -> int:
+    return len(self._waiters)
+
+  async def acquire(self) -> Optional[str]:
+    """Return ``None`` once admitted, or ``"queue_full"``/``"queue_timeout"`` when shed."""
+    if self._in_flight < self.limit and not self._waiters:
+      self._in_flight += 1
+      return None
+    if len(self._waiters) >= self.settings.max_queue:
+      return "queue_full"
+    fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+    self._waiters.append(fut)
+    try:
+      await asyncio.wait_for(asyncio.shield(fut), self.settings.queue_timeout)
+    except asyncio.TimeoutError:
+      if fut.done() and not fut.cancelled():
+        # Admitted in the same tick the timeout fired; keep the slot.
+        return None
+      fut.cancel()
+      self._discard(fut)
+      return "queue_timeout"
+    except BaseException:
+      if fut.done() and not fut.cancelled():
+        self.release(None)
+      else:
+        fut.cancel()
+        self._discard(fut)
+      raise
+    return None
+
+  def release(self, latency: Optional[float]) -> None:
+    """Free a slot, handing it straight to the oldest waiter if any."""
+    if latency is not None and self.settings.adaptive:
+      self._observe(latency)
+    self._in_flight -= 1
+    self._admit_waiters()
+
+  def _admit_waiters(self) -> None:
+    while self._waiters and self._in_flight < self.limit:
+      fut = self._waiters.popleft()
+      if fut.done():
+        continue
+      self._in_flight += 1
+      fut.set_result(None)
+
+  def _discard(self, fut: "asyncio.Future[None]") -> None:
+    try:
+      self._waiters.remove(fut)
+    except ValueError:
+      pass
+
+  def _observe(self, latency: float) -> None:
+    s = self.settings
+    self._min_latency = min(self._min_latency, latency)
+    self._latency_sum += latency
+    self._samples += 1
+    if self._samples < self._WINDOW:
+      return
+    average = self._latency_sum / self._samples
+    self._latency_sum = 0.0
+    self._samples = 0
+    gradient = max(0.5, min(1.0, s.latency_tolerance * self._min_latency / average)) if average > 0 else 1.0
+    target = self._limit * gradient + math.sqrt(self._limit)
+    self._limit = (1 - self._SMOOTHING) * self._limit + self._SMOOTHING * target
+    self._limit = max(float(s.min_limit), min(float(s.max_limit), self._limit))
+    # Let the baseline drift up slowly so a permanently slower workload is re-learned.
+    self._min_latency *= 1.05
+    self._admit_waiters()
+
+
+class AdmissionPolicy:
+  """Per-route limiter registry keyed by ``(method, path template)``."""
+
+  def __init__(self, default: AdmissionSettings, *, enabled: bool = True) -> None:
+    self.enabled = enabled
+    self.default = default
+    self.exempt = {"/health", "/api/health", "/ready", "/api/ready", "/metrics"}
+    self._overrides: Dict[Tuple[str, str], AdmissionSettings] = {}
+    self._limiters: Dict[Tuple[str, str], AdmissionLimiter] = {}
+
+  @classmethod
+  def from_env(cls) -> "AdmissionPolicy":
+    return cls(AdmissionSettings.from_env(), enabled=_env_bool("BACKEND_ADMISSION_ENABLED", True))
+
+  def configure(self, method: str, path: str, **changes: Any) -> None:
+    """Override settings for one route; takes effect for new requests."""
+    key = (method.upper(), path)
+    self._overrides[key] = replace(self._overrides.get(key, self.default), **changes)
+    self._limiters.pop(key, None)
+
+  def reset(self) -> None:
+    self._overrides.clear()
+    self._limiters.clear()
+
+  def limiter_for(self, method: str, path: str) -> Optional[AdmissionLimiter]:
+    if not self.enabled or path in self.exempt:
+      return None
+    key = (method, path)
+    limiter = self._limiters.get(key)
+    if limiter is None:
+      created = AdmissionLimiter(self._overrides.get(key, self.default))
+      self._limiters[key] = created
+      ADMISSION_LIMIT.set_function(lambda: created.limit, method, path)
+      ADMISSION_IN_FLIGHT.set_function(lambda: created.in_flight, method, path)
+      return created
+    return limiter
+
+
+POLICY = AdmissionPolicy.from_env()
+
+
+class AdmissionRoute(APIRoute):
+  """APIRoute that passes requests through the route's admission limiter.
+
+  Admission happens after routing but before body parsing and dependency
+  resolution, so shed requests never reach the thread pool. A streamed
+  response keeps its slot until the body iterator finishes.
+  """
+
+  def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+    handler = super().get_route_handler()
+    path = self.path
+
+    async def admitted(request: Request) -> Response:
+      method = request.method
+      limiter = POLICY.limiter_for(method, path)
+      if limiter is None:
+        return await handler(request)
+      reason = await limiter.acquire()
+      if reason is not None:
+        ADMISSION_REJECTED.inc(method, path, reason)
+        return JSONResponse(
+          {"detail": "Service overloaded"},
+          status_code=503,
+          headers={"Retry-After": str(limiter.settings.retry_after)},
+        )
+      started = time.perf_counter()
+      try:
+        response = await handler(request)
+      except BaseException:
+        limiter.release(time.perf_counter() - started)
+        raise
+      if isinstance(response, StreamingResponse):
+        response.body_iterator = _released_after(response.body_iterator, limiter, started)
+      else:
+        limiter.release(time.perf_counter() - started)
+      return response
+
+    return admitted
+
+
+async def _released_after(body: AsyncIterable[Any], limiter: AdmissionLimiter, started: float) -> AsyncIterator[Any]:
+  try:
+    async for chunk in body:
+      yield chunk
+  finally:
+    limiter.release(time.perf_counter() - started)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+CHANGES_APPENDED = REGISTRY.counter("users_changes_total", "Change records appended to the user change log.", ("op",))
+CHANGES_RESYNC = REGISTRY.counter("users_changes_resync_total", "Change feed reads refused because the cursor fell out of retention.")
+
+CREATE, UPDATE, DELETE = "create", "update", "delete"
+
+
+@dataclass(frozen=True)
+class Change:
+  seq: int
+  op: str
+  id: str
+  name: Optional[str]
+  ts: float
+
+  def to_dict(self) -> Dict[str, Any]:
+    user = None if self.op == DELETE else {"id": self.id, "name": self.name}
+    return {"seq": self.seq, "op": self.op, "id": self.id, "user": user, "ts": self.ts}
+
+
+class ResyncRequired(Exception):
+  """The requested cursor is not covered by the log; the consumer must re-read everything."""
+
+  def __init__(self, since: int, earliest: int, latest: int) -> None:
+    super().__init__(f"changes after {since} are no longer retained")
+    self.since = since
+    self.earliest = earliest
+    self.latest = latest
+
+
+class ChangeLog:
+  """Bounded, sequence-numbered log of committed user changes.
+
+  Sequence numbers start at 1 and have no gaps; only the newest
+  ``retention`` records are kept. ``since(seq)`` returns records after
+  ``seq`` and raises ResyncRequired when some of them were already dropped,
+  or when ``seq`` is ahead of the log (e.g. a cursor from before a restart).
+  Appends come from commit paths on any thread; ``wait`` lets coroutines
+  block until a newer record exists.
+  """
+
+  def __init__(self, retention: int = 10_000) -> None:
+    if retention < 1:
+      raise ValueError("retention must be >= 1")
+    self.retention = retention
+    self._lock = threading.Lock()
+    self._entries: Deque[Change] = deque(maxlen=retention)
+    self._latest = 0
+    self._waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+
+  @classmethod
+  def from_env(cls) -> "ChangeLog":
+    return cls(int(os.getenv("BACKEND_CHANGE_RETENTION", "10000")))
+
+  @property
+  def latest(self) -> int:
+    return self._latest
+
+  @property
+  def earliest(self) -> int:
+    """Oldest retained sequence number (``latest + 1`` while empty)."""
+    entries = self._entries
+    return entries[0].seq if entries else self._latest + 1
+
+  def append(self, records: List[Tuple[str, str, Optional[str]]]) -> None:
+    """Append ``(op, user id, name)`` records as one contiguous run of sequence numbers."""
+    if not records:
+      return
+    now = time.time()
+    with self._lock:
+      seq = self._latest
+      for op, user_id, name in records:
+        seq += 1
+        self._entries.append(Change(seq, op, user_id, name, now))
+      self._latest = seq
+    for op, _, _ in records:
+      CHANGES_APPENDED.inc(op)
+    self._notify()
+
+  def _notify(self) -> None:
+    # Wake coroutines blocked in wait(); they re-check ``latest`` themselves.
+    with self._lock:
+      waiters, self._waiters = self._waiters, []
+    for loop, fut in waiters:
+      loop.call_soon_threadsafe(_wake, fut)
+
+  def since(self, seq: int, limit: int = 1000) -> List[Change]:
+    with self._lock:
+      earliest = self._entries[0].seq if self._entries else self._latest + 1
+      if seq < earliest - 1 or seq > self._latest:
+        CHANGES_RESYNC.inc()
+        raise ResyncRequired(seq, earliest, self._latest)
+      start = seq - earliest + 1
+      return list(islice(self._entries, start, start + limit))
+
+  async def wait(self, seq: int, timeout: float) -> bool:
+    """Wait up to ``timeout`` seconds for a record after ``seq``; True if one exists."""
+    loop = asyncio.get_running_loop()
+    fut: asyncio.Future[None] = loop.create_future()
+    with self._lock:
+      if self._latest > seq:
+        return True
+      self._waiters.append((loop, fut))
+    try:
+      await asyncio.wait_for(fut, timeout)
+      return True
+    except asyncio.TimeoutError:
+      return self._latest > seq
+    finally:
+      with self._lock:
+        try:
+          self._waiters.remove((loop, fut))
+        except ValueError:
+          pass
+
+
+def _wake(fut: "asyncio.Future[None]") -> None:
+  if not fut.done():
+    fut.set_result(None)
+
+
+async def sse_events(log: ChangeLog, since: int, *, batch: int = 500, keepalive: float = 15.0) -> AsyncIterator[bytes]:
+  """Server-sent events for changes after ``since``, until the client goes away.
+
+  Each change is an event named after its op with the sequence number as
+  ``id`` (so EventSource reconnects resume via Last-Event-ID). A ``resync``
+  event ends the stream when the cursor is not covered by the log.
+  """
+  cursor = since
+  while True:
+    try:
+      changes = log.since(cursor, batch)
+    except ResyncRequired as exc:
+      body = json.dumps({"since": exc.since, "earliest": exc.earliest, "latest": exc.latest})
+      yield f"event: resync\ndata: {body}\n\n".encode()
+      return
+    if changes:
+      yield "".join(
+        f"id: {c.seq}\nevent: {c.op}\ndata: {json.dumps(c.to_dict(), ensure_ascii=False)}\n\n" for c in changes
+      ).encode()
+      cursor = changes[-1].seq
+    elif not await log.wait(cursor, keepalive):
+      yield b": keepalive\n\n"
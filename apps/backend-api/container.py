@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import inspect
+from contextlib import contextmanager
+from typing import (
+  Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Type, TypeVar, get_type_hints,
+)
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+SINGLETON, REQUEST, TRANSIENT = "singleton", "request", "transient"
+SCOPES = (SINGLETON, REQUEST, TRANSIENT)
+# Where a request's scope lives in the ASGI scope dict.
+_SCOPE_KEY = "di.scope"
+_MISSING = object()
+_OVERRIDE = object()
+
+
+class ContainerError(Exception):
+  """The registrations do not form a valid graph (unknown key, cycle or scope mismatch)."""
+
+
+class RequestScope:
+  """Instances of request-scoped registrations for one request."""
+
+  __slots__ = ("instances",)
+
+  def __init__(self) -> None:
+    self.instances: Dict[Any, Any] = {}
+
+
+Provider = Callable[[RequestScope], Any]
+
+
+class _Registration:
+  __slots__ = ("key", "factory", "scope", "deps")
+
+  def __init__(self, key: Any, factory: Callable[..., Any], scope: str, deps: Tuple[Any, ...]) -> None:
+    self.key = key
+    self.factory = factory
+    self.scope = scope
+    self.deps = deps
+
+
+def _inferred_deps(factory: Callable[..., Any]) -> Tuple[Any, ...]:
+  """Keys for ``factory``'s parameters without defaults, from their annotations."""
+  target = factory.__init__ if inspect.isclass(factory) else factory
+  hints = get_type_hints(target)
+  deps: List[Any] = []
+  for param in list(inspect.signature(factory).parameters.values()):
+    if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD) or param.default is not param.empty:
+      continue
+    if param.name not in hints:
+      raise ContainerError(f"{_name(factory)}: parameter {param.name!r} has no annotation to resolve")
+    deps.append(hints[param.name])
+  return tuple(deps)
+
+
+def _name(key: Any) -> str:
+  return getattr(key, "__qualname__", None) or repr(key)
+
+
+class Container:
+  """Registry of factories, compiled once into a graph of providers.
+
+  Each registration has a scope: ``singleton`` (built once, at compile time),
+  ``request`` (built at most once per RequestScope) or ``transient`` (built on
+  every resolution). Dependencies are other registered keys, passed to the
+  factory positionally; by default they are read from the factory's
+  annotated parameters. Registering after ``compile`` has no effect on the
+  compiled container.
+  """
+
+  def __init__(self) -> None:
+    self._registrations: Dict[Any, _Registration] = {}
+
+  def register(
+    self,
+    key: Any,
+    factory: Optional[Callable[..., Any]] = None,
+    *,
+    scope: str = TRANSIENT,
+    deps: Optional[Sequence[Any]] = None,
+  ) -> None:
+    if scope not in SCOPES:
+      raise ContainerError(f"unknown scope {scope!r}")
+    build = factory if factory is not None else key
+    self._registrations[key] = _Registration(
+      key, build, scope, tuple(deps) if deps is not None else _inferred_deps(build),
+    )
+
+  def instance(self, key: Any, value: Any) -> None:
+    """Register an already built singleton."""
+    self._registrations[key] = _Registration(key, lambda: value, SINGLETON, ())
+
+  def compile(self) -> "CompiledContainer":
+    return CompiledContainer(self._registrations)
+
+
+class CompiledContainer:
+  """Resolved dependency graph: one precomputed provider per key.
+
+  Providers are closures specialised by scope and arity, so resolving a key
+  walks no metadata: a singleton returns a constant, a transient calls its
+  factory with its dependencies' providers, and a request-scoped key does
+  one dict lookup in the RequestScope before falling back to building.
+
+  Tests swap a key's provider with ``override``. ``factory``, ``depends``,
+  ``provider`` and ``resolve`` look the key up on every call, so callables
+  handed out before the override (such as ``di.get_uow``) see it too.
+  Providers of other keys are compiled against the original, so an override
+  does not reach into what they build.
+  """
+
+  def __init__(self, registrations: Dict[Any, _Registration]) -> None:
+    self._registrations = dict(registrations)
+    self._providers: Dict[Any, Provider] = {}
+    self._depends: Dict[Any, Callable[[Request], Awaitable[Any]]] = {}
+    self._request_bound: Set[Any] = set()
+    for key in self._registrations:
+      self._compile(key, ())
+
+  def _compile(self, key: Any, path: Tuple[Any, ...]) -> Provider:
+    provider = self._providers.get(key)
+    if provider is not None:
+      return provider
+    if key in path:
+      raise ContainerError("dependency cycle: " + " -> ".join(_name(k) for k in (*path, key)))
+    reg = self._registrations.get(key)
+    if reg is None:
+      via = f" (needed by {_name(path[-1])})" if path else ""
+      raise ContainerError(f"{_name(key)} is not registered{via}")
+    deps = [self._compile(dep, (*path, key)) for dep in reg.deps]
+    # A singleton must not capture a request's instance, directly or through
+    # a transient built from one.
+    bound = [dep for dep in reg.deps if dep in self._request_bound]
+    if bound and reg.scope == SINGLETON:
+      raise ContainerError(f"singleton {_name(key)} cannot depend on request-scoped {_name(bound[0])}")
+    if reg.scope == REQUEST or (bound and reg.scope == TRANSIENT):
+      self._request_bound.add(key)
+    build = _builder(reg.factory, deps)
+    if reg.scope == SINGLETON:
+      value = build(RequestScope())
+      provider = lambda scope: value  # noqa: E731
+    elif reg.scope == REQUEST:
+      provider = _request_scoped(key, build)
+    else:
+      provider = build
+    self._providers[key] = provider
+    return provider
+
+  def provider(self, key: Type[T]) -> Callable[[RequestScope], T]:
+    try:
+      return self._providers[key]
+    except KeyError:
+      raise ContainerError(f"{_name(key)} is not registered") from None
+
+  def resolve(self, key: Type[T], scope: Optional[RequestScope] = None) -> T:
+    return self.provider(key)(scope if scope is not None else RequestScope())
+
+  def factory(self, key: Type[T]) -> Callable[[], T]:
+    """Zero-argument callable building ``key`` in a fresh scope on every call."""
+    self.provider(key)  # fails early for an unknown key
+    providers = self._providers
+    return lambda: providers[key](RequestScope())
+
+  def depends(self, key: Type[T]) -> Callable[[Request], Awaitable[T]]:
+    """FastAPI dependency resolving ``key`` in the current request's scope.
+
+    The returned coroutine function is cached per key, so FastAPI's own
+    per-request dependency cache also applies; being ``async`` it runs on
+    the event loop instead of costing a thread pool hop like a sync one.
+    """
+    dependency = self._depends.get(key)
+    if dependency is None:
+      self.provider(key)  # fails early for an unknown key
+      providers = self._providers
+
+      async def dependency(request: Request) -> Any:
+        state = request.scope
+        scope = state.get(_SCOPE_KEY)
+        if scope is None:
+          scope = state[_SCOPE_KEY] = RequestScope()
+        return providers[key](scope)
+
+      dependency.__name__ = f"provide_{getattr(key, '__name__', 'dependency')}"
+      self._depends[key] = dependency
+    return dependency
+
+  @contextmanager
+  def override(self, key: Type[T], factory: Callable[[], T]) -> Iterator[None]:
+    """Resolve ``key`` with ``factory`` until the block exits (for tests).
+
+    ``factory`` takes no arguments. For a request-scoped key it is called at
+    most once per request, otherwise on every resolution.
+    """
+    original = self.provider(key)
+    build: Provider = lambda scope: factory()  # noqa: E731
+    if self._registrations[key].scope == REQUEST:
+      # Cached apart from the original's instance, which other keys' providers
+      # may still build in the same request.
+      build = _request_scoped((_OVERRIDE, key), build)
+    self._providers[key] = build
+    try:
+      yield
+    finally:
+      self._providers[key] = original
+
+  def keys(self) -> List[Any]:
+    return list(self._providers)
+
+
+def _builder(factory: Callable[..., Any], deps: List[Provider]) -> Provider:
+  if not deps:
+    return lambda scope: factory()
+  if len(deps) == 1:
+    (a,) = deps
+    return lambda scope: factory(a(scope))
+  if len(deps) == 2:
+    a, b = deps
+    return lambda scope: factory(a(scope), b(scope))
+  if len(deps) == 3:
+    a, b, c = deps
+    return lambda scope: factory(a(scope), b(scope), c(scope))
+  return lambda scope: factory(*[dep(scope) for dep in deps])
+
+
+def _request_scoped(key: Any, build: Provider) -> Provider:
+  def provide(scope: RequestScope) -> Any:
+    instances = scope.instances
+    value = instances.get(key, _MISSING)
+    if value is _MISSING:
+      value = instances[key] = build(scope)
+    return value
+
+  return provide
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from metrics import REPO_OPERATION_DURATION, timed
+from tracing import traced
+
+
+@dataclass
+class PostEntity:
+  id: str
+  user_id: str
+  title: str
+  content: Optional[str] = None
+  published: bool = False
+
+
+@dataclass
+class CommentEntity:
+  id: str
+  post_id: str
+  user_id: str
+  content: str
+
+
+E = TypeVar("E", PostEntity, CommentEntity)
+
+# Staged slot of a row the transaction has not written.
+_UNSTAGED = object()
+
+
+class WriteSet(Generic[E]):
+  """Staged writes of one transaction; ``None`` marks a delete."""
+
+  __slots__ = ("writes",)
+
+  def __init__(self) -> None:
+    self.writes: Dict[str, Optional[E]] = {}
+
+  def __len__(self) -> int:
+    return len(self.writes)
+
+  def entry(self, row_id: str) -> object:
+    """This transaction's state for ``row_id``, for ``restore``."""
+    return self.writes.get(row_id, _UNSTAGED)
+
+  def restore(self, row_id: str, entry: object) -> None:
+    if entry is _UNSTAGED:
+      self.writes.pop(row_id, None)
+    else:
+      self.writes[row_id] = entry  # type: ignore[assignment]
+
+
+class IndexedRepository(Generic[E]):
+  """In-memory repository with hash indexes on foreign-key columns.
+
+  Each indexed column maps a key (e.g. a ``user_id``) to the ids of the rows
+  referencing it, in insertion order. Indexes are maintained incrementally
+  as writes are applied, so a lookup by foreign key costs O(k) in the
+  matching rows and the per-key count (the bucket size) is O(1); neither
+  scans the table. Transactions stage a write set, and lookups inside a
+  transaction merge it with the committed index.
+  """
+
+  def __init__(self, name: str, indexed: Tuple[str, ...]) -> None:
+    self.name = name
+    self.indexed = indexed
+    self._rows: Dict[str, E] = {}
+    self._indexes: Dict[str, Dict[str, Dict[str, None]]] = {column: {} for column in indexed}
+    self._lock = threading.Lock()
+    self._listeners: List[Callable[[List[Tuple[Optional[E], Optional[E]]]], None]] = []
+    # Set by the owner of the repository (e.g. a tenant quota) to refuse write
+    # sets; see ``admit``.
+    self.admission: Optional[Callable[[WriteSet[E]], None]] = None
+    # Instrument per instance: the metric and span names carry the table name.
+    for op in ("get", "save", "delete", "lookup", "lookup_many", "commit"):
+      fn = getattr(self, op)
+      setattr(self, op, timed(REPO_OPERATION_DURATION, name, op)(traced(f"repository.{name}.{op}")(fn)))
+
+  def subscribe(self, listener: Callable[[List[Tuple[Optional[E], Optional[E]]]], None]) -> None:
+    """Call ``listener`` with the ``(old, new)`` rows of every applied write set.
+
+    Listeners run under the repository lock, so they see writes in commit
+    order; they must be quick and must not call back into the repository.
+    """
+    self._listeners.append(listener)
+
+  def get(self, row_id: str, *, staging: Optional[WriteSet[E]] = None) -> Optional[E]:
+    if staging is not None and row_id in staging.writes:
+      return staging.writes[row_id]
+    return self._rows.get(row_id)
+
+  def save(self, row: E, *, staging: Optional[WriteSet[E]] = None) -> None:
+    if staging is not None:
+      staging.writes[row.id] = row
+    else:
+      self._apply({row.id: row})
+
+  def delete(self, row_id: str, *, staging: Optional[WriteSet[E]] = None) -> None:
+    if staging is not None:
+      staging.writes[row_id] = None
+    else:
+      self._apply({row_id: None})
+
+  def lookup(self, column: str, key: str, *, staging: Optional[WriteSet[E]] = None) -> List[E]:
+    """Rows whose ``column`` equals ``key``, committed first in insertion order, then staged."""
+    return self._lookup(column, key, staging)
+
+  def lookup_many(self, column: str, keys: Iterable[str], *, staging: Optional[WriteSet[E]] = None) -> Dict[str, List[E]]:
+    """``lookup`` for several keys in one call (one round trip for a real store)."""
+    return {key: self._lookup(column, key, staging) for key in keys}
+
+  def _lookup(self, column: str, key: str, staging: Optional[WriteSet[E]]) -> List[E]:
+    ids = list(self._indexes[column].get(key, ()))
+    rows = self._rows
+    if staging is None or not staging.writes:
+      return [rows[row_id] for row_id in ids if row_id in rows]
+    writes = staging.writes
+    out: List[E] = []
+    for row_id in ids:
+      if row_id in writes:
+        staged = writes[row_id]
+        if staged is not None and getattr(staged, column) == key:
+          out.append(staged)
+      elif row_id in rows:
+        out.append(rows[row_id])
+    committed = set(ids)
+    out.extend(row for row_id, row in writes.items() if row is not None and row_id not in committed and getattr(row, column) == key)
+    return out
+
+  def count(self, column: str, key: str, *, staging: Optional[WriteSet[E]] = None) -> int:
+    if staging is None or not staging.writes:
+      return len(self._indexes[column].get(key, ()))
+    return len(self._lookup(column, key, staging))
+
+  def snapshot(self) -> WriteSet[E]:
+    return WriteSet()
+
+  def admit(self, staged: WriteSet[E]) -> None:
+    """Raise if ``staged`` must not be committed. Applies nothing.
+
+    A unit of work admits every repository's write set before it commits
+    any of them, so a refusal leaves all of them untouched.
+    """
+    if self.admission is not None and staged.writes:
+      self.admission(staged)
+
+  def commit(self, staged: WriteSet[E]) -> None:
+    if staged.writes:
+      self._apply(staged.writes)
+
+  def _apply(self, writes: Dict[str, Optional[E]]) -> None:
+    with self._lock:
+      rows = self._rows
+      applied: List[Tuple[Optional[E], Optional[E]]] = []
+      for row_id, row in writes.items():
+        old = rows.get(row_id)
+        if old is not None or row is not None:
+          applied.append((old, row))
+        for column, index in self._indexes.items():
+          old_key = None if old is None else getattr(old, column)
+          new_key = None if row is None else getattr(row, column)
+          if old_key == new_key:
+            continue
+          if old_key is not None:
+            bucket = index[old_key]
+            del bucket[row_id]
+            if not bucket:
+              del index[old_key]
+          if new_key is not None:
+            index.setdefault(new_key, {})[row_id] = None
+        if row is None:
+          rows.pop(row_id, None)
+        else:
+          rows[row_id] = row
+      for listener in self._listeners:
+        listener(applied)
+
+  def bulk_load(self, rows: Iterable[E], *, batch: int = 10_000) -> int:
+    """Apply ``rows`` ``batch`` at a time, outside any transaction; for start-up loading.
+
+    Indexes and listeners (the search index) are updated as for a commit.
+    """
+    rows = iter(rows)
+    count = 0
+    while True:
+      chunk: Dict[str, Optional[E]] = {row.id: row for row in islice(rows, batch)}
+      if not chunk:
+        return count
+      self._apply(chunk)
+      count += len(chunk)
+
+  def size(self) -> int:
+    return len(self._rows)
+
+
+class InMemoryPostRepository(IndexedRepository[PostEntity]):
+  def __init__(self) -> None:
+    super().__init__("posts", ("user_id",))
+
+  def by_user(self, user_id: str, *, staging: Optional[WriteSet[PostEntity]] = None) -> List[PostEntity]:
+    return self.lookup("user_id", user_id, staging=staging)
+
+  def by_users(self, user_ids: Iterable[str], *, staging: Optional[WriteSet[PostEntity]] = None) -> Dict[str, List[PostEntity]]:
+    return self.lookup_many("user_id", user_ids, staging=staging)
+
+  def count_for_user(self, user_id: str, *, staging: Optional[WriteSet[PostEntity]] = None) -> int:
+    return self.count("user_id", user_id, staging=staging)
+
+
+class InMemoryCommentRepository(IndexedRepository[CommentEntity]):
+  def __init__(self) -> None:
+    super().__init__("comments", ("post_id", "user_id"))
+
+  def for_post(self, post_id: str, *, staging: Optional[WriteSet[CommentEntity]] = None) -> List[CommentEntity]:
+    return self.lookup("post_id", post_id, staging=staging)
+
+  def for_posts(
+    self, post_ids: Iterable[str], *, staging: Optional[WriteSet[CommentEntity]] = None,
+  ) -> Dict[str, List[CommentEntity]]:
+    return self.lookup_many("post_id", post_ids, staging=staging)
+
+  def count_for_post(self, post_id: str, *, staging: Optional[WriteSet[CommentEntity]] = None) -> int:
+    return self.count("post_id", post_id, staging=staging)
+
+  def by_user(self, user_id: str, *, staging: Optional[WriteSet[CommentEntity]] = None) -> List[CommentEntity]:
+    return self.lookup("user_id", user_id, staging=staging)
+
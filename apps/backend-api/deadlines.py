@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Coroutine, Dict, Iterator, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from admission import AdmissionRoute
+from metrics import REGISTRY
+
+DEADLINE_EXCEEDED = REGISTRY.counter(
+  "request_deadline_exceeded_total", "Work abandoned because the request's deadline passed, by stage.", ("route", "stage"),
+)
+
+TIMEOUT_HEADER = "x-request-timeout"
+
+
+class DeadlineExceeded(Exception):
+  """The current request's deadline passed before ``stage`` could start."""
+
+  def __init__(self, stage: str, budget: float) -> None:
+    super().__init__(f"deadline of {budget:g}s exceeded before {stage}")
+    self.stage = stage
+    self.budget = budget
+
+
+class Deadline:
+  """Point in ``time.monotonic()`` by which a request's work must be done."""
+
+  __slots__ = ("expires", "budget", "route")
+
+  def __init__(self, budget: float, route: str = "") -> None:
+    self.expires = time.monotonic() + budget
+    self.budget = budget
+    self.route = route
+
+  def remaining(self) -> float:
+    return self.expires - time.monotonic()
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+  return _current.get()
+
+
+def remaining() -> Optional[float]:
+  """Seconds left before the current deadline, or None when there is none."""
+  active = _current.get()
+  return None if active is None else active.remaining()
+
+
+def check(stage: str) -> None:
+  """Raise DeadlineExceeded if the current deadline has passed.
+
+  Called before expensive steps (snapshots, scans, commits) so a request
+  whose client has given up stops using its worker thread; outside a
+  deadline it costs one context variable lookup.
+  """
+  active = _current.get()
+  if active is not None and time.monotonic() >= active.expires:
+    DEADLINE_EXCEEDED.inc(active.route or "-", stage)
+    raise DeadlineExceeded(stage, active.budget)
+
+
+@contextmanager
+def deadline(seconds: float, *, route: str = "") -> Iterator[Deadline]:
+  """Run the block under a deadline ``seconds`` from now.
+
+  Nested deadlines never extend an enclosing one: the earlier expiry wins.
+  The deadline is carried in a context variable, so it follows the work
+  into ``run_in_threadpool`` calls made inside the block.
+  """
+  created = Deadline(seconds, route)
+  outer = _current.get()
+  if outer is not None and outer.expires < created.expires:
+    created.expires = outer.expires
+    created.budget = outer.budget
+  token = _current.set(created)
+  try:
+    yield created
+  finally:
+    _current.reset(token)
+
+
+class DeadlinePolicy:
+  """Request budgets: a default, per-route overrides and a client header.
+
+  A route's budget is its override or the default; ``0`` means none. A
+  client may send ``X-Request-Timeout`` (seconds) to ask for a shorter
+  budget, never a longer one; it is capped at ``max_timeout`` on routes
+  without a budget of their own.
+  """
+
+  def __init__(self, default: float = 0.0, *, max_timeout: float = 60.0) -> None:
+    self.default = default
+    self.max_timeout = max_timeout
+    self._overrides: Dict[Tuple[str, str], float] = {}
+
+  @classmethod
+  def from_env(cls) -> "DeadlinePolicy":
+    return cls(
+      float(os.getenv("BACKEND_REQUEST_TIMEOUT", "0") or 0),
+      max_timeout=float(os.getenv("BACKEND_REQUEST_TIMEOUT_MAX", "60")),
+    )
+
+  def configure(self, method: str, path: str, seconds: float) -> None:
+    self._overrides[(method.upper(), path)] = seconds
+
+  def reset(self) -> None:
+    self._overrides.clear()
+
+  def budget_for(self, method: str, path: str, requested: Optional[str] = None) -> Optional[float]:
+    """Budget in seconds for a request, or None for no deadline.
+
+    Raises ValueError if ``requested`` (the header value) is not a positive
+    number of seconds.
+    """
+    route = self._overrides.get((method, path), self.default)
+    if requested is None:
+      return route if route > 0 else None
+    asked = float(requested)
+    if not math.isfinite(asked) or asked <= 0:
+      raise ValueError("must be a positive number of seconds")
+    return min(asked, route) if route > 0 else min(asked, self.max_timeout)
+
+
+DEADLINES = DeadlinePolicy.from_env()
+
+
+class DeadlineRoute(AdmissionRoute):
+  """AdmissionRoute that runs the request under its deadline.
+
+  The deadline starts when the request is routed, so time spent queued for
+  admission, parsing the body and resolving dependencies counts against
+  it. It covers producing the response, not streaming its body.
+  """
+
+  def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+    handler = super().get_route_handler()
+    path = self.path
+
+    async def bounded(request: Request) -> Response:
+      try:
+        budget = DEADLINES.budget_for(request.method, path, request.headers.get(TIMEOUT_HEADER))
+      except ValueError as exc:
+        return JSONResponse({"detail": f"Invalid X-Request-Timeout: {exc}"}, status_code=400)
+      if budget is None:
+        return await handler(request)
+      with deadline(budget, route=path):
+        return await handler(request)
+
+    return bounded
+
+
+def deadline_exceeded_response(request: Request, exc: Exception) -> Response:
+  """Exception handler turning DeadlineExceeded into a 504."""
+  stage = exc.stage if isinstance(exc, DeadlineExceeded) else None
+  return JSONResponse({"detail": "Deadline exceeded", "stage": stage}, status_code=504)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hmac
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+import di
+import uow
+from hotkeys import HOTKEYS
+from memory import GROUP_BY, MemoryDebugger, structure_sizes
+from profiling import PROFILER
+
+# Debug routes, and request profiling on demand, are served only when a token
+# is configured, and then only to requests presenting it. Without a token they
+# answer 404 and nothing is traced or recorded, so the disabled surface costs
+# nothing.
+DEBUG_TOKEN_HEADER = "X-Debug-Token"
+
+
+class DebugSettings:
+  def __init__(self, token: str = "") -> None:
+    self.token = token
+
+  @property
+  def token(self) -> str:
+    return self._token
+
+  @token.setter
+  def token(self, token: str) -> None:
+    # Open units of work are only needed by /debug/memory.
+    self._token = token
+    uow.track_open_units(bool(token))
+
+  @classmethod
+  def from_env(cls) -> "DebugSettings":
+    return cls(os.getenv("BACKEND_DEBUG_TOKEN", ""))
+
+  @property
+  def enabled(self) -> bool:
+    return bool(self.token)
+
+
+SETTINGS = DebugSettings.from_env()
+MEMORY = MemoryDebugger()
+
+
+def authorized(presented: str) -> bool:
+  """Whether ``presented`` is the configured debug token (always False when disabled)."""
+  return SETTINGS.enabled and hmac.compare_digest(presented.encode(), SETTINGS.token.encode())
+
+
+def require_debug(request: Request) -> None:
+  if not SETTINGS.enabled:
+    raise HTTPException(status_code=404, detail="Not Found")
+  if not authorized(request.headers.get(DEBUG_TOKEN_HEADER, "")):
+    raise HTTPException(status_code=403, detail="Forbidden")
+
+
+# Plain APIRoutes: debug requests bypass admission control so they still get
+# through when the service is overloaded, which is when they are needed.
+router = APIRouter(prefix="/debug", tags=["debug"], include_in_schema=False, dependencies=[Depends(require_debug)])
+
+_GROUP_BY = Query("lineno", pattern=f"^({'|'.join(GROUP_BY)})$")
+
+
+def _unavailable(exc: Exception) -> HTTPException:
+  return HTTPException(status_code=409, detail=str(exc))
+
+
+@router.get("/memory", summary="tracemalloc status and structure size estimates")
+def memory_status() -> Dict[str, Any]:
+  structures = structure_sizes(
+    di._singleton_user_repo, di._singleton_post_repo, di._singleton_comment_repo, di._post_search,
+  )
+  # Tenant partitions, as "tenants.<id>.<structure>"; offloaded parts count as empty.
+  for partition in di.TENANTS.partitions():
+    content = partition.content
+    sizes = structure_sizes(partition, content.posts, content.comments, content.search, staged=False)
+    structures.update((f"tenants.{partition.tenant}.{name}", size) for name, size in sizes.items())
+  return {**MEMORY.status(), "structures": structures}
+
+
+@router.post("/memory/start", summary="Start tracing allocations")
+def memory_start(frames: int = Query(1, ge=1, le=64)) -> Dict[str, Any]:
+  try:
+    MEMORY.start(frames)
+  except RuntimeError as exc:
+    raise _unavailable(exc)
+  return MEMORY.status()
+
+
+@router.post("/memory/stop", summary="Stop tracing and drop snapshots")
+def memory_stop() -> Dict[str, Any]:
+  MEMORY.stop()
+  return MEMORY.status()
+
+
+@router.post("/memory/snapshots", summary="Take and keep a snapshot")
+def memory_snapshot() -> Dict[str, int]:
+  try:
+    return {"id": MEMORY.take()}
+  except RuntimeError as exc:
+    raise _unavailable(exc)
+
+
+@router.get("/memory/top", summary="Top allocation sites")
+def memory_top(
+  snapshot: Optional[int] = Query(None, description="Stored snapshot id; a fresh snapshot when omitted"),
+  group_by: str = _GROUP_BY,
+  limit: int = Query(20, ge=1, le=500),
+) -> List[Dict[str, Any]]:
+  try:
+    return MEMORY.top(snapshot, group_by=group_by, limit=limit)
+  except KeyError as exc:
+    raise HTTPException(status_code=404, detail=str(exc.args[0]))
+  except RuntimeError as exc:
+    raise _unavailable(exc)
+
+
+@router.get("/memory/diff", summary="Allocation changes between two snapshots")
+def memory_diff(
+  base: int,
+  target: Optional[int] = Query(None, description="Stored snapshot id; a fresh snapshot when omitted"),
+  group_by: str = _GROUP_BY,
+  limit: int = Query(20, ge=1, le=500),
+) -> List[Dict[str, Any]]:
+  try:
+    return MEMORY.diff(base, target, group_by=group_by, limit=limit)
+  except KeyError as exc:
+    raise HTTPException(status_code=404, detail=str(exc.args[0]))
+  except RuntimeError as exc:
+    raise _unavailable(exc)
+
+
+@router.get("/tenants", summary="Tenant partitions: residency, size estimates and quotas")
+def tenant_usage() -> Dict[str, Any]:
+  return {
+    "resident_bytes": di.TENANTS.resident_bytes(),
+    "budget": di.TENANTS.settings.memory_budget,
+    "partitions": di.TENANTS.usage(),
+  }
+
+
+@router.get("/hotkeys", summary="Hottest keys per table with read/write mix")
+def hot_keys(
+  table: Optional[str] = Query(None, description="Only this table (users, posts, comments)"),
+  limit: int = Query(20, ge=1, le=1000),
+) -> Dict[str, Any]:
+  return {"enabled": HOTKEYS.enabled, "tables": HOTKEYS.report(table, limit)}
+
+
+_MEDIA_TYPES = {"pstats": "application/octet-stream", "collapsed": "text/plain", "json": "application/json"}
+
+
+@router.get("/profiles", summary="Captured request profiles, newest first")
+def list_profiles() -> List[Dict[str, Any]]:
+  return PROFILER.store.list()
+
+
+@router.get("/profiles/{name}", summary="Download a profile file")
+def download_profile(name: str) -> FileResponse:
+  path = PROFILER.store.path(name)
+  if path is None:
+    raise HTTPException(status_code=404, detail="Profile not found")
+  return FileResponse(path, media_type=_MEDIA_TYPES[name.rsplit(".", 1)[1]], filename=name)
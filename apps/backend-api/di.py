@@ -1,15 +1,108 @@
-from fastapi import Depends
+import os
+from typing import Callable
 
+from changes import ChangeLog
+from container import REQUEST, SINGLETON, Container
+from content_repository import InMemoryCommentRepository, InMemoryPostRepository
+from metrics import REPO_STORE_SIZE
+from search import SearchIndex
+from services import PostService, UserService
+from tenants import TenantContent, TenantRegistry, current_tenant
 from uow import UnitOfWork
-from repository import InMemoryUserRepository
+from repository import InMemoryUserRepository, ShardedUserRepository, UserRepository
 
-_singleton_user_repo = InMemoryUserRepository()
 
+def _make_user_repo() -> UserRepository:
+  # BACKEND_USER_STORE_FILE puts users in a file mapped by every worker on the
+  # host; BACKEND_USER_SHARDS > 0 selects the hash-sharded repository so
+  # writers on different shards do not serialize behind one lock.
+  path = os.getenv("BACKEND_USER_STORE_FILE")
+  if path:
+    # Imported lazily: relies on fcntl, which is POSIX-only.
+    from shared_store import SharedMemoryUserRepository
 
-def get_uow() -> UnitOfWork:
-  # In a real app, wire a session factory or connection pool.
-  return UnitOfWork(_singleton_user_repo)
+    return SharedMemoryUserRepository(path, capacity=int(os.getenv("BACKEND_USER_STORE_CAPACITY", "65536")))
+  shards = int(os.getenv("BACKEND_USER_SHARDS", "0"))
+  if shards > 0:
+    return ShardedUserRepository(shards)
+  return InMemoryUserRepository()
 
 
-def inject_uow(uow: UnitOfWork = Depends(get_uow)) -> UnitOfWork:
-  return uow
+def _tenant_user_repo(tenants: TenantRegistry) -> UserRepository:
+  # Requests without X-Tenant-Id get the repository above; other tenants get
+  # their own partition (see tenants.TenantRegistry).
+  return tenants.repository(current_tenant())
+
+
+def _tenant_content(tenants: TenantRegistry) -> TenantContent:
+  # Posts, comments and the search index are partitioned like users.
+  return tenants.content(current_tenant())
+
+
+def _user_changes(repo: UserRepository) -> ChangeLog:
+  return repo.changes
+
+
+def _posts(content: TenantContent) -> InMemoryPostRepository:
+  return content.posts
+
+
+def _comments(content: TenantContent) -> InMemoryCommentRepository:
+  return content.comments
+
+
+def _post_search_index(content: TenantContent) -> SearchIndex:
+  return content.search
+
+
+# The graph is built and checked once at import; each request then resolves
+# through precomputed providers (see container.CompiledContainer). Tests swap
+# a registration with ``CONTAINER.override(UnitOfWork, lambda: ...)``, which
+# covers both inject_uow and get_uow.
+_container = Container()
+_container.instance(TenantRegistry, TenantRegistry.from_env(_make_user_repo()))
+_container.register(UserRepository, _tenant_user_repo, scope=REQUEST, deps=(TenantRegistry,))
+_container.register(TenantContent, _tenant_content, scope=REQUEST, deps=(TenantRegistry,))
+_container.register(InMemoryPostRepository, _posts, scope=REQUEST)
+_container.register(InMemoryCommentRepository, _comments, scope=REQUEST)
+_container.register(ChangeLog, _user_changes, scope=REQUEST)
+_container.register(SearchIndex, _post_search_index, scope=REQUEST)
+_container.register(UserService, scope=SINGLETON)
+_container.register(PostService, scope=SINGLETON)
+_container.register(
+  UnitOfWork, scope=REQUEST, deps=(UserRepository, InMemoryPostRepository, InMemoryCommentRepository),
+)
+CONTAINER = _container.compile()
+
+TENANTS = CONTAINER.resolve(TenantRegistry)
+TENANTS.track()
+_singleton_user_repo = TENANTS.default
+_singleton_post_repo = TENANTS.default_content.posts
+_singleton_comment_repo = TENANTS.default_content.comments
+_post_search = TENANTS.default_content.search
+REPO_STORE_SIZE.set_function(_singleton_user_repo.size, "users")
+REPO_STORE_SIZE.set_function(_singleton_post_repo.size, "posts")
+REPO_STORE_SIZE.set_function(_singleton_comment_repo.size, "comments")
+
+# A fresh UnitOfWork per call, for code that creates its own (thread pool work,
+# coalesced reads, import chunks).
+get_uow = CONTAINER.factory(UnitOfWork)
+
+# FastAPI dependencies.
+inject_uow = CONTAINER.depends(UnitOfWork)
+user_changes = CONTAINER.depends(ChangeLog)
+post_search = CONTAINER.depends(SearchIndex)
+user_service = CONTAINER.depends(UserService)
+post_service = CONTAINER.depends(PostService)
+
+
+async def inject_uow_factory() -> Callable[[], UnitOfWork]:
+  # Resolved on the event loop, for handlers that open a UnitOfWork per
+  # chunk of work rather than one per request.
+  return get_uow
+
+
+def users_version() -> int:
+  # Changes whenever the current tenant's committed user data changes;
+  # scopes coalesced reads.
+  return TENANTS.repository(current_tenant()).version
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import os
+import itertools
+import threading
+import weakref
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+HOTKEY_OPERATIONS = REGISTRY.counter(
+  "hotkey_operations_total", "Keyed repository operations seen by hot-key tracking, by table and kind.", ("table", "op"),
+)
+HOTKEY_TOP_SHARE = REGISTRY.gauge(
+  "hotkey_top_share", "Share of a table's recent operations that went to its tracked top keys.", ("table",),
+)
+HOTKEY_TOP1_SHARE = REGISTRY.gauge(
+  "hotkey_top1_share", "Share of a table's recent operations that went to its single hottest key.", ("table",),
+)
+
+_MASK = (1 << 64) - 1
+
+
+class CountMinSketch:
+  """Approximate per-key counts in ``width * depth`` counters.
+
+  Each key maps to one counter per row (double hashing of Python's string
+  hash, so indices are stable only within a process). Updates are
+  conservative: only the counters at the current minimum are raised, which
+  keeps overestimates low for skewed streams. ``estimate`` never
+  undercounts; it overcounts by at most ``e / width`` of the total with
+  probability ``1 - exp(-depth)``.
+  """
+
+  __slots__ = ("width", "depth", "total", "_counts")
+
+  def __init__(self, width: int = 2048, depth: int = 4) -> None:
+    if width < 1 or depth < 1:
+      raise ValueError("width and depth must be >= 1")
+    self.width = width
+    self.depth = depth
+    self.total = 0
+    self._counts = array("Q", bytes(8 * width * depth))
+
+  def _slots(self, key: str) -> List[int]:
+    h = hash(key) & _MASK
+    h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+    width = self.width
+    return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+  def add(self, key: str, amount: int = 1) -> int:
+    """Count ``amount`` more of ``key``; returns its new estimate."""
+    counts = self._counts
+    slots = self._slots(key)
+    target = min(counts[i] for i in slots) + amount
+    for i in slots:
+      if counts[i] < target:
+        counts[i] = target
+    self.total += amount
+    return target
+
+  def estimate(self, key: str) -> int:
+    counts = self._counts
+    return min(counts[i] for i in self._slots(key))
+
+  def halve(self, times: int = 1) -> None:
+    self._counts = array("Q", [count >> times for count in self._counts])
+    self.total >>= times
+
+
+class SpaceSaving:
+  """Top-k heavy hitters over a stream in ``capacity`` counters (Metwally et al.).
+
+  Tracks at most ``capacity`` keys. An untracked key replaces one with the
+  minimum count and inherits that count as its ``error``, so ``count`` is an
+  upper bound and ``count - error`` a lower bound of its true frequency;
+  every key more frequent than ``total / capacity`` is tracked. Counts are
+  kept in buckets of equal count (the stream-summary layout), so an update
+  is O(1) whatever the capacity.
+  """
+
+  __slots__ = ("capacity", "total", "_counts", "_errors", "_buckets", "_min")
+
+  def __init__(self, capacity: int = 64) -> None:
+    if capacity < 1:
+      raise ValueError("capacity must be >= 1")
+    self.capacity = capacity
+    self.total = 0
+    self._counts: Dict[str, int] = {}
+    self._errors: Dict[str, int] = {}
+    # count -> keys with that count, in insertion order.
+    self._buckets: Dict[int, Dict[str, None]] = {}
+    self._min = 0
+
+  def __len__(self) -> int:
+    return len(self._counts)
+
+  def add(self, key: str) -> None:
+    self.total += 1
+    counts, buckets = self._counts, self._buckets
+    count = counts.get(key)
+    if count is None:
+      if len(counts) < self.capacity:
+        counts[key] = 1
+        self._errors[key] = 0
+        buckets.setdefault(1, {})[key] = None
+        self._min = 1
+        return
+      # Replace a key with the minimum count.
+      low = self._min
+      bucket = buckets[low]
+      evicted, _ = bucket.popitem()
+      del counts[evicted], self._errors[evicted]
+      if not bucket:
+        del buckets[low]
+      counts[key] = low + 1
+      self._errors[key] = low
+      buckets.setdefault(low + 1, {})[key] = None
+      if low not in buckets:
+        self._min = low + 1
+      return
+    bucket = buckets[count]
+    del bucket[key]
+    if not bucket:
+      del buckets[count]
+      if count == self._min:
+        self._min = count + 1
+    counts[key] = count + 1
+    buckets.setdefault(count + 1, {})[key] = None
+
+  def top(self, n: Optional[int] = None) -> List[Tuple[str, int, int]]:
+    """``(key, count, error)`` of the most frequent keys, most frequent first."""
+    ranked = sorted(self._counts.items(), key=lambda item: -item[1])
+    return [(key, count, self._errors[key]) for key, count in ranked[:n]]
+
+  def halve(self, times: int = 1) -> None:
+    """Halve every count (and error) ``times`` times, dropping keys that reach zero."""
+    counts = {key: count >> times for key, count in self._counts.items() if count >> times}
+    self._errors = {key: self._errors[key] >> times for key in counts}
+    self._counts = counts
+    self._buckets = {}
+    for key, count in sorted(counts.items(), key=lambda item: item[1]):
+      self._buckets.setdefault(count, {})[key] = None
+    self._min = min(counts.values()) if counts else 0
+    self.total >>= times
+
+
+class _Token:
+  # Held only by a thread's local storage; finalized when the thread exits.
+  __slots__ = ("__weakref__",)
+
+
+class KeyTracker:
+  """Read and write frequencies of one table's keys in bounded memory.
+
+  Reads and writes go to separate count-min sketches (so any key's mix can
+  be estimated) and together to a space-saving summary of the hottest keys.
+  Each thread records into its own buffer, applied under the tracker's lock
+  once it holds ``batch`` operations, so request threads take the lock once
+  per batch rather than per operation. Readers apply every buffer first,
+  so they see all operations recorded so far. A thread's buffer is dropped
+  once the thread has exited and its last operations have been applied, so
+  short-lived worker threads leave nothing behind.
+
+  All counts are halved once per ``window`` operations, so the picture
+  follows recent traffic. The halving, O(width * depth + top_k), is left to
+  readers (reports and metric scrapes), which halve once for each window
+  that has passed since the last read; recording never pays for it.
+  ``reads``/``writes`` are undecayed totals.
+  """
+
+  def __init__(
+    self, table: str, *, top_k: int = 64, width: int = 2048, depth: int = 4, window: int = 100_000, batch: int = 64,
+  ) -> None:
+    self.table = table
+    self.window = window
+    self.batch = max(1, batch)
+    self._reads = 0
+    self._writes = 0
+    self._read_sketch = CountMinSketch(width, depth)
+    self._write_sketch = CountMinSketch(width, depth)
+    self._summary = SpaceSaving(top_k)
+    self._lock = threading.Lock()
+    self._since_decay = 0
+    # One buffer of (key, is_write) per live recording thread, by serial
+    # number. Its thread appends; only holders of the lock pop. The thread's
+    # local token dies with the thread and queues the serial in ``_exited``.
+    self._local = threading.local()
+    self._buffers: Dict[int, Deque[Tuple[str, bool]]] = {}
+    self._serials = itertools.count()
+    self._exited: List[int] = []
+
+  @property
+  def reads(self) -> int:
+    with self._lock:
+      self._drain()
+      return self._reads
+
+  @property
+  def writes(self) -> int:
+    with self._lock:
+      self._drain()
+      return self._writes
+
+  def read(self, key: str) -> None:
+    self._record(key, False)
+
+  def write(self, key: str) -> None:
+    self._record(key, True)
+
+  def _record(self, key: str, write: bool) -> None:
+    buffer: Optional[Deque[Tuple[str, bool]]] = getattr(self._local, "buffer", None)
+    if buffer is None:
+      buffer = self._register()
+    buffer.append((key, write))
+    if len(buffer) >= self.batch:
+      with self._lock:
+        self._drain()
+
+  def _register(self) -> Deque[Tuple[str, bool]]:
+    buffer: Deque[Tuple[str, bool]] = deque()
+    token = _Token()
+    serial = next(self._serials)
+    # list.append is atomic, so the finalizer never needs the lock (it may
+    # run on any thread, including one that holds it).
+    weakref.finalize(token, self._exited.append, serial)
+    with self._lock:
+      # Apply and drop the buffers of exited threads, so a pool that keeps
+      # replacing its workers holds at most one buffer per live thread.
+      if self._exited:
+        self._drain()
+      self._buffers[serial] = buffer
+    self._local.buffer = buffer
+    self._local.token = token
+    return buffer
+
+  def _drain(self) -> None:
+    # Called with the lock held.
+    read_sketch, write_sketch, summary = self._read_sketch, self._write_sketch, self._summary
+    reads = writes = 0
+    # Threads that had exited before the drain append nothing more, so their
+    # buffers are empty afterwards.
+    exited = [self._exited.pop() for _ in range(len(self._exited))]
+    for buffer in self._buffers.values():
+      # Only what is there now: its thread may be appending meanwhile.
+      for _ in range(len(buffer)):
+        key, write = buffer.popleft()
+        if write:
+          write_sketch.add(key)
+          writes += 1
+        else:
+          read_sketch.add(key)
+          reads += 1
+        summary.add(key)
+    for serial in exited:
+      self._buffers.pop(serial, None)
+    self._reads += reads
+    self._writes += writes
+    self._since_decay += reads + writes
+
+  def _sync(self) -> None:
+    # Called with the lock held, by readers.
+    self._drain()
+    if not self.window or self._since_decay < self.window:
+      return
+    windows = self._since_decay // self.window
+    self._since_decay -= windows * self.window
+    # Past 64 halvings every count is zero anyway.
+    times = min(windows, 64)
+    self._read_sketch.halve(times)
+    self._write_sketch.halve(times)
+    self._summary.halve(times)
+
+  def estimate(self, key: str) -> Tuple[int, int]:
+    """Estimated recent ``(reads, writes)`` of ``key``."""
+    with self._lock:
+      self._sync()
+      return self._read_sketch.estimate(key), self._write_sketch.estimate(key)
+
+  def top_share(self, n: Optional[int] = None) -> float:
+    """Share of recent operations that went to the top ``n`` tracked keys."""
+    with self._lock:
+      self._sync()
+      total = self._summary.total
+      guaranteed = sum(count - error for _, count, error in self._summary.top(n))
+    return guaranteed / total if total else 0.0
+
+  def report(self, limit: int = 20) -> Dict[str, Any]:
+    with self._lock:
+      self._sync()
+      top = self._summary.top(limit)
+      recent = self._summary.total
+      keys = []
+      for key, count, error in top:
+        # Both the sketches and the summary overestimate; the smaller of
+        # the two is the better estimate.
+        reads = min(self._read_sketch.estimate(key), count)
+        writes = min(self._write_sketch.estimate(key), count)
+        keys.append({
+          "key": key,
+          "count": count,
+          "error": error,
+          "reads": reads,
+          "writes": writes,
+          "read_ratio": reads / (reads + writes) if reads + writes else 0.0,
+          "share": (count - error) / recent if recent else 0.0,
+        })
+      reads, writes = self._reads, self._writes
+    return {
+      "table": self.table,
+      "reads": reads,
+      "writes": writes,
+      "read_ratio": reads / (reads + writes) if reads + writes else 0.0,
+      "recent": recent,
+      "keys": keys,
+    }
+
+
+class _Untracked(KeyTracker):
+  def read(self, key: str) -> None:
+    pass
+
+  def write(self, key: str) -> None:
+    pass
+
+
+class HotKeys:
+  """One KeyTracker per table; when disabled, trackers record nothing."""
+
+  def __init__(
+    self,
+    *,
+    enabled: bool = True,
+    top_k: int = 64,
+    width: int = 2048,
+    depth: int = 4,
+    window: int = 100_000,
+    batch: int = 64,
+  ) -> None:
+    self.enabled = enabled
+    self._options = {"top_k": top_k, "width": width, "depth": depth, "window": window, "batch": batch}
+    self._trackers: Dict[str, KeyTracker] = {}
+
+  @classmethod
+  def from_env(cls) -> "HotKeys":
+    return cls(
+      enabled=os.getenv("BACKEND_HOTKEYS_ENABLED", "1").strip().lower() in ("1", "true", "yes", "on"),
+      top_k=int(os.getenv("BACKEND_HOTKEYS_TOP_K", "64")),
+      width=int(os.getenv("BACKEND_HOTKEYS_SKETCH_WIDTH", "2048")),
+      depth=int(os.getenv("BACKEND_HOTKEYS_SKETCH_DEPTH", "4")),
+      window=int(os.getenv("BACKEND_HOTKEYS_WINDOW", "100000")),
+      batch=int(os.getenv("BACKEND_HOTKEYS_BATCH", "64")),
+    )
+
+  def tracker(self, table: str) -> KeyTracker:
+    """The tracker for ``table``, created and exported as metrics on first use."""
+    if not self.enabled:
+      return _Untracked(table, top_k=1, width=1, depth=1, window=0)
+    tracker = self._trackers.get(table)
+    if tracker is None:
+      tracker = self._trackers.setdefault(table, KeyTracker(table, **self._options))
+      _export(tracker)
+    return tracker
+
+  def tables(self) -> List[str]:
+    return sorted(self._trackers)
+
+  def report(self, table: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    names = [table] if table is not None else self.tables()
+    return [self._trackers[name].report(limit) for name in names if name in self._trackers]
+
+
+def _export(tracker: KeyTracker) -> None:
+  table = tracker.table
+  HOTKEY_OPERATIONS.set_function(lambda: tracker.reads, table, "read")
+  HOTKEY_OPERATIONS.set_function(lambda: tracker.writes, table, "write")
+  HOTKEY_TOP_SHARE.set_function(tracker.top_share, table)
+  HOTKEY_TOP1_SHARE.set_function(lambda: tracker.top_share(1), table)
+
+
+HOTKEYS = HotKeys.from_env()
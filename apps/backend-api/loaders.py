@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, FrozenSet, Generic, Iterable, List, Mapping, Optional, TypeVar
+
+from content_repository import CommentEntity, PostEntity
+from repository import UserEntity
+from uow import UnitOfWork
+
+V = TypeVar("V")
+
+# Expansions accepted by ?include=; a nested path implies its parents.
+INCLUDES = frozenset({"posts", "posts.comments"})
+
+
+class BatchLoader(Generic[V]):
+  """DataLoader-style loader: batched fetches with per-instance memoization.
+
+  ``load_many`` resolves every key it has not seen yet with a single call to
+  ``batch`` and serves the rest from its cache. Create one per request so
+  the cache never outlives the request's UnitOfWork.
+  """
+
+  def __init__(self, batch: Callable[[List[str]], Mapping[str, V]]) -> None:
+    self._batch = batch
+    self._cache: Dict[str, V] = {}
+    self.batches = 0
+
+  def load_many(self, keys: Iterable[str]) -> Dict[str, V]:
+    wanted = list(dict.fromkeys(keys))
+    missing = [key for key in wanted if key not in self._cache]
+    if missing:
+      self.batches += 1
+      self._cache.update(self._batch(missing))
+    return {key: self._cache[key] for key in wanted}
+
+  def load(self, key: str) -> V:
+    return self.load_many([key])[key]
+
+
+class Loaders:
+  """The batch loaders of one request, reading through its UnitOfWork."""
+
+  def __init__(self, uow: UnitOfWork) -> None:
+    self.posts_by_user: BatchLoader[List[PostEntity]] = BatchLoader(uow.posts_by_users)
+    self.comments_by_post: BatchLoader[List[CommentEntity]] = BatchLoader(uow.comments_for_posts)
+
+
+def parse_include(raw: Optional[str]) -> FrozenSet[str]:
+  """Parse ``posts,posts.comments``; raises ValueError naming an unknown path."""
+  paths = {part.strip() for part in (raw or "").split(",") if part.strip()}
+  unknown = sorted(paths - INCLUDES)
+  if unknown:
+    raise ValueError(f"unknown include: {', '.join(unknown)}")
+  for path in list(paths):
+    parts = path.split(".")
+    paths.update(".".join(parts[:i]) for i in range(1, len(parts)))
+  return frozenset(paths)
+
+
+def expand_users(users: List[UserEntity], include: FrozenSet[str], loaders: Loaders) -> List[Dict[str, Any]]:
+  """Users as dicts with the requested relations attached.
+
+  Relations are resolved breadth-first: one batched lookup per level for
+  all entities at that level, however many users or posts there are.
+  """
+  out: List[Dict[str, Any]] = [{"id": u.id, "name": u.name} for u in users]
+  if "posts" not in include:
+    return out
+  posts_by_user = loaders.posts_by_user.load_many(u.id for u in users)
+  post_dicts: List[Dict[str, Any]] = []
+  for user in out:
+    user["posts"] = [
+      {"id": p.id, "user_id": p.user_id, "title": p.title, "content": p.content, "published": p.published}
+      for p in posts_by_user[user["id"]]
+    ]
+    post_dicts.extend(user["posts"])
+  if "posts.comments" in include:
+    comments = loaders.comments_by_post.load_many(p["id"] for p in post_dicts)
+    for post in post_dicts:
+      post["comments"] = [
+        {"id": c.id, "post_id": c.post_id, "user_id": c.user_id, "content": c.content} for c in comments[post["id"]]
+      ]
+  return out
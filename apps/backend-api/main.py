@@ -1,17 +1,58 @@
 from __future__ import annotations
 
-from typing import Dict
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
 
-from di import inject_uow
+from admission import POLICY
+from changes import ChangeLog, ResyncRequired, sse_events
+from deadlines import DEADLINES, DeadlineExceeded, DeadlineRoute, deadline_exceeded_response
+from debug import authorized, router as debug_router
+from di import (
+    CONTAINER, TENANTS, get_uow, inject_uow, inject_uow_factory, post_search, post_service, user_changes, user_service,
+    users_version,
+)
+from ingest import BODY_MODELS, json_body, json_body_openapi
+from loaders import Loaders, expand_users, parse_include
+from metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from profiling import ProfilingMiddleware
 from repository import UserEntity
-from services import UserService
+from content_repository import CommentEntity, InMemoryPostRepository, PostEntity
+from services import PostService, UserService
+from search import SearchIndex
+from singleflight import SingleFlight
+from tenants import TenantMiddleware, TenantQuotaExceeded, current_tenant, quota_exceeded_response
+from tracing import TracingMiddleware, traced_route
+from transfer import NDJSON, ImportFailed, export_ndjson, import_ndjson
 from uow import UnitOfWork
+from warmup import WARMUP, Progress, build_indexes, load_data, page_in_users, prebuild_validators, replay
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Warm up in the background: the worker answers liveness probes (and
+    # traffic) meanwhile, and reports readiness once the pipeline is done.
+    WARMUP.start()
+    yield
+    await WARMUP.stop()
 
-app = FastAPI(title="Backend API")
+
+app = FastAPI(title="Backend API", lifespan=lifespan)
+# Must be set before routes are declared so every route gets admission
+# control and runs under its deadline.
+app.router.route_class = DeadlineRoute
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_response)
+app.add_exception_handler(TenantQuotaExceeded, quota_exceeded_response)
+app.add_middleware(TenantMiddleware, registry=TENANTS)
+app.add_middleware(ProfilingMiddleware, authorize=authorized, exempt=POLICY.exempt)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.include_router(debug_router)
 
 
 @app.get("/health", summary="Service health", tags=["health"])
@@ -25,22 +66,240 @@ def api_health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+def _readiness() -> JSONResponse:
+    status = WARMUP.status()
+    if WARMUP.ready:
+        return JSONResponse(status)
+    return JSONResponse(status, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.get(
+    "/ready",
+    summary="Service readiness",
+    tags=["health"],
+    responses={503: {"description": "Still warming up, or warm-up failed"}},
+)
+def ready() -> JSONResponse:
+    # Unlike /health, only 200 once this worker has loaded its data and
+    # warmed up; the body reports the warm-up's progress either way.
+    return _readiness()
+
+
+@app.get(
+    "/api/ready",
+    summary="API base readiness",
+    tags=["health"],
+    responses={503: {"description": "Still warming up, or warm-up failed"}},
+)
+def api_ready() -> JSONResponse:
+    return _readiness()
+
+
+@app.get("/metrics", summary="Prometheus metrics", tags=["health"], include_in_schema=False)
+def prometheus_metrics() -> Response:
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 class User(BaseModel):
   id: str
   name: str
 
 
+class Post(BaseModel):
+  id: str
+  user_id: str
+  title: str
+  content: Optional[str] = None
+  published: bool = False
+
+
+class CommentCreate(BaseModel):
+  id: str
+  user_id: str
+  content: str
+
+
+class Comment(CommentCreate):
+  post_id: str
+
+
+class PostExpanded(Post):
+  comments: Optional[List[Comment]] = None
+
+
+class UserExpanded(User):
+  """``GET /users/{id}``: relations are only present when named in ``include``."""
+
+  posts: Optional[List[PostExpanded]] = None
+
+
+_user_reads: SingleFlight[Optional[bytes]] = SingleFlight("users.get")
+
+
+def _read_user_json(uow: UnitOfWork, user_id: str) -> Optional[bytes]:
+    entity = uow.users_get(user_id)
+    if not entity:
+        return None
+    return User(id=entity.id, name=entity.name).model_dump_json().encode()
+
+
+IMPORT_CHUNK_SIZE = int(os.getenv("BACKEND_IMPORT_CHUNK_SIZE", "1000"))
+
+
+def _parse_import_line(raw: bytes) -> UserEntity:
+    user = User.model_validate_json(raw, strict=True)
+    return UserEntity(id=user.id, name=user.name)
+
+
+def _get_user_expanded(user_id: str, include: str, uow: UnitOfWork) -> Response:
+    try:
+        paths = parse_include(include)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    user = uow.users_get(user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    # One batched lookup per included level, memoized for this request.
+    [expanded] = expand_users([user], paths, Loaders(uow))
+    return JSONResponse(expanded)
+
+
+# Declared before /users/{user_id} so "export" is not taken for an id.
+@app.get(
+    "/users/export",
+    summary="Export all users as NDJSON",
+    tags=["users"],
+    response_class=StreamingResponse,
+)
+@traced_route
+def export_users(
+    uow: UnitOfWork = Depends(inject_uow),
+    changes: ChangeLog = Depends(user_changes),
+) -> StreamingResponse:
+    # The snapshot is taken here; encoding happens lazily as the client reads.
+    # X-Change-Seq is read first, so following the change feed from it misses
+    # nothing (changes already in the snapshot may be replayed).
+    seq = changes.latest
+    return StreamingResponse(
+        export_ndjson(uow.users_scan()), media_type=NDJSON, headers={"X-Change-Seq": str(seq)}
+    )
+
+
+@app.post(
+    "/users/import",
+    summary="Import users from an NDJSON body",
+    tags=["users"],
+    responses={
+        422: {"description": "Invalid line; earlier chunks stay committed"},
+        504: {"description": "Deadline exceeded; earlier chunks stay committed"},
+    },
+)
+@traced_route
+async def import_users(
+    request: Request,
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=100_000),
+    uow_factory: Callable[[], UnitOfWork] = Depends(inject_uow_factory),
+) -> JSONResponse:
+    """Stream the body line by line, committing every ``chunk_size`` users in one transaction."""
+    try:
+        summary = await import_ndjson(request.stream(), _parse_import_line, uow_factory, chunk_size=chunk_size)
+    except ImportFailed as exc:
+        return JSONResponse(
+            {"detail": str(exc), "line": exc.line, "imported": exc.imported},
+            status_code=422,
+        )
+    return JSONResponse({"imported": summary.imported, "chunks": summary.chunks})
+
+
+# Imports run as long as the body takes to upload; only a client-sent
+# X-Request-Timeout bounds them.
+DEADLINES.configure("POST", "/users/import", 0)
+
+
+# Long-polls and event streams wait without using a worker thread; they are
+# not subject to the per-route concurrency limit.
+POLICY.exempt.add("/users/changes")
+
+
+def _resync_response(exc: ResyncRequired) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Resync required", "since": exc.since, "earliest": exc.earliest, "latest": exc.latest},
+        status_code=410,
+    )
+
+
+@app.get(
+    "/users/changes",
+    summary="User change feed",
+    tags=["users"],
+    responses={410: {"description": "Resync required: `since` is outside the retained log"}},
+)
+@traced_route
+async def user_change_feed(
+    request: Request,
+    since: int = Query(0, ge=0, description="Return changes with a sequence number after this one"),
+    limit: int = Query(1000, ge=1, le=10_000),
+    wait: float = Query(0.0, ge=0.0, le=30.0, description="Seconds to long-poll when nothing is pending"),
+    changes: ChangeLog = Depends(user_changes),
+) -> Response:
+    """Changes after ``since`` as JSON, or as server-sent events with ``Accept: text/event-stream``.
+
+    A 410 means the consumer must re-read the full dataset (GET /users/export)
+    and continue from its ``X-Change-Seq``.
+    """
+    if "text/event-stream" in request.headers.get("accept", ""):
+        last_event_id = request.headers.get("last-event-id", "")
+        start = int(last_event_id) if last_event_id.isdigit() else since
+        try:
+            changes.since(start, 0)
+        except ResyncRequired as exc:
+            return _resync_response(exc)
+        return StreamingResponse(
+            sse_events(changes, start),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    try:
+        batch = changes.since(since, limit)
+        if not batch and wait > 0 and await changes.wait(since, wait):
+            batch = changes.since(since, limit)
+    except ResyncRequired as exc:
+        return _resync_response(exc)
+    return JSONResponse({
+        "changes": [c.to_dict() for c in batch],
+        "next": batch[-1].seq if batch else since,
+        "latest": changes.latest,
+    })
+
+
 @app.get(
     "/users/{user_id}",
-    response_model=User,
     summary="Get user by id",
     tags=["users"],
+    # The handler returns pre-serialized bodies; document what they contain.
+    responses={
+        200: {"model": UserExpanded, "description": "The user, with any relations named in `include`"},
+        400: {"description": "Unknown relation in `include`"},
+        404: {"description": "User not found"},
+    },
 )
-def get_user(user_id: str, uow: UnitOfWork = Depends(inject_uow)) -> User:
-    entity = uow.users_get(user_id)
-    if not entity:
+@traced_route
+def get_user(
+    user_id: str,
+    include: Optional[str] = Query(
+        None, description="Comma-separated relations to embed: posts, posts.comments", examples=["posts.comments"]
+    ),
+    uow: UnitOfWork = Depends(inject_uow),
+) -> Response:
+    if include:
+        return _get_user_expanded(user_id, include, uow)
+    # Concurrent reads of the same user of the same tenant at the same data
+    # version share one repository read and one serialized body.
+    key = (current_tenant(), user_id, users_version())
+    body = _user_reads.do(key, lambda: _read_user_json(uow, user_id))
+    if body is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return User(id=entity.id, name=entity.name)
+    return Response(content=body, media_type="application/json")
 
 
 @app.post(
@@ -48,9 +307,14 @@ def get_user(user_id: str, uow: UnitOfWork = Depends(inject_uow)) -> User:
     response_model=User,
     summary="Create user",
     tags=["users"],
+    openapi_extra=json_body_openapi(User),
 )
-def create_user(user: User, uow: UnitOfWork = Depends(inject_uow)) -> User:
-    svc = UserService()
+@traced_route
+def create_user(
+    user: User = Depends(json_body(User)),
+    uow: UnitOfWork = Depends(inject_uow),
+    svc: UserService = Depends(user_service),
+) -> User:
     created = svc.create_user(uow, id=user.id, name=user.name)
     return User(id=created.id, name=created.name)
 
@@ -60,8 +324,10 @@ def create_user(user: User, uow: UnitOfWork = Depends(inject_uow)) -> User:
     status_code=500,
     summary="Simulate create failure (rollback)",
     tags=["users"],
+    openapi_extra=json_body_openapi(User),
 )
-def create_user_then_fail(user: User, uow: UnitOfWork = Depends(inject_uow)) -> None:
+@traced_route
+def create_user_then_fail(user: User = Depends(json_body(User)), uow: UnitOfWork = Depends(inject_uow)) -> None:
     try:
         with uow.transaction():
             uow.users_save(UserEntity(**user.model_dump()))
@@ -76,9 +342,15 @@ def create_user_then_fail(user: User, uow: UnitOfWork = Depends(inject_uow)) ->
     response_model=User,
     summary="Update user name",
     tags=["users"],
+    openapi_extra=json_body_openapi(User),
 )
-def update_user(user_id: str, user: User, uow: UnitOfWork = Depends(inject_uow)) -> User:
-    svc = UserService()
+@traced_route
+def update_user(
+    user_id: str,
+    user: User = Depends(json_body(User)),
+    uow: UnitOfWork = Depends(inject_uow),
+    svc: UserService = Depends(user_service),
+) -> User:
     try:
         updated = svc.rename_user(uow, id=user_id, name=user.name)
     except KeyError:
@@ -90,11 +362,11 @@ def update_user(user_id: str, user: User, uow: UnitOfWork = Depends(inject_uow))
     "/users/{user_id}",
     status_code=204,
     response_model=None,
-    summary="Delete user",
+    summary="Delete user with their posts and comments",
     tags=["users"],
 )
-def delete_user(user_id: str, uow: UnitOfWork = Depends(inject_uow)) -> None:
-    svc = UserService()
+@traced_route
+def delete_user(user_id: str, uow: UnitOfWork = Depends(inject_uow), svc: UserService = Depends(user_service)) -> None:
     svc.delete_user(uow, id=user_id)
     return None
 
@@ -104,8 +376,12 @@ def delete_user(user_id: str, uow: UnitOfWork = Depends(inject_uow)) -> None:
     status_code=500,
     summary="Simulate update failure (rollback)",
     tags=["users"],
+    openapi_extra=json_body_openapi(User),
 )
-def update_user_then_fail(user_id: str, user: User, uow: UnitOfWork = Depends(inject_uow)) -> None:
+@traced_route
+def update_user_then_fail(
+    user_id: str, user: User = Depends(json_body(User)), uow: UnitOfWork = Depends(inject_uow),
+) -> None:
     """Simulate an update followed by a failure to exercise rollback semantics."""
     try:
         with uow.transaction():
@@ -120,3 +396,187 @@ def update_user_then_fail(user_id: str, user: User, uow: UnitOfWork = Depends(in
     except RuntimeError:
         # Deliberate failure to test rollback
         raise HTTPException(status_code=500, detail="simulated failure")
+
+
+class PostDetail(Post):
+  comment_count: int
+
+
+class UserPosts(BaseModel):
+  count: int
+  posts: List[Post]
+
+
+class PostComments(BaseModel):
+  count: int
+  comments: List[Comment]
+
+
+class SearchHit(BaseModel):
+  score: float
+  post: Post
+
+
+class SearchResults(BaseModel):
+  results: List[SearchHit]
+
+
+def _post_out(post: PostEntity) -> Post:
+    return Post(id=post.id, user_id=post.user_id, title=post.title, content=post.content, published=post.published)
+
+
+def _comment_out(comment: CommentEntity) -> Comment:
+    return Comment(id=comment.id, post_id=comment.post_id, user_id=comment.user_id, content=comment.content)
+
+
+@app.post(
+    "/posts",
+    response_model=Post,
+    summary="Create post",
+    tags=["posts"],
+    openapi_extra=json_body_openapi(Post),
+)
+@traced_route
+def create_post(
+    post: Post = Depends(json_body(Post)),
+    uow: UnitOfWork = Depends(inject_uow),
+    svc: PostService = Depends(post_service),
+) -> Post:
+    try:
+        created = svc.create_post(uow, **post.model_dump())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="User not found")
+    return _post_out(created)
+
+
+# Declared before /posts/{post_id} so "search" is not taken for an id.
+@app.get(
+    "/posts/search",
+    response_model=SearchResults,
+    summary="Full-text search over post titles and content (BM25)",
+    tags=["posts"],
+)
+@traced_route
+def search_posts(
+    q: str = Query(..., min_length=1, max_length=512),
+    k: int = Query(10, ge=1, le=100),
+    index: SearchIndex = Depends(post_search),
+    uow: UnitOfWork = Depends(inject_uow),
+) -> SearchResults:
+    hits: List[SearchHit] = []
+    for post_id, score in index.search(q, k):
+        post = uow.posts_get(post_id)
+        if post is not None:  # deleted since the index answered
+            hits.append(SearchHit(score=score, post=_post_out(post)))
+    return SearchResults(results=hits)
+
+
+@app.get(
+    "/posts/{post_id}",
+    response_model=PostDetail,
+    summary="Get post with its comment count",
+    tags=["posts"],
+)
+@traced_route
+def get_post(post_id: str, uow: UnitOfWork = Depends(inject_uow)) -> PostDetail:
+    post = uow.posts_get(post_id)
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return PostDetail(**_post_out(post).model_dump(), comment_count=uow.comments_count_for_post(post_id))
+
+
+@app.delete(
+    "/posts/{post_id}",
+    status_code=204,
+    response_model=None,
+    summary="Delete post and its comments",
+    tags=["posts"],
+)
+@traced_route
+def delete_post(post_id: str, uow: UnitOfWork = Depends(inject_uow), svc: PostService = Depends(post_service)) -> None:
+    svc.delete_post(uow, id=post_id)
+    return None
+
+
+@app.get(
+    "/users/{user_id}/posts",
+    response_model=UserPosts,
+    summary="Posts by user",
+    tags=["posts"],
+)
+@traced_route
+def list_user_posts(user_id: str, uow: UnitOfWork = Depends(inject_uow)) -> UserPosts:
+    # Served from the user_id index: cost follows the user's posts, not the table.
+    posts = uow.posts_by_user(user_id)
+    return UserPosts(count=len(posts), posts=[_post_out(p) for p in posts])
+
+
+@app.post(
+    "/posts/{post_id}/comments",
+    response_model=Comment,
+    summary="Comment on a post",
+    tags=["posts"],
+    openapi_extra=json_body_openapi(CommentCreate),
+)
+@traced_route
+def create_comment(
+    post_id: str,
+    comment: CommentCreate = Depends(json_body(CommentCreate)),
+    uow: UnitOfWork = Depends(inject_uow),
+    svc: PostService = Depends(post_service),
+) -> Comment:
+    try:
+        created = svc.add_comment(uow, post_id=post_id, **comment.model_dump())
+    except KeyError as exc:
+        # "post not found" / "user not found"
+        raise HTTPException(status_code=404, detail=str(exc.args[0]).capitalize())
+    return _comment_out(created)
+
+
+@app.get(
+    "/posts/{post_id}/comments",
+    response_model=PostComments,
+    summary="Comments on a post",
+    tags=["posts"],
+)
+@traced_route
+def list_post_comments(post_id: str, uow: UnitOfWork = Depends(inject_uow)) -> PostComments:
+    comments = uow.comments_for_post(post_id)
+    return PostComments(count=len(comments), comments=[_comment_out(c) for c in comments])
+
+
+# Warm-up steps, run in order at startup (see lifespan). Registered last so
+# that every route exists when validators are prebuilt and requests replayed.
+def _warmup_load(progress: Progress) -> None:
+    directory = WARMUP.settings.data_dir
+    if directory:
+        content = TENANTS.default_content
+        load_data(directory, TENANTS.default, content.posts, content.comments, progress, batch=WARMUP.settings.batch)
+
+
+def _warmup_validators(progress: Progress) -> None:
+    models = [
+        route.response_model for route in app.routes
+        if isinstance(route, APIRoute) and isinstance(route.response_model, type)
+        and issubclass(route.response_model, BaseModel)
+    ]
+    prebuild_validators(app.openapi, [*BODY_MODELS, *models], progress)
+
+
+async def _warmup_replay(progress: Progress) -> None:
+    settings = WARMUP.settings
+    if settings.replay_file:
+        await replay(
+            app, settings.replay_file, progress,
+            limit=settings.replay_limit, concurrency=settings.replay_concurrency, timeout=settings.replay_timeout,
+        )
+
+
+WARMUP.add("load", _warmup_load)
+WARMUP.add("page_in", lambda progress: page_in_users(get_uow, progress))
+WARMUP.add(
+    "indexes",
+    lambda progress: build_indexes(CONTAINER.resolve(InMemoryPostRepository), CONTAINER.resolve(SearchIndex), progress),
+)
+WARMUP.add("validators", _warmup_validators)
+WARMUP.add("replay", _warmup_replay, required=False)
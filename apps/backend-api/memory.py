@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import itertools
+import mmap
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+from changes import ChangeLog
+from content_repository import IndexedRepository
+from repository import InMemoryUserRepository, ShardedUserRepository
+from search import SearchIndex
+from uow import open_units
+
+# Containers larger than this are measured from an evenly spaced sample of
+# their items and extrapolated.
+SAMPLE = 256
+GROUP_BY = ("lineno", "filename", "traceback")
+
+_IGNORED = (
+  tracemalloc.Filter(False, tracemalloc.__file__),
+  tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+  tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+  tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def deep_sizeof(obj: Any, *, sample: int = SAMPLE) -> int:
+  """Estimated bytes reachable from ``obj``, counting each object once.
+
+  Follows container items, instance ``__dict__`` and ``__slots__``. Large
+  containers are sampled, so the result is an estimate whose error grows
+  with how uneven the items are. Types, functions and modules are not
+  followed; an mmap counts only its Python object, not the mapped pages.
+  """
+  seen: Set[int] = set()
+  return _sizeof(obj, seen, sample)
+
+
+def _sizeof(obj: Any, seen: Set[int], sample: int) -> int:
+  if id(obj) in seen or isinstance(obj, (type, mmap.mmap)) or callable(obj):
+    return 0
+  seen.add(id(obj))
+  size = sys.getsizeof(obj)
+  if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+    return size
+  if isinstance(obj, Mapping):
+    return size + _items(obj.items(), len(obj), seen, sample, pairs=True)
+  if isinstance(obj, (list, tuple, set, frozenset, deque)):
+    return size + _items(obj, len(obj), seen, sample, pairs=False)
+  if hasattr(obj, "__dict__"):
+    size += _sizeof(vars(obj), seen, sample)
+  for cls in type(obj).__mro__:
+    for name in getattr(cls, "__slots__", ()):
+      if hasattr(obj, name):
+        size += _sizeof(getattr(obj, name), seen, sample)
+  return size
+
+
+def _items(items: Iterable[Any], count: int, seen: Set[int], sample: int, *, pairs: bool) -> int:
+  if count > sample:
+    items = itertools.islice(items, 0, None, count // sample)
+  # Mapping items are measured as key and value: the (key, value) tuples are
+  # transient, and a recycled id would make later ones look already seen.
+  if pairs:
+    measured = [_sizeof(key, seen, sample) + _sizeof(value, seen, sample) for key, value in items]
+  else:
+    measured = [_sizeof(item, seen, sample) for item in items]
+  if count <= sample:
+    return sum(measured)
+  return int(sum(measured) / len(measured) * count) if measured else 0
+
+
+def _entry(obj: Any, entries: int) -> Dict[str, int]:
+  return {"entries": entries, "bytes": deep_sizeof(obj)}
+
+
+def structure_sizes(
+  users: object,
+  posts: IndexedRepository[Any],
+  comments: IndexedRepository[Any],
+  search: Optional[SearchIndex] = None,
+  *,
+  staged: bool = True,
+) -> Dict[str, Dict[str, int]]:
+  """Per-structure size estimates of the application's in-process state.
+
+  Staged sets (with ``staged``) are those of the units of work with an open
+  transaction, whatever repositories they use, so they are only counted
+  while a request holds one.
+  """
+  out: Dict[str, Dict[str, int]] = {}
+  if isinstance(users, InMemoryUserRepository):
+    out["users.store"] = _entry(users._store, len(users._store))
+  elif isinstance(users, ShardedUserRepository):
+    stores = [shard.store for shard in users._shards]
+    out["users.store"] = _entry(stores, sum(len(store) for store in stores))
+  else:
+    # The shared store lives in a file mapping shared with other workers.
+    mapped = getattr(users, "_map", None)
+    out["users.store"] = {"entries": users.size() if hasattr(users, "size") else 0, "bytes": len(mapped) if mapped else 0}
+  changes = getattr(users, "changes", None)
+  if isinstance(changes, ChangeLog):
+    out["users.changes"] = _entry(changes._entries, len(changes._entries))
+  for repo in (posts, comments):
+    out[f"{repo.name}.rows"] = _entry(repo._rows, len(repo._rows))
+    out[f"{repo.name}.indexes"] = _entry(repo._indexes, sum(len(index) for index in repo._indexes.values()))
+  if search is not None:
+    out["posts.search"] = _entry(search, len(search))
+  if staged:
+    sets: List[object] = []
+    for uow in open_units():
+      sets.extend(s for s in (uow._staged, uow._posts_staged, uow._comments_staged) if s is not None)
+    out["uow.staged"] = {"entries": sum(len(s) for s in sets if hasattr(s, "__len__")), "bytes": deep_sizeof(sets)}
+  return out
+
+
+def _stat(stat: Any) -> Dict[str, Any]:
+  frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+  return {"site": frames[0] if frames else "?", "traceback": frames, "size": stat.size, "count": stat.count}
+
+
+def _diff(stat: Any) -> Dict[str, Any]:
+  out = _stat(stat)
+  out.update(size_diff=stat.size_diff, count_diff=stat.count_diff)
+  return out
+
+
+class MemoryDebugger:
+  """On-demand tracemalloc control with a small store of numbered snapshots.
+
+  Nothing is traced until ``start``; ``stop`` ends tracing and drops the
+  stored snapshots. Only the newest ``keep`` snapshots are retained.
+  """
+
+  def __init__(self, keep: int = 8) -> None:
+    self.keep = keep
+    self._lock = threading.Lock()
+    self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+    self._next_id = 1
+
+  def status(self) -> Dict[str, Any]:
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+      "tracing": tracemalloc.is_tracing(),
+      "frames": tracemalloc.get_traceback_limit(),
+      "traced_bytes": current,
+      "peak_bytes": peak,
+      "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+      "snapshots": list(self._snapshots),
+    }
+
+  def start(self, frames: int = 1) -> None:
+    if tracemalloc.is_tracing():
+      raise RuntimeError("tracemalloc is already tracing")
+    tracemalloc.start(frames)
+
+  def stop(self) -> None:
+    with self._lock:
+      self._snapshots.clear()
+    tracemalloc.stop()
+
+  def take(self) -> int:
+    """Store a snapshot of current allocations and return its id."""
+    snapshot = self._snapshot()
+    with self._lock:
+      snapshot_id = self._next_id
+      self._next_id += 1
+      self._snapshots[snapshot_id] = snapshot
+      while len(self._snapshots) > self.keep:
+        self._snapshots.popitem(last=False)
+    return snapshot_id
+
+  def top(self, snapshot_id: Optional[int] = None, *, group_by: str = "lineno", limit: int = 20) -> List[Dict[str, Any]]:
+    """Largest allocation sites of a stored snapshot, or of a fresh one."""
+    snapshot = self._snapshot() if snapshot_id is None else self._get(snapshot_id)
+    return [_stat(stat) for stat in snapshot.statistics(group_by)[:limit]]
+
+  def diff(
+    self, base: int, target: Optional[int] = None, *, group_by: str = "lineno", limit: int = 20,
+  ) -> List[Dict[str, Any]]:
+    """Sites whose allocations changed most from ``base`` to ``target`` (default: now)."""
+    old = self._get(base)
+    new = self._snapshot() if target is None else self._get(target)
+    return [_diff(stat) for stat in new.compare_to(old, group_by)[:limit]]
+
+  def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+    with self._lock:
+      snapshot = self._snapshots.get(snapshot_id)
+    if snapshot is None:
+      raise KeyError(f"no snapshot {snapshot_id}")
+    return snapshot
+
+  def _snapshot(self) -> tracemalloc.Snapshot:
+    if not tracemalloc.is_tracing():
+      raise RuntimeError("tracemalloc is not tracing")
+    return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+Labels = Tuple[str, ...]
+
+# Latency buckets in seconds, tuned for an in-process API (sub-millisecond to seconds).
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+  0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def _escape(value: str) -> str:
+  return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+  parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+  if extra:
+    parts.append(extra)
+  return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+  if value == float("inf"):
+    return "+Inf"
+  return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+  kind = ""
+
+  def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+    self.name = name
+    self.help = help
+    self.labelnames = tuple(labelnames)
+    self._lock = threading.Lock()
+
+  def _header(self) -> List[str]:
+    return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+  def render(self) -> List[str]:
+    raise NotImplementedError
+
+
+class Counter(_Metric):
+  """Monotonic counter, one series per label-value tuple.
+
+  A series can also be read from a callback at scrape time, for totals
+  that are already kept (under their own lock) by the code being measured.
+  """
+
+  kind = "counter"
+
+  def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+    super().__init__(name, help, labelnames)
+    self._values: Dict[Labels, float] = {}
+    self._functions: Dict[Labels, Callable[[], float]] = {}
+
+  def inc(self, *labels: str, amount: float = 1.0) -> None:
+    with self._lock:
+      self._values[labels] = self._values.get(labels, 0.0) + amount
+
+  def set_function(self, fn: Callable[[], float], *labels: str) -> None:
+    with self._lock:
+      self._functions[labels] = fn
+
+  def value(self, *labels: str) -> float:
+    fn = self._functions.get(labels)
+    return fn() if fn is not None else self._values.get(labels, 0.0)
+
+  def render(self) -> List[str]:
+    lines = self._header()
+    with self._lock:
+      values = dict(self._values)
+      functions = dict(self._functions)
+    for labels, fn in functions.items():
+      values[labels] = fn()
+    items = sorted(values.items())
+    for labels, value in items:
+      lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+    return lines
+
+
+class Gauge(_Metric):
+  """Point-in-time value, either set explicitly or read from a callback at scrape time."""
+
+  kind = "gauge"
+
+  def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+    super().__init__(name, help, labelnames)
+    self._values: Dict[Labels, float] = {}
+    self._functions: Dict[Labels, Callable[[], float]] = {}
+
+  def set(self, value: float, *labels: str) -> None:
+    with self._lock:
+      self._values[labels] = value
+
+  def set_function(self, fn: Callable[[], float], *labels: str) -> None:
+    with self._lock:
+      self._functions[labels] = fn
+
+  def value(self, *labels: str) -> float:
+    fn = self._functions.get(labels)
+    return fn() if fn is not None else self._values.get(labels, 0.0)
+
+  def render(self) -> List[str]:
+    lines = self._header()
+    with self._lock:
+      values = dict(self._values)
+      functions = dict(self._functions)
+    for labels, fn in functions.items():
+      values[labels] = fn()
+    for labels, value in sorted(values.items()):
+      lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+    return lines
+
+
+class _HistogramSeries:
+  """Bucket counts for one label-value tuple; bind once and reuse on hot paths."""
+
+  __slots__ = ("_buckets", "_lock", "counts", "sum")
+
+  def __init__(self, buckets: Tuple[float, ...], lock: threading.Lock) -> None:
+    self._buckets = buckets
+    self._lock = lock
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0.0
+
+  def observe(self, value: float) -> None:
+    idx = bisect_left(self._buckets, value)
+    with self._lock:
+      self.counts[idx] += 1
+      self.sum += value
+
+
+class Histogram(_Metric):
+  """Fixed-bucket histogram; observations cost one bisect and a locked increment."""
+
+  kind = "histogram"
+
+  def __init__(
+    self,
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+  ) -> None:
+    super().__init__(name, help, labelnames)
+    self.buckets = tuple(sorted(buckets))
+    self._series: Dict[Labels, _HistogramSeries] = {}
+
+  def labels(self, *labels: str) -> _HistogramSeries:
+    series = self._series.get(labels)
+    if series is None:
+      with self._lock:
+        series = self._series.setdefault(labels, _HistogramSeries(self.buckets, self._lock))
+    return series
+
+  def observe(self, value: float, *labels: str) -> None:
+    self.labels(*labels).observe(value)
+
+  def count(self, *labels: str) -> int:
+    series = self._series.get(labels)
+    return sum(series.counts) if series is not None else 0
+
+  def total(self, *labels: str) -> float:
+    series = self._series.get(labels)
+    return series.sum if series is not None else 0.0
+
+  def time(self, *labels: str) -> "_Timer":
+    return _Timer(self.labels(*labels))
+
+  def render(self) -> List[str]:
+    lines = self._header()
+    with self._lock:
+      items = sorted((k, (list(v.counts), v.sum)) for k, v in self._series.items())
+    for labels, (counts, total) in items:
+      cumulative = 0
+      for bound, count in zip(self.buckets + (float("inf"),), counts):
+        cumulative += count
+        le = f'le="{_format_value(bound)}"'
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+      label_str = _format_labels(self.labelnames, labels)
+      lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+      lines.append(f"{self.name}_count{label_str} {cumulative}")
+    return lines
+
+
+class _Timer:
+  __slots__ = ("_series", "_start")
+
+  def __init__(self, series: _HistogramSeries) -> None:
+    self._series = series
+    self._start = 0.0
+
+  def __enter__(self) -> "_Timer":
+    self._start = time.perf_counter()
+    return self
+
+  def __exit__(self, *exc: Any) -> None:
+    self._series.observe(time.perf_counter() - self._start)
+
+
+class Registry:
+  """Collection of metrics rendered together in Prometheus text exposition format."""
+
+  def __init__(self) -> None:
+    self._metrics: Dict[str, _Metric] = {}
+
+  def _register(self, metric: _Metric) -> None:
+    if metric.name in self._metrics:
+      raise ValueError(f"metric already registered: {metric.name}")
+    self._metrics[metric.name] = metric
+
+  def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, help, labelnames)
+    self._register(metric)
+    return metric
+
+  def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    metric = Gauge(name, help, labelnames)
+    self._register(metric)
+    return metric
+
+  def histogram(
+    self,
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+  ) -> Histogram:
+    metric = Histogram(name, help, labelnames, buckets)
+    self._register(metric)
+    return metric
+
+  def __iter__(self) -> Iterator[_Metric]:
+    return iter(list(self._metrics.values()))
+
+  def render(self) -> str:
+    lines: List[str] = []
+    for metric in self:
+      lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+  "http_requests_total", "HTTP requests by method, route template and status code.", ("method", "route", "status"),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+  "http_request_duration_seconds", "HTTP request latency by method and route template.", ("method", "route"),
+)
+UOW_TRANSACTION_DURATION = REGISTRY.histogram(
+  "uow_transaction_duration_seconds", "UnitOfWork transaction duration by outcome.", ("outcome",),
+)
+UOW_COMMITS = REGISTRY.counter("uow_commits_total", "UnitOfWork transactions committed.")
+UOW_ROLLBACKS = REGISTRY.counter("uow_rollbacks_total", "UnitOfWork transactions rolled back.")
+UOW_SAVEPOINTS = REGISTRY.counter(
+  "uow_savepoints_total", "Nested UnitOfWork transactions (savepoints) by outcome.", ("outcome",),
+)
+UOW_STAGED_SIZE = REGISTRY.histogram(
+  "uow_staged_entries", "Entries in the staged set at commit time.", buckets=SIZE_BUCKETS,
+)
+REPO_OPERATION_DURATION = REGISTRY.histogram(
+  "repository_operation_duration_seconds", "Repository operation latency by repository and operation.",
+  ("repository", "operation"),
+)
+REPO_STORE_SIZE = REGISTRY.gauge("repository_store_entries", "Committed entries held by a repository.", ("repository",))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def timed(histogram: Histogram, *labels: str) -> Callable[[F], F]:
+  """Decorator recording the wall time of each call into ``histogram``."""
+
+  series = histogram.labels(*labels)
+  clock = time.perf_counter
+
+  def decorator(fn: F) -> F:
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+      start = clock()
+      try:
+        return fn(*args, **kwargs)
+      finally:
+        series.observe(clock() - start)
+
+    return wrapper  # type: ignore[return-value]
+
+  return decorator
+
+
+class MetricsMiddleware:
+  """ASGI middleware recording per-route latency and status counts.
+
+  Routes are labelled by their path template (``/users/{user_id}``) so label
+  cardinality stays bounded; unmatched paths share a single label.
+  """
+
+  def __init__(self, app: ASGIApp, *, exclude: Sequence[str] = ("/metrics",)) -> None:
+    self.app = app
+    self.exclude = frozenset(exclude)
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http" or scope["path"] in self.exclude:
+      await self.app(scope, receive, send)
+      return
+
+    status: Optional[int] = None
+
+    async def send_wrapper(message: Message) -> None:
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+      await send(message)
+
+    start = time.perf_counter()
+    try:
+      await self.app(scope, receive, send_wrapper)
+    except Exception:
+      status = 500
+      raise
+    finally:
+      elapsed = time.perf_counter() - start
+      route = scope.get("route")
+      template = getattr(route, "path", None) or "<unmatched>"
+      method = scope["method"]
+      HTTP_LATENCY.observe(elapsed, method, template)
+      HTTP_REQUESTS.inc(method, template, str(status or 500))
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import cProfile
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import REGISTRY
+
+PROFILES_CAPTURED = REGISTRY.counter(
+  "http_profiles_captured_total", "Requests profiled, by profiler mode and what triggered it.", ("mode", "trigger"),
+)
+PROFILES_SKIPPED = REGISTRY.counter(
+  "http_profiles_skipped_total", "Requests that asked to be profiled while another capture was running.",
+)
+
+CPROFILE, SAMPLE = "cprofile", "sample"
+MODES = (CPROFILE, SAMPLE)
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+TOKEN_HEADER = b"x-debug-token"
+_EXTENSIONS = {CPROFILE: "pstats", SAMPLE: "collapsed"}
+_NAME = re.compile(r"^\d+-\d+-\d+\.(json|pstats|collapsed)$")
+# Innermost frames of a thread that is blocked waiting for work.
+_IDLE = {("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"), ("thread.py", "_worker")}
+
+
+class ProfileSettings:
+  def __init__(
+    self,
+    *,
+    sample_rate: float = 0.0,
+    directory: Optional[str] = None,
+    keep: int = 50,
+    mode: str = CPROFILE,
+    interval: float = 0.005,
+  ) -> None:
+    if mode not in MODES:
+      raise ValueError(f"profile mode must be one of {', '.join(MODES)}")
+    self.sample_rate = sample_rate
+    self.directory = directory or os.path.join(tempfile.gettempdir(), "backend-api-profiles")
+    self.keep = keep
+    self.mode = mode
+    self.interval = interval
+
+  @classmethod
+  def from_env(cls) -> "ProfileSettings":
+    return cls(
+      sample_rate=float(os.getenv("BACKEND_PROFILE_SAMPLE_RATE", "0") or 0),
+      directory=os.getenv("BACKEND_PROFILE_DIR") or None,
+      keep=int(os.getenv("BACKEND_PROFILE_KEEP", "50")),
+      mode=os.getenv("BACKEND_PROFILE_MODE", CPROFILE),
+      interval=float(os.getenv("BACKEND_PROFILE_INTERVAL", "0.005")),
+    )
+
+
+class ProfileStore:
+  """Bounded on-disk ring of request profiles.
+
+  Each profile is a ``<id>.pstats`` (cProfile, loadable with ``pstats``) or
+  ``<id>.collapsed`` (folded stacks for flamegraph.pl or speedscope) file,
+  plus an ``<id>.json`` describing the request. Ids sort by capture time and
+  carry the pid, so workers can share a directory. Saving a profile deletes
+  the oldest ones beyond ``keep``.
+  """
+
+  def __init__(self, directory: str, keep: int = 50) -> None:
+    self.directory = directory
+    self.keep = keep
+    self._seq = itertools.count()
+
+  def new_id(self) -> str:
+    return f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._seq) % 10000:04d}"
+
+  def save(self, profile_id: str, ext: str, write: Callable[[str], None], meta: Dict[str, Any]) -> None:
+    os.makedirs(self.directory, exist_ok=True)
+    artifact = f"{profile_id}.{ext}"
+    write(os.path.join(self.directory, artifact))
+    meta = {**meta, "id": profile_id, "file": artifact}
+    # Written last: a profile is listed only once its artifact is complete.
+    tmp = os.path.join(self.directory, f".{profile_id}.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+      json.dump(meta, fh)
+    os.replace(tmp, os.path.join(self.directory, f"{profile_id}.json"))
+    self._trim()
+
+  def list(self) -> List[Dict[str, Any]]:
+    """Metadata of stored profiles, newest first."""
+    out: List[Dict[str, Any]] = []
+    for name in self._meta_files()[::-1]:
+      try:
+        with open(os.path.join(self.directory, name), encoding="utf-8") as fh:
+          out.append(json.load(fh))
+      except (FileNotFoundError, ValueError):
+        continue  # trimmed by another worker meanwhile
+    return out
+
+  def path(self, name: str) -> Optional[str]:
+    """Path of a stored file, or None for names this store never writes."""
+    if not _NAME.match(name):
+      return None
+    path = os.path.join(self.directory, name)
+    return path if os.path.isfile(path) else None
+
+  def _meta_files(self) -> List[str]:
+    try:
+      names = os.listdir(self.directory)
+    except FileNotFoundError:
+      return []
+    return sorted(n for n in names if n.endswith(".json") and _NAME.match(n))
+
+  def _trim(self) -> None:
+    metas = self._meta_files()
+    for name in metas[: max(0, len(metas) - self.keep)]:
+      stem = name[: -len(".json")]
+      for ext in ("json", *_EXTENSIONS.values()):
+        try:
+          os.unlink(os.path.join(self.directory, f"{stem}.{ext}"))
+        except FileNotFoundError:
+          pass
+
+
+def _collapse(frame: Optional[FrameType]) -> Optional[str]:
+  names: List[str] = []
+  while frame is not None:
+    code = frame.f_code
+    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+    frame = frame.f_back
+  if not names or tuple(names[0].split(":", 1)) in _IDLE:
+    return None
+  return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+  """Samples every thread's stack at ``interval`` from a background thread.
+
+  Stacks are folded into ``frame;frame;...`` counts. Threads blocked waiting
+  for work are skipped, so an idle thread pool does not swamp the profile;
+  work from concurrent requests in the same window is included. Overhead is
+  one stack walk per thread per interval and none on the profiled code.
+  """
+
+  def __init__(self, interval: float = 0.005) -> None:
+    self.interval = interval
+    self.stacks: Counter[str] = Counter()
+    self.samples = 0
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+  def start(self) -> None:
+    self._thread.start()
+
+  def stop(self) -> None:
+    self._stop.set()
+    self._thread.join()
+
+  def _run(self) -> None:
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    while not self._stop.wait(self.interval):
+      self.samples += 1
+      for ident, frame in sys._current_frames().items():
+        if ident == me:
+          continue
+        stack = _collapse(frame)
+        if stack is not None:
+          if ident not in names:
+            names = {t.ident: t.name for t in threading.enumerate()}
+          self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+
+  def write(self, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+      for stack, count in self.stacks.most_common():
+        fh.write(f"{stack} {count}\n")
+
+
+class _Capture:
+  """One running profile: cProfile or the sampler; ``save`` frees the profiler."""
+
+  def __init__(self, profiler: "Profiler", mode: str, trigger: str) -> None:
+    self.profiler = profiler
+    self.mode = mode
+    self.trigger = trigger
+    self.id = profiler.store.new_id()
+    self.started = time.perf_counter()
+    self._cprofile: Optional[cProfile.Profile] = None
+    self._sampler: Optional[SamplingProfiler] = None
+    if mode == CPROFILE:
+      self._cprofile = cProfile.Profile()
+      self._cprofile.enable()
+    else:
+      self._sampler = SamplingProfiler(profiler.settings.interval)
+      self._sampler.start()
+
+  def stop(self) -> float:
+    if self._cprofile is not None:
+      self._cprofile.disable()
+    if self._sampler is not None:
+      self._sampler.stop()
+    return time.perf_counter() - self.started
+
+  def save(self, meta: Dict[str, Any]) -> None:
+    try:
+      if self._cprofile is not None:
+        self.profiler.store.save(self.id, _EXTENSIONS[CPROFILE], self._cprofile.dump_stats, meta)
+      elif self._sampler is not None:
+        meta["samples"] = self._sampler.samples
+        self.profiler.store.save(self.id, _EXTENSIONS[SAMPLE], self._sampler.write, meta)
+    finally:
+      self.profiler._busy.release()
+
+
+class Profiler:
+  """Decides which requests to profile and runs at most one capture at a time.
+
+  Profilers are process-wide: only one can be active, and on Python 3.12+
+  cProfile observes every thread (so handlers running on the thread pool
+  are included, together with anything else running in the window; before
+  3.12 it sees only the event loop thread, and the sampler is the better
+  choice there). A request asking to be profiled while a capture is running
+  is served unprofiled.
+  """
+
+  def __init__(self, settings: ProfileSettings, store: Optional[ProfileStore] = None) -> None:
+    self.settings = settings
+    self.store = store or ProfileStore(settings.directory, settings.keep)
+    self._busy = threading.Lock()
+
+  @classmethod
+  def from_env(cls) -> "Profiler":
+    return cls(ProfileSettings.from_env())
+
+  def begin(self, mode: str, trigger: str) -> Optional[_Capture]:
+    if not self._busy.acquire(blocking=False):
+      PROFILES_SKIPPED.inc()
+      return None
+    try:
+      capture = _Capture(self, mode, trigger)
+    except BaseException:
+      # e.g. another profiling tool (a debugger, an outer cProfile) is active.
+      self._busy.release()
+      raise
+    PROFILES_CAPTURED.inc(mode, trigger)
+    return capture
+
+
+PROFILER = Profiler.from_env()
+
+
+class ProfilingMiddleware:
+  """ASGI middleware profiling requests that ask for it or are sampled.
+
+  A request is profiled when it sends ``X-Profile`` (``cprofile``,
+  ``sample``, or any other value for the configured mode) together with a
+  debug token that ``authorize`` accepts, or when it falls in the
+  ``sample_rate`` fraction and its path is not in ``exempt``. The response
+  carries ``X-Profile-Id``. The capture ends once the first body message is
+  sent, so a streamed body does not hold the profiler while the client reads
+  it; the profile is then written off the event loop.
+  """
+
+  def __init__(
+    self,
+    app: ASGIApp,
+    profiler: Optional[Profiler] = None,
+    authorize: Optional[Callable[[str], bool]] = None,
+    exempt: Collection[str] = (),
+  ) -> None:
+    self.app = app
+    self.profiler = profiler or PROFILER
+    self.authorize = authorize
+    # Long polls and probes are never sampled: a capture is exclusive, and a
+    # long poll sends nothing until it returns.
+    self.exempt = exempt
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    mode, trigger = self._wanted(scope)
+    capture = None
+    if mode is not None:
+      try:
+        capture = self.profiler.begin(mode, trigger)
+      except ValueError:
+        capture = None
+    if capture is None:
+      await self.app(scope, receive, send)
+      return
+    active = capture
+    status = 500
+    finished = False
+
+    async def finish() -> None:
+      nonlocal finished
+      if finished:
+        return
+      finished = True
+      elapsed = active.stop()
+      route = scope.get("route")
+      meta = {
+        "mode": active.mode,
+        "trigger": active.trigger,
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": getattr(route, "path", None),
+        "status": status,
+        "duration_ms": elapsed * 1000.0,
+        "captured_at": time.time(),
+      }
+      await run_in_threadpool(active.save, meta)
+
+    async def send_wrapper(message: Message) -> None:
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+        message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, active.id.encode())]
+      await send(message)
+      if message["type"] == "http.response.body":
+        await finish()
+
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      await finish()
+
+  def _wanted(self, scope: Scope) -> Tuple[Optional[str], str]:
+    settings = self.profiler.settings
+    if self.authorize is not None:
+      requested: Optional[bytes] = None
+      token = b""
+      for key, value in scope["headers"]:
+        if key == PROFILE_HEADER:
+          requested = value
+        elif key == TOKEN_HEADER:
+          token = value
+      if requested is not None and self.authorize(token.decode("latin-1")):
+        mode = requested.decode("latin-1").strip().lower()
+        return (mode if mode in MODES else settings.mode), "header"
+    if settings.sample_rate > 0.0 and scope["path"] not in self.exempt and random.random() < settings.sample_rate:
+      return settings.mode, "sampled"
+    return None, ""
@@ -1,7 +1,18 @@
 from __future__ import annotations
 
+import threading
+import zlib
+from contextlib import ExitStack
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Set, Sized, Tuple
+
+from changes import CREATE, DELETE, UPDATE, ChangeLog
+from deadlines import check
+from metrics import REPO_OPERATION_DURATION, timed
+from tracing import traced
+
+# Staged slot of a user the transaction has not written.
+_UNSTAGED = object()
 
 
 @dataclass
@@ -10,34 +21,413 @@ class UserEntity:
   name: str
 
 
+class UserRepository(Protocol):
+  """What UnitOfWork needs from a user repository.
+
+  ``snapshot`` opens the transaction's staging area, which is passed back as
+  ``staging`` to the operations and finally to ``commit``; its shape is up to
+  the repository. ``staged_entry`` and ``restore_staged`` save and put back
+  one user's slot in it, which is how savepoints undo their writes. Every
+  committed write is appended to ``changes``, except those of ``bulk_load``,
+  which inserts users outside any transaction for start-up loading and
+  returns how many it wrote.
+  """
+
+  changes: ChangeLog
+
+  @property
+  def version(self) -> int: ...
+
+  def get(self, user_id: str, *, staging: Any = None) -> Optional[UserEntity]: ...
+
+  def save(self, user: UserEntity, *, staging: Any = None) -> None: ...
+
+  def update(self, user: UserEntity, *, staging: Any = None) -> None: ...
+
+  def delete(self, user_id: str, *, staging: Any = None) -> None: ...
+
+  def commit(self, staged: Any) -> None: ...
+
+  def snapshot(self) -> Sized: ...
+
+  def staged_entry(self, staged: Any, user_id: str) -> Any: ...
+
+  def restore_staged(self, staged: Any, user_id: str, entry: Any) -> None: ...
+
+  def scan(self) -> Iterator[UserEntity]: ...
+
+  def bulk_load(self, users: Iterable[UserEntity]) -> int: ...
+
+  def size(self) -> int: ...
+
+
 class InMemoryUserRepository:
   """Simple in-memory user repository with transactional staging support."""
 
-  def __init__(self) -> None:
+  def __init__(self, changes: Optional[ChangeLog] = None) -> None:
     self._store: Dict[str, UserEntity] = {}
+    # Bumped on every write to the committed store; lets readers detect change.
+    self._version = 0
+    self.changes = changes or ChangeLog.from_env()
+    # Open scans iterating the current ``_store``; see ``_writable``.
+    self._scans = 0
+    self._scan_lock = threading.Lock()
+
+  @property
+  def version(self) -> int:
+    return self._version
 
   # Transaction staging buffers are provided by the UnitOfWork.
+  @timed(REPO_OPERATION_DURATION, "users", "get")
+  @traced("repository.users.get")
   def get(self, user_id: str, *, staging: Optional[Dict[str, UserEntity]] = None) -> Optional[UserEntity]:
     src = staging if staging is not None else self._store
     return src.get(user_id)
 
+  @timed(REPO_OPERATION_DURATION, "users", "save")
+  @traced("repository.users.save")
   def save(self, user: UserEntity, *, staging: Optional[Dict[str, UserEntity]] = None) -> None:
-    target = staging if staging is not None else self._store
-    target[user.id] = user
+    if staging is not None:
+      staging[user.id] = user
+      return
+    with self._scan_lock:
+      store = self._writable()
+      self.changes.append([(UPDATE if user.id in store else CREATE, user.id, user.name)])
+      store[user.id] = user
+      self._version += 1
 
+  @timed(REPO_OPERATION_DURATION, "users", "update")
+  @traced("repository.users.update")
   def update(self, user: UserEntity, *, staging: Optional[Dict[str, UserEntity]] = None) -> None:
-    target = staging if staging is not None else self._store
-    if user.id not in target:
-      raise KeyError("user not found")
-    target[user.id] = user
+    if staging is not None:
+      if user.id not in staging:
+        raise KeyError("user not found")
+      staging[user.id] = user
+      return
+    with self._scan_lock:
+      store = self._writable()
+      if user.id not in store:
+        raise KeyError("user not found")
+      store[user.id] = user
+      self.changes.append([(UPDATE, user.id, user.name)])
+      self._version += 1
 
+  @timed(REPO_OPERATION_DURATION, "users", "delete")
+  @traced("repository.users.delete")
   def delete(self, user_id: str, *, staging: Optional[Dict[str, UserEntity]] = None) -> None:
-    target = staging if staging is not None else self._store
-    target.pop(user_id, None)
+    if staging is not None:
+      staging.pop(user_id, None)
+      return
+    with self._scan_lock:
+      if self._writable().pop(user_id, None) is not None:
+        self.changes.append([(DELETE, user_id, None)])
+      self._version += 1
 
   # Commit staged changes into the main store
+  @timed(REPO_OPERATION_DURATION, "users", "commit")
+  @traced("repository.users.commit")
   def commit(self, staged: Dict[str, UserEntity]) -> None:
-    self._store = dict(staged)
+    check("users.commit")
+    # Staging is a full copy, so the change records come from diffing it
+    # against the store; that is the same order of work as taking the copy.
+    # Diff, swap, log and version move together under the lock, like the
+    # direct writes, so concurrent commits neither interleave records nor
+    # lose a version bump.
+    with self._scan_lock:
+      current = self._store
+      records: List[Tuple[str, str, Optional[str]]] = []
+      for user_id, user in staged.items():
+        old = current.get(user_id)
+        if old is None:
+          records.append((CREATE, user_id, user.name))
+        elif old != user:
+          records.append((UPDATE, user_id, user.name))
+      records.extend((DELETE, user_id, None) for user_id in current if user_id not in staged)
+      # A new dict: open scans keep the old one.
+      self._store = dict(staged)
+      self._scans = 0
+      self.changes.append(records)
+      self._version += 1
 
+  @timed(REPO_OPERATION_DURATION, "users", "snapshot")
+  @traced("repository.users.snapshot")
   def snapshot(self) -> Dict[str, UserEntity]:
+    check("users.snapshot")
     return dict(self._store)
+
+  def staged_entry(self, staged: Dict[str, UserEntity], user_id: str) -> Any:
+    return staged.get(user_id, _UNSTAGED)
+
+  def restore_staged(self, staged: Dict[str, UserEntity], user_id: str, entry: Any) -> None:
+    if entry is _UNSTAGED:
+      staged.pop(user_id, None)
+    else:
+      staged[user_id] = entry
+
+  def _writable(self) -> Dict[str, UserEntity]:
+    # Called with _scan_lock held. Scans iterate the store dict in place, so
+    # the first direct write while one is open moves the store to a copy.
+    if self._scans:
+      self._store = dict(self._store)
+      self._scans = 0
+    return self._store
+
+  def scan(self) -> Iterator[UserEntity]:
+    """Iterate committed users as of this call, lazily and without a copy."""
+    check("users.scan")
+    with self._scan_lock:
+      store = self._store
+      self._scans += 1
+    return self._iterate(store)
+
+  def _iterate(self, store: Dict[str, UserEntity]) -> Iterator[UserEntity]:
+    try:
+      yield from store.values()
+    finally:
+      with self._scan_lock:
+        if self._store is store and self._scans:
+          self._scans -= 1
+
+  def bulk_load(self, users: Iterable[UserEntity]) -> int:
+    """Insert ``users`` straight into the store, without change records."""
+    loaded = {user.id: user for user in users}
+    with self._scan_lock:
+      self._writable().update(loaded)
+      self._version += 1
+    return len(loaded)
+
+  def size(self) -> int:
+    return len(self._store)
+
+
+class ShardStaging:
+  """Write set of one transaction against a write-set repository (sharded or shared-memory).
+
+  ``writes`` maps user id to the new entity, or ``None`` for a delete.
+  ``expected`` holds ids updated in this transaction that must still exist
+  when it commits.
+  """
+
+  __slots__ = ("writes", "expected")
+
+  def __init__(self) -> None:
+    self.writes: Dict[str, Optional[UserEntity]] = {}
+    self.expected: Set[str] = set()
+
+  def __len__(self) -> int:
+    return len(self.writes)
+
+  def entry(self, user_id: str) -> Tuple[Any, bool]:
+    """This transaction's state for ``user_id``, for ``restore``."""
+    return self.writes.get(user_id, _UNSTAGED), user_id in self.expected
+
+  def restore(self, user_id: str, entry: Tuple[Any, bool]) -> None:
+    write, expected = entry
+    if write is _UNSTAGED:
+      self.writes.pop(user_id, None)
+    else:
+      self.writes[user_id] = write
+    if expected:
+      self.expected.add(user_id)
+    else:
+      self.expected.discard(user_id)
+
+
+class _Shard:
+  __slots__ = ("lock", "store", "scans")
+
+  def __init__(self) -> None:
+    self.lock = threading.Lock()
+    self.store: Dict[str, UserEntity] = {}
+    # Open scans iterating ``store``; writers copy it first while any are.
+    self.scans = 0
+
+  def writable(self) -> Dict[str, UserEntity]:
+    # Called with lock held.
+    if self.scans:
+      self.store = dict(self.store)
+      self.scans = 0
+    return self.store
+
+
+class ShardedUserRepository:
+  """In-memory user repository partitioned by a hash of the user id.
+
+  Each shard has its own lock. A transaction stages only the rows it writes
+  and, at commit, locks just the shards it touched in ascending index order,
+  so transactions on disjoint shards commit in parallel and overlapping ones
+  cannot deadlock. Reads go straight to the shard dicts without locking and
+  see committed data (read committed); a multi-shard commit becomes visible
+  shard by shard.
+  """
+
+  def __init__(self, shards: int = 16, changes: Optional[ChangeLog] = None) -> None:
+    if shards < 1:
+      raise ValueError("shards must be >= 1")
+    self._shards: List[_Shard] = [_Shard() for _ in range(shards)]
+    self._version_lock = threading.Lock()
+    self._version = 0
+    self.changes = changes or ChangeLog.from_env()
+
+  @property
+  def version(self) -> int:
+    return self._version
+
+  @property
+  def shard_count(self) -> int:
+    return len(self._shards)
+
+  def shard_of(self, user_id: str) -> int:
+    # crc32 rather than hash(): stable across processes and PYTHONHASHSEED.
+    return zlib.crc32(user_id.encode()) % len(self._shards)
+
+  def _bump_version(self) -> None:
+    with self._version_lock:
+      self._version += 1
+
+  @timed(REPO_OPERATION_DURATION, "users", "get")
+  @traced("repository.users.get")
+  def get(self, user_id: str, *, staging: Optional[ShardStaging] = None) -> Optional[UserEntity]:
+    if staging is not None and user_id in staging.writes:
+      return staging.writes[user_id]
+    return self._shards[self.shard_of(user_id)].store.get(user_id)
+
+  @timed(REPO_OPERATION_DURATION, "users", "save")
+  @traced("repository.users.save")
+  def save(self, user: UserEntity, *, staging: Optional[ShardStaging] = None) -> None:
+    if staging is not None:
+      staging.writes[user.id] = user
+      return
+    shard = self._shards[self.shard_of(user.id)]
+    with shard.lock:
+      self.changes.append([(UPDATE if user.id in shard.store else CREATE, user.id, user.name)])
+      shard.writable()[user.id] = user
+    self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "update")
+  @traced("repository.users.update")
+  def update(self, user: UserEntity, *, staging: Optional[ShardStaging] = None) -> None:
+    if staging is not None:
+      if self.get(user.id, staging=staging) is None:
+        raise KeyError("user not found")
+      if user.id not in staging.writes:
+        staging.expected.add(user.id)
+      staging.writes[user.id] = user
+      return
+    shard = self._shards[self.shard_of(user.id)]
+    with shard.lock:
+      if user.id not in shard.store:
+        raise KeyError("user not found")
+      self.changes.append([(UPDATE, user.id, user.name)])
+      shard.writable()[user.id] = user
+    self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "delete")
+  @traced("repository.users.delete")
+  def delete(self, user_id: str, *, staging: Optional[ShardStaging] = None) -> None:
+    if staging is not None:
+      staging.writes[user_id] = None
+      return
+    shard = self._shards[self.shard_of(user_id)]
+    with shard.lock:
+      if shard.writable().pop(user_id, None) is not None:
+        self.changes.append([(DELETE, user_id, None)])
+    self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "commit")
+  @traced("repository.users.commit")
+  def commit(self, staged: ShardStaging) -> None:
+    """Apply ``staged`` atomically with respect to other commits.
+
+    Raises KeyError, applying nothing, if a user updated in the transaction
+    was deleted by a concurrent commit.
+    """
+    if not staged.writes:
+      return
+    # Checked before waiting for the shard locks.
+    check("users.commit")
+    by_shard: Dict[int, Dict[str, Optional[UserEntity]]] = {}
+    for user_id, entity in staged.writes.items():
+      by_shard.setdefault(self.shard_of(user_id), {})[user_id] = entity
+    with ExitStack() as held:
+      for index in sorted(by_shard):
+        held.enter_context(self._shards[index].lock)
+      for user_id in staged.expected:
+        if user_id not in self._shards[self.shard_of(user_id)].store:
+          raise KeyError("user not found")
+      # Logged while the shard locks are held so the log orders writes to
+      # any one user the same way they were applied.
+      records: List[Tuple[str, str, Optional[str]]] = []
+      for index, writes in by_shard.items():
+        store = self._shards[index].store
+        for user_id, entity in writes.items():
+          if entity is not None:
+            records.append((UPDATE if user_id in store else CREATE, user_id, entity.name))
+          elif user_id in store:
+            records.append((DELETE, user_id, None))
+        self._apply(self._shards[index], writes)
+      self.changes.append(records)
+    self._bump_version()
+
+  def _apply(self, shard: _Shard, writes: Dict[str, Optional[UserEntity]]) -> None:
+    # Called with shard.lock held.
+    store = shard.writable()
+    for user_id, entity in writes.items():
+      if entity is None:
+        store.pop(user_id, None)
+      else:
+        store[user_id] = entity
+
+  @timed(REPO_OPERATION_DURATION, "users", "snapshot")
+  @traced("repository.users.snapshot")
+  def snapshot(self) -> ShardStaging:
+    # Transactions stage writes only; there is no full copy to take.
+    return ShardStaging()
+
+  def staged_entry(self, staged: ShardStaging, user_id: str) -> Any:
+    return staged.entry(user_id)
+
+  def restore_staged(self, staged: ShardStaging, user_id: str, entry: Any) -> None:
+    staged.restore(user_id, entry)
+
+  def scan(self) -> Iterator[UserEntity]:
+    """Iterate committed users as of this call, consistent across shards.
+
+    Shard dicts are iterated in place; writers copy a shard before changing
+    it while a scan is open on it.
+    """
+    check("users.scan")
+    with ExitStack() as held:
+      for shard in self._shards:
+        held.enter_context(shard.lock)
+        shard.scans += 1
+      stores = [shard.store for shard in self._shards]
+    return self._iterate(stores)
+
+  def _iterate(self, stores: List[Dict[str, UserEntity]]) -> Iterator[UserEntity]:
+    try:
+      for store in stores:
+        yield from store.values()
+    finally:
+      for shard, store in zip(self._shards, stores):
+        with shard.lock:
+          if shard.store is store and shard.scans:
+            shard.scans -= 1
+
+  def bulk_load(self, users: Iterable[UserEntity]) -> int:
+    """Insert ``users`` straight into the shards, without change records."""
+    by_shard: Dict[int, Dict[str, UserEntity]] = {}
+    for user in users:
+      by_shard.setdefault(self.shard_of(user.id), {})[user.id] = user
+    for index, loaded in by_shard.items():
+      shard = self._shards[index]
+      with shard.lock:
+        shard.writable().update(loaded)
+    self._bump_version()
+    return sum(len(loaded) for loaded in by_shard.values())
+
+  def size(self) -> int:
+    return sum(len(shard.store) for shard in self._shards)
+
+  def shard_sizes(self) -> List[int]:
+    return [len(shard.store) for shard in self._shards]
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from content_repository import PostEntity
+from metrics import REPO_OPERATION_DURATION, timed
+from tracing import traced
+
+_TOKEN = re.compile(r"\w+")
+# Title terms count this many times towards a post's term frequency.
+TITLE_WEIGHT = 2
+_MAX_TF = 0xFFFF
+_MAGIC = b"HXSI"
+_FORMAT = 2
+
+
+def tokenize(text: str) -> List[str]:
+  return _TOKEN.findall(text.lower())
+
+
+def post_terms(post: PostEntity) -> Dict[str, int]:
+  """Weighted term frequencies of a post's title and content."""
+  freqs: Dict[str, int] = {}
+  for term in tokenize(post.title):
+    freqs[term] = freqs.get(term, 0) + TITLE_WEIGHT
+  if post.content:
+    for term in tokenize(post.content):
+      freqs[term] = freqs.get(term, 0) + 1
+  return freqs
+
+
+class SearchIndex:
+  """Incremental inverted index over posts with BM25 ranking.
+
+  Each term has a posting list of (doc, tf) held in two parallel typed
+  arrays. Doc numbers are handed out in increasing order and never reused,
+  so posting lists stay sorted by doc with plain appends. Replacing or
+  removing a post marks its old doc dead; dead postings are skipped by
+  queries and dropped by a compaction once they make up half the index.
+
+  Queries run document-at-a-time with MaxScore pruning: terms whose combined
+  score bound cannot lift a document into the current top-k are only probed
+  (by binary search) for candidates from the other terms, and probing stops
+  as soon as a candidate can no longer qualify. Rankings are exact.
+  """
+
+  def __init__(self, *, k1: float = 1.2, b: float = 0.75) -> None:
+    self.k1 = k1
+    self.b = b
+    self._lock = threading.Lock()
+    self._terms: Dict[str, int] = {}
+    self._postings: List[array[int]] = []
+    self._freqs: List[array[int]] = []
+    self._df = array("I")
+    self._doc_keys: List[Optional[str]] = []
+    self._doc_len = array("I")
+    self._docs_by_key: Dict[str, int] = {}
+    self._total_len = 0
+    self._live_postings = 0
+    self._dead_postings = 0
+
+  def __len__(self) -> int:
+    return len(self._docs_by_key)
+
+  # Updates.
+  def add(self, post: PostEntity) -> None:
+    with self._lock:
+      self._remove(post.id, None)
+      self._add(post.id, post_terms(post))
+
+  def remove(self, post: PostEntity) -> None:
+    with self._lock:
+      self._remove(post.id, post_terms(post))
+
+  def apply(self, changes: Iterable[Tuple[Optional[PostEntity], Optional[PostEntity]]]) -> None:
+    """Apply committed ``(old, new)`` row pairs; subscribed to the post repository."""
+    with self._lock:
+      for old, new in changes:
+        if old is not None:
+          self._remove(old.id, post_terms(old))
+        if new is not None:
+          self._add(new.id, post_terms(new))
+
+  def compact(self) -> None:
+    """Drop dead postings now rather than once they make up half the index."""
+    with self._lock:
+      if self._dead_postings:
+        self._compact()
+
+  def _add(self, key: str, freqs: Dict[str, int]) -> None:
+    if not freqs:
+      return
+    doc = len(self._doc_keys)
+    self._doc_keys.append(key)
+    self._docs_by_key[key] = doc
+    length = sum(freqs.values())
+    self._doc_len.append(length)
+    self._total_len += length
+    terms = self._terms
+    for term, tf in freqs.items():
+      tid = terms.get(term)
+      if tid is None:
+        tid = terms[term] = len(self._postings)
+        self._postings.append(array("I"))
+        self._freqs.append(array("H"))
+        self._df.append(0)
+      self._postings[tid].append(doc)
+      self._freqs[tid].append(min(tf, _MAX_TF))
+      self._df[tid] += 1
+    self._live_postings += len(freqs)
+
+  def _remove(self, key: str, freqs: Optional[Dict[str, int]]) -> None:
+    doc = self._docs_by_key.pop(key, None)
+    if doc is None:
+      return
+    if freqs is None:
+      freqs = self._doc_terms(doc)
+    for term in freqs:
+      tid = self._terms.get(term)
+      if tid is not None:
+        self._df[tid] -= 1
+    self._doc_keys[doc] = None
+    self._total_len -= self._doc_len[doc]
+    self._doc_len[doc] = 0
+    self._live_postings -= len(freqs)
+    self._dead_postings += len(freqs)
+    if self._dead_postings > 1024 and self._dead_postings > self._live_postings:
+      self._compact()
+
+  def _doc_terms(self, doc: int) -> Dict[str, int]:
+    # Only used when the caller has no copy of the old text: scans every posting list.
+    out: Dict[str, int] = {}
+    for term, tid in self._terms.items():
+      docs = self._postings[tid]
+      i = bisect_left(docs, doc)
+      if i < len(docs) and docs[i] == doc:
+        out[term] = self._freqs[tid][i]
+    return out
+
+  def _compact(self) -> None:
+    """Drop dead docs and postings, renumbering docs in their existing order."""
+    renumber = array("i", [-1]) * len(self._doc_keys)
+    keys: List[Optional[str]] = []
+    lengths = array("I")
+    for doc, key in enumerate(self._doc_keys):
+      if key is not None:
+        renumber[doc] = len(keys)
+        keys.append(key)
+        lengths.append(self._doc_len[doc])
+    terms: Dict[str, int] = {}
+    postings: List[array[int]] = []
+    freqs: List[array[int]] = []
+    df = array("I")
+    for term, tid in self._terms.items():
+      docs, tfs = array("I"), array("H")
+      for doc, tf in zip(self._postings[tid], self._freqs[tid]):
+        new = renumber[doc]
+        if new >= 0:
+          docs.append(new)
+          tfs.append(tf)
+      if docs:
+        terms[term] = len(postings)
+        postings.append(docs)
+        freqs.append(tfs)
+        df.append(len(docs))
+    self._terms, self._postings, self._freqs, self._df = terms, postings, freqs, df
+    self._doc_keys, self._doc_len = keys, lengths
+    self._docs_by_key = {key: doc for doc, key in enumerate(keys) if key is not None}
+    self._dead_postings = 0
+
+  # Queries.
+  @timed(REPO_OPERATION_DURATION, "posts_search", "query")
+  @traced("search.posts.query")
+  def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+    """Top ``k`` ``(post id, score)`` pairs for ``query``, best first."""
+    with self._lock:
+      return self._search(list(dict.fromkeys(tokenize(query))), k)
+
+  def _search(self, tokens: List[str], k: int) -> List[Tuple[str, float]]:
+    n_docs = len(self._docs_by_key)
+    tids = [self._terms[t] for t in tokens if t in self._terms and self._df[self._terms[t]] > 0]
+    if k <= 0 or n_docs == 0 or not tids:
+      return []
+    k1, b = self.k1, self.b
+    avgdl = self._total_len / n_docs
+    lists: List[Tuple[float, float, array[int], array[int]]] = []
+    for tid in tids:
+      df = self._df[tid]
+      idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+      # A term contributes at most idf * (k1 + 1) to any document.
+      lists.append((idf * (k1 + 1), idf, self._postings[tid], self._freqs[tid]))
+    lists.sort(key=lambda entry: entry[0])
+    bounds = [entry[0] for entry in lists]
+    prefix = list(bounds)
+    for i in range(1, len(prefix)):
+      prefix[i] += prefix[i - 1]
+    norm_a, norm_b = k1 * (1 - b), k1 * b / avgdl
+    doc_len, doc_keys = self._doc_len, self._doc_keys
+
+    if len(lists) == 1:
+      # Nothing to prune against: score the one list in a single pass.
+      _, idf, docs, tfs = lists[0]
+      scored = (
+        (idf * tf * (k1 + 1) / (tf + norm_a + norm_b * doc_len[doc]), -doc)
+        for doc, tf in zip(docs, tfs) if doc_keys[doc] is not None
+      )
+      return [(doc_keys[-neg] or "", score) for score, neg in heapq.nlargest(k, scored)]
+
+    cursors = [0] * len(lists)
+    # Lists [0, essential) are non-essential: their bounds together cannot beat theta.
+    essential = 0
+    theta = 0.0
+    top: List[Tuple[float, int]] = []
+    frontier = [(entry[2][0], i) for i, entry in enumerate(lists) if len(entry[2])]
+    heapq.heapify(frontier)
+
+    while frontier:
+      while frontier and frontier[0][1] < essential:
+        heapq.heappop(frontier)
+      if not frontier:
+        break
+      doc = frontier[0][0]
+      score = 0.0
+      dl_norm = norm_a + norm_b * doc_len[doc]
+      while frontier and frontier[0][0] == doc:
+        _, i = heapq.heappop(frontier)
+        if i < essential:
+          continue
+        _, idf, docs, tfs = lists[i]
+        c = cursors[i]
+        tf = tfs[c]
+        score += idf * tf * (k1 + 1) / (tf + dl_norm)
+        cursors[i] = c + 1
+        if c + 1 < len(docs):
+          heapq.heappush(frontier, (docs[c + 1], i))
+      if doc_keys[doc] is None:
+        continue
+      for i in range(essential - 1, -1, -1):
+        if score + prefix[i] <= theta:
+          break
+        _, idf, docs, tfs = lists[i]
+        c = bisect_left(docs, doc, cursors[i])
+        cursors[i] = c
+        if c < len(docs) and docs[c] == doc:
+          tf = tfs[c]
+          score += idf * tf * (k1 + 1) / (tf + dl_norm)
+      if len(top) < k:
+        heapq.heappush(top, (score, -doc))
+      elif score > theta:
+        heapq.heapreplace(top, (score, -doc))
+      else:
+        continue
+      if len(top) == k:
+        theta = top[0][0]
+        while essential < len(lists) and prefix[essential] <= theta:
+          essential += 1
+    ranked = sorted(top, reverse=True)
+    return [(doc_keys[-neg] or "", score) for score, neg in ranked]
+
+  # Persistence.
+  def save(self, path: str) -> None:
+    """Write the live index to ``path`` atomically (dead postings are compacted first)."""
+    tmp = f"{path}.tmp"
+    with self._lock:
+      if self._dead_postings:
+        self._compact()
+      with open(tmp, "wb") as fh:
+        fh.write(struct.pack("<4sIddII", _MAGIC, _FORMAT, self.k1, self.b, len(self._doc_keys), len(self._terms)))
+        for key in self._doc_keys:
+          _write_str(fh, key or "")
+        fh.write(self._doc_len.tobytes())
+        for term, tid in self._terms.items():
+          _write_str(fh, term)
+          docs = self._postings[tid]
+          fh.write(struct.pack("<I", len(docs)))
+          fh.write(docs.tobytes())
+          fh.write(self._freqs[tid].tobytes())
+    os.replace(tmp, path)
+
+  @classmethod
+  def load(cls, path: str) -> "SearchIndex":
+    with open(path, "rb") as fh:
+      magic, version, k1, b, n_docs, n_terms = struct.unpack("<4sIddII", fh.read(struct.calcsize("<4sIddII")))
+      if magic != _MAGIC or version != _FORMAT:
+        raise ValueError(f"{path} is not a search index (format {_FORMAT})")
+      index = cls(k1=k1, b=b)
+      index._doc_keys = [_read_str(fh) for _ in range(n_docs)]
+      index._doc_len.frombytes(fh.read(4 * n_docs))
+      for tid in range(n_terms):
+        term = _read_str(fh)
+        (count,) = struct.unpack("<I", fh.read(4))
+        docs, tfs = array("I"), array("H")
+        docs.frombytes(fh.read(4 * count))
+        tfs.frombytes(fh.read(2 * count))
+        index._terms[term] = tid
+        index._postings.append(docs)
+        index._freqs.append(tfs)
+        index._df.append(count)
+        index._live_postings += count
+    index._docs_by_key = {key: doc for doc, key in enumerate(index._doc_keys) if key is not None}
+    index._total_len = sum(index._doc_len)
+    return index
+
+
+def _write_str(fh: BinaryIO, value: str) -> None:
+  raw = value.encode()
+  fh.write(struct.pack("<I", len(raw)))
+  fh.write(raw)
+
+
+def _read_str(fh: BinaryIO) -> str:
+  (size,) = struct.unpack("<I", fh.read(4))
+  return fh.read(size).decode()
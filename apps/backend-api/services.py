@@ -1,17 +1,26 @@
 from __future__ import annotations
 
+from typing import Optional
+
+from content_repository import CommentEntity, PostEntity
+from deadlines import check
+from tracing import traced
 from uow import UnitOfWork
 from repository import UserEntity
 
 
 class UserService:
+  @traced("service.create_user")
   def create_user(self, uow: UnitOfWork, *, id: str, name: str) -> UserEntity:
+    check("service.create_user")
     with uow.transaction():
       entity = UserEntity(id=id, name=name)
       uow.users_save(entity)
       return entity
 
+  @traced("service.rename_user")
   def rename_user(self, uow: UnitOfWork, *, id: str, name: str) -> UserEntity:
+    check("service.rename_user")
     with uow.transaction():
       existing = uow.users_get(id)
       if existing is None:
@@ -20,7 +29,52 @@ class UserService:
       uow.users_update(updated)
       return updated
 
+  @traced("service.delete_user")
   def delete_user(self, uow: UnitOfWork, *, id: str) -> None:
+    """Delete the user with their posts, comments on those posts, and their comments elsewhere."""
+    check("service.delete_user")
     with uow.transaction():
+      posts = uow.posts_by_user(id)
+      doomed = {c.id for comments in uow.comments_for_posts([p.id for p in posts]).values() for c in comments}
+      doomed.update(c.id for c in uow.comments_by_user(id))
+      for comment_id in doomed:
+        uow.comments_delete(comment_id)
+      for post in posts:
+        uow.posts_delete(post.id)
       uow.users_delete(id)
 
+
+class PostService:
+  """Posts and their comments. Missing referenced rows raise KeyError."""
+
+  @traced("service.create_post")
+  def create_post(
+    self, uow: UnitOfWork, *, id: str, user_id: str, title: str, content: Optional[str] = None, published: bool = False,
+  ) -> PostEntity:
+    check("service.create_post")
+    with uow.transaction():
+      if uow.users_get(user_id) is None:
+        raise KeyError("user not found")
+      post = PostEntity(id=id, user_id=user_id, title=title, content=content, published=published)
+      uow.posts_save(post)
+      return post
+
+  @traced("service.delete_post")
+  def delete_post(self, uow: UnitOfWork, *, id: str) -> None:
+    check("service.delete_post")
+    with uow.transaction():
+      for comment in uow.comments_for_post(id):
+        uow.comments_delete(comment.id)
+      uow.posts_delete(id)
+
+  @traced("service.add_comment")
+  def add_comment(self, uow: UnitOfWork, *, id: str, post_id: str, user_id: str, content: str) -> CommentEntity:
+    check("service.add_comment")
+    with uow.transaction():
+      if uow.posts_get(post_id) is None:
+        raise KeyError("post not found")
+      if uow.users_get(user_id) is None:
+        raise KeyError("user not found")
+      comment = CommentEntity(id=id, post_id=post_id, user_id=user_id, content=content)
+      uow.comments_save(comment)
+      return comment
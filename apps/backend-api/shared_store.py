@@ -0,0 +1,571 @@
+from __future__ import annotations
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from changes import CHANGES_APPENDED, CHANGES_RESYNC, CREATE, DELETE, UPDATE, Change, ChangeLog, ResyncRequired
+from deadlines import check
+from metrics import REPO_OPERATION_DURATION, timed
+from repository import ShardStaging, UserEntity
+from tracing import traced
+
+_MAGIC = b"HXUS"
+_LAYOUT = 2
+# magic, layout, capacity, id_max, name_max, count, tombstones, version, epoch, log capacity, log seq
+_HEADER = struct.Struct("<4sIIIIIIQQIQ")
+_HEADER_SIZE = 64
+_COUNT_AT = 20
+_TOMBSTONES_AT = 24
+_VERSION_AT = 28
+_EPOCH_AT = 36
+_LOG_SEQ_AT = 48
+# seq, hash, state, id_len, name_len; followed by id and name bytes
+_SLOT = struct.Struct("<IIBBH")
+# Change log record: seq, timestamp, op, id_len, name_len; followed by id and name bytes
+_RECORD = struct.Struct("<QdBBH")
+_OPS = (CREATE, UPDATE, DELETE)
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+_EMPTY, _USED, _DELETED = 0, 1, 2
+_MAX_LOAD = 0.75
+# Lock-free attempts before a read falls back to taking the file lock.
+_READ_RETRIES = 64
+# How often a change feed long-poll looks for records appended by other processes.
+_WAIT_POLL = 0.05
+
+
+class SharedMemoryUserRepository:
+  """User repository in an mmap'd file shared by every worker process on a host.
+
+  The file holds a fixed-capacity open-addressing hash table of fixed-size
+  slots (header, then ``id`` and ``name`` as UTF-8 up to ``id_max`` and
+  ``name_max`` bytes). Writers serialize on ``flock`` of the file plus a
+  thread lock. Readers take no lock: each slot carries a sequence number
+  that is odd while it is being written, and a table-wide epoch guards
+  rehashing, so a read that overlaps a write retries, and after
+  ``_READ_RETRIES`` attempts reads under the lock instead.
+
+  The first process to open ``path`` creates it with the given sizes; later
+  ones adopt the sizes recorded in the file. Opening also repairs what a
+  writer that died mid-write left behind: an odd slot sequence becomes a
+  tombstone, and an odd epoch (a rehash cut short) empties the table.
+
+  ``changes`` is a SharedChangeLog kept in the same file after the table,
+  so every worker serves the same feed with the same sequence numbers.
+  """
+
+  # Its data is shared by every worker process; see TenantRegistry.
+  cross_process = True
+
+  def __init__(
+    self,
+    path: str,
+    *,
+    capacity: int = 65536,
+    id_max: int = 64,
+    name_max: int = 192,
+    retention: Optional[int] = None,
+  ) -> None:
+    if retention is None:
+      retention = int(os.getenv("BACKEND_CHANGE_RETENTION", "10000"))
+    if capacity < 1 or not 0 < id_max <= 255 or not 0 < name_max <= 65535 or retention < 1:
+      raise ValueError("invalid shared store dimensions")
+    self.path = path
+    self._thread_lock = threading.Lock()
+    self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+      with self._file_lock():
+        header = os.pread(self._fd, _HEADER.size, 0)
+        if len(header) < _HEADER.size or header[:4] != _MAGIC:
+          self._initialize(capacity, id_max, name_max, retention)
+          header = os.pread(self._fd, _HEADER.size, 0)
+      layout = _HEADER.unpack(header)[1]
+      if layout != _LAYOUT:
+        raise ValueError(f"unsupported shared store layout {layout} in {path}")
+      _, _, capacity, id_max, name_max, _, _, _, _, retention, _ = _HEADER.unpack(header)
+      self.capacity = capacity
+      self.id_max = id_max
+      self.name_max = name_max
+      self._slot_size = _slot_size(id_max, name_max)
+      table_end = _HEADER_SIZE + capacity * self._slot_size
+      self._map = mmap.mmap(self._fd, table_end + retention * _record_size(id_max, name_max))
+      self._log = SharedChangeLog(self, table_end, retention)
+      self.changes: ChangeLog = self._log
+      with self._file_lock():
+        self._repair()
+    except BaseException:
+      os.close(self._fd)
+      raise
+
+  def _initialize(self, capacity: int, id_max: int, name_max: int, retention: int) -> None:
+    size = _HEADER_SIZE + capacity * _slot_size(id_max, name_max) + retention * _record_size(id_max, name_max)
+    os.ftruncate(self._fd, 0)
+    os.ftruncate(self._fd, size)
+    os.pwrite(self._fd, _HEADER.pack(_MAGIC, _LAYOUT, capacity, id_max, name_max, 0, 0, 0, 0, retention, 0), 0)
+
+  def _repair(self) -> None:
+    """Undo half-finished writes; holding the file lock, nothing odd is in progress."""
+    epoch = self._u64(_EPOCH_AT)
+    if epoch & 1:
+      # The live records of an interrupted rehash only existed in the dead writer.
+      self._map[_HEADER_SIZE:_HEADER_SIZE + self.capacity * self._slot_size] = bytes(self.capacity * self._slot_size)
+      _U32.pack_into(self._map, _COUNT_AT, 0)
+      _U32.pack_into(self._map, _TOMBSTONES_AT, 0)
+      _U64.pack_into(self._map, _EPOCH_AT, epoch + 1)
+      self._bump_version()
+      # The log cannot describe what was lost; move every cursor out of retention.
+      self._log.invalidate()
+      return
+    repaired = False
+    count = tombstones = 0
+    for index in range(self.capacity):
+      offset = _HEADER_SIZE + index * self._slot_size
+      seq, h, state, _, _ = _SLOT.unpack_from(self._map, offset)
+      if seq & 1:
+        # Keep the probe chain intact; the slot's contents cannot be trusted.
+        _SLOT.pack_into(self._map, offset, (seq + 1) & 0xFFFFFFFF, h, _DELETED, 0, 0)
+        state, repaired = _DELETED, True
+      count += state == _USED
+      tombstones += state == _DELETED
+    if repaired:
+      _U32.pack_into(self._map, _COUNT_AT, count)
+      _U32.pack_into(self._map, _TOMBSTONES_AT, tombstones)
+      self._bump_version()
+
+  def close(self) -> None:
+    self._map.close()
+    os.close(self._fd)
+
+  @contextmanager
+  def _file_lock(self) -> Iterator[None]:
+    # flock is per open file description, so threads of this process also
+    # need the thread lock to exclude each other.
+    with self._thread_lock:
+      fcntl.flock(self._fd, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+  # Header fields.
+  def _u32(self, offset: int) -> int:
+    value: int = _U32.unpack_from(self._map, offset)[0]
+    return value
+
+  def _u64(self, offset: int) -> int:
+    value: int = _U64.unpack_from(self._map, offset)[0]
+    return value
+
+  @property
+  def version(self) -> int:
+    return self._u64(_VERSION_AT)
+
+  def size(self) -> int:
+    return self._u32(_COUNT_AT)
+
+  # Lock-free reads.
+  def _read(self, user_id: str) -> Optional[UserEntity]:
+    key = user_id.encode()
+    if len(key) > self.id_max:
+      return None
+    h = zlib.crc32(key)
+    for _ in range(_READ_RETRIES):
+      epoch = self._u64(_EPOCH_AT)
+      if not epoch & 1:
+        found, consistent = self._probe(key, h)
+        if consistent and self._u64(_EPOCH_AT) == epoch:
+          return None if found is None else UserEntity(id=user_id, name=found)
+      time.sleep(0)
+    # Under sustained writes to this chain, stop spinning and wait for the writer.
+    with self._file_lock():
+      found, _ = self._probe(key, h)
+    return None if found is None else UserEntity(id=user_id, name=found)
+
+  def _probe(self, key: bytes, h: int) -> Tuple[Optional[str], bool]:
+    m, size, capacity = self._map, self._slot_size, self.capacity
+    id_start = _HEADER_SIZE + _SLOT.size
+    for i in range(capacity):
+      offset = (h + i) % capacity * size
+      seq, slot_hash, state, id_len, name_len = _SLOT.unpack_from(m, _HEADER_SIZE + offset)
+      if seq & 1:
+        return None, False
+      if state == _EMPTY:
+        return None, True
+      if state != _USED or slot_hash != h or id_len != len(key):
+        continue
+      start = id_start + offset
+      if m[start:start + id_len] != key:
+        continue
+      raw = m[start + self.id_max:start + self.id_max + name_len]
+      if self._u32(_HEADER_SIZE + offset) != seq:
+        return None, False
+      try:
+        return raw.decode(), True
+      except UnicodeDecodeError:
+        return None, False
+    return None, True
+
+  # Writes; callers hold the file lock.
+  def _locate(self, key: bytes, h: int) -> Tuple[Optional[int], Optional[int]]:
+    """Return (slot holding ``key``, first free slot on its probe chain)."""
+    m, size, capacity = self._map, self._slot_size, self.capacity
+    free: Optional[int] = None
+    for i in range(capacity):
+      index = (h + i) % capacity
+      offset = _HEADER_SIZE + index * size
+      _, slot_hash, state, id_len, _ = _SLOT.unpack_from(m, offset)
+      if state == _EMPTY:
+        return None, index if free is None else free
+      if state == _DELETED:
+        if free is None:
+          free = index
+      elif slot_hash == h and id_len == len(key) and m[offset + _SLOT.size:offset + _SLOT.size + id_len] == key:
+        return index, free
+    return None, free
+
+  def _write_slot(self, index: int, state: int, h: int, key: bytes, name: bytes) -> None:
+    offset = _HEADER_SIZE + index * self._slot_size
+    seq = self._u32(offset)
+    _U32.pack_into(self._map, offset, seq + 1)
+    if state == _USED:
+      start = offset + _SLOT.size
+      self._map[start:start + len(key)] = key
+      self._map[start + self.id_max:start + self.id_max + len(name)] = name
+    _SLOT.pack_into(self._map, offset, seq + 1, h, state, len(key), len(name))
+    _U32.pack_into(self._map, offset, (seq + 2) & 0xFFFFFFFF)
+
+  def _put(self, user: UserEntity) -> None:
+    key, name = self._encode(user)
+    h = zlib.crc32(key)
+    index, free = self._locate(key, h)
+    if index is None:
+      count, tombstones = self._u32(_COUNT_AT), self._u32(_TOMBSTONES_AT)
+      if count + 1 > self.capacity * _MAX_LOAD:
+        raise RuntimeError(f"shared user store {self.path} is full ({count} users)")
+      reuse = free is not None and self._state(free) == _DELETED
+      if not reuse and count + tombstones + 1 > self.capacity * _MAX_LOAD:
+        self._rehash()
+        index, free = self._locate(key, h)
+        tombstones = 0
+        reuse = False
+      assert free is not None
+      index = free
+      _U32.pack_into(self._map, _COUNT_AT, count + 1)
+      if reuse:
+        _U32.pack_into(self._map, _TOMBSTONES_AT, tombstones - 1)
+    self._write_slot(index, _USED, h, key, name)
+
+  def _remove(self, user_id: str) -> None:
+    key = user_id.encode()
+    h = zlib.crc32(key)
+    index, _ = self._locate(key, h)
+    if index is None:
+      return
+    self._write_slot(index, _DELETED, h, b"", b"")
+    _U32.pack_into(self._map, _COUNT_AT, self._u32(_COUNT_AT) - 1)
+    _U32.pack_into(self._map, _TOMBSTONES_AT, self._u32(_TOMBSTONES_AT) + 1)
+
+  def _contains(self, user_id: str) -> bool:
+    key = user_id.encode()
+    return self._locate(key, zlib.crc32(key))[0] is not None
+
+  def _state(self, index: int) -> int:
+    state: int = _SLOT.unpack_from(self._map, _HEADER_SIZE + index * self._slot_size)[2]
+    return state
+
+  def _rehash(self) -> None:
+    """Rebuild the table without tombstones; readers retry while the epoch is odd."""
+    live = self._live_records()
+    epoch = self._u64(_EPOCH_AT)
+    _U64.pack_into(self._map, _EPOCH_AT, epoch + 1)
+    table = _HEADER_SIZE
+    self._map[table:table + self.capacity * self._slot_size] = bytes(self.capacity * self._slot_size)
+    for key, name in live:
+      h = zlib.crc32(key)
+      _, free = self._locate(key, h)
+      assert free is not None
+      self._write_slot(free, _USED, h, key, name)
+    _U32.pack_into(self._map, _TOMBSTONES_AT, 0)
+    _U64.pack_into(self._map, _EPOCH_AT, epoch + 2)
+
+  def _live_records(self) -> List[Tuple[bytes, bytes]]:
+    out: List[Tuple[bytes, bytes]] = []
+    for index in range(self.capacity):
+      offset = _HEADER_SIZE + index * self._slot_size
+      _, _, state, id_len, name_len = _SLOT.unpack_from(self._map, offset)
+      if state == _USED:
+        start = offset + _SLOT.size
+        out.append((bytes(self._map[start:start + id_len]), bytes(self._map[start + self.id_max:start + self.id_max + name_len])))
+    return out
+
+  def _bump_version(self) -> None:
+    _U64.pack_into(self._map, _VERSION_AT, self._u64(_VERSION_AT) + 1)
+
+  def _encode(self, user: UserEntity) -> Tuple[bytes, bytes]:
+    key, name = user.id.encode(), user.name.encode()
+    if len(key) > self.id_max:
+      raise ValueError(f"user id longer than {self.id_max} bytes")
+    if len(name) > self.name_max:
+      raise ValueError(f"user name longer than {self.name_max} bytes")
+    return key, name
+
+  # UserRepository interface; transactions stage a write set like the sharded repository.
+  @timed(REPO_OPERATION_DURATION, "users", "get")
+  @traced("repository.users.get")
+  def get(self, user_id: str, *, staging: Optional[ShardStaging] = None) -> Optional[UserEntity]:
+    if staging is not None and user_id in staging.writes:
+      return staging.writes[user_id]
+    return self._read(user_id)
+
+  @timed(REPO_OPERATION_DURATION, "users", "save")
+  @traced("repository.users.save")
+  def save(self, user: UserEntity, *, staging: Optional[ShardStaging] = None) -> None:
+    self._encode(user)
+    if staging is not None:
+      staging.writes[user.id] = user
+      return
+    with self._file_lock():
+      op = UPDATE if self._contains(user.id) else CREATE
+      self._put(user)
+      self.changes.append([(op, user.id, user.name)])
+      self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "update")
+  @traced("repository.users.update")
+  def update(self, user: UserEntity, *, staging: Optional[ShardStaging] = None) -> None:
+    self._encode(user)
+    if staging is not None:
+      if self.get(user.id, staging=staging) is None:
+        raise KeyError("user not found")
+      if user.id not in staging.writes:
+        staging.expected.add(user.id)
+      staging.writes[user.id] = user
+      return
+    with self._file_lock():
+      if not self._contains(user.id):
+        raise KeyError("user not found")
+      self._put(user)
+      self.changes.append([(UPDATE, user.id, user.name)])
+      self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "delete")
+  @traced("repository.users.delete")
+  def delete(self, user_id: str, *, staging: Optional[ShardStaging] = None) -> None:
+    if staging is not None:
+      staging.writes[user_id] = None
+      return
+    with self._file_lock():
+      if self._contains(user_id):
+        self._remove(user_id)
+        self.changes.append([(DELETE, user_id, None)])
+      self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "commit")
+  @traced("repository.users.commit")
+  def commit(self, staged: ShardStaging) -> None:
+    """Apply ``staged`` under the cross-process lock.
+
+    Raises KeyError, applying nothing, if a user updated in the transaction
+    was deleted by another commit meanwhile, and RuntimeError if the inserts
+    would not fit.
+    """
+    if not staged.writes:
+      return
+    # Checked before waiting for the cross-process lock.
+    check("users.commit")
+    with self._file_lock():
+      for user_id in staged.expected:
+        if not self._contains(user_id):
+          raise KeyError("user not found")
+      inserts = sum(1 for user_id, entity in staged.writes.items() if entity is not None and not self._contains(user_id))
+      if self.size() + inserts > self.capacity * _MAX_LOAD:
+        raise RuntimeError(f"shared user store {self.path} is full ({self.size()} users)")
+      records: List[Tuple[str, str, Optional[str]]] = []
+      for user_id, entity in staged.writes.items():
+        existed = self._contains(user_id)
+        if entity is None:
+          if existed:
+            self._remove(user_id)
+            records.append((DELETE, user_id, None))
+        else:
+          self._put(entity)
+          records.append((UPDATE if existed else CREATE, user_id, entity.name))
+      self.changes.append(records)
+      self._bump_version()
+
+  @timed(REPO_OPERATION_DURATION, "users", "snapshot")
+  @traced("repository.users.snapshot")
+  def snapshot(self) -> ShardStaging:
+    return ShardStaging()
+
+  def staged_entry(self, staged: ShardStaging, user_id: str) -> Any:
+    return staged.entry(user_id)
+
+  def restore_staged(self, staged: ShardStaging, user_id: str, entry: Any) -> None:
+    staged.restore(user_id, entry)
+
+  def scan(self) -> Iterator[UserEntity]:
+    """Iterate users from a copy of the table taken under the lock.
+
+    The copy is the table's fixed size, independent of how many users are
+    read from it, and entities are decoded lazily.
+    """
+    check("users.scan")
+    with self._file_lock():
+      table = bytes(self._map[_HEADER_SIZE:_HEADER_SIZE + self.capacity * self._slot_size])
+    return self._decode_table(table)
+
+  def bulk_load(self, users: Iterable[UserEntity]) -> int:
+    """Insert ``users`` without change records, once per file.
+
+    Runs under the file lock, and only while the store's version is still 0:
+    when several workers load the same data at start-up, the first writes it
+    and the others, having waited for it, return 0 without consuming
+    ``users``. A store that already holds data (a file kept from an earlier
+    run) is not loaded again either.
+    """
+    with self._file_lock():
+      if self.version:
+        return 0
+      count = 0
+      for user in users:
+        self._put(user)
+        count += 1
+      self._bump_version()
+    return count
+
+  def _decode_table(self, table: bytes) -> Iterator[UserEntity]:
+    for offset in range(0, len(table), self._slot_size):
+      _, _, state, id_len, name_len = _SLOT.unpack_from(table, offset)
+      if state == _USED:
+        start = offset + _SLOT.size
+        name_at = start + self.id_max
+        yield UserEntity(id=table[start:start + id_len].decode(), name=table[name_at:name_at + name_len].decode())
+
+
+class SharedChangeLog(ChangeLog):
+  """The user change log of a SharedMemoryUserRepository, stored in its file.
+
+  A ring of ``retention`` fixed-size records follows the hash table, and the
+  latest sequence number lives in the file header. ``append`` is called by
+  the repository with the file lock held. ``since`` takes no lock, so the
+  feed never waits on another worker's commit: records up to the header's
+  sequence are complete, and each carries its own sequence number, so one
+  overwritten by a later append is detected and the read retried.
+  ``wait`` also polls the header, so a long-poll in one worker sees commits
+  made by the others.
+  """
+
+  def __init__(self, store: SharedMemoryUserRepository, offset: int, retention: int) -> None:
+    super().__init__(retention)
+    self._store = store
+    self._offset = offset
+    self._record_size = _record_size(store.id_max, store.name_max)
+
+  @property
+  def latest(self) -> int:
+    return self._store._u64(_LOG_SEQ_AT)
+
+  @property
+  def earliest(self) -> int:
+    return max(1, self.latest - self.retention + 1)
+
+  def _at(self, seq: int) -> int:
+    return self._offset + (seq - 1) % self.retention * self._record_size
+
+  def append(self, records: List[Tuple[str, str, Optional[str]]]) -> None:
+    # Called with the store's file lock held.
+    if not records:
+      return
+    m, now = self._store._map, time.time()
+    seq = self.latest
+    for op, user_id, name in records:
+      seq += 1
+      key, value = user_id.encode(), (name or "").encode()
+      at = self._at(seq)
+      _RECORD.pack_into(m, at, seq, now, _OPS.index(op), len(key), len(value))
+      start = at + _RECORD.size
+      m[start:start + len(key)] = key
+      m[start + self._store.id_max:start + self._store.id_max + len(value)] = value
+    _U64.pack_into(m, _LOG_SEQ_AT, seq)
+    for op, _, _ in records:
+      CHANGES_APPENDED.inc(op)
+    self._notify()
+
+  def invalidate(self) -> None:
+    """Skip the sequence past every retained record; called with the file lock held."""
+    _U64.pack_into(self._store._map, _LOG_SEQ_AT, self.latest + self.retention)
+    self._notify()
+
+  def since(self, seq: int, limit: int = 1000) -> List[Change]:
+    for _ in range(_READ_RETRIES):
+      latest, earliest = self.latest, self.earliest
+      if seq < earliest - 1 or seq > latest:
+        CHANGES_RESYNC.inc()
+        raise ResyncRequired(seq, earliest, latest)
+      out: List[Change] = []
+      for expected in range(seq + 1, min(latest, seq + limit) + 1):
+        change = self._read(expected)
+        if change is None:
+          break
+        out.append(change)
+      else:
+        return out
+      if self.latest == latest:
+        # Not overwritten by an append: invalidate() skipped past it, or the
+        # cursor predates a reset.
+        CHANGES_RESYNC.inc()
+        raise ResyncRequired(seq, latest + 1, latest)
+      # Overwritten by appends meanwhile; the range check above decides
+      # whether the cursor fell out of retention.
+      time.sleep(0)
+    # Appends keep overwriting the records the cursor needs: it is at the
+    # edge of retention.
+    CHANGES_RESYNC.inc()
+    raise ResyncRequired(seq, self.earliest, self.latest)
+
+  def _read(self, expected: int) -> Optional[Change]:
+    m, id_max = self._store._map, self._store.id_max
+    at = self._at(expected)
+    seq, ts, op, id_len, name_len = _RECORD.unpack_from(m, at)
+    if seq != expected or op >= len(_OPS):
+      return None
+    start = at + _RECORD.size
+    raw_id = bytes(m[start:start + id_len])
+    raw_name = bytes(m[start + id_max:start + id_max + name_len])
+    # append() writes the record's sequence number first, so a record being
+    # overwritten no longer carries ``expected`` once its bytes are read.
+    if _RECORD.unpack_from(m, at)[0] != expected:
+      return None
+    try:
+      user_id = raw_id.decode()
+      name = None if _OPS[op] == DELETE else raw_name.decode()
+    except UnicodeDecodeError:
+      return None
+    return Change(seq, _OPS[op], user_id, name, ts)
+
+  async def wait(self, seq: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while self.latest <= seq:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        return False
+      # Returns early on appends from this process; polls for the others.
+      await super().wait(seq, min(_WAIT_POLL, remaining))
+    return True
+
+
+def _slot_size(id_max: int, name_max: int) -> int:
+  return (_SLOT.size + id_max + name_max + 7) & ~7
+
+
+def _record_size(id_max: int, name_max: int) -> int:
+  return (_RECORD.size + id_max + name_max + 7) & ~7
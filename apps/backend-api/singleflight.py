@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from metrics import REGISTRY
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+  "singleflight_calls_total", "Coalesced lookups by group and role (leader ran it, shared joined it).",
+  ("group", "role"),
+)
+
+
+class _Call(Generic[T]):
+  __slots__ = ("done", "result", "error")
+
+  def __init__(self) -> None:
+    self.done = threading.Event()
+    self.result: Optional[T] = None
+    self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+  """Coalesce concurrent calls with the same key into one execution (thread-safe).
+
+  The first caller for a key runs ``fn``; callers arriving while it is in
+  flight block until it finishes and receive the same result or exception.
+  Nothing is cached once the call completes. For use from sync handlers,
+  which run on the thread pool.
+  """
+
+  def __init__(self, group: str = "default") -> None:
+    self.group = group
+    self._lock = threading.Lock()
+    self._calls: Dict[Hashable, _Call[T]] = {}
+
+  def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+    with self._lock:
+      call = self._calls.get(key)
+      if call is not None:
+        leader = False
+      else:
+        call = _Call()
+        self._calls[key] = call
+        leader = True
+
+    if not leader:
+      SINGLEFLIGHT_CALLS.inc(self.group, "shared")
+      call.done.wait()
+    else:
+      SINGLEFLIGHT_CALLS.inc(self.group, "leader")
+      try:
+        call.result = fn()
+      except BaseException as exc:
+        call.error = exc
+      finally:
+        with self._lock:
+          del self._calls[key]
+        call.done.set()
+
+    if call.error is not None:
+      raise call.error
+    return call.result  # type: ignore[return-value]
+
+  def in_flight(self) -> int:
+    return len(self._calls)
+
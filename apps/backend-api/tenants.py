@@ -0,0 +1,692 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from changes import ChangeLog
+from content_repository import CommentEntity, InMemoryCommentRepository, InMemoryPostRepository, PostEntity, WriteSet
+from memory import deep_sizeof
+from metrics import REGISTRY
+from repository import InMemoryUserRepository, UserEntity, UserRepository
+from search import SearchIndex
+
+TENANT_QUOTA_REJECTED = REGISTRY.counter(
+  "tenant_quota_rejected_total", "Commits refused because they would take a tenant over its memory quota.",
+)
+TENANT_EVICTIONS = REGISTRY.counter(
+  "tenant_evictions_total", "Tenant partitions offloaded to disk, by reason (idle or budget).", ("reason",),
+)
+TENANT_RELOADS = REGISTRY.counter("tenant_reloads_total", "Offloaded tenant partitions loaded back into memory.")
+TENANT_REJECTED = REGISTRY.counter(
+  "tenant_rejected_total", "Requests refused for their tenant, by reason (unknown or limit).", ("reason",),
+)
+TENANT_RESIDENT_BYTES = REGISTRY.gauge(
+  "tenant_resident_bytes", "Estimated bytes held in memory by tenant partitions.",
+)
+TENANT_PARTITIONS = REGISTRY.gauge("tenant_partitions", "Tenant partitions by state.", ("state",))
+
+TENANT_HEADER = b"x-tenant-id"
+DEFAULT_TENANT = "default"
+# Tenant ids end up in file names, so they are kept to a safe alphabet.
+_TENANT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+_current: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def current_tenant() -> str:
+  return _current.get()
+
+
+@contextmanager
+def tenant(tenant_id: str) -> Iterator[str]:
+  """Run the block as ``tenant_id``; repositories resolved inside use its partition."""
+  if not _TENANT_ID.match(tenant_id):
+    raise ValueError(f"invalid tenant id {tenant_id!r}")
+  token = _current.set(tenant_id)
+  try:
+    yield tenant_id
+  finally:
+    _current.reset(token)
+
+
+class TenantQuotaExceeded(Exception):
+  def __init__(self, tenant_id: str, quota: int, projected: int) -> None:
+    super().__init__(f"tenant {tenant_id} would hold ~{projected} bytes, over its quota of {quota}")
+    self.tenant = tenant_id
+    self.quota = quota
+    self.projected = projected
+
+
+class UnknownTenant(KeyError):
+  def __init__(self, tenant_id: str) -> None:
+    super().__init__(tenant_id)
+    self.tenant = tenant_id
+
+
+class TenantLimitReached(Exception):
+  def __init__(self, limit: int) -> None:
+    super().__init__(f"already holding the maximum of {limit} tenant partitions")
+    self.limit = limit
+
+
+class TenantSettings:
+  """Tenant partitioning settings.
+
+  ``tenants`` are the ids served besides the default tenant; ``"*"`` admits
+  any well-formed id. Empty (the default) serves the default tenant only.
+  """
+
+  def __init__(
+    self,
+    *,
+    tenants: Iterable[str] = (),
+    max_partitions: int = 100,
+    quota_bytes: int = 0,
+    memory_budget: int = 0,
+    idle_seconds: float = 0.0,
+    offload_dir: Optional[str] = None,
+    change_retention: int = 1000,
+  ) -> None:
+    self.tenants = frozenset(tenants)
+    self.max_partitions = max_partitions
+    self.quota_bytes = quota_bytes
+    self.memory_budget = memory_budget
+    self.idle_seconds = idle_seconds
+    self.offload_dir = offload_dir or os.path.join(tempfile.gettempdir(), "backend-api-tenants")
+    self.change_retention = change_retention
+
+  @classmethod
+  def from_env(cls) -> "TenantSettings":
+    return cls(
+      tenants=[t.strip() for t in os.getenv("BACKEND_TENANTS", "").split(",") if t.strip()],
+      max_partitions=int(os.getenv("BACKEND_TENANT_MAX_PARTITIONS", "100")),
+      quota_bytes=int(os.getenv("BACKEND_TENANT_QUOTA_BYTES", "0")),
+      memory_budget=int(os.getenv("BACKEND_TENANT_MEMORY_BUDGET", "0")),
+      idle_seconds=float(os.getenv("BACKEND_TENANT_IDLE_SECONDS", "0")),
+      offload_dir=os.getenv("BACKEND_TENANT_OFFLOAD_DIR") or None,
+      change_retention=int(os.getenv("BACKEND_TENANT_CHANGE_RETENTION", "1000")),
+    )
+
+
+class TenantUserRepository(InMemoryUserRepository):
+  """One tenant's users: a single-dict store with memory accounting and offload.
+
+  ``bytes`` is a ``deep_sizeof`` estimate of the store, refreshed on every
+  commit from the staged copy, which is also what the quota is checked
+  against before anything is applied, together with the bytes of the
+  tenant's posts and comments (``content``). ``offload`` writes the store to an
+  NDJSON file and drops it from memory; any later operation loads it back,
+  so callers holding the repository never notice. Operations are serialized
+  by a per-partition lock so an offload cannot interleave with them. While
+  offloaded, the quota counts the bytes the store had (``footprint``).
+  """
+
+  def __init__(
+    self,
+    tenant_id: str,
+    path: str,
+    *,
+    quota: int = 0,
+    changes: Optional[ChangeLog] = None,
+    on_commit: Optional[Callable[["TenantUserRepository"], None]] = None,
+  ) -> None:
+    super().__init__(changes)
+    self.tenant = tenant_id
+    self.path = path
+    self.quota = quota
+    self.bytes = deep_sizeof(self._store)
+    self.last_used = time.monotonic()
+    self.pins = 0
+    self._on_commit = on_commit
+    self._lock = threading.RLock()
+    self._resident = True
+    self._count = 0
+    self._offloaded_bytes = 0
+    self.content = TenantContent(self, f"{os.path.splitext(path)[0]}-content.ndjson")
+
+  @property
+  def resident(self) -> bool:
+    return self._resident
+
+  @property
+  def footprint(self) -> int:
+    """Estimated bytes of the store, resident or not."""
+    return self.bytes if self._resident else self._offloaded_bytes
+
+  def _load(self) -> None:
+    # Called with the lock held.
+    if self._resident:
+      return
+    store: Dict[str, UserEntity] = {}
+    with open(self.path, encoding="utf-8") as fh:
+      for line in fh:
+        row = json.loads(line)
+        store[row["id"]] = UserEntity(id=row["id"], name=row["name"])
+    self._store = store
+    self.bytes = deep_sizeof(store)
+    self._resident = True
+    os.unlink(self.path)
+    TENANT_RELOADS.inc()
+
+  def _admit(self, projected: int) -> None:
+    # ``projected`` is the user store's size; content is counted on top.
+    projected += self.content.footprint
+    if self.quota and projected > self.quota:
+      TENANT_QUOTA_REJECTED.inc()
+      raise TenantQuotaExceeded(self.tenant, self.quota, projected)
+
+  def offload(self) -> int:
+    """Write the store to disk and free it; returns the bytes released.
+
+    Gives up (returning 0) if the partition is in use by another thread.
+    """
+    if not self._lock.acquire(blocking=False):
+      return 0
+    try:
+      if not self._resident:
+        return 0
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      tmp = f"{self.path}.tmp"
+      with open(tmp, "w", encoding="utf-8") as fh:
+        for user in self._store.values():
+          fh.write(json.dumps({"id": user.id, "name": user.name}, ensure_ascii=False) + "\n")
+      os.replace(tmp, self.path)
+      released = self._offloaded_bytes = self.bytes
+      self._count = len(self._store)
+      self._store = {}
+      self.bytes = 0
+      self._resident = False
+      return released
+    finally:
+      self._lock.release()
+
+  def discard(self) -> None:
+    """Delete the offload files, if any (the partition is being forgotten)."""
+    for path in (self.path, self.content.path):
+      if path is None:
+        continue
+      try:
+        os.unlink(path)
+      except FileNotFoundError:
+        pass
+
+  def get(self, user_id: str, *, staging: Optional[Dict[str, UserEntity]] = None) -> Optional[UserEntity]:
+    if staging is not None:
+      return super().get(user_id, staging=staging)
+    with self._lock:
+      self._load()
+      return super().get(user_id)
+
+  def save(self, user: UserEntity, *, staging: Optional[Dict[str, UserEntity]] = None) -> None:
+    if staging is not None:
+      super().save(user, staging=staging)
+      return
+    with self._lock:
+      self._load()
+      self._admit(self.bytes + deep_sizeof(user))
+      super().save(user)
+      self.bytes = deep_sizeof(self._store)
+
+  def update(self, user: UserEntity, *, staging: Optional[Dict[str, UserEntity]] = None) -> None:
+    if staging is not None:
+      super().update(user, staging=staging)
+      return
+    with self._lock:
+      self._load()
+      self._admit(self.bytes + deep_sizeof(user))
+      super().update(user)
+      self.bytes = deep_sizeof(self._store)
+
+  def delete(self, user_id: str, *, staging: Optional[Dict[str, UserEntity]] = None) -> None:
+    if staging is not None:
+      super().delete(user_id, staging=staging)
+      return
+    with self._lock:
+      self._load()
+      super().delete(user_id)
+      self.bytes = deep_sizeof(self._store)
+
+  def commit(self, staged: Dict[str, UserEntity]) -> None:
+    # The staging is a full copy of the store, so its size is the size the
+    # store will have.
+    projected = deep_sizeof(staged)
+    self._admit(projected)
+    with self._lock:
+      self._load()
+      super().commit(staged)
+      self.bytes = projected
+    if self._on_commit is not None:
+      self._on_commit(self)
+
+  def snapshot(self) -> Dict[str, UserEntity]:
+    with self._lock:
+      self._load()
+      return super().snapshot()
+
+  def scan(self) -> Iterator[UserEntity]:
+    with self._lock:
+      self._load()
+      return super().scan()
+
+  def bulk_load(self, users: Iterable[UserEntity]) -> int:
+    with self._lock:
+      self._load()
+      count = super().bulk_load(users)
+      self.bytes = deep_sizeof(self._store)
+    return count
+
+  def size(self) -> int:
+    return len(self._store) if self._resident else self._count
+
+
+class TenantContent:
+  """One tenant's posts, comments and post search index.
+
+  With an owning TenantUserRepository, the estimated bytes of the rows are
+  kept up to date as writes are applied and count against that tenant's
+  quota: a write set that would take the tenant over it is refused before
+  the unit of work applies anything. ``offload`` writes the rows to ``path``
+  and drops them, and the search index, from memory; ``load`` brings them
+  back. Unlike the user store, the repositories are replaced rather than
+  reloaded behind the callers' backs, so the registry only offloads content
+  no request is using and loads it before handing it out (see
+  TenantRegistry.content). Without an owner (the default tenant) nothing
+  is counted or offloaded.
+  """
+
+  def __init__(self, owner: Optional[TenantUserRepository] = None, path: Optional[str] = None) -> None:
+    self.owner = owner
+    self.path = path
+    self.bytes = 0
+    self._lock = threading.Lock()
+    # Serializes offload and load.
+    self._residency = threading.RLock()
+    self._resident = True
+    self._offloaded_bytes = 0
+    self._offloaded_counts = (0, 0)
+    self._build()
+
+  def _build(self) -> None:
+    self.posts = InMemoryPostRepository()
+    self.comments = InMemoryCommentRepository()
+    self.search = SearchIndex()
+    self.posts.subscribe(self.search.apply)
+    if self.owner is not None:
+      self.posts.subscribe(self._applied)
+      self.comments.subscribe(self._applied)
+      self.posts.admission = self._admit
+      self.comments.admission = self._admit
+
+  @property
+  def resident(self) -> bool:
+    return self._resident
+
+  @property
+  def footprint(self) -> int:
+    """Estimated bytes of the rows, resident or not."""
+    return self.bytes if self._resident else self._offloaded_bytes
+
+  def _admit(self, staged: WriteSet[Any]) -> None:
+    assert self.owner is not None
+    grown = sum(deep_sizeof(row) for row in staged.writes.values() if row is not None)
+    self.owner._admit(self.owner.footprint + grown)
+
+  def _applied(self, applied: List[Tuple[Optional[Any], Optional[Any]]]) -> None:
+    delta = sum(
+      (0 if new is None else deep_sizeof(new)) - (0 if old is None else deep_sizeof(old)) for old, new in applied
+    )
+    with self._lock:
+      self.bytes += delta
+
+  def counts(self) -> Tuple[int, int]:
+    """Numbers of ``(posts, comments)``, resident or not."""
+    if not self._resident:
+      return self._offloaded_counts
+    return self.posts.size(), self.comments.size()
+
+  def empty(self) -> bool:
+    return self.counts() == (0, 0)
+
+  def offload(self, idle: Callable[[], bool] = lambda: True) -> int:
+    """Write the rows to ``path`` and free them; returns the bytes released.
+
+    ``idle`` is checked once offloading can no longer race with ``load``;
+    if it returns False, nothing is offloaded.
+    """
+    with self._residency:
+      if self.owner is None or self.path is None or not self._resident or self.empty() or not idle():
+        return 0
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      tmp = f"{self.path}.tmp"
+      with open(tmp, "w", encoding="utf-8") as fh:
+        for kind, repo in (("post", self.posts), ("comment", self.comments)):
+          for row in repo._rows.values():
+            fh.write(json.dumps({"kind": kind, **asdict(row)}, ensure_ascii=False) + "\n")
+      os.replace(tmp, self.path)
+      released = self._offloaded_bytes = self.bytes
+      self._offloaded_counts = self.counts()
+      self._build()
+      with self._lock:
+        self.bytes = 0
+      self._resident = False
+      return released
+
+  def load(self) -> None:
+    """Bring offloaded rows back into memory, rebuilding indexes and search."""
+    with self._residency:
+      if self._resident:
+        return
+      assert self.path is not None
+      posts: List[PostEntity] = []
+      comments: List[CommentEntity] = []
+      with open(self.path, encoding="utf-8") as fh:
+        for line in fh:
+          row = json.loads(line)
+          if row.pop("kind") == "post":
+            posts.append(PostEntity(**row))
+          else:
+            comments.append(CommentEntity(**row))
+      # Bytes are re-counted by _applied as the rows are applied.
+      self.posts.bulk_load(posts)
+      self.comments.bulk_load(comments)
+      self._resident = True
+      os.unlink(self.path)
+      TENANT_RELOADS.inc()
+
+
+class TenantRegistry:
+  """Tenant id to user repository, with a memory budget across tenants.
+
+  The default tenant (requests without ``X-Tenant-Id``) uses the configured
+  process-wide repository and ``default_content``, unpartitioned and without
+  a quota. Each tenant listed in ``settings.tenants`` gets a
+  TenantUserRepository, with its own TenantContent, created on first use;
+  other ids raise UnknownTenant, and a new partition beyond
+  ``max_partitions`` raises TenantLimitReached. Partitions are held in this
+  process, whatever user repository the default tenant is configured with,
+  so they cannot be combined with a store shared across worker processes.
+
+  When the estimated bytes of resident partitions (users and content)
+  exceed ``memory_budget``, the least recently used ones are offloaded
+  until they fit. A partition left empty is forgotten when the last request
+  using it ends; with ``idle_seconds`` set, a background sweeper also
+  offloads partitions unused for that long, and forgets empty ones.
+  """
+
+  def __init__(self, default: UserRepository, settings: Optional[TenantSettings] = None) -> None:
+    self.default = default
+    self.default_content = TenantContent()
+    self.settings = settings or TenantSettings()
+    if self.settings.tenants and getattr(default, "cross_process", False):
+      # Every worker would hold its own, different, copy of each tenant.
+      raise ValueError(
+        "tenant partitions are held per process and cannot be combined with a shared user store "
+        "(unset BACKEND_TENANTS or BACKEND_USER_STORE_FILE)"
+      )
+    self._lock = threading.Lock()
+    self._partitions: Dict[str, TenantUserRepository] = {}
+    self._sweeper: Optional[threading.Thread] = None
+    self._stop = threading.Event()
+
+  @classmethod
+  def from_env(cls, default: UserRepository) -> "TenantRegistry":
+    return cls(default, TenantSettings.from_env())
+
+  def allows(self, tenant_id: str) -> bool:
+    tenants = self.settings.tenants
+    return tenant_id == DEFAULT_TENANT or tenant_id in tenants or "*" in tenants
+
+  def repository(self, tenant_id: str) -> UserRepository:
+    if tenant_id == DEFAULT_TENANT:
+      return self.default
+    return self._partition(tenant_id)
+
+  def content(self, tenant_id: str) -> TenantContent:
+    """``tenant_id``'s content, loaded back first if it was offloaded.
+
+    Content is only offloaded while its partition is not pinned, so resolve
+    it inside ``pinned`` (as requests do) to keep it from being offloaded
+    while in use.
+    """
+    if tenant_id == DEFAULT_TENANT:
+      return self.default_content
+    content = self._partition(tenant_id).content
+    content.load()
+    return content
+
+  def _partition(self, tenant_id: str) -> TenantUserRepository:
+    partition = self._partitions.get(tenant_id)
+    if partition is None:
+      if not self.allows(tenant_id):
+        raise UnknownTenant(tenant_id)
+      with self._lock:
+        partition = self._partitions.get(tenant_id)
+        if partition is None:
+          if len(self._partitions) >= self.settings.max_partitions:
+            self._forget_empty()
+            if len(self._partitions) >= self.settings.max_partitions:
+              raise TenantLimitReached(self.settings.max_partitions)
+          partition = self._partitions[tenant_id] = self._create(tenant_id)
+    partition.last_used = time.monotonic()
+    return partition
+
+  def _forgettable(self, partition: TenantUserRepository) -> bool:
+    # Called with the lock held.
+    return (
+      partition.pins == 0 and partition.size() == 0 and partition.changes.latest == 0 and partition.content.empty()
+    )
+
+  def _forget(self, partition: TenantUserRepository) -> None:
+    # Called with the lock held.
+    if self._partitions.get(partition.tenant) is partition:
+      del self._partitions[partition.tenant]
+      partition.discard()
+
+  def _forget_empty(self) -> None:
+    # Called with the lock held.
+    for partition in [p for p in self._partitions.values() if self._forgettable(p)]:
+      self._forget(partition)
+
+  def _create(self, tenant_id: str) -> TenantUserRepository:
+    s = self.settings
+    # Partitions are per process, so are their offload files.
+    path = os.path.join(s.offload_dir, f"{os.getpid()}-{tenant_id}.ndjson")
+    partition = TenantUserRepository(
+      tenant_id, path, quota=s.quota_bytes, changes=ChangeLog(s.change_retention), on_commit=self._committed,
+    )
+    if s.idle_seconds > 0 and self._sweeper is None:
+      self._sweeper = threading.Thread(target=self._sweep_loop, name="tenant-sweeper", daemon=True)
+      self._sweeper.start()
+    return partition
+
+  @contextmanager
+  def pinned(self, tenant_id: str) -> Iterator[None]:
+    """Keep ``tenant_id``'s partition registered, and its content in memory, while the block runs.
+
+    Its users may still be offloaded. A partition still empty when the last
+    block using it ends is forgotten.
+    """
+    if tenant_id == DEFAULT_TENANT:
+      yield
+      return
+    partition = self._partition(tenant_id)
+    with self._lock:
+      partition.pins += 1
+    try:
+      yield
+    finally:
+      with self._lock:
+        partition.pins -= 1
+        if self._forgettable(partition):
+          self._forget(partition)
+
+  def resident_bytes(self) -> int:
+    return sum(_resident_bytes(p) for p in list(self._partitions.values()))
+
+  def _offload(self, partition: TenantUserRepository) -> int:
+    """Offload ``partition``'s users, and its content unless it is pinned; returns the bytes released."""
+    def idle() -> bool:
+      with self._lock:
+        return partition.pins == 0
+
+    return partition.offload() + partition.content.offload(idle)
+
+  def _committed(self, partition: TenantUserRepository) -> None:
+    budget = self.settings.memory_budget
+    if budget and self.resident_bytes() > budget:
+      self.rebalance(keep=partition.tenant)
+
+  def rebalance(self, keep: Optional[str] = None) -> int:
+    """Offload least recently used partitions until resident bytes fit the budget.
+
+    ``keep`` (the tenant that just committed) is offloaded last of all: only
+    if it alone is over the budget. Returns the number offloaded.
+    """
+    budget = self.settings.memory_budget
+    with self._lock:
+      resident = sorted(
+        (p for p in self._partitions.values() if _resident_bytes(p)), key=lambda p: (p.tenant == keep, p.last_used),
+      )
+    total = sum(_resident_bytes(p) for p in resident)
+    evicted = 0
+    for partition in resident:
+      if total <= budget:
+        break
+      released = self._offload(partition)
+      if released:
+        total -= released
+        evicted += 1
+        TENANT_EVICTIONS.inc("budget")
+    return evicted
+
+  def sweep(self, now: Optional[float] = None) -> int:
+    """Offload partitions idle for ``idle_seconds``; forget idle empty ones. Returns the number offloaded."""
+    cutoff = (time.monotonic() if now is None else now) - self.settings.idle_seconds
+    with self._lock:
+      idle = [p for p in self._partitions.values() if p.last_used <= cutoff]
+    offloaded = 0
+    for partition in idle:
+      if partition.size() == 0 and partition.changes.latest == 0 and partition.content.empty():
+        with self._lock:
+          if self._forgettable(partition) and partition.last_used <= cutoff:
+            self._forget(partition)
+        continue
+      if self._offload(partition):
+        offloaded += 1
+        TENANT_EVICTIONS.inc("idle")
+    return offloaded
+
+  def _sweep_loop(self) -> None:
+    interval = max(0.05, min(self.settings.idle_seconds / 4, 30.0))
+    while not self._stop.wait(interval):
+      self.sweep()
+
+  def close(self) -> None:
+    self._stop.set()
+    with self._lock:
+      partitions, self._partitions = list(self._partitions.values()), {}
+    for partition in partitions:
+      partition.discard()
+
+  def usage(self) -> List[Dict[str, Any]]:
+    now = time.monotonic()
+    with self._lock:
+      partitions = sorted(self._partitions.values(), key=lambda p: p.tenant)
+    return [
+      {
+        "tenant": p.tenant,
+        "resident": _resident(p),
+        "users": p.size(),
+        "posts": p.content.counts()[0],
+        "comments": p.content.counts()[1],
+        "bytes": _resident_bytes(p),
+        "footprint": p.footprint + p.content.footprint,
+        "quota": p.quota,
+        "idle_seconds": round(now - p.last_used, 3),
+      }
+      for p in partitions
+    ]
+
+  def partitions(self) -> List[TenantUserRepository]:
+    with self._lock:
+      return sorted(self._partitions.values(), key=lambda p: p.tenant)
+
+  def track(self) -> None:
+    """Export the registry's state as gauges."""
+    TENANT_RESIDENT_BYTES.set_function(self.resident_bytes)
+    TENANT_PARTITIONS.set_function(lambda: sum(1 for p in list(self._partitions.values()) if _resident(p)), "resident")
+    TENANT_PARTITIONS.set_function(
+      lambda: sum(1 for p in list(self._partitions.values()) if not _resident(p)), "offloaded",
+    )
+
+
+def _resident(partition: TenantUserRepository) -> bool:
+  # Content with no rows is never offloaded and holds nothing.
+  content = partition.content
+  return partition.resident or (content.resident and not content.empty())
+
+
+def _resident_bytes(partition: TenantUserRepository) -> int:
+  return partition.bytes + partition.content.bytes
+
+
+class TenantMiddleware:
+  """ASGI middleware selecting the request's tenant from ``X-Tenant-Id``.
+
+  The tenant is carried in a context variable for the rest of the request,
+  and its partition stays registered until the response is sent. Malformed
+  ids are answered with 400, tenants the registry does not serve with 404,
+  and a new tenant beyond the registry's partition limit with 429.
+  """
+
+  def __init__(self, app: ASGIApp, registry: Optional[TenantRegistry] = None) -> None:
+    self.app = app
+    self.registry = registry
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    tenant_id = DEFAULT_TENANT
+    for key, value in scope["headers"]:
+      if key == TENANT_HEADER:
+        tenant_id = value.decode("latin-1")
+        break
+    if not _TENANT_ID.match(tenant_id):
+      await JSONResponse({"detail": "Invalid X-Tenant-Id"}, status_code=400)(scope, receive, send)
+      return
+    if self.registry is not None and not self.registry.allows(tenant_id):
+      TENANT_REJECTED.inc("unknown")
+      await JSONResponse({"detail": "Unknown tenant"}, status_code=404)(scope, receive, send)
+      return
+    token = _current.set(tenant_id)
+    try:
+      with ExitStack() as stack:
+        if self.registry is not None:
+          try:
+            stack.enter_context(self.registry.pinned(tenant_id))
+          except TenantLimitReached:
+            TENANT_REJECTED.inc("limit")
+            await JSONResponse({"detail": "Too many tenants"}, status_code=429)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+    finally:
+      _current.reset(token)
+
+
+def quota_exceeded_response(request: Request, exc: Exception) -> JSONResponse:
+  """Exception handler turning TenantQuotaExceeded into a 507."""
+  detail = str(exc) if isinstance(exc, TenantQuotaExceeded) else "Tenant quota exceeded"
+  return JSONResponse({"detail": "Tenant quota exceeded", "reason": detail}, status_code=507)
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, List, Optional, Protocol, Sequence, TypeVar, get_type_hints
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Span:
+  """A timed operation within a trace. Times are ``perf_counter`` seconds."""
+
+  __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "end", "attributes", "status", "_trace")
+
+  def __init__(self, name: str, trace_id: str, parent_id: Optional[str], trace: List["Span"]) -> None:
+    self.trace_id = trace_id
+    self.span_id = os.urandom(8).hex()
+    self.parent_id = parent_id
+    self.name = name
+    self.start = time.perf_counter()
+    self.end: Optional[float] = None
+    self.attributes: Dict[str, Any] = {}
+    self.status = "ok"
+    self._trace = trace
+
+  @property
+  def duration(self) -> float:
+    return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+  def set_attribute(self, key: str, value: Any) -> None:
+    self.attributes[key] = value
+
+  def to_dict(self) -> Dict[str, Any]:
+    return {
+      "trace_id": self.trace_id,
+      "span_id": self.span_id,
+      "parent_id": self.parent_id,
+      "name": self.name,
+      "start": self.start,
+      "duration_ms": self.duration * 1000.0,
+      "status": self.status,
+      "attributes": self.attributes,
+    }
+
+
+class SpanSink(Protocol):
+  def export(self, spans: Sequence[Span]) -> None:
+    ...
+
+
+class RingBufferSink:
+  """Keeps the most recent ``capacity`` finished traces in memory."""
+
+  def __init__(self, capacity: int = 256) -> None:
+    self._traces: Deque[List[Span]] = deque(maxlen=capacity)
+
+  def export(self, spans: Sequence[Span]) -> None:
+    self._traces.append(list(spans))
+
+  def traces(self) -> List[List[Span]]:
+    return list(self._traces)
+
+  def clear(self) -> None:
+    self._traces.clear()
+
+
+class JsonLinesSink:
+  """Appends one JSON object per span to ``path`` from a background writer thread.
+
+  ``export`` runs on the event loop, so it only enqueues the finished trace;
+  serialization and file I/O happen on the writer. When ``capacity`` traces
+  are already waiting the trace is dropped and counted in ``dropped`` rather
+  than stalling the request.
+  """
+
+  def __init__(self, path: str, capacity: int = 1024) -> None:
+    self._path = path
+    self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=capacity)
+    self._lock = threading.Lock()
+    self._thread: Optional[threading.Thread] = None
+    self.dropped = 0
+
+  def export(self, spans: Sequence[Span]) -> None:
+    if self._thread is None:
+      self._start()
+    try:
+      self._queue.put_nowait(list(spans))
+    except queue.Full:
+      self.dropped += 1
+
+  def flush(self, timeout: Optional[float] = None) -> bool:
+    """Wait until every queued trace is written; False if ``timeout`` passed first."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while self._queue.unfinished_tasks:
+      if deadline is not None and time.monotonic() >= deadline:
+        return False
+      time.sleep(0.005)
+    return True
+
+  def close(self) -> None:
+    """Write what is queued and stop the writer thread."""
+    thread = self._thread
+    if thread is not None:
+      self._queue.put(None)
+      thread.join()
+      self._thread = None
+
+  def _start(self) -> None:
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+  def _run(self) -> None:
+    while True:
+      batch = [self._queue.get()]
+      # Drain whatever else is waiting so a burst costs one open/write.
+      while len(batch) < 256:
+        try:
+          batch.append(self._queue.get_nowait())
+        except queue.Empty:
+          break
+      stop = None in batch
+      try:
+        self._write([spans for spans in batch if spans is not None])
+      finally:
+        for _ in batch:
+          self._queue.task_done()
+      if stop:
+        return
+
+  def _write(self, traces: List[List[Span]]) -> None:
+    if not traces:
+      return
+    payload = "".join(json.dumps(s.to_dict(), default=str) + "\n" for spans in traces for s in spans)
+    with open(self._path, "a", encoding="utf-8") as fh:
+      fh.write(payload)
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class _NoopScope:
+  __slots__ = ()
+
+  def __enter__(self) -> Optional[Span]:
+    return None
+
+  def __exit__(self, *exc: Any) -> None:
+    return None
+
+
+_NOOP = _NoopScope()
+
+
+class _SpanScope:
+  __slots__ = ("_tracer", "_span", "_token", "_root")
+
+  def __init__(self, tracer: "Tracer", span: Span, root: bool) -> None:
+    self._tracer = tracer
+    self._span = span
+    self._root = root
+    self._token: Optional[Token[Optional[Span]]] = None
+
+  def __enter__(self) -> Span:
+    self._token = _current.set(self._span)
+    return self._span
+
+  def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+    span = self._span
+    span.end = time.perf_counter()
+    if exc_type is not None:
+      span.status = "error"
+      span.attributes["error.type"] = exc_type.__name__
+    if self._token is not None:
+      _current.reset(self._token)
+    span._trace.append(span)
+    if self._root:
+      self._tracer._export(span._trace)
+
+
+class Tracer:
+  """Head-sampled tracer; spans propagate through ``contextvars``.
+
+  Only roots make a sampling decision. Inside an unsampled (or absent) trace
+  every ``span()`` call returns a shared no-op scope after one context lookup.
+  """
+
+  def __init__(self, sample_rate: float = 0.0, sinks: Sequence[SpanSink] = ()) -> None:
+    self.sample_rate = sample_rate
+    self.sinks: List[SpanSink] = list(sinks)
+
+  @classmethod
+  def from_env(cls) -> "Tracer":
+    rate = float(os.getenv("BACKEND_TRACE_SAMPLE_RATE", "0") or 0)
+    sinks: List[SpanSink] = [RingBufferSink(int(os.getenv("BACKEND_TRACE_BUFFER", "256")))]
+    path = os.getenv("BACKEND_TRACE_FILE")
+    if path:
+      sinks.append(JsonLinesSink(path, int(os.getenv("BACKEND_TRACE_QUEUE", "1024"))))
+    return cls(sample_rate=rate, sinks=sinks)
+
+  def trace(self, name: str, *, force: bool = False, **attributes: Any) -> Any:
+    """Start a root span, subject to sampling unless ``force`` is set."""
+    if not force and (self.sample_rate <= 0.0 or random.random() >= self.sample_rate):
+      return _NOOP
+    span = Span(name, os.urandom(16).hex(), None, [])
+    span.attributes.update(attributes)
+    return _SpanScope(self, span, root=True)
+
+  def span(self, name: str, **attributes: Any) -> Any:
+    """Start a child of the current span; a no-op outside a sampled trace."""
+    parent = _current.get()
+    if parent is None:
+      return _NOOP
+    span = Span(name, parent.trace_id, parent.span_id, parent._trace)
+    if attributes:
+      span.attributes.update(attributes)
+    return _SpanScope(self, span, root=False)
+
+  def ring_buffer(self) -> Optional[RingBufferSink]:
+    for sink in self.sinks:
+      if isinstance(sink, RingBufferSink):
+        return sink
+    return None
+
+  def _export(self, spans: Sequence[Span]) -> None:
+    for sink in self.sinks:
+      sink.export(spans)
+
+
+TRACER = Tracer.from_env()
+
+
+def current_span() -> Optional[Span]:
+  return _current.get()
+
+
+def span(name: str, **attributes: Any) -> Any:
+  if _current.get() is None:
+    return _NOOP
+  return TRACER.span(name, **attributes)
+
+
+def traced(name: str) -> Callable[[F], F]:
+  """Decorator wrapping each call in a child span named ``name``."""
+
+  def decorator(fn: F) -> F:
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+      if _current.get() is None:
+        return fn(*args, **kwargs)
+      with TRACER.span(name):
+        return fn(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+  return decorator
+
+
+def traced_route(fn: F) -> F:
+  """Wrap a route handler in a ``route.<name>`` span.
+
+  Also records a ``request.parse`` span covering the time between the root
+  span starting and the handler being entered: routing, body parsing and
+  validation, and dependency resolution.
+  """
+  name = f"route.{fn.__name__}"
+
+  def enter() -> bool:
+    root = _current.get()
+    if root is None:
+      return False
+    parse = Span("request.parse", root.trace_id, root.span_id, root._trace)
+    parse.start = root.start
+    parse.end = time.perf_counter()
+    root._trace.append(parse)
+    return True
+
+  wrapper: Any
+  if inspect.iscoroutinefunction(fn):
+    @wraps(fn)
+    async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+      if not enter():
+        return await fn(*args, **kwargs)
+      with TRACER.span(name):
+        return await fn(*args, **kwargs)
+
+    wrapper = async_wrapper
+  else:
+    @wraps(fn)
+    def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+      if not enter():
+        return fn(*args, **kwargs)
+      with TRACER.span(name):
+        return fn(*args, **kwargs)
+
+    wrapper = sync_wrapper
+
+  # FastAPI resolves string annotations against the wrapper's module globals;
+  # publish the handler's resolved signature so dependency injection is unchanged.
+  hints = get_type_hints(fn)
+  sig = inspect.signature(fn)
+  wrapper.__signature__ = sig.replace(
+    parameters=[p.replace(annotation=hints.get(p.name, p.annotation)) for p in sig.parameters.values()],
+    return_annotation=hints.get("return", sig.return_annotation),
+  )
+  return wrapper  # type: ignore[no-any-return]
+
+
+class TracingMiddleware:
+  """ASGI middleware opening the root ``http.request`` span for sampled requests."""
+
+  def __init__(self, app: ASGIApp, tracer: Optional[Tracer] = None) -> None:
+    self.app = app
+    self.tracer = tracer or TRACER
+
+  async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    root = self.tracer.trace("http.request")
+    if root is _NOOP:
+      await self.app(scope, receive, send)
+      return
+
+    with root as span:
+      span.set_attribute("http.method", scope["method"])
+      span.set_attribute("http.target", scope["path"])
+
+      async def send_wrapper(message: Message) -> None:
+        if message["type"] == "http.response.start":
+          span.set_attribute("http.status_code", message["status"])
+        await send(message)
+
+      try:
+        await self.app(scope, receive, send_wrapper)
+      finally:
+        route = scope.get("route")
+        if route is not None:
+          span.set_attribute("http.route", getattr(route, "path", None))
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from metrics import REGISTRY
+from repository import UserEntity
+from tracing import span
+from uow import UnitOfWork
+
+NDJSON = "application/x-ndjson"
+
+USERS_EXPORTED = REGISTRY.counter("users_exported_total", "Users written by NDJSON exports.")
+USERS_IMPORTED = REGISTRY.counter("users_imported_total", "Users committed by NDJSON imports.")
+IMPORT_CHUNKS = REGISTRY.counter("users_import_chunks_total", "Import chunks committed.")
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def export_ndjson(users: Iterable[UserEntity], *, batch: int = 500) -> Iterator[bytes]:
+  """Encode ``users`` as NDJSON, ``batch`` lines per yielded chunk."""
+  lines: List[str] = []
+  for user in users:
+    lines.append(_dumps({"id": user.id, "name": user.name}))
+    if len(lines) >= batch:
+      USERS_EXPORTED.inc(amount=len(lines))
+      yield ("\n".join(lines) + "\n").encode()
+      lines = []
+  if lines:
+    USERS_EXPORTED.inc(amount=len(lines))
+    yield ("\n".join(lines) + "\n").encode()
+
+
+class LineTooLong(ValueError):
+  def __init__(self, line: int, limit: int) -> None:
+    super().__init__(f"line exceeds {limit} bytes")
+    self.line = line
+
+
+class ImportFailed(Exception):
+  """An import stopped at ``line``; ``imported`` users were already committed."""
+
+  def __init__(self, message: str, *, line: int, imported: int) -> None:
+    super().__init__(message)
+    self.line = line
+    self.imported = imported
+
+
+@dataclass
+class ImportSummary:
+  imported: int = 0
+  chunks: int = 0
+  lines: int = 0
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], *, max_line: int) -> AsyncIterator[Tuple[int, bytes]]:
+  """Split a byte stream into ``(line number, line)`` pairs, skipping blank lines.
+
+  Only the current partial line is buffered; a line longer than ``max_line``
+  bytes raises LineTooLong.
+  """
+  pending = bytearray()
+  number = 0
+  async for chunk in chunks:
+    if not chunk:
+      continue
+    # Bytes before ``searched`` are known to hold no newline; only scan what arrived.
+    searched = len(pending)
+    pending += chunk
+    start = 0
+    while True:
+      end = pending.find(b"\n", searched)
+      if end < 0:
+        break
+      line = bytes(pending[start:end])
+      number += 1
+      if line.strip():
+        yield number, line
+      start = searched = end + 1
+    if start:
+      del pending[:start]
+    if len(pending) > max_line:
+      raise LineTooLong(number + 1, max_line)
+  if pending.strip():
+    yield number + 1, bytes(pending)
+
+
+def _commit_chunk(uow: UnitOfWork, rows: List[UserEntity]) -> None:
+  with span("users.import.chunk"):
+    with uow.transaction():
+      for row in rows:
+        uow.users_save(row)
+
+
+async def import_ndjson(
+  chunks: AsyncIterator[bytes],
+  parse: Callable[[bytes], UserEntity],
+  uow_factory: Callable[[], UnitOfWork],
+  *,
+  chunk_size: int,
+  max_line: int = 1 << 20,
+) -> ImportSummary:
+  """Parse NDJSON users from ``chunks`` and commit them ``chunk_size`` per transaction.
+
+  Memory holds at most one chunk of parsed users plus one partial line.
+  Chunks committed before a bad line stay committed; the bad line's chunk is
+  dropped and ImportFailed reports where the import stopped. Progress is
+  visible while the import runs through the ``users_imported_total`` and
+  ``users_import_chunks_total`` metrics.
+  """
+  summary = ImportSummary()
+  rows: List[UserEntity] = []
+
+  async def flush() -> None:
+    await run_in_threadpool(_commit_chunk, uow_factory(), rows)
+    summary.imported += len(rows)
+    summary.chunks += 1
+    USERS_IMPORTED.inc(amount=len(rows))
+    IMPORT_CHUNKS.inc()
+    rows.clear()
+
+  try:
+    async for number, line in ndjson_lines(chunks, max_line=max_line):
+      summary.lines = number
+      try:
+        rows.append(parse(line))
+      except ValueError as exc:
+        # pydantic's ValidationError is a ValueError too.
+        raise ImportFailed(str(exc), line=number, imported=summary.imported) from exc
+      if len(rows) >= chunk_size:
+        await flush()
+  except LineTooLong as exc:
+    raise ImportFailed(str(exc), line=exc.line, imported=summary.imported) from exc
+  if rows:
+    await flush()
+  return summary
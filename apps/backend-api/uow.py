@@ -1,61 +1,262 @@
 from __future__ import annotations
 
+import threading
+import time
+import weakref
 from contextlib import contextmanager
-from typing import Dict, Iterator, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sized
 
-from repository import InMemoryUserRepository, UserEntity
+import deadlines
+from content_repository import CommentEntity, InMemoryCommentRepository, InMemoryPostRepository, PostEntity, WriteSet
+from hotkeys import HOTKEYS
+from metrics import UOW_COMMITS, UOW_ROLLBACKS, UOW_SAVEPOINTS, UOW_STAGED_SIZE, UOW_TRANSACTION_DURATION
+from repository import UserEntity, UserRepository
+from tracing import span
+
+# Per-key access tracking (see hotkeys.py): every keyed read and write made
+# through a unit of work is counted, whichever repository backs it.
+_USER_KEYS = HOTKEYS.tracker("users")
+_POST_KEYS = HOTKEYS.tracker("posts")
+_COMMENT_KEYS = HOTKEYS.tracker("comments")
+
+# Units of work with an open transaction, for the memory debug endpoint.
+# Registered only while tracking is on (debug.py turns it on with the debug
+# endpoints); otherwise transactions never touch the set or its lock.
+_OPEN: "weakref.WeakSet[UnitOfWork]" = weakref.WeakSet()
+_OPEN_LOCK = threading.Lock()
+_TRACK_OPEN = False
+
+
+def track_open_units(enabled: bool) -> None:
+  """Start or stop registering units of work for ``open_units``."""
+  global _TRACK_OPEN
+  _TRACK_OPEN = enabled
+
+
+def open_units() -> List["UnitOfWork"]:
+  """Units of work whose outermost transaction opened while tracking was on and is still open."""
+  with _OPEN_LOCK:
+    return list(_OPEN)
+
+
+class _Savepoint:
+  """Staged state, per repository, of each row a savepoint wrote, as it was before its first write."""
+
+  __slots__ = ("users", "posts", "comments")
+
+  def __init__(self) -> None:
+    self.users: Dict[str, Any] = {}
+    self.posts: Dict[str, object] = {}
+    self.comments: Dict[str, object] = {}
 
 
 class UnitOfWork:
   """Minimal Unit of Work stub for alignment with architecture.
 
   In real usage, this would manage DB sessions/transactions.
+
+  ``transaction()`` nests: inside an open transaction it opens a savepoint
+  over the same staging instead of a new snapshot. A savepoint remembers the
+  staged state of the rows it writes; if its block raises, only those rows
+  are put back (the enclosing transaction carries on if the caller handles
+  the exception), and on success its writes simply stay in the parent's
+  staging. Nothing is committed until the outermost transaction ends.
   """
 
-  def __init__(self, repo: InMemoryUserRepository) -> None:
+  def __init__(
+    self,
+    repo: UserRepository,
+    posts: Optional[InMemoryPostRepository] = None,
+    comments: Optional[InMemoryCommentRepository] = None,
+  ) -> None:
     self._active = False
     self._repo = repo
-    self._staged: Optional[Dict[str, UserEntity]] = None
+    self._posts = posts or InMemoryPostRepository()
+    self._comments = comments or InMemoryCommentRepository()
+    self._staged: Optional[Sized] = None
+    self._posts_staged: Optional[WriteSet[PostEntity]] = None
+    self._comments_staged: Optional[WriteSet[CommentEntity]] = None
+    self._savepoints: List[_Savepoint] = []
 
   @contextmanager
   def transaction(self) -> Iterator["UnitOfWork"]:
+    if self._active:
+      with span("uow.savepoint"):
+        yield from self._savepoint()
+      return
+    with span("uow.transaction"):
+      yield from self._transaction()
+
+  def _savepoint(self) -> Iterator["UnitOfWork"]:
+    savepoint = _Savepoint()
+    self._savepoints.append(savepoint)
+    try:
+      yield self
+    except Exception:
+      self._savepoints.pop()
+      self._rollback_to(savepoint)
+      UOW_SAVEPOINTS.inc("rollback")
+      raise
+    self._savepoints.pop()
+    if self._savepoints:
+      # Rolling the parent back must undo these writes too; where the parent
+      # wrote a row first, its own earlier entry is the one to keep.
+      parent = self._savepoints[-1]
+      for target, source in ((parent.users, savepoint.users), (parent.posts, savepoint.posts),
+                             (parent.comments, savepoint.comments)):
+        for key, entry in source.items():
+          target.setdefault(key, entry)
+    UOW_SAVEPOINTS.inc("release")
+
+  def _rollback_to(self, savepoint: _Savepoint) -> None:
+    for user_id, entry in savepoint.users.items():
+      self._repo.restore_staged(self._staged, user_id, entry)
+    if self._posts_staged is not None:
+      for post_id, entry in savepoint.posts.items():
+        self._posts_staged.restore(post_id, entry)
+    if self._comments_staged is not None:
+      for comment_id, entry in savepoint.comments.items():
+        self._comments_staged.restore(comment_id, entry)
+
+  def _mark_user(self, user_id: str) -> None:
+    if self._savepoints:
+      self._savepoints[-1].users.setdefault(user_id, self._repo.staged_entry(self._staged, user_id))
+
+  def _mark_post(self, post_id: str) -> None:
+    if self._savepoints and self._posts_staged is not None:
+      self._savepoints[-1].posts.setdefault(post_id, self._posts_staged.entry(post_id))
+
+  def _mark_comment(self, comment_id: str) -> None:
+    if self._savepoints and self._comments_staged is not None:
+      self._savepoints[-1].comments.setdefault(comment_id, self._comments_staged.entry(comment_id))
+
+  def _transaction(self) -> Iterator["UnitOfWork"]:
+    started = time.perf_counter()
+    # Before the snapshot, which may copy the whole user store.
+    deadlines.check("uow.begin")
     self._active = True
+    tracked = _TRACK_OPEN
+    if tracked:
+      with _OPEN_LOCK:
+        _OPEN.add(self)
     # Begin transaction by taking a snapshot of repo state
     self._staged = self._repo.snapshot()
+    self._posts_staged = self._posts.snapshot()
+    self._comments_staged = self._comments.snapshot()
     try:
       yield self
-      # commit staged changes into repository
+      # An expired deadline aborts here, before anything is applied, and the
+      # handler below rolls back.
+      deadlines.check("uow.commit")
+      # Posts and comments are admitted up front; of the commits below only
+      # the users one can still refuse, so it goes first.
+      self._posts.admit(self._posts_staged)
+      self._comments.admit(self._comments_staged)
       if self._staged is not None:
+        UOW_STAGED_SIZE.observe(len(self._staged))
         self._repo.commit(self._staged)
+      self._posts.commit(self._posts_staged)
+      self._comments.commit(self._comments_staged)
     except Exception:
       # rollback: drop staged changes by not committing
+      UOW_ROLLBACKS.inc()
+      UOW_TRANSACTION_DURATION.observe(time.perf_counter() - started, "rollback")
       raise
+    else:
+      UOW_COMMITS.inc()
+      UOW_TRANSACTION_DURATION.observe(time.perf_counter() - started, "commit")
     finally:
+      if tracked:
+        with _OPEN_LOCK:
+          _OPEN.discard(self)
       self._active = False
       self._staged = None
+      self._posts_staged = None
+      self._comments_staged = None
+      self._savepoints.clear()
 
   def is_active(self) -> bool:
     return self._active
 
   # Convenience methods to operate on repo within a transaction
+  def users_scan(self) -> Iterator[UserEntity]:
+    # Committed data only; staged changes of an open transaction are not included.
+    return self._repo.scan()
+
   def users_get(self, user_id: str) -> Optional[UserEntity]:
+    _USER_KEYS.read(user_id)
     return self._repo.get(user_id, staging=self._staged)
 
   def users_save(self, user: UserEntity) -> None:
+    _USER_KEYS.write(user.id)
     if self._staged is None:
       # Allow save outside transaction as immediate write (not typical, but safe for demo)
       self._repo.save(user)
     else:
+      self._mark_user(user.id)
       self._repo.save(user, staging=self._staged)
 
   def users_update(self, user: UserEntity) -> None:
+    _USER_KEYS.write(user.id)
     if self._staged is None:
       self._repo.update(user)
     else:
+      self._mark_user(user.id)
       self._repo.update(user, staging=self._staged)
 
   def users_delete(self, user_id: str) -> None:
+    _USER_KEYS.write(user_id)
     if self._staged is None:
       self._repo.delete(user_id)
     else:
+      self._mark_user(user_id)
       self._repo.delete(user_id, staging=self._staged)
+
+  def posts_get(self, post_id: str) -> Optional[PostEntity]:
+    _POST_KEYS.read(post_id)
+    return self._posts.get(post_id, staging=self._posts_staged)
+
+  def posts_save(self, post: PostEntity) -> None:
+    _POST_KEYS.write(post.id)
+    self._mark_post(post.id)
+    self._posts.save(post, staging=self._posts_staged)
+
+  def posts_delete(self, post_id: str) -> None:
+    _POST_KEYS.write(post_id)
+    self._mark_post(post_id)
+    self._posts.delete(post_id, staging=self._posts_staged)
+
+  def posts_by_user(self, user_id: str) -> List[PostEntity]:
+    return self._posts.by_user(user_id, staging=self._posts_staged)
+
+  def posts_by_users(self, user_ids: Iterable[str]) -> Dict[str, List[PostEntity]]:
+    return self._posts.by_users(user_ids, staging=self._posts_staged)
+
+  def posts_count_for_user(self, user_id: str) -> int:
+    return self._posts.count_for_user(user_id, staging=self._posts_staged)
+
+  def comments_get(self, comment_id: str) -> Optional[CommentEntity]:
+    _COMMENT_KEYS.read(comment_id)
+    return self._comments.get(comment_id, staging=self._comments_staged)
+
+  def comments_save(self, comment: CommentEntity) -> None:
+    _COMMENT_KEYS.write(comment.id)
+    self._mark_comment(comment.id)
+    self._comments.save(comment, staging=self._comments_staged)
+
+  def comments_delete(self, comment_id: str) -> None:
+    _COMMENT_KEYS.write(comment_id)
+    self._mark_comment(comment_id)
+    self._comments.delete(comment_id, staging=self._comments_staged)
+
+  def comments_for_post(self, post_id: str) -> List[CommentEntity]:
+    return self._comments.for_post(post_id, staging=self._comments_staged)
+
+  def comments_for_posts(self, post_ids: Iterable[str]) -> Dict[str, List[CommentEntity]]:
+    return self._comments.for_posts(post_ids, staging=self._comments_staged)
+
+  def comments_count_for_post(self, post_id: str) -> int:
+    return self._comments.count_for_post(post_id, staging=self._comments_staged)
+
+  def comments_by_user(self, user_id: str) -> List[CommentEntity]:
+    return self._comments.by_user(user_id, staging=self._comments_staged)
@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+import os
+import time
+from dataclasses import fields
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message
+
+from content_repository import CommentEntity, InMemoryCommentRepository, InMemoryPostRepository, PostEntity
+from metrics import REGISTRY
+from repository import UserEntity, UserRepository
+from search import SearchIndex
+from uow import UnitOfWork
+
+WARMUP_STEP_DURATION = REGISTRY.gauge(
+  "warmup_step_duration_seconds", "Time each warm-up step took in this worker.", ("step",),
+)
+WARMUP_REPLAYED = REGISTRY.counter(
+  "warmup_replayed_requests_total", "Recorded requests replayed during warm-up, by outcome.", ("outcome",),
+)
+BACKEND_READY = REGISTRY.gauge("backend_ready", "1 once this worker finished warming up and is ready for traffic.")
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+DONE, SKIPPED = "done", "skipped"
+# Replayed requests may only read: warm-up must not change data.
+_REPLAYABLE = {"GET", "HEAD"}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+  raw = os.getenv(name)
+  return default if raw is None else raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+class WarmupSettings:
+  def __init__(
+    self,
+    *,
+    enabled: bool = True,
+    data_dir: Optional[str] = None,
+    batch: int = 10_000,
+    replay_file: Optional[str] = None,
+    replay_limit: int = 1000,
+    replay_concurrency: int = 4,
+    replay_timeout: float = 5.0,
+  ) -> None:
+    self.enabled = enabled
+    self.data_dir = data_dir
+    self.batch = batch
+    self.replay_file = replay_file
+    self.replay_limit = replay_limit
+    self.replay_concurrency = replay_concurrency
+    self.replay_timeout = replay_timeout
+
+  @classmethod
+  def from_env(cls) -> "WarmupSettings":
+    return cls(
+      enabled=_env_bool("BACKEND_WARMUP_ENABLED", True),
+      data_dir=os.getenv("BACKEND_WARMUP_DATA_DIR") or None,
+      batch=int(os.getenv("BACKEND_WARMUP_BATCH", "10000")),
+      replay_file=os.getenv("BACKEND_WARMUP_REPLAY") or None,
+      replay_limit=int(os.getenv("BACKEND_WARMUP_REPLAY_LIMIT", "1000")),
+      replay_concurrency=int(os.getenv("BACKEND_WARMUP_REPLAY_CONCURRENCY", "4")),
+      replay_timeout=float(os.getenv("BACKEND_WARMUP_REPLAY_TIMEOUT", "5")),
+    )
+
+
+class Progress:
+  """What a running step has done so far; steps update it as they go."""
+
+  __slots__ = ("done", "total", "detail")
+
+  def __init__(self) -> None:
+    self.done = 0
+    self.total: Optional[int] = None
+    self.detail: Dict[str, Any] = {}
+
+
+StepFn = Callable[[Progress], Union[None, Awaitable[None]]]
+
+
+class _Step:
+  __slots__ = ("name", "fn", "required", "state", "progress", "seconds", "error")
+
+  def __init__(self, name: str, fn: StepFn, required: bool) -> None:
+    self.name = name
+    self.fn = fn
+    self.required = required
+    self.state = PENDING
+    self.progress = Progress()
+    self.seconds: Optional[float] = None
+    self.error: Optional[str] = None
+
+  def status(self) -> Dict[str, Any]:
+    return {
+      "name": self.name,
+      "state": self.state,
+      "done": self.progress.done,
+      "total": self.progress.total,
+      "seconds": self.seconds,
+      "error": self.error,
+      **self.progress.detail,
+    }
+
+
+class Warmup:
+  """Ordered warm-up steps run once per worker, in the background, at startup.
+
+  The pipeline runs as a task on the event loop, so the worker serves
+  requests (and liveness probes) while it warms up; synchronous steps run
+  on the thread pool. The worker is ready once every step has finished. A
+  failing required step leaves it not ready for good, so a load balancer
+  keeps it out of rotation. A failing optional step is recorded and the
+  pipeline carries on.
+  """
+
+  def __init__(self, settings: WarmupSettings) -> None:
+    self.settings = settings
+    self._steps: List[_Step] = []
+    self._task: Optional["asyncio.Task[None]"] = None
+    self.state = PENDING
+    self.started: Optional[float] = None
+    self.finished: Optional[float] = None
+
+  @classmethod
+  def from_env(cls) -> "Warmup":
+    return cls(WarmupSettings.from_env())
+
+  def add(self, name: str, fn: StepFn, *, required: bool = True) -> None:
+    """Append a step; ``fn`` is a coroutine function or a plain (blocking) function."""
+    self._steps.append(_Step(name, fn, required))
+
+  @property
+  def ready(self) -> bool:
+    return self.state == READY
+
+  def start(self) -> "asyncio.Task[None]":
+    """Start the pipeline on the running loop; later calls return the same task."""
+    if self._task is None:
+      self._task = asyncio.get_running_loop().create_task(self.run())
+    return self._task
+
+  async def stop(self) -> None:
+    task, self._task = self._task, None
+    if task is not None and not task.done():
+      task.cancel()
+      try:
+        await task
+      except asyncio.CancelledError:
+        pass
+
+  async def run(self) -> None:
+    self.state = RUNNING
+    self.started = time.time()
+    for step in self._steps:
+      step.state, step.error, step.progress = PENDING, None, Progress()
+    if not self.settings.enabled:
+      for step in self._steps:
+        step.state = SKIPPED
+      self._finish(READY)
+      return
+    for step in self._steps:
+      step.state = RUNNING
+      began = time.perf_counter()
+      try:
+        if inspect.iscoroutinefunction(step.fn):
+          await step.fn(step.progress)
+        else:
+          await run_in_threadpool(step.fn, step.progress)
+      except Exception as exc:
+        step.state, step.error = FAILED, f"{type(exc).__name__}: {exc}"
+      else:
+        step.state = DONE
+      step.seconds = time.perf_counter() - began
+      WARMUP_STEP_DURATION.set(step.seconds, step.name)
+      if step.state == FAILED and step.required:
+        self._finish(FAILED)
+        return
+    self._finish(READY)
+
+  def _finish(self, state: str) -> None:
+    self.state = state
+    self.finished = time.time()
+
+  def status(self) -> Dict[str, Any]:
+    current = next((step.name for step in self._steps if step.state == RUNNING), None)
+    return {
+      "status": self.state,
+      "step": current,
+      "started_at": self.started,
+      "finished_at": self.finished,
+      "steps": [step.status() for step in self._steps],
+    }
+
+
+_ENTITIES: Tuple[Tuple[str, Type[Any]], ...] = (
+  ("users", UserEntity),
+  ("posts", PostEntity),
+  ("comments", CommentEntity),
+)
+
+
+def _rows(path: str, entity: Type[Any], progress: Progress) -> Iterator[Any]:
+  names = [f.name for f in fields(entity)]
+  with open(path, "rb") as fh:
+    for number, line in enumerate(fh, 1):
+      progress.done += len(line)
+      if not line.strip():
+        continue
+      try:
+        data = json.loads(line)
+        yield entity(**{name: data[name] for name in names if name in data})
+      except (TypeError, ValueError) as exc:
+        raise ValueError(f"{os.path.basename(path)} line {number}: {exc}") from exc
+
+
+def load_data(
+  directory: str,
+  users: UserRepository,
+  posts: InMemoryPostRepository,
+  comments: InMemoryCommentRepository,
+  progress: Progress,
+  *,
+  batch: int = 10_000,
+) -> None:
+  """Load ``users.ndjson``, ``posts.ndjson`` and ``comments.ndjson`` from ``directory``.
+
+  Each line is a JSON object, for example a ``/users/export`` line or a
+  row written by the benchmark data generator. Keys the entity does not
+  have are ignored. Rows go through the repositories' ``bulk_load``, not a
+  unit of work: nothing is snapshotted, logged to the change feed or counted
+  as a hot key. Posts and comments are applied ``batch`` at a time, so the
+  foreign-key and search indexes are built as the rows arrive. A shared
+  user store is loaded by the first worker only. Progress counts bytes. A
+  missing file is skipped.
+  """
+  targets: Dict[str, Callable[[Iterator[Any]], int]] = {
+    "users": users.bulk_load,
+    "posts": lambda rows: posts.bulk_load(rows, batch=batch),
+    "comments": lambda rows: comments.bulk_load(rows, batch=batch),
+  }
+  files = [(table, os.path.join(directory, f"{table}.ndjson"), entity) for table, entity in _ENTITIES]
+  files = [item for item in files if os.path.isfile(item[1])]
+  progress.total = sum(os.path.getsize(path) for _, path, _ in files)
+  for table, path, entity in files:
+    end = progress.done + os.path.getsize(path)
+    progress.detail[table] = targets[table](_rows(path, entity, progress))
+    # A file another worker already loaded is not read at all.
+    progress.done = end
+
+
+def page_in_users(uow_factory: Callable[[], UnitOfWork], progress: Progress) -> None:
+  """Read every user once, faulting a file-backed store's pages in before traffic does."""
+  count = 0
+  for _ in uow_factory().users_scan():
+    count += 1
+  progress.done = progress.total = count
+
+
+def build_indexes(posts: InMemoryPostRepository, search: SearchIndex, progress: Progress) -> None:
+  """Compact the post search index and report index coverage.
+
+  Foreign-key and search indexes are maintained as writes commit, so after
+  the data is loaded they are complete. Compacting now drops the dead
+  postings that loading left behind, so the first queries do not pay for them.
+  """
+  search.compact()
+  progress.done = progress.total = len(search)
+  progress.detail["posts"] = posts.size()
+
+
+def prebuild_validators(openapi: Callable[[], Dict[str, Any]], models: Iterable[Type[BaseModel]], progress: Progress) -> None:
+  """Build everything pydantic and FastAPI otherwise build on first use.
+
+  Model schemas that were deferred are completed. Each model validates
+  one document, which also loads the error-reporting paths. The OpenAPI
+  document is generated and cached.
+  """
+  unique = list(dict.fromkeys(models))
+  progress.total = len(unique) + 1
+  for model in unique:
+    if not model.__pydantic_complete__:
+      model.model_rebuild(force=True)
+    try:
+      model.model_validate_json(b"{}", strict=True)
+    except ValidationError:
+      pass
+    progress.done += 1
+  openapi()
+  progress.done += 1
+
+
+async def replay(
+  app: ASGIApp, path: str, progress: Progress, *, limit: int = 1000, concurrency: int = 4, timeout: float = 5.0,
+) -> None:
+  """Replay recorded requests through ``app`` in-process, to exercise the hot paths.
+
+  ``path`` holds one JSON object per line: ``method``, ``path`` and
+  optionally ``query`` and ``headers``. Only GET and HEAD requests are
+  replayed, at most ``limit`` of them, ``concurrency`` at a time. Responses
+  are discarded; only their outcome is counted. A request still running
+  after ``timeout`` seconds (a change feed, say) is abandoned.
+  """
+  requests: List[Dict[str, Any]] = []
+  with open(path, encoding="utf-8") as fh:
+    for line in fh:
+      if line.strip():
+        request = json.loads(line)
+        if str(request.get("method", "GET")).upper() in _REPLAYABLE:
+          requests.append(request)
+          if len(requests) >= limit:
+            break
+  progress.total = len(requests)
+  outcomes: Dict[str, int] = {}
+  pending = iter(requests)
+
+  async def worker() -> None:
+    for request in pending:
+      try:
+        status = await asyncio.wait_for(_call(app, request), timeout)
+      except asyncio.TimeoutError:
+        outcome = "timeout"
+      except Exception:
+        outcome = "error"
+      else:
+        outcome = "error" if status >= 500 else "ok"
+      WARMUP_REPLAYED.inc(outcome)
+      outcomes[outcome] = outcomes.get(outcome, 0) + 1
+      progress.done += 1
+
+  await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+  progress.detail.update(outcomes)
+
+
+async def _call(app: ASGIApp, request: Dict[str, Any]) -> int:
+  target = str(request["path"])
+  path, _, query = target.partition("?")
+  query = str(request.get("query", query))
+  headers = [(str(k).lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in request.get("headers", {}).items()]
+  scope = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": str(request.get("method", "GET")).upper(),
+    "scheme": "http",
+    "path": path,
+    "raw_path": path.encode(),
+    "root_path": "",
+    "query_string": query.encode(),
+    "headers": headers,
+    "client": ("127.0.0.1", 0),
+    "server": ("warmup", 80),
+  }
+  status = 500
+  requested = False
+  complete = asyncio.Event()
+
+  async def receive() -> Message:
+    nonlocal requested
+    if not requested:
+      requested = True
+      return {"type": "http.request", "body": b"", "more_body": False}
+    # The client "disconnects" once it has the whole response.
+    await complete.wait()
+    return {"type": "http.disconnect"}
+
+  async def send(message: Message) -> None:
+    nonlocal status
+    if message["type"] == "http.response.start":
+      status = message["status"]
+    elif message["type"] == "http.response.body" and not message.get("more_body", False):
+      complete.set()
+
+  await app(scope, receive, send)
+  return status
+
+
+WARMUP = Warmup.from_env()
+BACKEND_READY.set_function(lambda: 1.0 if WARMUP.ready else 0.0)
@@ -1,7 +1,10 @@
 from datetime import datetime
+from typing import Annotated
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field
+
+from libs.backend.type_utils.validators.types import StrippedStr, not_empty
 
 
 class Comment(BaseModel):
@@ -12,13 +15,5 @@ class Comment(BaseModel):
     id: UUID
     post_id: UUID
     user_id: UUID
-    content: str = Field(..., min_length=1, description="Content cannot be empty")
+    content: Annotated[StrippedStr, not_empty("Content")] = Field(..., description="Content cannot be empty")
     created_at: datetime
-
-    @field_validator("content")
-    @classmethod
-    def validate_content(cls, value: str) -> str:
-        trimmed = value.strip()
-        if not trimmed:
-            raise ValueError("Content cannot be empty")
-        return trimmed
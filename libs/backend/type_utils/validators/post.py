@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional, Any
+from typing import Annotated, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field, StrictBool, field_validator
+from pydantic import BaseModel, ConfigDict, Field, StrictBool
+
+from libs.backend.type_utils.validators.types import StrippedStr, not_empty
 
 
 class Post(BaseModel):
@@ -12,30 +14,9 @@ class Post(BaseModel):
 
     id: UUID
     user_id: UUID
-    title: str = Field(..., min_length=1, description="Title cannot be empty")
-    content: Optional[str] = Field(default=None, description="Content cannot be empty when provided")
+    # Strict so that non-string titles are rejected rather than coerced, as before.
+    title: Annotated[StrippedStr, not_empty("Title")] = Field(..., strict=True, description="Title cannot be empty")
+    content: Optional[Annotated[StrippedStr, not_empty("Content")]] = Field(default=None, strict=True, description="Content cannot be empty when provided")
     published: StrictBool
     created_at: datetime
     updated_at: Optional[datetime] = None
-
-    @field_validator("title", mode="before")
-    @classmethod
-    def validate_title(cls, value: Any) -> str:
-        if not isinstance(value, str):
-            raise TypeError("Title must be a string")
-        trimmed = value.strip()
-        if not trimmed:
-            raise ValueError("Title cannot be empty")
-        return trimmed
-
-    @field_validator("content", mode="before")
-    @classmethod
-    def validate_content(cls, value: Optional[Any]) -> Optional[str]:
-        if value is None:
-            return None
-        if not isinstance(value, str):
-            raise TypeError("Content must be a string")
-        trimmed = value.strip()
-        if not trimmed:
-            raise ValueError("Content cannot be empty")
-        return trimmed
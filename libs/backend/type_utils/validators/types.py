@@ -0,0 +1,33 @@
+from typing import Annotated, Type, TypeVar, Union
+
+from pydantic import AfterValidator, BaseModel, StringConstraints
+
+# Surrounding whitespace is stripped inside pydantic-core; a non-string fails
+# there with ``string_type`` before any Python validator runs.
+StrippedStr = Annotated[str, StringConstraints(strip_whitespace=True)]
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def not_empty(label: str) -> AfterValidator:
+    """Validator rejecting an empty (already stripped) string as ``value_error``.
+
+    It raises ValueError, as the field validators it replaced did, so clients
+    keep seeing "Value error, <label> cannot be empty" with the error in ``ctx``.
+    """
+    def check(value: str) -> str:
+        if not value:
+            raise ValueError(f"{label} cannot be empty")
+        return value
+
+    return AfterValidator(check)
+
+
+def validate_json(model: Type[M], raw: Union[str, bytes, bytearray]) -> M:
+    """Validate a raw JSON document against ``model`` without building a dict first.
+
+    Parsing and validation happen in one pass in pydantic-core, in strict mode:
+    JSON strings are still accepted for UUID and datetime fields, but no other
+    type coercion is done (``"1"`` is not an int, ``0`` is not a bool).
+    """
+    return model.model_validate_json(raw, strict=True)
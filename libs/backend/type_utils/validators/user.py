@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+from libs.backend.type_utils.validators.types import StrippedStr, not_empty
 
 
 class User(BaseModel):
@@ -11,15 +13,7 @@ class User(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
     id: UUID
-    name: str = Field(..., min_length=1, description="Name cannot be empty")
+    name: Annotated[StrippedStr, not_empty("Name")] = Field(..., description="Name cannot be empty")
     email: EmailStr
     created_at: datetime
     updated_at: Optional[datetime] = None
-
-    @field_validator("name")
-    @classmethod
-    def validate_name(cls, value: str) -> str:
-        trimmed = value.strip()
-        if not trimmed:
-            raise ValueError("Name cannot be empty")
-        return trimmed
@@ -1,13 +1,272 @@
-from typing import TypeVar, Callable, Awaitable
-from sqlalchemy.ext.asyncio import AsyncSession
-from my-test-domain.domain.ports import IUnitOfWork
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import Table, event, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from my_test_domain.domain.ports import IUnitOfWork
 
 T = TypeVar('T')
 
+# SQLSTATE codes for serialization failures and deadlocks (PostgreSQL, ANSI).
+_RETRYABLE_SQLSTATES = frozenset({'40001', '40P01'})
+# Driver messages for the same conditions where no SQLSTATE is exposed (SQLite, MySQL).
+_RETRYABLE_MESSAGES = ('database is locked', 'deadlock', 'could not serialize')
+
+# Upper bound on bound parameters per statement, by dialect name.
+_MAX_BIND_PARAMS = {'sqlite': 32766, 'postgresql': 32767, 'mysql': 65535}
+_DEFAULT_MAX_BIND_PARAMS = 2000
+
+# Dialects with a native INSERT ... ON CONFLICT / ON DUPLICATE KEY form.
+_UPSERT_DIALECTS = frozenset({'postgresql', 'sqlite', 'mysql'})
+
+# Engines are shared per (url, engine options, event loop): a pool created with
+# other options, or bound to another running loop, is never handed out.
+_engines: Dict[Tuple[str, str, Optional[asyncio.AbstractEventLoop]], AsyncEngine] = {}
+
+# Session of the outermost transaction, per adapter, in the current context.
+_sessions: ContextVar[Mapping['UnitOfWorkSQLAlchemyAdapter', AsyncSession]] = ContextVar('uow_sessions', default={})
+
+
+@dataclass(frozen=True)
+class BulkChunkResult:
+    """Outcome of one chunk of a bulk write."""
+
+    index: int
+    rows: int
+    rowcount: int
+    elapsed: float
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == 'sqlite' and parsed.database in (None, '', ':memory:')
+
+
+def _enable_sqlite_savepoints(engine: AsyncEngine) -> None:
+    # pysqlite/aiosqlite emit BEGIN lazily and break SAVEPOINT; take over transaction control.
+    @event.listens_for(engine.sync_engine, 'connect')
+    def _on_connect(dbapi_connection: Any, _record: Any) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, 'begin')
+    def _on_begin(conn: Any) -> None:
+        conn.exec_driver_sql('BEGIN')
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_engine(
+    url: str,
+    *,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    pool_timeout: float = 30.0,
+    pool_recycle: int = 1800,
+    query_cache_size: int = 1200,
+    **options: Any,
+) -> AsyncEngine:
+    """Return the shared engine for ``url``, creating it on first use.
+
+    The pool is sized for request-scoped sessions and the compiled statement
+    cache is kept enabled so repeated queries skip SQL compilation. Engines
+    are cached per URL, engine options and running event loop.
+    """
+    kwargs: Dict[str, Any] = {'query_cache_size': query_cache_size, 'pool_pre_ping': True}
+    if not _is_memory_sqlite(url):
+        # In-memory SQLite uses a static single-connection pool with no sizing options.
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+        )
+    kwargs.update(options)
+    key = (url, repr(sorted(kwargs.items())), _running_loop())
+    engine = _engines.get(key)
+    if engine is not None:
+        return engine
+
+    engine = create_async_engine(url, **kwargs)
+    if engine.dialect.name == 'sqlite':
+        _enable_sqlite_savepoints(engine)
+    _engines[key] = engine
+    return engine
+
+
+async def dispose_engines() -> None:
+    """Close every shared engine; call on application shutdown."""
+    engines = list(_engines.values())
+    _engines.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def _insert_for(dialect: str, table: Table) -> Any:
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table)
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table)
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return mysql_insert(table)
+    raise ValueError(f'on_conflict is not supported for dialect {dialect!r}')
+
+
+def _upsert_statement(
+    dialect: str,
+    table: Table,
+    columns: Sequence[str],
+    on_conflict: str,
+    conflict_columns: Optional[Sequence[str]],
+) -> Any:
+    stmt = _insert_for(dialect, table)
+    keys = list(conflict_columns or [c.name for c in table.primary_key.columns])
+    if dialect == 'mysql':
+        if on_conflict == 'ignore':
+            return stmt.prefix_with('IGNORE')
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns if c not in keys})
+    if on_conflict == 'ignore':
+        return stmt.on_conflict_do_nothing(index_elements=keys)
+    updates = {c: stmt.excluded[c] for c in columns if c not in keys}
+    if not updates:
+        return stmt.on_conflict_do_nothing(index_elements=keys)
+    return stmt.on_conflict_do_update(index_elements=keys, set_=updates)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if not isinstance(exc, DBAPIError) or exc.connection_invalidated:
+        return False
+    orig = exc.orig
+    code = getattr(orig, 'sqlstate', None) or getattr(orig, 'pgcode', None)
+    if code in _RETRYABLE_SQLSTATES:
+        return True
+    message = str(orig).lower()
+    return any(marker in message for marker in _RETRYABLE_MESSAGES)
+
+
 class UnitOfWorkSQLAlchemyAdapter(IUnitOfWork):
-    def __init__(self, session: AsyncSession):
-        self._session = session
+    """Unit of Work opening a fresh ``AsyncSession`` per outermost transaction.
+
+    Nested ``with_transaction`` calls run inside a SAVEPOINT on the current
+    session. Outermost transactions that fail with a serialization or deadlock
+    error are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        max_retries: int = 3,
+        retry_backoff: float = 0.05,
+    ):
+        self._session_factory = session_factory
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+
+    @classmethod
+    def from_url(cls, url: str, *, max_retries: int = 3, retry_backoff: float = 0.05, **engine_options: Any) -> 'UnitOfWorkSQLAlchemyAdapter':
+        engine = get_engine(url, **engine_options)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        return cls(factory, max_retries=max_retries, retry_backoff=retry_backoff)
+
+    @property
+    def session(self) -> AsyncSession:
+        """Session bound to the unit of work running in the current context."""
+        session = _sessions.get().get(self)
+        if session is None:
+            raise RuntimeError('No active transaction')
+        return session
 
     async def with_transaction(self, work: Callable[[], Awaitable[T]]) -> T:
-        async with self._session.begin():
-            return await work()
\ No newline at end of file
+        session = _sessions.get().get(self)
+        if session is not None:
+            async with session.begin_nested():
+                return await work()
+
+        attempt = 0
+        while True:
+            try:
+                return await self._run_outermost(work)
+            except DBAPIError as exc:
+                if attempt >= self._max_retries or not _is_retryable(exc):
+                    raise
+                await asyncio.sleep(self._retry_backoff * (2 ** attempt))
+                attempt += 1
+
+    async def bulk_write(
+        self,
+        table: Table,
+        rows: Sequence[Mapping[str, Any]],
+        *,
+        on_conflict: Optional[str] = None,
+        conflict_columns: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> List[BulkChunkResult]:
+        """Insert ``rows`` into ``table`` in chunks using multi-row statements.
+
+        ``on_conflict`` may be ``'update'`` (upsert non-key columns) or
+        ``'ignore'`` (skip conflicting rows); conflicts are matched on
+        ``conflict_columns``, defaulting to the primary key; dialects without
+        a native upsert raise ``ValueError`` for either mode before anything
+        is written. Plain inserts work on every dialect. Chunks are sized
+        to stay under the dialect's bound-parameter limit. Runs inside the
+        current unit of work, or in a new one when none is active.
+        """
+        if on_conflict not in (None, 'update', 'ignore'):
+            raise ValueError(f'unknown on_conflict mode {on_conflict!r}')
+        bind = self._session_factory.kw.get('bind')
+        if on_conflict is not None and bind is not None and bind.dialect.name not in _UPSERT_DIALECTS:
+            raise ValueError(f'on_conflict is not supported for dialect {bind.dialect.name!r}')
+        if not rows:
+            return []
+
+        async def work() -> List[BulkChunkResult]:
+            session = self.session
+            dialect = session.get_bind().dialect.name
+            columns = list(rows[0].keys())
+            limit = _MAX_BIND_PARAMS.get(dialect, _DEFAULT_MAX_BIND_PARAMS) // max(len(columns), 1)
+            size = max(1, min(chunk_size or limit, limit))
+            if on_conflict is None:
+                stmt = insert(table)
+            else:
+                stmt = _upsert_statement(dialect, table, columns, on_conflict, conflict_columns)
+
+            results: List[BulkChunkResult] = []
+            for index, start in enumerate(range(0, len(rows), size)):
+                chunk = rows[start:start + size]
+                began = time.perf_counter()
+                # A parameter list executes as executemany / batched multi-row VALUES.
+                result = await session.execute(stmt, list(chunk))
+                results.append(BulkChunkResult(
+                    index=index,
+                    rows=len(chunk),
+                    rowcount=result.rowcount,
+                    elapsed=time.perf_counter() - began,
+                ))
+            return results
+
+        if self in _sessions.get():
+            return await work()
+        return await self.with_transaction(work)
+
+    async def _run_outermost(self, work: Callable[[], Awaitable[T]]) -> T:
+        async with self._session_factory() as session:
+            # Copy on write so sibling tasks that inherited the mapping are unaffected.
+            token = _sessions.set({**_sessions.get(), self: session})
+            try:
+                async with session.begin():
+                    return await work()
+            finally:
+                _sessions.reset(token)
@@ -0,0 +1,93 @@
+"""Benchmark suite CLI.
+
+    python -m tests.py.benchmarks run [--filter repository] [--sizes 100,10000] [--output results.json]
+    python -m tests.py.benchmarks baseline [--name local]
+    python -m tests.py.benchmarks compare BASELINE [CURRENT] [--threshold 0.05] [--alpha 0.01]
+
+``baseline`` writes ``baselines/<name>.json`` next to this file. ``compare``
+runs the suite when CURRENT is omitted and exits non-zero on regressions.
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+from tests.py.benchmarks import cases  # noqa: F401  (registers cases)
+from tests.py.benchmarks import harness
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+def _print_result(key: str, stats: Dict[str, Any]) -> None:
+    print(f"{key:<52} {harness.format_duration(stats['median']):>12}  "
+          f"±{stats['stdev'] / stats['median'] * 100 if stats['median'] else 0:5.1f}%  "
+          f"{stats['ops_per_sec']:>14,.0f} ops/s")
+
+
+def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    selected = [c for c in harness.registered() if not args.filter or any(f in c.name for f in args.filter)]
+    overrides: Optional[Dict[str, Sequence[Any]]] = None
+    if args.sizes:
+        overrides = {'size': [int(s) for s in args.sizes.split(',')]}
+    return harness.run(selected, overrides=overrides, repeat=args.repeat, min_time=args.min_time, report=_print_result)
+
+
+def _add_run_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--filter', action='append', help='only run cases whose name contains this (repeatable)')
+    parser.add_argument('--sizes', help='comma-separated store sizes overriding the defaults')
+    parser.add_argument('--repeat', type=int, default=15, help='samples per case')
+    parser.add_argument('--min-time', type=float, default=0.01, help='minimum seconds per sample')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_p = sub.add_parser('run', help='run the suite and print results')
+    _add_run_options(run_p)
+    run_p.add_argument('--output', help='write results JSON to this path')
+
+    base_p = sub.add_parser('baseline', help='run the suite and store it as a named baseline')
+    _add_run_options(base_p)
+    base_p.add_argument('--name', default='local')
+
+    cmp_p = sub.add_parser('compare', help='compare against a baseline and flag significant regressions')
+    _add_run_options(cmp_p)
+    cmp_p.add_argument('baseline', help='baseline JSON path or name under baselines/')
+    cmp_p.add_argument('current', nargs='?', help='results JSON; runs the suite when omitted')
+    cmp_p.add_argument('--threshold', type=float, default=0.05, help='minimum relative slowdown to flag')
+    cmp_p.add_argument('--alpha', type=float, default=0.01, help='significance level')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        document = _run(args)
+        if args.output:
+            harness.save(document, args.output)
+        return 0
+
+    if args.command == 'baseline':
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.name}.json')
+        harness.save(_run(args), path)
+        print(f'baseline written to {path}')
+        return 0
+
+    baseline_path = args.baseline
+    if not os.path.exists(baseline_path):
+        baseline_path = os.path.join(BASELINE_DIR, f'{args.baseline}.json')
+    baseline = harness.load(baseline_path)
+    current = harness.load(args.current) if args.current else _run(args)
+    comparisons = harness.compare(baseline, current, threshold=args.threshold, alpha=args.alpha)
+    regressions = [c for c in comparisons if c.regressed]
+    for c in comparisons:
+        flag = 'REGRESSION' if c.regressed else ''
+        print(f'{c.key:<52} {harness.format_duration(c.baseline):>12} -> {harness.format_duration(c.current):>12}  '
+              f'{c.change * 100:+6.1f}%  p={c.p_value:.4f} {flag}')
+    print(f'{len(regressions)} regression(s) across {len(comparisons)} comparable result(s)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Import helpers and a tiny timing loop shared by the benchmark scripts."""
+
+import importlib.util
+import os
+import random
+import sys
+import time
+import types
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Callable, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+API_DIR = os.path.join(ROOT, 'apps/backend-api')
+DOMAIN_DIR = os.path.join(ROOT, 'libs/my-test-domain')
+
+
+def use_backend_api() -> None:
+    """Make ``apps/backend-api`` modules importable (``import uow`` etc.)."""
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+
+
+def _load(name: str, path: str) -> types.ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_adapter_module() -> types.ModuleType:
+    """Import the SQLAlchemy UoW adapter from the Nx domain layout."""
+    if 'my_test_domain.domain.ports' not in sys.modules:
+        _load('my_test_domain.domain.ports', os.path.join(DOMAIN_DIR, 'domain/src/lib/ports/unit_of_work_port.py'))
+    return _load(
+        'unit_of_work_sqlalchemy_adapter',
+        os.path.join(DOMAIN_DIR, 'infrastructure/src/lib/adapters/unit_of_work_sqlalchemy_adapter.py'),
+    )
+
+
+def ns_per_call(fn: Callable[[], object], number: int = 100_000, repeat: int = 5) -> float:
+    """Best-of-``repeat`` nanoseconds per call of ``fn``."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter_ns() - start) / number)
+    return best
+
+
+class Zipf:
+    """Samples ranks ``0..n-1`` with probability proportional to ``1 / (rank + 1) ** s``."""
+
+    def __init__(self, n: int, s: float, rng: Optional[random.Random] = None) -> None:
+        self._cdf: List[float] = list(accumulate(1.0 / (k ** s) for k in range(1, n + 1)))
+        self._total = self._cdf[-1]
+        self._rng = rng or random.Random()
+
+    def sample(self) -> int:
+        return bisect_left(self._cdf, self._rng.random() * self._total)
@@ -0,0 +1,127 @@
+"""Per-request dependency resolution cost as the dependency graph grows.
+
+Builds a synthetic graph of ``n`` services: a request-scoped handler
+dependency on top of a request-scoped unit of work and a tree of singleton
+services (repositories, caches, buses; fan-out 4), all of which also depend
+on one shared settings object. Every request resolves the handler
+dependency, whose transitive closure is the whole graph. Compared:
+
+* ``fastapi sync``: one ``Depends`` function per node, as ``di.py`` used to
+  be wired (sync functions, so FastAPI runs each on the thread pool);
+* ``fastapi async``: the same graph with ``async def`` dependency functions;
+* ``container``: one ``Depends`` on ``CompiledContainer.depends`` (singletons
+  prebuilt, the request's instances cached in its scope);
+* ``provider``: the compiled provider called directly, without FastAPI.
+
+The FastAPI variants go through ``solve_dependencies`` with a fresh request
+per resolution, as a route does.
+
+Run with: python -m tests.py.benchmarks.bench_di [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List
+
+from fastapi import Depends
+from fastapi.dependencies.utils import get_dependant, solve_dependencies
+from starlette.requests import Request
+
+from tests.py.benchmarks._support import use_backend_api
+
+use_backend_api()
+
+from container import REQUEST, SINGLETON, Container, RequestScope  # noqa: E402
+
+
+class Node:
+    def __init__(self, *deps: Any) -> None:
+        self.deps = deps
+
+
+def _graph(n: int) -> Dict[int, List[int]]:
+    """Dependencies by node: 0 is the handler, 1 the unit of work, ``n - 1`` the settings."""
+    settings = n - 1
+    deps: Dict[int, List[int]] = {0: [1, 2], 1: [settings], settings: []}
+    for i in range(2, settings):
+        first = 4 * (i - 2) + 3
+        deps[i] = [c for c in range(first, first + 4) if c < settings] + [settings]
+    return deps
+
+
+def _is_request_scoped(i: int) -> bool:
+    return i < 2
+
+
+def _fastapi_graph(n: int, asynchronous: bool) -> Callable[..., Any]:
+    singletons: Dict[int, Node] = {}
+    funcs: Dict[int, Callable[..., Any]] = {}
+    graph = _graph(n)
+    for i in sorted(graph, reverse=True):
+        params = ', '.join(f'd{j}=Depends(funcs[{d}])' for j, d in enumerate(graph[i]))
+        args = ', '.join(f'd{j}' for j in range(len(graph[i])))
+        if _is_request_scoped(i):
+            body = f'    return Node({args})'
+        else:
+            body = f'    return singletons[{i}] if {i} in singletons else singletons.setdefault({i}, Node({args}))'
+        src = f"{'async ' if asynchronous else ''}def dep{i}({params}):\n{body}\n"
+        namespace: Dict[str, Any] = {'Depends': Depends, 'funcs': funcs, 'singletons': singletons, 'Node': Node}
+        exec(src, namespace)
+        funcs[i] = namespace[f'dep{i}']
+    return funcs[0]
+
+
+def _container(n: int) -> Any:
+    graph = _graph(n)
+    types = [type(f'Service{i}', (Node,), {}) for i in range(n)]
+    container = Container()
+    for i, cls in enumerate(types):
+        scope = REQUEST if _is_request_scoped(i) else SINGLETON
+        container.register(cls, scope=scope, deps=[types[d] for d in graph[i]])
+    return container.compile(), types[0]
+
+
+def _request() -> Request:
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': [], 'query_string': b''})
+
+
+async def _solve_rate(root: Callable[..., Any], requests: int) -> float:
+    async def handler(value: Any = Depends(root)) -> Any:
+        return value
+
+    dependant = get_dependant(path='/', call=handler)
+    started = time.perf_counter()
+    for _ in range(requests):
+        async with AsyncExitStack() as stack:
+            await solve_dependencies(request=_request(), dependant=dependant, async_exit_stack=stack)
+    return requests / (time.perf_counter() - started)
+
+
+def _provider_rate(provider: Callable[[RequestScope], Any], requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests * 10):
+        provider(RequestScope())
+    return requests * 10 / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.bench_di')
+    parser.add_argument('--requests', type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6} {'fastapi sync/s':>15} {'fastapi async/s':>16} {'container/s':>12} {'provider/s':>12}")
+    for n in (4, 16, 64, 256):
+        compiled, root = _container(n)
+        rates = [
+            asyncio.run(_solve_rate(_fastapi_graph(n, asynchronous=False), args.requests)),
+            asyncio.run(_solve_rate(_fastapi_graph(n, asynchronous=True), args.requests)),
+            asyncio.run(_solve_rate(compiled.depends(root), args.requests)),
+            _provider_rate(compiled.provider(root), args.requests),
+        ]
+        print(f'{n:>6} {rates[0]:>15,.0f} {rates[1]:>16,.0f} {rates[2]:>12,.0f} {rates[3]:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Cost of the metrics instrumentation on repository, UnitOfWork and HTTP hot paths.
+
+Run with: python -m tests.py.benchmarks.bench_metrics_overhead
+"""
+
+import asyncio
+from typing import Any, Dict
+
+from tests.py.benchmarks._support import ns_per_call, use_backend_api
+
+use_backend_api()
+
+from metrics import Counter, Histogram, MetricsMiddleware  # noqa: E402
+from repository import InMemoryUserRepository, UserEntity  # noqa: E402
+from uow import UnitOfWork  # noqa: E402
+
+
+def _primitives() -> Dict[str, float]:
+    counter = Counter('bench_total', 'bench')
+    histogram = Histogram('bench_seconds', 'bench', ('op',))
+    return {
+        'counter.inc': ns_per_call(counter.inc),
+        'histogram.observe': ns_per_call(lambda: histogram.observe(0.0004, 'get')),
+    }
+
+
+def _repository() -> Dict[str, float]:
+    repo = InMemoryUserRepository()
+    repo.save(UserEntity(id='hot', name='Hot'))
+    raw_get: Any = InMemoryUserRepository.get.__wrapped__  # type: ignore[attr-defined]
+    return {
+        'repo.get (raw)': ns_per_call(lambda: raw_get(repo, 'hot')),
+        'repo.get (instrumented)': ns_per_call(lambda: repo.get('hot')),
+    }
+
+
+def _uow() -> Dict[str, float]:
+    repo = InMemoryUserRepository()
+    for i in range(100):
+        repo.save(UserEntity(id=str(i), name='x'))
+    uow = UnitOfWork(repo)
+
+    def commit() -> None:
+        with uow.transaction():
+            uow.users_save(UserEntity(id='0', name='y'))
+
+    return {'uow.transaction commit (100 rows)': ns_per_call(commit, number=20_000)}
+
+
+def _middleware() -> Dict[str, float]:
+    async def endpoint(scope: Any, receive: Any, send: Any) -> None:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def receive() -> Dict[str, Any]:
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message: Dict[str, Any]) -> None:
+        return None
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/users/1'}
+    wrapped = MetricsMiddleware(endpoint)
+    loop = asyncio.new_event_loop()
+    try:
+        return {
+            'asgi call (raw)': ns_per_call(lambda: loop.run_until_complete(endpoint(scope, receive, send)), number=20_000),
+            'asgi call (middleware)': ns_per_call(lambda: loop.run_until_complete(wrapped(scope, receive, send)), number=20_000),
+        }
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    for section in (_primitives, _repository, _uow, _middleware):
+        for label, ns in section().items():
+            print(f'{label:<36} {ns:>10,.0f} ns/op')
+
+
+if __name__ == '__main__':
+    main()
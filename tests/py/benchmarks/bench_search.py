@@ -0,0 +1,100 @@
+"""Build cost, memory and query latency of the post search index.
+
+Generates posts whose words follow a Zipf distribution over a synthetic
+vocabulary (like natural text: a few very common terms and a long tail),
+indexes them, and reports build throughput, index memory (tracemalloc
+peak and resident-set growth), and p50/p99 latency of top-k queries made
+of one to three terms drawn from the same distribution. Also times a
+save/load round trip of the persisted form.
+
+Run with: python -m tests.py.benchmarks.bench_search [--posts 1000000] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+from typing import Iterator, List
+
+from tests.py.benchmarks._support import Zipf, use_backend_api
+
+use_backend_api()
+
+from content_repository import PostEntity  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _posts(n: int, vocab: List[str], sampler: Zipf, rng: random.Random) -> Iterator[PostEntity]:
+    for i in range(n):
+        title = ' '.join(vocab[sampler.sample()] for _ in range(rng.randint(3, 8)))
+        content = ' '.join(vocab[sampler.sample()] for _ in range(rng.randint(10, 60)))
+        yield PostEntity(id=f'post-{i}', user_id=f'user-{i % 1000}', title=title, content=content)
+
+
+def _pct(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.bench_search')
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--vocab', type=int, default=50_000)
+    parser.add_argument('--skew', type=float, default=1.07)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--tracemalloc', action='store_true', help='also trace allocations (slows the build)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocab = [f't{i:x}' for i in range(args.vocab)]
+    sampler = Zipf(args.vocab, args.skew, rng)
+    index = SearchIndex()
+
+    rss_before = _rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for post in _posts(args.posts, vocab, sampler, rng):
+        index.add(post)
+    build = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1] / 2**20 if args.tracemalloc else float('nan')
+    if args.tracemalloc:
+        tracemalloc.stop()
+    rss_growth = _rss_mb() - rss_before
+
+    print(f'posts={args.posts:,} vocab={args.vocab:,} zipf s={args.skew}')
+    print(f'build: {build:.1f}s ({args.posts / build:,.0f} posts/s), rss +{rss_growth:,.0f} MiB, tracemalloc peak {traced_peak:,.0f} MiB')
+
+    print(f"{'terms':>5} {'p50 ms':>9} {'p99 ms':>9} {'qps':>9}")
+    for terms in (1, 2, 3):
+        samples: List[float] = []
+        for _ in range(args.queries):
+            query = ' '.join(vocab[sampler.sample()] for _ in range(terms))
+            t0 = time.perf_counter()
+            index.search(query, args.k)
+            samples.append(time.perf_counter() - t0)
+        print(f'{terms:>5} {_pct(samples, 0.5) * 1e3:>9.3f} {_pct(samples, 0.99) * 1e3:>9.3f} {len(samples) / sum(samples):>9,.0f}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'posts.idx')
+        t0 = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - t0
+        size = os.path.getsize(path) / 2**20
+        t0 = time.perf_counter()
+        SearchIndex.load(path)
+        loaded = time.perf_counter() - t0
+    print(f'persisted: {size:,.0f} MiB, save {saved:.2f}s, load {loaded:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
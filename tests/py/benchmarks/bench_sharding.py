@@ -0,0 +1,76 @@
+"""Write-transaction throughput vs thread count for the sharded user repository.
+
+``shards=1`` is the single-lock baseline: every commit serializes behind one
+lock, as any correct concurrency control over a single dict must. Each
+transaction updates ``--keys-per-tx`` random users. ``--commit-cost`` holds a
+shard's lock for that many seconds per row written to it (GIL released),
+standing in for durable-write latency; without it, CPython's GIL caps scaling of the pure
+in-memory work and only a free-threaded build shows the lock effect.
+
+Run with: python -m tests.py.benchmarks.bench_sharding [--commit-cost 0.0001]
+"""
+
+import argparse
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from tests.py.benchmarks._support import use_backend_api
+
+use_backend_api()
+
+from repository import ShardedUserRepository, UserEntity  # noqa: E402
+from uow import UnitOfWork  # noqa: E402
+
+
+class _CostlyCommitRepository(ShardedUserRepository):
+    def __init__(self, shards: int, commit_cost: float) -> None:
+        super().__init__(shards)
+        self.commit_cost = commit_cost
+
+    def _apply(self, shard, writes: Dict[str, Optional[UserEntity]]) -> None:  # type: ignore[no-untyped-def]
+        if self.commit_cost:
+            time.sleep(self.commit_cost * len(writes))
+        super()._apply(shard, writes)
+
+
+def _run(shards: int, threads: int, transactions: int, keys: int, keys_per_tx: int, commit_cost: float) -> float:
+    repo = _CostlyCommitRepository(shards, commit_cost)
+    for i in range(keys):
+        repo.save(UserEntity(id=f'user-{i}', name=f'User {i}'))
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        uow = UnitOfWork(repo)
+        for _ in range(transactions):
+            with uow.transaction():
+                for _ in range(keys_per_tx):
+                    uow.users_update(UserEntity(id=f'user-{rng.randrange(keys)}', name='Renamed'))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return threads * transactions / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.bench_sharding')
+    parser.add_argument('--keys', type=int, default=10_000)
+    parser.add_argument('--transactions', type=int, default=500, help='transactions per thread')
+    parser.add_argument('--keys-per-tx', type=int, default=1)
+    parser.add_argument('--commit-cost', type=float, default=0.0001, help='seconds a shard lock is held per written row')
+    args = parser.parse_args()
+
+    shard_counts = (1, 4, 16, 64)
+    print(f"{'threads':>7} " + ' '.join(f'{f"shards={n} tx/s":>16}' for n in shard_counts))
+    for threads in (1, 2, 4, 8, 16):
+        rates = [_run(n, threads, args.transactions, args.keys, args.keys_per_tx, args.commit_cost) for n in shard_counts]
+        print(f'{threads:>7} ' + ' '.join(f'{rate:>16,.0f}' for rate in rates))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Request coalescing for GET /users/{id} under skewed (Zipfian) key popularity.
+
+Compares per-request reads with SingleFlight-coalesced reads across thread
+counts and skews, reporting lookups/sec and how many backend reads were
+actually issued. ``--read-cost`` adds a GIL-releasing delay per backend read
+and ``--pool`` caps concurrent backend reads, standing in for a datastore
+round trip behind a fixed-size connection pool.
+
+Run with: python -m tests.py.benchmarks.bench_singleflight [--read-cost 0.0002] [--pool 8]
+"""
+
+import argparse
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from tests.py.benchmarks._support import Zipf, use_backend_api
+
+use_backend_api()
+
+from repository import InMemoryUserRepository, UserEntity  # noqa: E402
+from singleflight import SingleFlight  # noqa: E402
+from uow import UnitOfWork  # noqa: E402
+
+
+def _run(threads: int, lookups: int, skew: float, keys: int, read_cost: float, pool_size: int, coalesce: bool) -> Dict[str, float]:
+    repo = InMemoryUserRepository()
+    for i in range(keys):
+        repo.save(UserEntity(id=f'user-{i}', name=f'User {i}'))
+    flight: SingleFlight[Optional[bytes]] = SingleFlight('bench')
+    reads = [0]
+    reads_lock = threading.Lock()
+    pool = threading.BoundedSemaphore(pool_size)
+
+    def backend_read(user_id: str) -> Optional[bytes]:
+        with reads_lock:
+            reads[0] += 1
+        with pool:
+            if read_cost:
+                time.sleep(read_cost)
+            entity = UnitOfWork(repo).users_get(user_id)
+        return None if entity is None else f'{{"id":"{entity.id}","name":"{entity.name}"}}'.encode()
+
+    lookup: Callable[[str], Optional[bytes]]
+    if coalesce:
+        lookup = lambda uid: flight.do((uid, repo.version), lambda: backend_read(uid))  # noqa: E731
+    else:
+        lookup = backend_read
+
+    def worker(seed: int) -> None:
+        sampler = Zipf(keys, skew, random.Random(seed))
+        for _ in range(lookups):
+            lookup(f'user-{sampler.sample()}')
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = threads * lookups
+    return {'lookups_per_sec': total / elapsed, 'backend_reads': reads[0] / total}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.bench_singleflight')
+    parser.add_argument('--keys', type=int, default=10_000)
+    parser.add_argument('--lookups', type=int, default=2_000, help='lookups per thread')
+    parser.add_argument('--read-cost', type=float, default=0.0002, help='seconds per backend read')
+    parser.add_argument('--pool', type=int, default=8, help='max concurrent backend reads')
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'zipf s':>6} {'direct/s':>12} {'coalesced/s':>12} {'speedup':>8} {'reads/lookup':>13}")
+    for threads in (4, 16, 64):
+        for skew in (0.8, 1.1, 1.4):
+            direct = _run(threads, args.lookups, skew, args.keys, args.read_cost, args.pool, coalesce=False)
+            shared = _run(threads, args.lookups, skew, args.keys, args.read_cost, args.pool, coalesce=True)
+            print(f"{threads:>7} {skew:>6} {direct['lookups_per_sec']:>12,.0f} {shared['lookups_per_sec']:>12,.0f} "
+                  f"{shared['lookups_per_sec'] / direct['lookups_per_sec']:>7.2f}x {shared['backend_reads']:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Rows/sec of UnitOfWorkSQLAlchemyAdapter.bulk_write versus per-row inserts on SQLite.
+
+Run with: python -m tests.py.benchmarks.bench_sqlalchemy_bulk [rows]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import Column, MetaData, String, Table, insert
+
+from tests.py.benchmarks._support import load_adapter_module
+
+
+def _table() -> Table:
+    return Table('users', MetaData(), Column('id', String, primary_key=True), Column('name', String, nullable=False))
+
+
+async def _measure(rows: int) -> Dict[str, float]:
+    mod = load_adapter_module()
+    table = _table()
+    data: List[Dict[str, Any]] = [{'id': str(i), 'name': f'user-{i}'} for i in range(rows)]
+    results: Dict[str, float] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ('per_row', 'bulk', 'bulk_upsert'):
+            url = f"sqlite+aiosqlite:///{os.path.join(tmp, label + '.db')}"
+            uow = mod.UnitOfWorkSQLAlchemyAdapter.from_url(url)
+            engine = mod.get_engine(url)
+            async with engine.begin() as conn:
+                await conn.run_sync(table.metadata.create_all)
+
+            async def per_row() -> None:
+                for row in data:
+                    await uow.session.execute(insert(table).values(**row))
+
+            started = time.perf_counter()
+            if label == 'per_row':
+                await uow.with_transaction(per_row)
+            elif label == 'bulk':
+                await uow.bulk_write(table, data)
+            else:
+                await uow.bulk_write(table, data, on_conflict='update')
+            results[label] = rows / (time.perf_counter() - started)
+        await mod.dispose_engines()
+    return results
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = asyncio.run(_measure(rows))
+    for label, rate in results.items():
+        print(f'{label:<12} {rate:>12,.0f} rows/sec')
+    print(f"bulk speedup {results['bulk'] / results['per_row']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
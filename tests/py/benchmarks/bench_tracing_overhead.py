@@ -0,0 +1,47 @@
+"""Cost of tracing spans when a request is unsampled versus sampled.
+
+Run with: python -m tests.py.benchmarks.bench_tracing_overhead
+"""
+
+from typing import Dict
+
+from tests.py.benchmarks._support import ns_per_call, use_backend_api
+
+use_backend_api()
+
+from tracing import Tracer, span, traced  # noqa: E402
+
+
+def _measure() -> Dict[str, float]:
+    tracer = Tracer(sample_rate=0.0)
+
+    def raw() -> None:
+        return None
+
+    wrapped = traced('bench.noop')(raw)
+
+    def child_span() -> None:
+        with span('child'):
+            pass
+
+    def sampled_trace() -> None:
+        with tracer.trace('root', force=True):
+            with tracer.span('child'):
+                pass
+
+    return {
+        'plain call': ns_per_call(raw),
+        'traced call (unsampled)': ns_per_call(wrapped),
+        'span() outside trace': ns_per_call(child_span),
+        'root decision (unsampled)': ns_per_call(lambda: tracer.trace('root')),
+        'root + child (sampled)': ns_per_call(sampled_trace, number=20_000),
+    }
+
+
+def main() -> None:
+    for label, ns in _measure().items():
+        print(f'{label:<28} {ns:>10,.0f} ns/op')
+
+
+if __name__ == '__main__':
+    main()
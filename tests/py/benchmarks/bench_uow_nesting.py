@@ -0,0 +1,105 @@
+"""Cost of composing UserService calls, as separate transactions vs savepoints.
+
+An operation made of ``calls`` service calls (create, rename, delete of
+users, plus one call per operation that fails and is rolled back) is run:
+
+* ``flat``: each call in its own top-level transaction, the only correct
+  composition before ``transaction()`` nested; every call takes a snapshot
+  and commits (a full copy and diff of the store for the single-dict
+  repository), and a failing call cannot undo the ones before it;
+* ``nested``: all calls inside one outer transaction, so each call's own
+  ``transaction()`` is a savepoint over the shared staging; one snapshot and
+  one commit per operation.
+
+A second table nests the calls instead of chaining them: each call opens
+the next one from inside its transaction, ``depth`` levels deep.
+
+Run with: python -m tests.py.benchmarks.bench_uow_nesting [--users 100000]
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from tests.py.benchmarks._support import use_backend_api
+
+use_backend_api()
+
+from repository import InMemoryUserRepository, ShardedUserRepository, UserEntity  # noqa: E402
+from services import UserService  # noqa: E402
+from uow import UnitOfWork  # noqa: E402
+
+SERVICE = UserService()
+
+
+def _repo(kind: str, users: int) -> object:
+    repo = InMemoryUserRepository() if kind == 'memory' else ShardedUserRepository(16)
+    for i in range(users):
+        repo.save(UserEntity(id=f'user-{i}', name=f'User {i}'))
+    return repo
+
+
+def _calls(uow: UnitOfWork, op: int, calls: int) -> None:
+    for i in range(calls - 1):
+        user_id = f'op-{op}-{i % 4}'
+        if i % 3 == 0:
+            SERVICE.create_user(uow, id=user_id, name='New')
+        elif i % 3 == 1:
+            SERVICE.rename_user(uow, id=f'user-{(op * 7 + i) % 1000}', name='Renamed')
+        else:
+            SERVICE.delete_user(uow, id=user_id)
+    try:
+        SERVICE.rename_user(uow, id='missing', name='x')
+    except KeyError:
+        pass
+
+
+def _flat(uow: UnitOfWork, op: int, calls: int) -> None:
+    _calls(uow, op, calls)
+
+
+def _nested(uow: UnitOfWork, op: int, calls: int) -> None:
+    with uow.transaction():
+        _calls(uow, op, calls)
+
+
+def _deep(uow: UnitOfWork, op: int, depth: int) -> None:
+    if depth == 0:
+        return
+    with uow.transaction():
+        uow.users_save(UserEntity(id=f'deep-{op}-{depth % 8}', name='Deep'))
+        _deep(uow, op, depth - 1)
+
+
+def _ops_per_s(repo: object, run: Callable[[UnitOfWork, int, int], None], size: int, seconds: float) -> float:
+    uow = UnitOfWork(repo)  # type: ignore[arg-type]
+    ops = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        run(uow, ops, size)
+        ops += 1
+    return ops / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.bench_uow_nesting')
+    parser.add_argument('--users', type=int, default=10_000, help='users committed before timing')
+    parser.add_argument('--seconds', type=float, default=0.5, help='time per measurement')
+    args = parser.parse_args()
+
+    for kind in ('memory', 'sharded'):
+        repo = _repo(kind, args.users)
+        print(f'\n{kind} repository, {args.users:,} users: composed operations/s')
+        print(f"{'calls':>6} {'flat':>12} {'nested':>12} {'speedup':>8}")
+        for calls in (2, 4, 8, 16, 32):
+            flat = _ops_per_s(repo, _flat, calls, args.seconds)
+            nested = _ops_per_s(repo, _nested, calls, args.seconds)
+            print(f'{calls:>6} {flat:>12,.0f} {nested:>12,.0f} {nested / flat:>7.1f}x')
+        print(f"{'depth':>6} {'nested ops/s':>12}")
+        for depth in (1, 4, 16, 64, 256):
+            print(f'{depth:>6} {_ops_per_s(repo, _deep, depth, args.seconds):>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Request-body validation throughput: dict path vs raw JSON path.
+
+For each of User, Post and Comment, compares
+
+* ``legacy``: ``json.loads`` followed by ``model_validate`` on models that
+  trim and check strings in Python ``field_validator`` functions (the
+  validators as they were before the string constraints moved into
+  pydantic-core; reproduced below);
+* ``dict``: ``json.loads`` followed by ``model_validate`` on the current models;
+* ``json``: ``validate_json`` on the raw bytes (strict, single pass).
+
+Run with: python -m tests.py.benchmarks.bench_validation [--seconds 1.0]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, StrictBool, field_validator
+
+from libs.backend.type_utils.validators.comment import Comment
+from libs.backend.type_utils.validators.post import Post
+from libs.backend.type_utils.validators.types import validate_json
+from libs.backend.type_utils.validators.user import User
+
+
+def _trim(value: Any, message: str) -> str:
+    if not isinstance(value, str):
+        raise TypeError(message)
+    trimmed = value.strip()
+    if not trimmed:
+        raise ValueError(message)
+    return trimmed
+
+
+class LegacyUser(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
+    id: UUID
+    name: str = Field(..., min_length=1)
+    email: EmailStr
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @field_validator('name')
+    @classmethod
+    def validate_name(cls, value: str) -> str:
+        return _trim(value, 'Name cannot be empty')
+
+
+class LegacyPost(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
+    id: UUID
+    user_id: UUID
+    title: str = Field(..., min_length=1)
+    content: Optional[str] = None
+    published: StrictBool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @field_validator('title', mode='before')
+    @classmethod
+    def validate_title(cls, value: Any) -> str:
+        return _trim(value, 'Title cannot be empty')
+
+    @field_validator('content', mode='before')
+    @classmethod
+    def validate_content(cls, value: Any) -> Optional[str]:
+        return None if value is None else _trim(value, 'Content cannot be empty')
+
+
+class LegacyComment(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
+    id: UUID
+    post_id: UUID
+    user_id: UUID
+    content: str = Field(..., min_length=1)
+    created_at: datetime
+
+    @field_validator('content')
+    @classmethod
+    def validate_content(cls, value: str) -> str:
+        return _trim(value, 'Content cannot be empty')
+
+
+def _payloads() -> Dict[str, bytes]:
+    now = datetime.now(timezone.utc).isoformat()
+    docs = {
+        'user': {'id': str(uuid4()), 'name': ' Ada ', 'email': 'ada@example.com', 'created_at': now, 'updated_at': None},
+        'post': {
+            'id': str(uuid4()), 'user_id': str(uuid4()), 'title': ' Hello ', 'content': 'Body text ' * 20,
+            'published': True, 'created_at': now, 'updated_at': now,
+        },
+        'comment': {'id': str(uuid4()), 'post_id': str(uuid4()), 'user_id': str(uuid4()), 'content': ' Nice ', 'created_at': now},
+    }
+    return {name: json.dumps(doc).encode() for name, doc in docs.items()}
+
+
+def _rate(fn: Callable[[], object], seconds: float) -> float:
+    for _ in range(1000):
+        fn()
+    count, started = 0, time.perf_counter()
+    while True:
+        for _ in range(1000):
+            fn()
+        count += 1000
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.bench_validation')
+    parser.add_argument('--seconds', type=float, default=1.0, help='measurement time per cell')
+    args = parser.parse_args()
+
+    models = {'user': (LegacyUser, User), 'post': (LegacyPost, Post), 'comment': (LegacyComment, Comment)}
+    print(f"{'model':>8} {'legacy/s':>12} {'dict/s':>12} {'json/s':>12} {'json vs legacy':>15}")
+    for name, raw in _payloads().items():
+        legacy, current = models[name]
+        rates = [
+            _rate(lambda: legacy.model_validate(json.loads(raw)), args.seconds),
+            _rate(lambda: current.model_validate(json.loads(raw)), args.seconds),
+            _rate(lambda: validate_json(current, raw), args.seconds),
+        ]
+        print(f'{name:>8} {rates[0]:>12,.0f} {rates[1]:>12,.0f} {rates[2]:>12,.0f} {rates[2] / rates[0]:>14.2f}x')
+
+
+if __name__ == '__main__':
+    main()
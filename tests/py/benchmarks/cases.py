@@ -0,0 +1,196 @@
+"""Benchmark cases for the backend-api repository, UnitOfWork and service, and the validators."""
+
+import itertools
+import json
+import random
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+from uuid import uuid4
+
+from tests.py.benchmarks._support import Zipf, use_backend_api
+from tests.py.benchmarks.harness import benchmark
+
+use_backend_api()
+
+from content_repository import CommentEntity, InMemoryCommentRepository, InMemoryPostRepository, PostEntity  # noqa: E402
+from hotkeys import KeyTracker  # noqa: E402
+from repository import InMemoryUserRepository, UserEntity  # noqa: E402
+from services import UserService  # noqa: E402
+from uow import UnitOfWork  # noqa: E402
+
+from libs.backend.type_utils.validators.comment import Comment  # noqa: E402
+from libs.backend.type_utils.validators.post import Post  # noqa: E402
+from libs.backend.type_utils.validators.types import validate_json  # noqa: E402
+from libs.backend.type_utils.validators.user import User  # noqa: E402
+
+SIZES = (100, 10_000, 100_000)
+
+
+def _populated(size: int) -> InMemoryUserRepository:
+    repo = InMemoryUserRepository()
+    for i in range(size):
+        repo.save(UserEntity(id=f'user-{i}', name=f'User {i}'))
+    return repo
+
+
+def _new_ids() -> Callable[[], str]:
+    # Reuse a small id pool so inserts overwrite and the store size stays near ``size``.
+    ids = itertools.cycle([f'new-{i}' for i in range(16)])
+    return lambda: next(ids)
+
+
+def _key_cycle(size: int) -> Callable[[], str]:
+    ids = itertools.cycle([f'user-{i}' for i in range(0, size, max(1, size // 1024))])
+    return lambda: next(ids)
+
+
+@benchmark('repository.get', size=SIZES)
+def repository_get(size: int) -> Callable[[], object]:
+    repo = _populated(size)
+    key = _key_cycle(size)
+    return lambda: repo.get(key())
+
+
+@benchmark('repository.save', size=SIZES)
+def repository_save(size: int) -> Callable[[], object]:
+    repo = _populated(size)
+    new_id = _new_ids()
+    return lambda: repo.save(UserEntity(id=new_id(), name='New'))
+
+
+@benchmark('repository.update', size=SIZES)
+def repository_update(size: int) -> Callable[[], object]:
+    repo = _populated(size)
+    key = _key_cycle(size)
+    return lambda: repo.update(UserEntity(id=key(), name='Renamed'))
+
+
+@benchmark('repository.delete', size=SIZES)
+def repository_delete(size: int) -> Callable[[], object]:
+    # Each call deletes one user and re-inserts it so the store size stays fixed.
+    repo = _populated(size)
+    key = _key_cycle(size)
+    entity = UserEntity(id='', name='Restored')
+
+    def op() -> None:
+        user_id = key()
+        repo.delete(user_id)
+        entity.id = user_id
+        repo.save(entity)
+
+    return op
+
+
+@benchmark('uow.begin_commit', size=SIZES)
+def uow_begin_commit(size: int) -> Callable[[], object]:
+    uow = UnitOfWork(_populated(size))
+
+    def op() -> None:
+        with uow.transaction():
+            pass
+
+    return op
+
+
+@benchmark('uow.begin_rollback', size=SIZES)
+def uow_begin_rollback(size: int) -> Callable[[], object]:
+    uow = UnitOfWork(_populated(size))
+
+    def op() -> None:
+        try:
+            with uow.transaction():
+                raise RuntimeError('rollback')
+        except RuntimeError:
+            pass
+
+    return op
+
+
+@benchmark('service.create_user', size=SIZES)
+def service_create_user(size: int) -> Callable[[], object]:
+    uow = UnitOfWork(_populated(size))
+    svc = UserService()
+    new_id = _new_ids()
+    return lambda: svc.create_user(uow, id=new_id(), name='New')
+
+
+@benchmark('service.rename_user', size=SIZES)
+def service_rename_user(size: int) -> Callable[[], object]:
+    uow = UnitOfWork(_populated(size))
+    svc = UserService()
+    key = _key_cycle(size)
+    return lambda: svc.rename_user(uow, id=key(), name='Renamed')
+
+
+@benchmark('service.delete_user', size=SIZES)
+def service_delete_user(size: int) -> Callable[[], object]:
+    uow = UnitOfWork(_populated(size))
+    svc = UserService()
+    key = _key_cycle(size)
+
+    def op() -> None:
+        user_id = key()
+        svc.delete_user(uow, id=user_id)
+        svc.create_user(uow, id=user_id, name='Restored')
+
+    return op
+
+
+def _posts(size: int) -> InMemoryPostRepository:
+    # ``size`` posts spread over size // 10 users: ten posts per user at every size.
+    repo = InMemoryPostRepository()
+    for i in range(size):
+        repo.save(PostEntity(id=f'post-{i}', user_id=f'user-{i % max(1, size // 10)}', title='t'))
+    return repo
+
+
+@benchmark('posts.by_user', size=SIZES)
+def posts_by_user(size: int) -> Callable[[], object]:
+    repo = _posts(size)
+    key = _key_cycle(max(1, size // 10))
+    return lambda: repo.by_user(key())
+
+
+@benchmark('comments.count_for_post', size=SIZES)
+def comments_count_for_post(size: int) -> Callable[[], object]:
+    repo = InMemoryCommentRepository()
+    for i in range(size):
+        repo.save(CommentEntity(id=f'c-{i}', post_id=f'post-{i % max(1, size // 10)}', user_id='u', content='c'))
+    posts = itertools.cycle([f'post-{i}' for i in range(0, max(1, size // 10), max(1, size // 10240))])
+    return lambda: repo.count_for_post(next(posts))
+
+
+@benchmark('hotkeys.record', top_k=(16, 256, 4096))
+def hotkeys_record(top_k: int) -> Callable[[], object]:
+    # Zipf-distributed keys over a large id space: most reads hit tracked
+    # keys, the tail keeps replacing the summary's minimum.
+    zipf = Zipf(100_000, 1.1, random.Random(0))
+    keys = itertools.cycle([f'user-{zipf.sample()}' for _ in range(65_536)])
+    tracker = KeyTracker('bench', top_k=top_k)
+    return lambda: tracker.read(next(keys))
+
+
+def _validator_payloads() -> Dict[str, Dict[str, Any]]:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        'user': {'id': str(uuid4()), 'name': ' Ada ', 'email': 'ada@example.com', 'created_at': now, 'updated_at': None},
+        'post': {
+            'id': str(uuid4()), 'user_id': str(uuid4()), 'title': ' Hello ', 'content': 'Body text',
+            'published': True, 'created_at': now, 'updated_at': now,
+        },
+        'comment': {'id': str(uuid4()), 'post_id': str(uuid4()), 'user_id': str(uuid4()), 'content': 'Nice', 'created_at': now},
+    }
+
+
+@benchmark('validators.model_validate', model=('user', 'post', 'comment'))
+def validators_model_validate(model: str) -> Callable[[], object]:
+    cls = {'user': User, 'post': Post, 'comment': Comment}[model]
+    payload = _validator_payloads()[model]
+    return lambda: cls.model_validate(payload)
+
+
+@benchmark('validators.validate_json', model=('user', 'post', 'comment'))
+def validators_validate_json(model: str) -> Callable[[], object]:
+    cls = {'user': User, 'post': Post, 'comment': Comment}[model]
+    raw = json.dumps(_validator_payloads()[model]).encode()
+    return lambda: validate_json(cls, raw)
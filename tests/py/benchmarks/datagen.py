@@ -0,0 +1,591 @@
+"""Synthetic datasets generated from ``tests/fixtures/database-schema.json``.
+
+Tables and columns come from the schema, the same input ``DbToPython``
+consumes. A ``uuid`` column named ``<name>_id`` references table ``<name>s``
+when it exists (or the table named by a column's ``references`` key). A
+Profile says how many rows each table gets, which tables are generated as
+children of a parent row (comments per post), how references are
+distributed (Zipfian authorship) and how often nullable columns are null.
+
+Rows are JSON-ready dicts. A table is generated in chunks of driving rows.
+Each chunk has its own RNG seeded from ``(seed, table, chunk)``; ids, and the
+``created_at`` of counted rows, are pure functions of a row's index. So chunks are
+independent: any number of processes can generate any subset of them, and
+the output for a seed does not depend on how the work was split.
+Referenced rows always exist and are created before the rows that
+reference them.
+
+    python -m tests.py.benchmarks.datagen --users 1000000 --workers 8 --output data/
+    python -m tests.py.benchmarks.datagen --users 1000000 --shard 0/4 --output data/
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from tests.py.benchmarks._support import ROOT, use_backend_api
+
+DEFAULT_SCHEMA = os.path.join(ROOT, 'tests/fixtures/database-schema.json')
+FANOUT_DISTRIBUTIONS = ('fixed', 'poisson', 'geometric')
+
+Row = Dict[str, Any]
+Schema = Dict[str, Dict[str, Dict[str, Any]]]
+
+_INTEGER = {'integer', 'bigint', 'smallint', 'serial', 'bigserial'}
+_FLOAT = {'numeric', 'decimal', 'double', 'real'}
+_TEXT = {'text', 'varchar', 'char'}
+_TIMESTAMP = {'timestamptz', 'timestamp'}
+_SUPPORTED = {'uuid', 'boolean', 'date', 'time', 'json', 'jsonb', 'bytea'} | _INTEGER | _FLOAT | _TEXT | _TIMESTAMP
+
+_FIRST = (
+    'Ada', 'Alan', 'Barbara', 'Claude', 'Dennis', 'Edsger', 'Frances', 'Grace', 'Guido', 'Hedy',
+    'Ivan', 'Jean', 'Ken', 'Leslie', 'Linus', 'Margaret', 'Niklaus', 'Radia', 'Sophie', 'Tim',
+)
+_LAST = (
+    'Allen', 'Backus', 'Cerf', 'Dijkstra', 'Floyd', 'Hamilton', 'Hopper', 'Kay', 'Knuth', 'Lamport',
+    'Liskov', 'Lovelace', 'McCarthy', 'Perlman', 'Ritchie', 'Shannon', 'Thompson', 'Turing', 'Wirth', 'Wilson',
+)
+_WORDS = (
+    'cache', 'index', 'query', 'latency', 'thread', 'shard', 'commit', 'schema', 'buffer', 'vector',
+    'stream', 'batch', 'lock', 'queue', 'worker', 'profile', 'memory', 'record', 'server', 'client',
+    'request', 'response', 'table', 'column', 'budget', 'window', 'metric', 'sample', 'graph', 'replica',
+    'the', 'a', 'of', 'to', 'and', 'with', 'for', 'on', 'under', 'after',
+)
+
+
+class ZipfSampler:
+    """Draws ranks ``0..n-1`` with probability proportional to ``1 / (rank + 1) ** s``.
+
+    Rejection-inversion (Hoermann and Derflinger): constant memory and
+    expected O(1) time per draw, whatever ``n``, so it can skew references
+    over millions of rows. ``s == 0`` is uniform.
+    """
+
+    def __init__(self, n: int, s: float) -> None:
+        if n < 1 or s < 0:
+            raise ValueError('n must be >= 1 and s >= 0')
+        self.n = n
+        self.s = s
+        self._x1 = self._big_h(1.5) - 1.0
+        self._xn = self._big_h(n + 0.5)
+        self._cut = 2.0 - self._big_h_inv(self._big_h(2.5) - self._h(2.0))
+
+    def _h(self, x: float) -> float:
+        return math.exp(-self.s * math.log(x))
+
+    def _big_h(self, x: float) -> float:
+        log_x = math.log(x)
+        return _expm1_over((1.0 - self.s) * log_x) * log_x
+
+    def _big_h_inv(self, x: float) -> float:
+        t = max(-1.0, x * (1.0 - self.s))
+        return math.exp(_log1p_over(t) * x)
+
+    def sample(self, rng: random.Random) -> int:
+        if self.s == 0.0:
+            return rng.randrange(self.n)
+        while True:
+            u = self._xn + rng.random() * (self._x1 - self._xn)
+            x = self._big_h_inv(u)
+            k = min(max(int(x + 0.5), 1), self.n)
+            if k - x <= self._cut or u >= self._big_h(k + 0.5) - self._h(k):
+                return k - 1
+
+
+def _log1p_over(x: float) -> float:
+    return math.log1p(x) / x if abs(x) > 1e-8 else 1.0 - x * (0.5 - x * (1.0 / 3.0 - 0.25 * x))
+
+
+def _expm1_over(x: float) -> float:
+    return math.expm1(x) / x if abs(x) > 1e-8 else 1.0 + x * 0.5 * (1.0 + x / 3.0 * (1.0 + 0.25 * x))
+
+
+@dataclass(frozen=True)
+class Fanout:
+    """Rows of a table generated per row of the table ``parent`` references."""
+
+    parent: str
+    mean: float
+    distribution: str = 'geometric'
+
+    def __post_init__(self) -> None:
+        if self.distribution not in FANOUT_DISTRIBUTIONS:
+            raise ValueError(f"fanout distribution must be one of {', '.join(FANOUT_DISTRIBUTIONS)}")
+
+    def draw(self, rng: random.Random) -> int:
+        mean = self.mean
+        if self.distribution == 'fixed':
+            return int(round(mean))
+        if mean <= 0:
+            return 0
+        if self.distribution == 'poisson':
+            if mean > 30:
+                return max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+            limit, k, product = math.exp(-mean), 0, rng.random()
+            while product > limit:
+                k += 1
+                product *= rng.random()
+            return k
+        # Geometric on 0, 1, 2, ...: most parents get few children, a long tail gets many.
+        return int(math.log(1.0 - rng.random()) / math.log(mean / (mean + 1.0)))
+
+
+@dataclass
+class Profile:
+    """Shape of a dataset.
+
+    ``counts`` gives the row count of tables generated on their own,
+    ``fanout`` the tables generated per parent row. ``skew`` is the Zipf
+    exponent of a reference column (``'posts.user_id'``; 0, the default, is
+    uniform); rank 0 is the first row, so the most referenced rows are also
+    the oldest. ``null_rates`` and ``true_rates`` are keyed the same way and
+    default to ``null_rate`` for nullable columns and 0.5 for booleans.
+    """
+
+    counts: Dict[str, int] = field(default_factory=dict)
+    fanout: Dict[str, Fanout] = field(default_factory=dict)
+    skew: Dict[str, float] = field(default_factory=dict)
+    null_rates: Dict[str, float] = field(default_factory=dict)
+    true_rates: Dict[str, float] = field(default_factory=dict)
+    null_rate: float = 0.1
+    seed: int = 0
+    start: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    span: timedelta = timedelta(days=365)
+
+    @classmethod
+    def social(
+        cls,
+        users: int,
+        *,
+        posts_per_user: float = 5.0,
+        comments_per_post: float = 4.0,
+        author_skew: float = 1.1,
+        commenter_skew: float = 0.8,
+        fanout: str = 'geometric',
+        seed: int = 0,
+    ) -> 'Profile':
+        """Users, their posts and comments on them, for the repo's schema."""
+        return cls(
+            counts={'users': users, 'posts': int(users * posts_per_user)},
+            fanout={'comments': Fanout('post_id', comments_per_post, fanout)},
+            skew={'posts.user_id': author_skew, 'comments.user_id': commenter_skew},
+            true_rates={'posts.published': 0.8},
+            seed=seed,
+        )
+
+
+def load_schema(path: str = DEFAULT_SCHEMA) -> Schema:
+    """``{table: {column: definition}}`` from a schema file."""
+    with open(path, encoding='utf-8') as fh:
+        data = json.load(fh)
+    return {table: dict(definition['columns']) for table, definition in data['tables'].items()}
+
+
+def foreign_keys(schema: Schema) -> Dict[str, Dict[str, str]]:
+    """``{table: {column: referenced table}}`` for every table of ``schema``."""
+    out: Dict[str, Dict[str, str]] = {}
+    for table, columns in schema.items():
+        refs: Dict[str, str] = {}
+        for column, definition in columns.items():
+            target = definition.get('references')
+            if target is None and column.endswith('_id') and f'{column[:-3]}s' in schema:
+                target = f'{column[:-3]}s'
+            if target is not None:
+                if target not in schema:
+                    raise ValueError(f'{table}.{column} references unknown table {target!r}')
+                refs[column] = target
+        out[table] = refs
+    return out
+
+
+class Dataset:
+    """Deterministic rows of every table in ``profile`` (see the module docstring).
+
+    Picklable, so worker processes can be handed the whole dataset and a
+    list of ``(table, chunk)`` pairs.
+    """
+
+    def __init__(self, schema: Schema, profile: Profile, *, chunk_size: int = 10_000) -> None:
+        self.schema = schema
+        self.profile = profile
+        self.chunk_size = chunk_size
+        self.references = foreign_keys(schema)
+        for table, columns in schema.items():
+            for column, definition in columns.items():
+                if definition['type'].lower() not in _SUPPORTED:
+                    raise ValueError(f"{table}.{column}: unsupported column type {definition['type']!r}")
+        for table in profile.fanout:
+            if table in profile.counts:
+                raise ValueError(f'{table} is both counted and fanned out')
+        self.order = self._order()
+        self._key = profile.seed.to_bytes(8, 'little', signed=True)
+        self._samplers: Dict[str, ZipfSampler] = {}
+        # No row is older than the first row of every table it samples a
+        # reference from, so there is always a row to pick.
+        self._earliest: Dict[str, datetime] = {}
+        for table in self.order:
+            earliest = profile.start
+            for column, target in self.references[table].items():
+                if self._parent_column(table) == column:
+                    continue
+                if target not in profile.counts:
+                    raise ValueError(f'{table}.{column} references {target}, which has no row count')
+                self._samplers[f'{table}.{column}'] = ZipfSampler(
+                    max(profile.counts[target], 1), profile.skew.get(f'{table}.{column}', 0.0),
+                )
+                earliest = max(earliest, self.created_at(target, 0) + timedelta(minutes=1))
+            self._earliest[table] = earliest
+
+    @classmethod
+    def from_schema(cls, profile: Profile, path: str = DEFAULT_SCHEMA, **options: Any) -> 'Dataset':
+        return cls(load_schema(path), profile, **options)
+
+    def _parent_column(self, table: str) -> Optional[str]:
+        fanout = self.profile.fanout.get(table)
+        return fanout.parent if fanout is not None else None
+
+    def _order(self) -> List[str]:
+        """Tables of the profile, each after every table it references."""
+        wanted = [t for t in self.schema if t in self.profile.counts or t in self.profile.fanout]
+        for table in (*self.profile.counts, *self.profile.fanout):
+            if table not in self.schema:
+                raise ValueError(f'unknown table {table!r}')
+        order: List[str] = []
+        visiting: List[str] = []
+
+        def visit(table: str) -> None:
+            if table in order:
+                return
+            if table in visiting:
+                raise ValueError('reference cycle: ' + ' -> '.join((*visiting, table)))
+            visiting.append(table)
+            for target in self.references[table].values():
+                if target in wanted:
+                    visit(target)
+            visiting.pop()
+            order.append(table)
+
+        for table in wanted:
+            visit(table)
+        return order
+
+    def _drivers(self, table: str) -> int:
+        """Rows that drive ``table``'s chunks: its own rows, or its parents'."""
+        fanout = self.profile.fanout.get(table)
+        if fanout is None:
+            return self.profile.counts[table]
+        parent = self.references[table].get(fanout.parent)
+        if parent is None or parent not in self.profile.counts:
+            raise ValueError(f'{table}.{fanout.parent} must reference a table with a row count')
+        return self.profile.counts[parent]
+
+    def chunks(self, table: str) -> range:
+        return range(-(-self._drivers(table) // self.chunk_size))
+
+    def tasks(self, shard: Optional[Tuple[int, int]] = None) -> List[Tuple[str, int]]:
+        """Every ``(table, chunk)`` in generation order, or shard ``i`` of ``n`` of them."""
+        tasks = [(table, chunk) for table in self.order for chunk in self.chunks(table)]
+        if shard is None:
+            return tasks
+        index, total = shard
+        return tasks[index::total]
+
+    def row_id(self, table: str, index: int, child: int = -1) -> Any:
+        """Primary key of row ``index`` (of child ``child`` of parent ``index``)."""
+        if self.schema[table]['id']['type'].lower() != 'uuid':
+            return index + 1 if child < 0 else (index << 20) + child + 1
+        raw = bytearray(blake2b(f'{table}:{index}:{child}'.encode(), digest_size=16, key=self._key).digest())
+        raw[6] = (raw[6] & 0x0F) | 0x40  # version 4
+        raw[8] = (raw[8] & 0x3F) | 0x80  # RFC 4122 variant
+        h = raw.hex()
+        return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+    def created_at(self, table: str, index: int) -> datetime:
+        """``created_at`` of counted row ``index``: evenly spread over the profile's span."""
+        profile = self.profile
+        moment = profile.start + profile.span * ((index + 0.5) / max(profile.counts[table], 1))
+        return max(moment.replace(microsecond=0), self._earliest[table])
+
+    def _pick(self, sampler: ZipfSampler, target: str, before: datetime, rng: random.Random) -> int:
+        """Index of a ``target`` row created before ``before``, drawn from ``sampler``."""
+        profile = self.profile
+        count = sampler.n
+        # Rows created at least a second earlier, so the order survives rounding to seconds.
+        elapsed = (before - profile.start - timedelta(seconds=1)) / profile.span
+        bound = max(1, min(count, math.ceil(elapsed * count - 0.5)))
+        index = sampler.sample(rng)
+        for _ in range(4):
+            if index < bound:
+                break
+            index = sampler.sample(rng)
+        else:
+            index %= bound
+        return index if self.created_at(target, index) < before else 0
+
+    def rows(self, table: str, chunk: int) -> Iterator[Row]:
+        """Rows of one chunk of ``table``, always the same for the same seed."""
+        rng = random.Random(f'{self.profile.seed}:{table}:{chunk}')
+        begin = chunk * self.chunk_size
+        end = min(begin + self.chunk_size, self._drivers(table))
+        fanout = self.profile.fanout.get(table)
+        columns = self._columns(table)
+        if fanout is None:
+            for index in range(begin, end):
+                yield self._row(table, columns, rng, self.row_id(table, index), {}, self.created_at(table, index))
+            return
+        parent = self.references[table][fanout.parent]
+        for index in range(begin, end):
+            fixed = {fanout.parent: self.row_id(parent, index)}
+            since = max(self.created_at(parent, index), self._earliest[table])
+            for child in range(fanout.draw(rng)):
+                # Replies trickle in: each child follows its parent by an exponential delay.
+                created = (since + timedelta(hours=rng.expovariate(1 / 24), seconds=1)).replace(microsecond=0)
+                yield self._row(table, columns, rng, self.row_id(table, index, child), fixed, created)
+
+    def stream(self, table: str) -> Iterator[Row]:
+        for chunk in self.chunks(table):
+            yield from self.rows(table, chunk)
+
+    def _columns(self, table: str) -> List[Tuple[str, Callable[[random.Random, Row], Any], float]]:
+        """``(column, generate, null rate)`` per column, in schema order."""
+        out = []
+        for column, definition in self.schema[table].items():
+            key = f'{table}.{column}'
+            null = self.profile.null_rates.get(key, self.profile.null_rate) if definition.get('nullable') else 0.0
+            out.append((column, self._generator(table, column, definition['type'].lower()), null))
+        return out
+
+    def _generator(self, table: str, column: str, kind: str) -> Callable[[random.Random, Row], Any]:
+        key = f'{table}.{column}'
+        target = self.references[table].get(column)
+        if target is not None:
+            sampler = self._samplers.get(key)
+            if sampler is None:
+                return lambda rng, row: row[column]
+            return lambda rng, row: self.row_id(target, self._pick(sampler, target, row['created_at'], rng))
+        if kind in _TEXT:
+            return _TEXT_COLUMNS.get(column, _words)
+        if kind in _TIMESTAMP:
+            if column == 'updated_at':
+                return lambda rng, row: row['created_at'] + timedelta(hours=rng.expovariate(1 / 72))
+            return lambda rng, row: row['created_at']
+        if kind == 'boolean':
+            rate = self.profile.true_rates.get(key, 0.5)
+            return lambda rng, row: rng.random() < rate
+        if kind in _INTEGER:
+            return lambda rng, row: rng.randrange(1_000_000)
+        if kind in _FLOAT:
+            return lambda rng, row: round(rng.random() * 1000, 2)
+        if kind == 'date':
+            return lambda rng, row: row['created_at'].date().isoformat()
+        if kind == 'time':
+            return lambda rng, row: f'{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}'
+        if kind in ('json', 'jsonb'):
+            return lambda rng, row: {}
+        if kind == 'bytea':
+            return lambda rng, row: rng.getrandbits(128).to_bytes(16, 'little').hex()
+        return lambda rng, row: str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def _row(
+        self,
+        table: str,
+        columns: Sequence[Tuple[str, Callable[[random.Random, Row], Any], float]],
+        rng: random.Random,
+        row_id: Any,
+        fixed: Row,
+        created: datetime,
+    ) -> Row:
+        # created_at first: references and updated_at depend on it.
+        row: Row = {'id': row_id, **fixed, 'created_at': created}
+        for column, generate, null in columns:
+            if column in fixed or column == 'id':
+                continue
+            if null and rng.random() < null:
+                row[column] = None
+            elif column != 'created_at':
+                row[column] = generate(rng, row)
+        return {column: _jsonable(row[column]) for column in self.schema[table]}
+
+
+def _jsonable(value: Any) -> Any:
+    return value.isoformat(timespec='seconds') if isinstance(value, datetime) else value
+
+
+def _name(rng: random.Random, row: Row) -> str:
+    return f'{rng.choice(_FIRST)} {rng.choice(_LAST)}'
+
+
+def _email(rng: random.Random, row: Row) -> str:
+    # The row id keeps emails unique; the name part keeps them readable.
+    local = str(row.get('name') or 'user').lower().replace(' ', '.')
+    return f"{local}.{str(row['id'])[:8]}@example.com"
+
+
+def _title(rng: random.Random, row: Row) -> str:
+    return rng.choice(_TITLES)
+
+
+def _content(rng: random.Random, row: Row) -> str:
+    return ' '.join(rng.choices(_SENTENCES, k=rng.randint(1, 4)))
+
+
+def _words(rng: random.Random, row: Row) -> str:
+    return ' '.join(rng.choices(_WORDS, k=rng.randint(1, 6)))
+
+
+# Drawing whole titles and sentences from fixed pools keeps text generation
+# from dominating the cost of a row; the pools are the same in every process.
+_pool = random.Random('datagen-text')
+_TITLES = tuple(' '.join(_pool.choices(_WORDS, k=_pool.randint(3, 8))).capitalize() for _ in range(4096))
+_SENTENCES = tuple(' '.join(_pool.choices(_WORDS, k=_pool.randint(5, 15))).capitalize() + '.' for _ in range(4096))
+del _pool
+
+_TEXT_COLUMNS: Dict[str, Callable[[random.Random, Row], str]] = {
+    'name': _name,
+    'email': _email,
+    'title': _title,
+    'content': _content,
+}
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def _write_chunk(dataset: Dataset, directory: str, table: str, chunk: int) -> int:
+    rows = 0
+    with open(os.path.join(directory, f'.{table}.{chunk:06d}.ndjson'), 'w', encoding='utf-8') as fh:
+        for row in dataset.rows(table, chunk):
+            fh.write(_dumps(row))
+            fh.write('\n')
+            rows += 1
+    return rows
+
+
+def write_ndjson(
+    dataset: Dataset, directory: str, *, workers: int = 1, shard: Optional[Tuple[int, int]] = None,
+) -> Dict[str, int]:
+    """Write ``<table>.ndjson`` per table into ``directory``; returns rows per table.
+
+    Chunks are generated by ``workers`` processes into part files, which are
+    then joined in chunk order, so the files are identical for any number
+    of workers. With ``shard=(i, n)`` only every n-th chunk is generated
+    into ``<table>.<i>-of-<n>.ndjson``; the n shards together hold every row.
+    """
+    os.makedirs(directory, exist_ok=True)
+    tasks = dataset.tasks(shard)
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            counts = list(pool.map(_write_chunk, *zip(*[(dataset, directory, t, c) for t, c in tasks]), chunksize=4))
+    else:
+        counts = [_write_chunk(dataset, directory, table, chunk) for table, chunk in tasks]
+    written = {table: 0 for table in dataset.order}
+    suffix = '' if shard is None else f'.{shard[0]}-of-{shard[1]}'
+    for table in dataset.order:
+        with open(os.path.join(directory, f'{table}{suffix}.ndjson'), 'wb') as out:
+            for (part_table, chunk), rows in zip(tasks, counts):
+                if part_table != table:
+                    continue
+                part = os.path.join(directory, f'.{table}.{chunk:06d}.ndjson')
+                with open(part, 'rb') as fh:
+                    shutil.copyfileobj(fh, out)
+                os.unlink(part)
+                written[table] += rows
+    return written
+
+
+def load_into(dataset: Dataset, uow: Any, *, batch: int = 10_000) -> Dict[str, int]:
+    """Save the ``users``, ``posts`` and ``comments`` rows through a backend UnitOfWork.
+
+    Rows are committed ``batch`` per transaction and keep only the columns
+    the entities have. The single-dict user repository copies its store on
+    every commit, so give it a large ``batch``. Returns rows per table.
+    """
+    use_backend_api()
+    from content_repository import CommentEntity, PostEntity
+    from repository import UserEntity
+
+    targets = {
+        'users': (UserEntity, uow.users_save),
+        'posts': (PostEntity, uow.posts_save),
+        'comments': (CommentEntity, uow.comments_save),
+    }
+    loaded: Dict[str, int] = {}
+    for table in dataset.order:
+        if table not in targets:
+            continue
+        entity, save = targets[table]
+        names = [f.name for f in fields(entity)]
+        loaded[table] = 0
+        rows = dataset.stream(table)
+        while True:
+            with uow.transaction():
+                count = 0
+                for row in rows:
+                    save(entity(**{name: row[name] for name in names}))
+                    count += 1
+                    if count >= batch:
+                        break
+            loaded[table] += count
+            if count < batch:
+                break
+    return loaded
+
+
+def _shard(value: str) -> Tuple[int, int]:
+    index, _, total = value.partition('/')
+    shard = (int(index), int(total))
+    if not 0 <= shard[0] < shard[1]:
+        raise argparse.ArgumentTypeError('expected i/n with 0 <= i < n')
+    return shard
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.datagen')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--posts-per-user', type=float, default=5.0)
+    parser.add_argument('--comments-per-post', type=float, default=4.0)
+    parser.add_argument('--fanout', choices=FANOUT_DISTRIBUTIONS, default='geometric', help='comments-per-post distribution')
+    parser.add_argument('--author-skew', type=float, default=1.1, help='Zipf exponent of post authorship (0 = uniform)')
+    parser.add_argument('--commenter-skew', type=float, default=0.8, help='Zipf exponent of comment authorship')
+    parser.add_argument('--null-rate', type=float, default=0.1, help='null rate of nullable columns')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shard', type=_shard, help='generate only shard i of n (i/n), e.g. one per machine')
+    parser.add_argument('--output', required=True, help='directory for the <table>.ndjson files')
+    args = parser.parse_args(argv)
+
+    profile = Profile.social(
+        args.users,
+        posts_per_user=args.posts_per_user,
+        comments_per_post=args.comments_per_post,
+        author_skew=args.author_skew,
+        commenter_skew=args.commenter_skew,
+        fanout=args.fanout,
+        seed=args.seed,
+    )
+    profile.null_rate = args.null_rate
+    dataset = Dataset.from_schema(profile, args.schema, chunk_size=args.chunk_size)
+    started = time.perf_counter()
+    written = write_ndjson(dataset, args.output, workers=args.workers, shard=args.shard)
+    elapsed = time.perf_counter() - started
+    for table, rows in written.items():
+        print(f'{table:<12} {rows:>12,} rows')
+    total = sum(written.values())
+    print(f'{total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Minimal benchmark harness: case registry, timing, JSON baselines and regression checks.
+
+Cases register with :func:`benchmark` and return the zero-argument callable to
+time. Each case is timed as ``repeat`` samples of an auto-calibrated inner
+loop; a sample is the mean seconds per call over that loop. Comparisons use a
+one-sided Mann-Whitney U test on the samples, so a change is only flagged when
+it is both statistically significant and larger than the relative threshold.
+"""
+
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+Setup = Callable[..., Callable[[], object]]
+
+
+@dataclass
+class Case:
+    """A registered benchmark; ``params`` maps a parameter name to the values to sweep."""
+
+    name: str
+    setup: Setup
+    params: Dict[str, Sequence[Any]] = field(default_factory=dict)
+
+    def expand(self, overrides: Optional[Dict[str, Sequence[Any]]] = None) -> List[Dict[str, Any]]:
+        grid: List[Dict[str, Any]] = [{}]
+        for key, values in self.params.items():
+            chosen = overrides.get(key, values) if overrides else values
+            grid = [dict(point, **{key: value}) for point in grid for value in chosen]
+        return grid
+
+
+_REGISTRY: Dict[str, Case] = {}
+
+
+def benchmark(name: str, **params: Sequence[Any]) -> Callable[[Setup], Setup]:
+    """Register ``setup`` as benchmark ``name``, swept over ``params``."""
+
+    def decorator(setup: Setup) -> Setup:
+        if name in _REGISTRY:
+            raise ValueError(f'benchmark already registered: {name}')
+        _REGISTRY[name] = Case(name, setup, dict(params))
+        return setup
+
+    return decorator
+
+
+def registered() -> List[Case]:
+    return list(_REGISTRY.values())
+
+
+def result_key(name: str, point: Dict[str, Any]) -> str:
+    if not point:
+        return name
+    return name + '[' + ','.join(f'{k}={v}' for k, v in sorted(point.items())) + ']'
+
+
+def _calibrate(fn: Callable[[], object], min_time: float) -> int:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 24:
+            return number
+        # Aim directly for min_time, growing at least 2x per step.
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)) + 1)
+
+
+def measure(fn: Callable[[], object], *, repeat: int = 15, min_time: float = 0.01) -> Dict[str, Any]:
+    """Time ``fn`` and summarize per-call seconds over ``repeat`` samples."""
+    number = _calibrate(fn, min_time)
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    median = statistics.median(samples)
+    return {
+        'number': number,
+        'samples': samples,
+        'median': median,
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'min': min(samples),
+        'ops_per_sec': 1.0 / median if median > 0 else float('inf'),
+    }
+
+
+def run(
+    cases: Iterable[Case],
+    *,
+    overrides: Optional[Dict[str, Sequence[Any]]] = None,
+    repeat: int = 15,
+    min_time: float = 0.01,
+    report: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Run ``cases`` and return a JSON-serializable results document."""
+    results: Dict[str, Any] = {}
+    for case in cases:
+        for point in case.expand(overrides):
+            fn = case.setup(**point)
+            stats = measure(fn, repeat=repeat, min_time=min_time)
+            key = result_key(case.name, point)
+            results[key] = stats
+            if report is not None:
+                report(key, stats)
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'min_time': min_time,
+        },
+        'results': results,
+    }
+
+
+def save(document: Dict[str, Any], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(document, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as fh:
+        data: Dict[str, Any] = json.load(fh)
+    return data
+
+
+def mann_whitney_greater(current: Sequence[float], baseline: Sequence[float]) -> float:
+    """One-sided p-value that ``current`` samples are stochastically larger than ``baseline``.
+
+    Uses the normal approximation with tie correction, adequate for the
+    sample counts the harness collects (>= 8 per side).
+    """
+    n1, n2 = len(current), len(baseline)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    combined = sorted([(v, 0) for v in current] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        avg = (i + j) / 2.0 + 1.0
+        for k in range(i, j + 1):
+            ranks[k] = avg
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+    r1 = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u1 = r1 - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0 if u1 <= n1 * n2 / 2.0 else 0.0
+    z = (u1 - n1 * n2 / 2.0 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+@dataclass
+class Comparison:
+    key: str
+    baseline: float
+    current: float
+    p_value: float
+    regressed: bool
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1.0 if self.baseline else 0.0
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    *,
+    threshold: float = 0.05,
+    alpha: float = 0.01,
+) -> List[Comparison]:
+    """Compare medians of every result present in both documents.
+
+    A result regresses when the median slowed by more than ``threshold``
+    (relative) and the slowdown is significant at level ``alpha``.
+    """
+    out: List[Comparison] = []
+    base_results = baseline.get('results', {})
+    for key, cur in current.get('results', {}).items():
+        base = base_results.get(key)
+        if base is None:
+            continue
+        p_value = mann_whitney_greater(cur['samples'], base['samples'])
+        change = cur['median'] / base['median'] - 1.0 if base['median'] else 0.0
+        out.append(Comparison(
+            key=key,
+            baseline=base['median'],
+            current=cur['median'],
+            p_value=p_value,
+            regressed=change > threshold and p_value < alpha,
+        ))
+    return out
+
+
+def format_duration(seconds: float) -> str:
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
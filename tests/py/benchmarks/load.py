@@ -0,0 +1,352 @@
+"""HTTP load harness for the backend API.
+
+Drives a weighted mix of ``/users`` operations (including the ``/with-error``
+rollback endpoints) against the FastAPI app, either in-process through an
+ASGI transport or over loopback against a uvicorn server, at a fixed
+concurrency (closed loop) or a fixed arrival rate (open loop). In open-loop
+mode latency is measured from each request's scheduled start, so queueing
+delay is not hidden when the server falls behind.
+
+    python -m tests.py.benchmarks.load --concurrency 32 --duration 10
+    python -m tests.py.benchmarks.load --rate 500 --duration 10 --mix get=80,create=10,create_error=10
+    python -m tests.py.benchmarks.load --uvicorn --concurrency 64 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+
+from tests.py.benchmarks._support import use_backend_api
+
+# Relative weights per operation; rollback endpoints are included to capture their cost.
+DEFAULT_MIX: Dict[str, float] = {
+    'get': 60,
+    'create': 15,
+    'update': 10,
+    'delete': 5,
+    'create_error': 5,
+    'update_error': 5,
+}
+
+# Status codes that count as a successful outcome for each operation.
+EXPECTED_STATUS: Dict[str, Set[int]] = {
+    'get': {200},
+    'create': {200},
+    'update': {200},
+    'delete': {204},
+    'create_error': {500},
+    'update_error': {500},
+}
+
+PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class OperationStats:
+    count: int = 0
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class LoadReport:
+    mode: str
+    duration: float
+    requests: int
+    throughput: float
+    errors: int
+    error_rate: float
+    latency_ms: Dict[str, float]
+    operations: Dict[str, OperationStats]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def format(self) -> str:
+        pct = '  '.join(f'{k}={v:.2f}ms' for k, v in self.latency_ms.items())
+        lines = [
+            f'{self.mode}: {self.requests} requests in {self.duration:.2f}s '
+            f'({self.throughput:,.0f} req/s), errors {self.errors} ({self.error_rate * 100:.2f}%)',
+            f'  overall  {pct}',
+        ]
+        for name, op in self.operations.items():
+            op_pct = '  '.join(f'{k}={v:.2f}ms' for k, v in op.latency_ms.items())
+            lines.append(f'  {name:<13} n={op.count:<7} err={op.errors:<5} {op_pct}  {op.statuses}')
+        return '\n'.join(lines)
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, op: str, latency: float, status: Optional[int]) -> None:
+        self.samples.setdefault(op, []).append(latency)
+        key = str(status) if status is not None else 'exception'
+        counts = self.statuses.setdefault(op, {})
+        counts[key] = counts.get(key, 0) + 1
+        if status not in EXPECTED_STATUS[op]:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    def report(self, mode: str, duration: float) -> LoadReport:
+        all_samples = sorted(v for values in self.samples.values() for v in values)
+        operations: Dict[str, OperationStats] = {}
+        for op, values in sorted(self.samples.items()):
+            ordered = sorted(values)
+            operations[op] = OperationStats(
+                count=len(values),
+                errors=self.errors.get(op, 0),
+                statuses=dict(sorted(self.statuses[op].items())),
+                latency_ms={f'p{p:g}': percentile(ordered, p) * 1000 for p in PERCENTILES},
+            )
+        total = len(all_samples)
+        errors = sum(self.errors.values())
+        return LoadReport(
+            mode=mode,
+            duration=duration,
+            requests=total,
+            throughput=total / duration if duration else 0.0,
+            errors=errors,
+            error_rate=errors / total if total else 0.0,
+            latency_ms={f'p{p:g}': percentile(all_samples, p) * 1000 for p in PERCENTILES},
+            operations=operations,
+        )
+
+
+class _Workload:
+    """Chooses operations by weight and tracks the ids they act on."""
+
+    def __init__(self, mix: Dict[str, float], seeded: List[str], rng: random.Random) -> None:
+        unknown = set(mix) - set(EXPECTED_STATUS)
+        if unknown:
+            raise ValueError(f'unknown operations in mix: {sorted(unknown)}')
+        self._names = [k for k, w in mix.items() if w > 0]
+        self._weights = [mix[k] for k in self._names]
+        self._seeded = seeded
+        self._created: List[str] = []
+        self._rng = rng
+
+    def next(self) -> str:
+        return self._rng.choices(self._names, self._weights)[0]
+
+    def request(self, op: str) -> Tuple[str, str, Optional[Dict[str, str]]]:
+        rng = self._rng
+        if op == 'get':
+            uid = rng.choice(self._seeded)
+            return 'GET', f'/users/{uid}', None
+        if op == 'create':
+            uid = str(uuid.uuid4())
+            self._created.append(uid)
+            return 'POST', '/users', {'id': uid, 'name': 'Load'}
+        if op == 'update':
+            uid = rng.choice(self._seeded)
+            return 'PUT', f'/users/{uid}', {'id': uid, 'name': f'Load {rng.randrange(1000)}'}
+        if op == 'delete':
+            # Only delete ids this run created so reads keep hitting existing users.
+            uid = self._created.pop() if self._created else str(uuid.uuid4())
+            return 'DELETE', f'/users/{uid}', None
+        if op == 'create_error':
+            uid = str(uuid.uuid4())
+            return 'POST', '/users/with-error', {'id': uid, 'name': 'Rollback'}
+        uid = rng.choice(self._seeded)
+        return 'PUT', f'/users/{uid}/with-error', {'id': uid, 'name': 'Rollback'}
+
+
+async def _issue(client: httpx.AsyncClient, workload: _Workload, recorder: _Recorder, op: str, started: float) -> None:
+    method, url, body = workload.request(op)
+    status: Optional[int] = None
+    try:
+        response = await client.request(method, url, json=body)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = None
+    recorder.record(op, time.perf_counter() - started, status)
+
+
+async def _seed(client: httpx.AsyncClient, count: int) -> List[str]:
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    for uid in ids:
+        response = await client.post('/users', json={'id': uid, 'name': 'Seed'})
+        response.raise_for_status()
+    return ids
+
+
+async def _closed_loop(
+    client: httpx.AsyncClient, workload: _Workload, recorder: _Recorder, concurrency: int, duration: float,
+) -> None:
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await _issue(client, workload, recorder, workload.next(), time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _open_loop(
+    client: httpx.AsyncClient, workload: _Workload, recorder: _Recorder, rate: float, duration: float,
+    max_in_flight: int,
+) -> None:
+    start = time.perf_counter()
+    total = int(rate * duration)
+    in_flight: Set["asyncio.Task[None]"] = set()
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            # Client-side cap: count as an error rather than queueing unboundedly.
+            recorder.record(workload.next(), time.perf_counter() - scheduled, None)
+            continue
+        task = asyncio.ensure_future(_issue(client, workload, recorder, workload.next(), scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+class _UvicornThread:
+    """Runs uvicorn on loopback in a background thread for the duration of a run."""
+
+    def __init__(self, app: Any) -> None:
+        import uvicorn
+
+        self.port = _free_port()
+        config = uvicorn.Config(app, host='127.0.0.1', port=self.port, log_level='warning', access_log=False)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return f'http://127.0.0.1:{self.port}'
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def _load_app() -> Any:
+    use_backend_api()
+    from main import app  # type: ignore
+
+    return app
+
+
+async def run_load(
+    app: Any = None,
+    *,
+    base_url: Optional[str] = None,
+    mix: Optional[Dict[str, float]] = None,
+    concurrency: Optional[int] = 16,
+    rate: Optional[float] = None,
+    duration: float = 5.0,
+    seed_users: int = 1000,
+    max_in_flight: int = 10_000,
+    seed: int = 0,
+) -> LoadReport:
+    """Run one load scenario and return its report.
+
+    Uses an in-process ASGI transport against ``app`` unless ``base_url`` is
+    given. ``rate`` (requests/sec) selects open-loop mode; otherwise
+    ``concurrency`` workers issue requests back to back.
+    """
+    if base_url is None:
+        transport: httpx.AsyncBaseTransport = httpx.ASGITransport(app=app if app is not None else _load_app())
+        client = httpx.AsyncClient(transport=transport, base_url='http://loadtest')
+    else:
+        limits = httpx.Limits(max_connections=max(concurrency or 0, 100), max_keepalive_connections=None)
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0)
+
+    async with client:
+        seeded = await _seed(client, seed_users)
+        workload = _Workload(mix or DEFAULT_MIX, seeded, random.Random(seed))
+        recorder = _Recorder()
+        started = time.perf_counter()
+        if rate is not None:
+            await _open_loop(client, workload, recorder, rate, duration, max_in_flight)
+            mode = f'open-loop rate={rate:g}/s'
+        else:
+            assert concurrency is not None
+            await _closed_loop(client, workload, recorder, concurrency, duration)
+            mode = f'closed-loop concurrency={concurrency}'
+        elapsed = time.perf_counter() - started
+    return recorder.report(mode, elapsed)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m tests.py.benchmarks.load')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate', type=float, help='fixed arrival rate (req/s); enables open-loop mode')
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--mix', type=parse_mix, help='comma-separated op=weight, e.g. get=80,create=20')
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--uvicorn', action='store_true', help='serve over loopback with uvicorn')
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    async def scenario(base_url: Optional[str]) -> LoadReport:
+        return await run_load(
+            None if base_url else _load_app(),
+            base_url=base_url,
+            mix=args.mix,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            seed_users=args.seed_users,
+        )
+
+    runner: Callable[[Optional[str]], Awaitable[LoadReport]] = scenario
+    if args.uvicorn:
+        with _UvicornThread(_load_app()) as url:
+            report = asyncio.run(runner(url))
+    else:
+        report = asyncio.run(runner(None))
+
+    print(report.format())
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report.to_dict(), fh, indent=2)
+            fh.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from tests.py.benchmarks import load
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+import admission  # type: ignore  # noqa: E402
+
+
+def _contended_app(peak=None) -> FastAPI:
+    """App whose reads serialize on one lock: ~200 req/s of capacity.
+
+    ``peak`` collects the in-flight gauge as seen by each admitted read.
+    """
+    app = FastAPI()
+    app.router.route_class = admission.AdmissionRoute
+    lock = threading.Lock()
+
+    @app.post('/users')
+    def create(user: dict) -> dict:
+        return user
+
+    @app.get('/users/{user_id}')
+    def read(user_id: str) -> dict:
+        if peak is not None:
+            peak.append(admission.ADMISSION_IN_FLIGHT.value('GET', '/users/{user_id}'))
+        with lock:
+            time.sleep(0.005)
+        return {'id': user_id}
+
+    return app
+
+
+def _overload(app: FastAPI) -> load.LoadReport:
+    return asyncio.run(load.run_load(app, rate=400, duration=1.0, seed_users=5, mix={'get': 1}))
+
+
+def test_admission_sheds_excess_load_and_bounds_in_flight():
+    admission.POLICY.configure('GET', '/users/{user_id}', limit=1, max_queue=2, queue_timeout=0.05)
+    before = sum(admission.ADMISSION_REJECTED.value('GET', '/users/{user_id}', reason) for reason in ('queue_full', 'queue_timeout'))
+    peak = []
+    try:
+        shed = _overload(_contended_app(peak))
+        rejected = sum(admission.ADMISSION_REJECTED.value('GET', '/users/{user_id}', reason) for reason in ('queue_full', 'queue_timeout'))
+        assert admission.ADMISSION_IN_FLIGHT.value('GET', '/users/{user_id}') == 0
+    finally:
+        admission.POLICY.reset()
+
+    get = shed.operations['get']
+    assert get.statuses.get('503', 0) > 0
+    assert get.statuses.get('200', 0) > 0
+    # Every 503 was an admission rejection, and no more than the limit ever ran at once.
+    assert rejected - before == get.statuses['503']
+    assert peak and max(peak) == 1
+
+
+def test_rejection_carries_retry_after():
+    app = _contended_app()
+    admission.POLICY.configure('GET', '/users/{user_id}', limit=1, max_queue=0, retry_after=3)
+    try:
+        limiter = admission.POLICY.limiter_for('GET', '/users/{user_id}')
+        limiter._in_flight = 1  # simulate a request already holding the only slot
+        res = TestClient(app).get('/users/x')
+    finally:
+        admission.POLICY.reset()
+    assert res.status_code == 503
+    assert res.headers['retry-after'] == '3'
+    assert res.json() == {'detail': 'Service overloaded'}
+
+
+def test_streamed_response_holds_its_slot_until_the_body_is_sent():
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    app.router.route_class = admission.AdmissionRoute
+    seen = []
+
+    @app.get('/export')
+    def export():
+        def body():
+            for i in range(3):
+                seen.append(admission.ADMISSION_IN_FLIGHT.value('GET', '/export'))
+                yield f'{i}\n'
+        return StreamingResponse(body())
+
+    admission.POLICY.configure('GET', '/export', limit=1, max_queue=0)
+    try:
+        res = TestClient(app).get('/export')
+        after = admission.ADMISSION_IN_FLIGHT.value('GET', '/export')
+    finally:
+        admission.POLICY.reset()
+    assert res.text == '0\n1\n2\n'
+    assert seen == [1, 1, 1]
+    assert after == 0
@@ -0,0 +1,90 @@
+import os
+import sys
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+@pytest.fixture
+def debug_token(monkeypatch):
+    _client()
+    import debug  # type: ignore
+    monkeypatch.setattr(debug.SETTINGS, 'token', 's3cret')
+    yield {'X-Debug-Token': 's3cret'}
+    if tracemalloc.is_tracing():
+        debug.MEMORY.stop()
+
+
+def test_disabled_without_token():
+    client = _client()
+    import debug  # type: ignore
+    assert not debug.SETTINGS.enabled
+    assert client.get('/debug/memory').status_code == 404
+    assert client.post('/debug/memory/start', headers={'X-Debug-Token': ''}).status_code == 404
+    assert not tracemalloc.is_tracing()
+    assert '/debug/memory' not in client.get('/openapi.json').json()['paths']
+
+
+
+def test_open_units_are_tracked_only_while_enabled(debug_token):
+    import uow  # type: ignore
+    assert uow._TRACK_OPEN
+    import debug  # type: ignore
+    debug.SETTINGS.token = ''
+    assert not uow._TRACK_OPEN
+
+
+def test_requires_matching_token(debug_token):
+    client = _client()
+    assert client.get('/debug/memory').status_code == 403
+    assert client.get('/debug/memory', headers={'X-Debug-Token': 'nope'}).status_code == 403
+    assert client.get('/debug/memory', headers=debug_token).status_code == 200
+
+
+def test_structures_include_tenant_partitions(debug_token, monkeypatch):
+    from uuid import uuid4
+
+    client = _client()
+    import di  # type: ignore
+    monkeypatch.setattr(di.TENANTS.settings, 'tenants', frozenset({'*'}))
+    tenant = f't-{uuid4().hex[:12]}'
+    headers = {'X-Tenant-Id': tenant}
+    client.post('/users', json={'id': 'author', 'name': 'A'}, headers=headers)
+    client.post('/posts', json={'id': 'p1', 'user_id': 'author', 'title': 'Hello'}, headers=headers)
+    structures = client.get('/debug/memory', headers=debug_token).json()['structures']
+    prefix = f'tenants.{tenant}.'
+    assert structures[prefix + 'users.store']['entries'] == 1
+    assert structures[prefix + 'posts.rows']['entries'] == 1
+    assert structures[prefix + 'posts.search']['bytes'] > 0
+    assert prefix + 'uow.staged' not in structures and 'uow.staged' in structures
+
+
+def test_trace_snapshot_and_diff(debug_token):
+    client = _client()
+    status = client.get('/debug/memory', headers=debug_token).json()
+    assert status['tracing'] is False
+    assert {'users.store', 'posts.rows', 'posts.indexes', 'comments.rows', 'uow.staged'} <= set(status['structures'])
+    assert client.post('/debug/memory/snapshots', headers=debug_token).status_code == 409
+
+    assert client.post('/debug/memory/start', params={'frames': 3}, headers=debug_token).json()['tracing'] is True
+    assert client.post('/debug/memory/start', headers=debug_token).status_code == 409
+    base = client.post('/debug/memory/snapshots', headers=debug_token).json()['id']
+    for i in range(20):
+        client.post('/users', json={'id': f'mem-{i}', 'name': 'x' * 150})
+    top = client.get('/debug/memory/top', params={'limit': 5, 'group_by': 'filename'}, headers=debug_token).json()
+    assert len(top) == 5 and all(entry['size'] > 0 for entry in top)
+    diff = client.get('/debug/memory/diff', params={'base': base}, headers=debug_token).json()
+    assert diff and {'size_diff', 'count_diff', 'site'} <= set(diff[0])
+    assert client.get('/debug/memory/diff', params={'base': 999}, headers=debug_token).status_code == 404
+    assert client.get('/debug/memory/top', params={'group_by': 'module'}, headers=debug_token).status_code == 422
+
+    assert client.post('/debug/memory/stop', headers=debug_token).json()['tracing'] is False
@@ -0,0 +1,49 @@
+import os
+import sys
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+AUTH = {'X-Debug-Token': 's3cret'}
+
+
+def test_hot_keys_endpoint_and_metrics(monkeypatch):
+    client = _client()
+    import debug  # type: ignore
+    monkeypatch.setattr(debug.SETTINGS, 'token', 's3cret')
+    hot = str(uuid4())
+    client.post('/users', json={'id': hot, 'name': 'Hot'})
+    for _ in range(300):
+        client.get(f'/users/{hot}')
+    client.put(f'/users/{hot}', json={'id': hot, 'name': 'Hotter'})
+
+    res = client.get('/debug/hotkeys', params={'table': 'users', 'limit': 5}, headers=AUTH)
+    assert res.status_code == 200
+    body = res.json()
+    assert body['enabled'] is True
+    [users] = body['tables']
+    assert users['table'] == 'users' and users['reads'] >= 300
+    top = users['keys'][0]
+    assert top['key'] == hot
+    assert top['reads'] >= 300 and top['writes'] >= 2
+    assert 0.9 < top['read_ratio'] < 1.0
+
+    metrics = client.get('/metrics').text
+    assert 'hotkey_operations_total{table="users",op="read"}' in metrics
+    assert 'hotkey_top1_share{table="users"}' in metrics
+
+
+def test_hot_keys_endpoint_requires_the_debug_token(monkeypatch):
+    client = _client()
+    import debug  # type: ignore
+    monkeypatch.setattr(debug.SETTINGS, 'token', 's3cret')
+    assert client.get('/debug/hotkeys').status_code == 403
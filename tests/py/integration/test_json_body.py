@@ -0,0 +1,47 @@
+import os
+import sys
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def test_invalid_bodies_are_422_with_body_locations():
+    client = _client()
+    res = client.post('/users', json={'id': str(uuid4()), 'name': 7})
+    assert res.status_code == 422
+    assert [(e['loc'], e['type']) for e in res.json()['detail']] == [(['body', 'name'], 'string_type')]
+
+    res = client.post('/users', content=b'{"id": ', headers={'content-type': 'application/json'})
+    assert res.status_code == 422
+    assert res.json()['detail'][0]['type'] == 'json_invalid'
+
+    res = client.post('/users')
+    assert res.status_code == 422
+    assert res.json()['detail'] == [{'type': 'missing', 'loc': ['body'], 'msg': 'Field required', 'input': None}]
+
+
+def test_strict_bodies_reject_coercion():
+    client = _client()
+    uid = str(uuid4())
+    assert client.post('/users', json={'id': uid, 'name': 'Author'}).status_code == 200
+    res = client.post('/posts', json={'id': str(uuid4()), 'user_id': uid, 'title': 'T', 'published': 'yes'})
+    assert res.status_code == 422
+    assert res.json()['detail'][0]['loc'] == ['body', 'published']
+    res = client.post(f'/posts/{uuid4()}/comments', json={'id': str(uuid4()), 'user_id': uid})
+    assert res.status_code == 422
+    assert res.json()['detail'][0]['loc'] == ['body', 'content']
+
+
+def test_request_body_schema_is_documented():
+    client = _client()
+    schema = client.get('/openapi.json').json()['paths']['/posts']['post']['requestBody']
+    assert schema['required'] is True
+    assert set(schema['content']['application/json']['schema']['required']) == {'id', 'user_id', 'title'}
@@ -0,0 +1,27 @@
+import asyncio
+
+from tests.py.benchmarks import load
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert load.percentile(values, 50) == 50
+    assert load.percentile(values, 99) == 99
+    assert load.percentile(values, 99.9) == 100
+    assert load.percentile([], 50) == 0.0
+
+
+def test_closed_loop_covers_mix_including_rollbacks():
+    report = asyncio.run(load.run_load(concurrency=4, duration=0.3, seed_users=20))
+    assert report.requests > 0
+    assert report.errors == 0
+    assert {'get', 'create', 'create_error', 'update_error'} <= set(report.operations)
+    assert report.operations['create_error'].statuses == {'500': report.operations['create_error'].count}
+    assert set(report.latency_ms) == {'p50', 'p95', 'p99', 'p99.9'}
+
+
+def test_open_loop_issues_requests_at_fixed_rate():
+    report = asyncio.run(load.run_load(rate=100, duration=0.3, seed_users=5, mix={'get': 1}))
+    assert report.requests == 30
+    assert report.error_rate == 0.0
+    assert report.mode.startswith('open-loop')
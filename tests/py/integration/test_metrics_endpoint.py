@@ -0,0 +1,53 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def _sample(body: str, prefix: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def test_metrics_endpoint_prometheus_format():
+    client = _client()
+    res = client.get('/metrics')
+    assert res.status_code == 200
+    assert res.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert '# TYPE http_request_duration_seconds histogram' in res.text
+    assert '# TYPE uow_commits_total counter' in res.text
+
+
+def test_metrics_record_routes_by_template():
+    client = _client()
+    before = _sample(client.get('/metrics').text, 'http_requests_total{method="GET",route="/users/{user_id}",status="404"}')
+    client.get('/users/metrics-missing-1')
+    client.get('/users/metrics-missing-2')
+    body = client.get('/metrics').text
+    after = _sample(body, 'http_requests_total{method="GET",route="/users/{user_id}",status="404"}')
+    assert after - before == 2
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/users/{user_id}",le="+Inf"}' in body
+    assert 'route="/metrics"' not in body
+
+
+def test_metrics_record_uow_and_repository_activity():
+    client = _client()
+    before = client.get('/metrics').text
+    uid = '66666666-6666-6666-6666-666666666666'
+    assert client.post('/users', json={"id": uid, "name": "Metric"}).status_code == 200
+    assert client.post('/users/with-error', json={"id": uid + 'x', "name": "Fail"}).status_code == 500
+    after = client.get('/metrics').text
+    assert _sample(after, 'uow_commits_total') - _sample(before, 'uow_commits_total') == 1
+    assert _sample(after, 'uow_rollbacks_total') - _sample(before, 'uow_rollbacks_total') == 1
+    assert _sample(after, 'repository_store_entries{repository="users"}') >= 1
+    assert 'repository_operation_duration_seconds_count{repository="users",operation="save"}' in after
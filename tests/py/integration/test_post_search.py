@@ -0,0 +1,41 @@
+import os
+import sys
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def test_search_ranks_and_tracks_writes():
+    client = _client()
+    author = str(uuid4())
+    assert client.post('/users', json={'id': author, 'name': 'Author'}).status_code == 200
+    word = f'zq{uuid4().hex[:10]}'
+    strong, weak = str(uuid4()), str(uuid4())
+    client.post('/posts', json={'id': strong, 'user_id': author, 'title': f'{word} guide', 'content': f'all about {word}'})
+    client.post('/posts', json={'id': weak, 'user_id': author, 'title': 'Misc', 'content': f'mentions {word} once among many other words here'})
+
+    res = client.get('/posts/search', params={'q': word.upper()})
+    assert res.status_code == 200
+    hits = res.json()['results']
+    assert [h['post']['id'] for h in hits] == [strong, weak]
+    assert hits[0]['score'] > hits[1]['score'] > 0
+    assert [h['post']['id'] for h in client.get('/posts/search', params={'q': word, 'k': 1}).json()['results']] == [strong]
+
+    assert client.delete(f'/posts/{strong}').status_code == 204
+    hits = client.get('/posts/search', params={'q': word}).json()['results']
+    assert [h['post']['id'] for h in hits] == [weak]
+
+
+def test_search_validates_query():
+    client = _client()
+    assert client.get('/posts/search').status_code == 422
+    assert client.get('/posts/search', params={'q': 'x', 'k': 0}).status_code == 422
+    assert client.get('/posts/search', params={'q': f'nothing{uuid4().hex}'}).json() == {'results': []}
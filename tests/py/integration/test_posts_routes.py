@@ -0,0 +1,61 @@
+import os
+import sys
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def _user(client):
+    uid = str(uuid4())
+    assert client.post('/users', json={'id': uid, 'name': 'Author'}).status_code == 200
+    return uid
+
+
+def test_posts_by_user_and_comment_counts():
+    client = _client()
+    author = _user(client)
+    post_ids = [str(uuid4()) for _ in range(3)]
+    for i, pid in enumerate(post_ids):
+        res = client.post('/posts', json={'id': pid, 'user_id': author, 'title': f'Post {i}'})
+        assert res.status_code == 200
+    for n in range(2):
+        res = client.post(f'/posts/{post_ids[0]}/comments', json={'id': str(uuid4()), 'user_id': author, 'content': f'c{n}'})
+        assert res.status_code == 200
+        assert res.json()['post_id'] == post_ids[0]
+
+    listing = client.get(f'/users/{author}/posts').json()
+    assert listing['count'] == 3
+    assert [p['id'] for p in listing['posts']] == post_ids
+    assert client.get(f'/posts/{post_ids[0]}').json()['comment_count'] == 2
+    assert client.get(f'/posts/{post_ids[1]}').json()['comment_count'] == 0
+    assert client.get(f'/posts/{post_ids[0]}/comments').json()['count'] == 2
+
+
+def test_delete_post_removes_its_comments():
+    client = _client()
+    author = _user(client)
+    pid = str(uuid4())
+    client.post('/posts', json={'id': pid, 'user_id': author, 'title': 'Bye'})
+    client.post(f'/posts/{pid}/comments', json={'id': str(uuid4()), 'user_id': author, 'content': 'x'})
+    assert client.delete(f'/posts/{pid}').status_code == 204
+    assert client.get(f'/posts/{pid}').status_code == 404
+    assert client.get(f'/posts/{pid}/comments').json() == {'count': 0, 'comments': []}
+    assert client.get(f'/users/{author}/posts').json()['count'] == 0
+
+
+def test_missing_references_are_404():
+    client = _client()
+    res = client.post('/posts', json={'id': str(uuid4()), 'user_id': str(uuid4()), 'title': 'Orphan'})
+    assert res.status_code == 404
+    assert res.json()['detail'] == 'User not found'
+    res = client.post(f'/posts/{uuid4()}/comments', json={'id': str(uuid4()), 'user_id': str(uuid4()), 'content': 'x'})
+    assert res.status_code == 404
+    assert res.json()['detail'] == 'Post not found'
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+
+def _main():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    import main  # type: ignore
+    return main
+
+
+def _fresh_users(main, monkeypatch):
+    # A shared user store already written by other tests is, by design, not
+    # loaded again; give the default tenant an empty store to load into.
+    from repository import InMemoryUserRepository  # type: ignore
+    monkeypatch.setattr(main.TENANTS, 'default', InMemoryUserRepository())
+
+
+def _wait_until_settled(client, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        res = client.get('/ready')
+        if res.json()['status'] in ('ready', 'failed') or time.monotonic() > deadline:
+            return res
+        time.sleep(0.02)
+
+
+def test_worker_becomes_ready_after_loading_data_and_replaying(tmp_path, monkeypatch):
+    main = _main()
+    user_id = f'warm-{uuid.uuid4().hex[:8]}'
+    (tmp_path / 'users.ndjson').write_text(json.dumps({'id': user_id, 'name': 'Warm'}) + '\n')
+    (tmp_path / 'sample.ndjson').write_text(
+        json.dumps({'method': 'GET', 'path': f'/users/{user_id}'}) + '\n'
+        + json.dumps({'method': 'DELETE', 'path': f'/users/{user_id}'}) + '\n'
+    )
+    _fresh_users(main, monkeypatch)
+    monkeypatch.setattr(main.WARMUP.settings, 'data_dir', str(tmp_path))
+    monkeypatch.setattr(main.WARMUP.settings, 'replay_file', str(tmp_path / 'sample.ndjson'))
+    with TestClient(main.app) as client:
+        res = _wait_until_settled(client)
+        assert res.status_code == 200
+        body = res.json()
+        assert body['status'] == 'ready'
+        steps = {step['name']: step for step in body['steps']}
+        assert list(steps) == ['load', 'page_in', 'indexes', 'validators', 'replay']
+        assert all(step['state'] == 'done' for step in steps.values())
+        assert steps['load']['users'] == 1
+        # Only the GET was replayed; the user is still there.
+        assert steps['replay']['ok'] == 1 and steps['replay']['total'] == 1
+        assert client.get(f'/users/{user_id}').json() == {'id': user_id, 'name': 'Warm'}
+        assert client.get('/api/ready').status_code == 200
+        assert 'backend_ready 1\n' in client.get('/metrics').text
+
+
+def test_failed_warmup_keeps_the_worker_unready_but_alive(tmp_path, monkeypatch):
+    main = _main()
+    (tmp_path / 'users.ndjson').write_text('{"id": "no-name"}\n')
+    _fresh_users(main, monkeypatch)
+    monkeypatch.setattr(main.WARMUP.settings, 'data_dir', str(tmp_path))
+    with TestClient(main.app) as client:
+        res = _wait_until_settled(client)
+        assert res.status_code == 503
+        assert res.headers['Retry-After'] == '1'
+        body = res.json()
+        assert body['status'] == 'failed'
+        assert 'users.ndjson line 1' in body['steps'][0]['error']
+        assert client.get('/health').json() == {'status': 'ok'}
@@ -0,0 +1,77 @@
+import os
+import sys
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    _client()
+    import deadlines  # type: ignore
+    monkeypatch.setattr(deadlines.DEADLINES, 'default', 0.0)
+    monkeypatch.setattr(deadlines.DEADLINES, '_overrides', dict(deadlines.DEADLINES._overrides))
+    return deadlines.DEADLINES
+
+
+# Expired by the time the handler opens its transaction.
+EXPIRED = {'X-Request-Timeout': '0.000001'}
+
+
+def test_expired_deadline_returns_504_and_rolls_back(policy):
+    client = _client()
+    from deadlines import DEADLINE_EXCEEDED  # type: ignore
+    before = DEADLINE_EXCEEDED.value('/users', 'service.create_user')
+    user_id = str(uuid4())
+    res = client.post('/users', json={'id': user_id, 'name': 'Late'}, headers=EXPIRED)
+    assert res.status_code == 504
+    assert res.json() == {'detail': 'Deadline exceeded', 'stage': 'service.create_user'}
+    assert DEADLINE_EXCEEDED.value('/users', 'service.create_user') == before + 1
+    assert client.get(f'/users/{user_id}').status_code == 404
+    metrics = client.get('/metrics').text
+    assert 'request_deadline_exceeded_total{route="/users",stage="service.create_user"}' in metrics
+
+
+def test_generous_deadline_does_not_interfere(policy):
+    client = _client()
+    user_id = str(uuid4())
+    res = client.post('/users', json={'id': user_id, 'name': 'On time'}, headers={'X-Request-Timeout': '30'})
+    assert res.status_code == 200
+    assert client.get(f'/users/{user_id}').json()['name'] == 'On time'
+
+
+def test_route_default_applies_without_a_header(policy):
+    client = _client()
+    user_id = str(uuid4())
+    client.post('/users', json={'id': user_id, 'name': 'Before'})
+    policy.configure('PUT', '/users/{user_id}', 0.000001)
+    res = client.put(f'/users/{user_id}', json={'id': user_id, 'name': 'After'})
+    assert res.status_code == 504
+    assert client.get(f'/users/{user_id}').json()['name'] == 'Before'
+    # Other routes keep the (disabled) default.
+    assert client.delete(f'/users/{user_id}').status_code == 204
+
+
+def test_invalid_header_is_rejected(policy):
+    client = _client()
+    res = client.post('/users', json={'id': str(uuid4()), 'name': 'X'}, headers={'X-Request-Timeout': 'soon'})
+    assert res.status_code == 400
+    assert 'X-Request-Timeout' in res.json()['detail']
+
+
+def test_import_commits_nothing_after_the_deadline(policy):
+    client = _client()
+    user_id = str(uuid4())
+    body = f'{{"id": "{user_id}", "name": "Imported"}}\n'.encode()
+    res = client.post('/users/import', content=body, headers=EXPIRED)
+    assert res.status_code == 504
+    assert client.get(f'/users/{user_id}').status_code == 404
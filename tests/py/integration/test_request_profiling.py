@@ -0,0 +1,75 @@
+import os
+import pstats
+import sys
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+@pytest.fixture
+def profiler(monkeypatch, tmp_path):
+    _client()
+    import debug  # type: ignore
+    import profiling  # type: ignore
+    monkeypatch.setattr(debug.SETTINGS, 'token', 's3cret')
+    monkeypatch.setattr(profiling.PROFILER, 'store', profiling.ProfileStore(str(tmp_path), keep=10))
+    return profiling.PROFILER
+
+
+AUTH = {'X-Debug-Token': 's3cret'}
+
+
+def test_header_requests_a_cprofile_capture(profiler, tmp_path):
+    client = _client()
+    res = client.post('/users', json={'id': str(uuid4()), 'name': 'Prof'}, headers={**AUTH, 'X-Profile': 'cprofile'})
+    assert res.status_code == 200
+    profile_id = res.headers['X-Profile-Id']
+
+    listed = client.get('/debug/profiles', headers=AUTH).json()
+    assert listed[0]['id'] == profile_id
+    assert listed[0]['route'] == '/users' and listed[0]['status'] == 200 and listed[0]['trigger'] == 'header'
+    download = client.get(f"/debug/profiles/{listed[0]['file']}", headers=AUTH)
+    assert download.status_code == 200
+    path = tmp_path / 'download.pstats'
+    path.write_bytes(download.content)
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert 'create_user' in functions
+
+
+def test_sample_mode_writes_collapsed_stacks(profiler):
+    client = _client()
+    res = client.get('/health', headers={**AUTH, 'X-Profile': 'sample'})
+    meta = client.get('/debug/profiles', headers=AUTH).json()[0]
+    assert meta['id'] == res.headers['X-Profile-Id'] and meta['mode'] == 'sample'
+    body = client.get(f"/debug/profiles/{meta['file']}", headers=AUTH)
+    assert body.headers['content-type'].startswith('text/plain')
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in body.text.splitlines())
+
+
+def test_header_without_token_is_ignored(profiler):
+    client = _client()
+    res = client.get('/health', headers={'X-Profile': 'cprofile', 'X-Debug-Token': 'wrong'})
+    assert 'X-Profile-Id' not in res.headers
+    assert client.get('/debug/profiles', headers=AUTH).json() == []
+    assert client.get('/debug/profiles').status_code == 403
+    assert client.get('/debug/profiles/..%2Fsecret.json', headers=AUTH).status_code == 404
+
+
+def test_sample_rate_profiles_without_a_header(profiler, monkeypatch):
+    monkeypatch.setattr(profiler.settings, 'sample_rate', 1.0)
+    client = _client()
+    # Probes and long polls are exempt from sampling.
+    assert 'X-Profile-Id' not in client.get('/health').headers
+    res = client.get('/posts/search', params={'q': 'none'})
+    assert 'X-Profile-Id' in res.headers
+    monkeypatch.setattr(profiler.settings, 'sample_rate', 0.0)
+    assert client.get('/debug/profiles', headers=AUTH).json()[0]['trigger'] == 'sampled'
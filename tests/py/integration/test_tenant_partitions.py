@@ -0,0 +1,160 @@
+import os
+import sys
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def _tenant():
+    return {'X-Tenant-Id': f't-{uuid4().hex[:12]}'}
+
+
+@pytest.fixture(autouse=True)
+def tenants(monkeypatch):
+    _client()
+    import di  # type: ignore
+    monkeypatch.setattr(di.TENANTS.settings, 'tenants', frozenset({'*'}))
+    return di.TENANTS
+
+
+def test_users_are_scoped_to_the_tenant_header():
+    client = _client()
+    acme, globex = _tenant(), _tenant()
+    user_id = str(uuid4())
+    assert client.post('/users', json={'id': user_id, 'name': 'Acme user'}, headers=acme).status_code == 200
+    assert client.get(f'/users/{user_id}', headers=acme).json()['name'] == 'Acme user'
+    assert client.get(f'/users/{user_id}', headers=globex).status_code == 404
+    assert client.get(f'/users/{user_id}').status_code == 404
+    # The same id can exist independently in another tenant.
+    assert client.post('/users', json={'id': user_id, 'name': 'Globex user'}, headers=globex).status_code == 200
+    assert client.get(f'/users/{user_id}', headers=acme).json()['name'] == 'Acme user'
+    exported = client.get('/users/export', headers=globex).text.splitlines()
+    assert exported == [f'{{"id":"{user_id}","name":"Globex user"}}']
+    feed = client.get('/users/changes', headers=acme).json()
+    assert [c['id'] for c in feed['changes']] == [user_id]
+
+
+def test_posts_and_search_are_scoped_to_the_tenant_header():
+    client = _client()
+    acme, globex = _tenant(), _tenant()
+    user_id, post_id = str(uuid4()), str(uuid4())
+    word = f'w{uuid4().hex[:10]}'
+    client.post('/users', json={'id': user_id, 'name': 'Author'}, headers=acme)
+    res = client.post('/posts', json={
+        'id': post_id, 'user_id': user_id, 'title': f'About {word}', 'published': True,
+        'created_at': '2024-01-01T00:00:00Z',
+    }, headers=acme)
+    assert res.status_code == 200
+    assert client.get(f'/posts/{post_id}', headers=acme).status_code == 200
+    for other in (globex, {}):
+        assert client.get(f'/posts/{post_id}', headers=other).status_code == 404
+        assert client.get('/posts/search', params={'q': word}, headers=other).json()['results'] == []
+    hits = client.get('/posts/search', params={'q': word}, headers=acme).json()['results']
+    assert [hit['post']['id'] for hit in hits] == [post_id]
+    # A user with the same id in another tenant does not see, or delete, these posts.
+    client.post('/users', json={'id': user_id, 'name': 'Namesake'}, headers=globex)
+    assert client.get(f'/users/{user_id}/posts', headers=globex).json()['posts'] == []
+    assert client.delete(f'/users/{user_id}', headers=globex).status_code in (200, 204)
+    assert client.get(f'/posts/{post_id}', headers=acme).status_code == 200
+
+
+def test_invalid_tenant_id_is_rejected():
+    client = _client()
+    res = client.get('/users/x', headers={'X-Tenant-Id': '../../etc'})
+    assert res.status_code == 400
+    assert res.json() == {'detail': 'Invalid X-Tenant-Id'}
+
+
+def test_unknown_tenants_are_refused(tenants, monkeypatch):
+    client = _client()
+    monkeypatch.setattr(tenants.settings, 'tenants', frozenset({'acme'}))
+    res = client.get('/users/x', headers={'X-Tenant-Id': 'globex'})
+    assert res.status_code == 404
+    assert res.json() == {'detail': 'Unknown tenant'}
+    assert 'globex' not in {p['tenant'] for p in tenants.usage()}
+    assert client.get('/users/x', headers={'X-Tenant-Id': 'acme'}).status_code == 404
+    assert client.get('/users/x').status_code == 404
+
+
+def test_partitions_past_the_limit_get_429_and_empty_ones_are_dropped(tenants, monkeypatch):
+    client = _client()
+    headers = _tenant()
+    client.post('/users', json={'id': str(uuid4()), 'name': 'Kept'}, headers=headers)
+    held = len(tenants.usage())
+    # Reads of tenants that hold nothing leave no partition behind.
+    for _ in range(20):
+        assert client.get('/users/x', headers=_tenant()).status_code == 404
+    assert len(tenants.usage()) == held
+    monkeypatch.setattr(tenants.settings, 'max_partitions', held)
+    res = client.post('/users', json={'id': str(uuid4()), 'name': 'New'}, headers=_tenant())
+    assert res.status_code == 429
+    assert res.json() == {'detail': 'Too many tenants'}
+    assert client.get('/users/x', headers=headers).status_code == 404
+
+
+def test_quota_exceeded_returns_507_and_rolls_back(tenants):
+    client = _client()
+    headers = _tenant()
+    first = str(uuid4())
+    assert client.post('/users', json={'id': first, 'name': 'Fits'}, headers=headers).status_code == 200
+    partition = tenants.repository(headers['X-Tenant-Id'])
+    partition.quota = partition.bytes + 64
+    body = ''.join(f'{{"id": "bulk-{i}", "name": "{"n" * 40}"}}\n' for i in range(100))
+    res = client.post('/users/import', content=body, headers=headers)
+    assert res.status_code == 507
+    assert res.json()['detail'] == 'Tenant quota exceeded'
+    assert client.get('/users/bulk-0', headers=headers).status_code == 404
+    assert client.get(f'/users/{first}', headers=headers).status_code == 200
+
+
+def test_offloaded_tenant_reloads_on_next_request(tenants):
+    client = _client()
+    headers = _tenant()
+    user_id = str(uuid4())
+    client.post('/users', json={'id': user_id, 'name': 'Sleepy'}, headers=headers)
+    partition = tenants.repository(headers['X-Tenant-Id'])
+    assert partition.offload() > 0 and not partition.resident
+    assert client.get(f'/users/{user_id}', headers=headers).json()['name'] == 'Sleepy'
+    assert partition.resident
+
+
+def test_offloaded_content_reloads_on_next_request(tenants):
+    client = _client()
+    headers = _tenant()
+    user_id, post_id = str(uuid4()), str(uuid4())
+    word = f'w{uuid4().hex[:10]}'
+    client.post('/users', json={'id': user_id, 'name': 'Author'}, headers=headers)
+    client.post('/posts', json={
+        'id': post_id, 'user_id': user_id, 'title': f'About {word}', 'published': True,
+        'created_at': '2024-01-01T00:00:00Z',
+    }, headers=headers)
+    partition = tenants.repository(headers['X-Tenant-Id'])
+    assert tenants._offload(partition) > 0
+    assert not partition.content.resident and tenants.resident_bytes() == sum(
+        p['bytes'] for p in tenants.usage()
+    )
+    hits = client.get('/posts/search', params={'q': word}, headers=headers).json()['results']
+    assert [hit['post']['id'] for hit in hits] == [post_id]
+    assert partition.content.resident and partition.content.bytes > 0
+
+
+def test_debug_lists_tenant_partitions(tenants, monkeypatch):
+    client = _client()
+    import debug  # type: ignore
+    monkeypatch.setattr(debug.SETTINGS, 'token', 's3cret')
+    headers = _tenant()
+    client.post('/users', json={'id': str(uuid4()), 'name': 'Listed'}, headers=headers)
+    res = client.get('/debug/tenants', headers={'X-Debug-Token': 's3cret'})
+    assert res.status_code == 200
+    listed = {p['tenant']: p for p in res.json()['partitions']}
+    assert listed[headers['X-Tenant-Id']]['users'] == 1
+    assert listed[headers['X-Tenant-Id']]['resident'] is True
@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _load():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    import tracing  # type: ignore
+    return TestClient(app), tracing
+
+
+@pytest.fixture
+def traced_client():
+    client, tracing = _load()
+    buffer = tracing.TRACER.ring_buffer()
+    buffer.clear()
+    previous = tracing.TRACER.sample_rate
+    tracing.TRACER.sample_rate = 1.0
+    yield client, buffer
+    tracing.TRACER.sample_rate = previous
+    buffer.clear()
+
+
+def test_sampled_request_spans_every_layer(traced_client):
+    client, buffer = traced_client
+    uid = '77777777-7777-7777-7777-777777777777'
+    assert client.post('/users', json={"id": uid, "name": "Traced"}).status_code == 200
+
+    (trace,) = buffer.traces()
+    by_name = {s.name: s for s in trace}
+    assert {'http.request', 'request.parse', 'route.create_user', 'service.create_user',
+            'uow.transaction', 'repository.users.snapshot', 'repository.users.save',
+            'repository.users.commit'} <= set(by_name)
+    root = by_name['http.request']
+    assert root.parent_id is None
+    assert root.attributes['http.route'] == '/users'
+    assert root.attributes['http.status_code'] == 200
+    assert {s.trace_id for s in trace} == {root.trace_id}
+    assert by_name['route.create_user'].parent_id == root.span_id
+    assert by_name['service.create_user'].parent_id == by_name['route.create_user'].span_id
+    assert by_name['uow.transaction'].parent_id == by_name['service.create_user'].span_id
+    assert by_name['repository.users.snapshot'].parent_id == by_name['uow.transaction'].span_id
+
+
+def test_failed_transaction_marks_span_error(traced_client):
+    client, buffer = traced_client
+    res = client.post('/users/with-error', json={"id": "88888888-8888-8888-8888-888888888888", "name": "X"})
+    assert res.status_code == 500
+    (trace,) = buffer.traces()
+    uow_span = next(s for s in trace if s.name == 'uow.transaction')
+    assert uow_span.status == 'error'
+    assert uow_span.attributes['error.type'] == 'RuntimeError'
+
+
+def test_unsampled_requests_record_nothing():
+    client, tracing = _load()
+    buffer = tracing.TRACER.ring_buffer()
+    buffer.clear()
+    assert tracing.TRACER.sample_rate == 0.0
+    client.get('/users/unsampled')
+    assert buffer.traces() == []
+    assert tracing.current_span() is None
+
+
+def test_json_lines_sink(tmp_path):
+    _, tracing = _load()
+    path = tmp_path / 'spans.jsonl'
+    sink = tracing.JsonLinesSink(str(path))
+    tracer = tracing.Tracer(sample_rate=0.0, sinks=[sink])
+    with tracer.trace('job', force=True, kind='batch'):
+        with tracer.span('step'):
+            pass
+    sink.close()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['name'] for line in lines] == ['step', 'job']
+    assert lines[1]['attributes'] == {'kind': 'batch'}
+    assert lines[0]['parent_id'] == lines[1]['span_id']
+
+
+def test_json_lines_sink_drops_traces_instead_of_blocking(tmp_path):
+    import threading
+
+    _, tracing = _load()
+    release = threading.Event()
+    sink = tracing.JsonLinesSink(str(tmp_path / 'spans.jsonl'), capacity=1)
+    write = sink._write
+    sink._write = lambda traces: (release.wait(), write(traces))
+    tracer = tracing.Tracer(sample_rate=0.0, sinks=[sink])
+    for i in range(10):
+        with tracer.trace(f'job-{i}', force=True):
+            pass
+    assert sink.dropped >= 8
+    release.set()
+    assert sink.flush(timeout=5)
+    written = len((tmp_path / 'spans.jsonl').read_text().splitlines())
+    assert written + sink.dropped == 10
+    sink.close()
@@ -0,0 +1,229 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+pytest.importorskip('aiosqlite')
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
+
+
+DOMAIN_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../libs/my-test-domain'))
+
+
+def _load(name: str, path: str) -> types.ModuleType:
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _adapter_module() -> types.ModuleType:
+    # The Nx domain layout is not an installable package; expose the generated
+    # port module under the import path the adapter expects.
+    if 'my_test_domain.domain.ports' not in sys.modules:
+        _load('my_test_domain.domain.ports', os.path.join(DOMAIN_DIR, 'domain/src/lib/ports/unit_of_work_port.py'))
+    return _load(
+        'unit_of_work_sqlalchemy_adapter',
+        os.path.join(DOMAIN_DIR, 'infrastructure/src/lib/adapters/unit_of_work_sqlalchemy_adapter.py'),
+    )
+
+
+@pytest.fixture
+def uow(tmp_path):
+    mod = _adapter_module()
+    adapter = mod.UnitOfWorkSQLAlchemyAdapter.from_url(f"sqlite+aiosqlite:///{tmp_path / 'uow.db'}", retry_backoff=0)
+
+    async def _schema() -> None:
+        async def work() -> None:
+            await adapter.session.execute(text('CREATE TABLE users (id TEXT PRIMARY KEY, name TEXT NOT NULL)'))
+        await adapter.with_transaction(work)
+
+    asyncio.run(_schema())
+    yield adapter
+    asyncio.run(mod.dispose_engines())
+
+
+def _names(adapter) -> list:
+    async def work():
+        rows = await adapter.session.execute(text('SELECT name FROM users ORDER BY name'))
+        return [r[0] for r in rows]
+    return asyncio.run(adapter.with_transaction(work))
+
+
+def test_commits_on_success(uow):
+    async def work():
+        await uow.session.execute(text("INSERT INTO users VALUES ('1', 'Ada')"))
+        row = await uow.session.execute(text("SELECT name FROM users WHERE id = '1'"))
+        return row.scalar_one()
+
+    assert asyncio.run(uow.with_transaction(work)) == 'Ada'
+    assert _names(uow) == ['Ada']
+
+
+def test_rolls_back_on_exception(uow):
+    async def work():
+        await uow.session.execute(text("INSERT INTO users VALUES ('1', 'Ada')"))
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(uow.with_transaction(work))
+    assert _names(uow) == []
+
+
+def test_nested_transactions_supported(uow):
+    async def inner():
+        await uow.session.execute(text("INSERT INTO users VALUES ('2', 'Bob')"))
+        await uow.session.execute(text("INSERT INTO users VALUES ('1', 'Duplicate')"))
+
+    async def outer():
+        await uow.session.execute(text("INSERT INTO users VALUES ('1', 'Ada')"))
+        with pytest.raises(IntegrityError):
+            await uow.with_transaction(inner)
+        await uow.session.execute(text("INSERT INTO users VALUES ('3', 'Cy')"))
+
+    asyncio.run(uow.with_transaction(outer))
+    assert _names(uow) == ['Ada', 'Cy']
+
+
+def test_session_per_unit_of_work(uow):
+    seen = []
+
+    async def work():
+        seen.append(uow.session)
+
+    asyncio.run(uow.with_transaction(work))
+    asyncio.run(uow.with_transaction(work))
+    assert seen[0] is not seen[1]
+    with pytest.raises(RuntimeError):
+        uow.session
+
+
+def test_retries_on_lock_error(uow):
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        await uow.session.execute(text(f"INSERT INTO users VALUES ('{len(attempts)}', 'Ada')"))
+        if len(attempts) < 3:
+            raise OperationalError('INSERT', {}, Exception('database is locked'))
+
+    asyncio.run(uow.with_transaction(work))
+    assert len(attempts) == 3
+    assert _names(uow) == ['Ada']
+
+
+def test_does_not_retry_other_errors(uow):
+    attempts = []
+
+    async def work():
+        attempts.append(1)
+        raise OperationalError('INSERT', {}, Exception('no such table: missing'))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(uow.with_transaction(work))
+    assert len(attempts) == 1
+
+
+def test_shared_engine_per_url(tmp_path):
+    mod = _adapter_module()
+    url = f"sqlite+aiosqlite:///{tmp_path / 'shared.db'}"
+    try:
+        assert mod.get_engine(url) is mod.get_engine(url)
+        assert mod.get_engine(url, pool_size=2) is not mod.get_engine(url)
+        assert mod.get_engine(url, pool_size=2) is mod.get_engine(url, pool_size=2)
+    finally:
+        asyncio.run(mod.dispose_engines())
+
+
+def test_engine_is_not_shared_across_event_loops(tmp_path):
+    mod = _adapter_module()
+    url = f"sqlite+aiosqlite:///{tmp_path / 'loops.db'}"
+
+    async def engine():
+        return mod.get_engine(url)
+
+    try:
+        assert asyncio.run(engine()) is not asyncio.run(engine())
+    finally:
+        asyncio.run(mod.dispose_engines())
+
+
+def test_sessions_are_tracked_per_adapter(uow, tmp_path):
+    mod = sys.modules['unit_of_work_sqlalchemy_adapter']
+    other = mod.UnitOfWorkSQLAlchemyAdapter.from_url(f"sqlite+aiosqlite:///{tmp_path / 'other.db'}")
+
+    async def work():
+        with pytest.raises(RuntimeError):
+            other.session
+        return uow.session
+
+    assert asyncio.run(uow.with_transaction(work)) is not None
+    assert mod._sessions.get() == {}
+
+
+def _users_table():
+    from sqlalchemy import Column, MetaData, String, Table
+    return Table('users', MetaData(), Column('id', String, primary_key=True), Column('name', String, nullable=False))
+
+
+def test_bulk_write_chunks_rows(uow):
+    rows = [{'id': str(i), 'name': f'user-{i:03d}'} for i in range(250)]
+    results = asyncio.run(uow.bulk_write(_users_table(), rows, chunk_size=100))
+    assert [r.rows for r in results] == [100, 100, 50]
+    assert [r.index for r in results] == [0, 1, 2]
+    assert len(_names(uow)) == 250
+
+
+def test_bulk_write_chunks_stay_under_parameter_limit(uow):
+    mod = sys.modules['unit_of_work_sqlalchemy_adapter']
+    rows = [{'id': str(i), 'name': 'x'} for i in range(20000)]
+    results = asyncio.run(uow.bulk_write(_users_table(), rows))
+    assert all(r.rows * 2 <= mod._MAX_BIND_PARAMS['sqlite'] for r in results)
+    assert sum(r.rows for r in results) == 20000
+
+
+def test_bulk_upsert_updates_existing_rows(uow):
+    table = _users_table()
+    asyncio.run(uow.bulk_write(table, [{'id': '1', 'name': 'Ada'}, {'id': '2', 'name': 'Bob'}]))
+    asyncio.run(uow.bulk_write(table, [{'id': '2', 'name': 'Bobby'}, {'id': '3', 'name': 'Cy'}], on_conflict='update'))
+    assert _names(uow) == ['Ada', 'Bobby', 'Cy']
+
+
+def test_bulk_upsert_ignore_keeps_existing_rows(uow):
+    table = _users_table()
+    asyncio.run(uow.bulk_write(table, [{'id': '1', 'name': 'Ada'}]))
+    asyncio.run(uow.bulk_write(table, [{'id': '1', 'name': 'Other'}, {'id': '2', 'name': 'Bob'}], on_conflict='ignore'))
+    assert _names(uow) == ['Ada', 'Bob']
+
+
+def test_bulk_write_joins_active_transaction(uow):
+    table = _users_table()
+
+    async def work():
+        await uow.bulk_write(table, [{'id': '1', 'name': 'Ada'}])
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(uow.with_transaction(work))
+    assert _names(uow) == []
+
+
+def test_bulk_upsert_rejects_dialects_without_upsert(uow, monkeypatch):
+    mod = sys.modules['unit_of_work_sqlalchemy_adapter']
+    table = _users_table()
+    with pytest.raises(ValueError, match='oracle'):
+        mod._insert_for('oracle', table)
+    monkeypatch.setattr(mod, '_UPSERT_DIALECTS', frozenset({'postgresql'}))
+    with pytest.raises(ValueError, match='sqlite'):
+        asyncio.run(uow.bulk_write(table, [{'id': '1', 'name': 'Ada'}], on_conflict='ignore'))
+    # Plain inserts need no dialect support.
+    asyncio.run(uow.bulk_write(table, [{'id': '1', 'name': 'Ada'}]))
+    assert _names(uow) == ['Ada']
@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def _latest(client):
+    return client.get('/users/changes', params={'since': 0, 'limit': 1}).json()['latest']
+
+
+def test_feed_reports_writes_in_order():
+    client = _client()
+    start = _latest(client)
+    uid = str(uuid4())
+    client.post('/users', json={'id': uid, 'name': 'Ada'})
+    client.put(f'/users/{uid}', json={'id': uid, 'name': 'Ada L.'})
+    client.delete(f'/users/{uid}')
+
+    res = client.get('/users/changes', params={'since': start})
+    assert res.status_code == 200
+    body = res.json()
+    mine = [(c['op'], c['user']) for c in body['changes'] if c['id'] == uid]
+    assert mine == [('create', {'id': uid, 'name': 'Ada'}), ('update', {'id': uid, 'name': 'Ada L.'}), ('delete', None)]
+    assert body['next'] == body['changes'][-1]['seq'] == body['latest']
+
+
+def test_long_poll_returns_when_a_change_arrives():
+    client = _client()
+    start = _latest(client)
+    uid = str(uuid4())
+    writer = threading.Timer(0.2, lambda: _client().post('/users', json={'id': uid, 'name': 'Late'}))
+    writer.start()
+    res = client.get('/users/changes', params={'since': start, 'wait': 10})
+    writer.join()
+    assert [c['id'] for c in res.json()['changes']] == [uid]
+
+
+def test_long_poll_times_out_empty():
+    client = _client()
+    start = _latest(client)
+    res = client.get('/users/changes', params={'since': start, 'wait': 0.05})
+    assert res.json()['changes'] == []
+    assert res.json()['next'] == start
+
+
+def test_cursor_outside_the_log_requires_resync():
+    client = _client()
+    latest = _latest(client)
+    res = client.get('/users/changes', params={'since': latest + 100})
+    assert res.status_code == 410
+    assert res.json()['detail'] == 'Resync required'
+    res = client.get('/users/changes', params={'since': latest + 100}, headers={'accept': 'text/event-stream'})
+    assert res.status_code == 410
+
+
+def test_export_reports_the_feed_position():
+    client = _client()
+    latest = _latest(client)
+    res = client.get('/users/export')
+    assert int(res.headers['x-change-seq']) == latest
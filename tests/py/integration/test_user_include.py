@@ -0,0 +1,71 @@
+import os
+import sys
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def _spy(monkeypatch, repo, name):
+    calls = []
+    original = getattr(repo, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(repo, name, wrapper)
+    return calls
+
+
+def test_include_embeds_posts_and_comments_with_batched_lookups(monkeypatch):
+    client = _client()
+    import di  # type: ignore
+
+    uid = str(uuid4())
+    client.post('/users', json={'id': uid, 'name': 'Ada'})
+    post_ids = [str(uuid4()) for _ in range(4)]
+    for pid in post_ids:
+        client.post('/posts', json={'id': pid, 'user_id': uid, 'title': 'T'})
+        for _ in range(2):
+            client.post(f'/posts/{pid}/comments', json={'id': str(uuid4()), 'user_id': uid, 'content': 'c'})
+
+    post_batches = _spy(monkeypatch, di._singleton_post_repo, 'lookup_many')
+    comment_batches = _spy(monkeypatch, di._singleton_comment_repo, 'lookup_many')
+    single_lookups = _spy(monkeypatch, di._singleton_comment_repo, 'lookup')
+
+    res = client.get(f'/users/{uid}', params={'include': 'posts.comments'})
+    assert res.status_code == 200
+    body = res.json()
+    assert body['name'] == 'Ada'
+    assert [p['id'] for p in body['posts']] == post_ids
+    assert all(len(p['comments']) == 2 for p in body['posts'])
+    assert len(post_batches) == 1
+    assert len(comment_batches) == 1
+    assert single_lookups == []
+
+
+def test_include_posts_only_and_plain_read_unchanged():
+    client = _client()
+    uid = str(uuid4())
+    client.post('/users', json={'id': uid, 'name': 'Bo'})
+    body = client.get(f'/users/{uid}', params={'include': 'posts'}).json()
+    assert body == {'id': uid, 'name': 'Bo', 'posts': []}
+    assert client.get(f'/users/{uid}').json() == {'id': uid, 'name': 'Bo'}
+
+
+def test_unknown_include_is_rejected():
+    client = _client()
+    uid = str(uuid4())
+    client.post('/users', json={'id': uid, 'name': 'Cy'})
+    res = client.get(f'/users/{uid}', params={'include': 'friends'})
+    assert res.status_code == 400
+    assert 'friends' in res.json()['detail']
+    assert client.get(f'/users/{uuid4()}', params={'include': 'posts'}).status_code == 404
@@ -25,3 +25,56 @@ def test_create_and_get_user():
     body = res.json()
     assert body.get('id') == user_id
     assert body.get('name') == 'Ada'
+
+
+def test_concurrent_reads_see_latest_committed_write():
+    from concurrent.futures import ThreadPoolExecutor
+
+    app = _load_app()
+    client = TestClient(app)
+    user_id = '99999999-0000-0000-0000-000000000001'
+    assert client.post('/users', json={"id": user_id, "name": "Before"}).status_code == 200
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bodies = list(pool.map(lambda _: client.get(f'/users/{user_id}').json(), range(32)))
+    assert all(b == {"id": user_id, "name": "Before"} for b in bodies)
+    assert client.put(f'/users/{user_id}', json={"id": user_id, "name": "After"}).status_code == 200
+    assert client.get(f'/users/{user_id}').json()['name'] == 'After'
+
+
+def test_get_user_documents_the_expanded_schema():
+    app = _load_app()
+    route = TestClient(app).get('/openapi.json').json()['paths']['/users/{user_id}']['get']
+    ok = route['responses']['200']['content']['application/json']['schema']
+    assert ok == {'$ref': '#/components/schemas/UserExpanded'}
+    assert {'400', '404'} <= set(route['responses'])
+
+
+def test_get_user_honours_unit_of_work_overrides():
+    import di  # type: ignore
+    from repository import InMemoryUserRepository, UserEntity  # type: ignore
+    from uow import UnitOfWork  # type: ignore
+
+    app = _load_app()
+    repo = InMemoryUserRepository()
+    repo.save(UserEntity(id='override-only', name='Stub'))
+    app.dependency_overrides[di.inject_uow] = lambda: UnitOfWork(repo)
+    try:
+        res = TestClient(app).get('/users/override-only')
+    finally:
+        app.dependency_overrides.clear()
+    assert res.json() == {'id': 'override-only', 'name': 'Stub'}
+
+
+def test_container_override_covers_routes_and_get_uow():
+    import di  # type: ignore
+    from repository import InMemoryUserRepository, UserEntity  # type: ignore
+    from uow import UnitOfWork  # type: ignore
+
+    app = _load_app()
+    repo = InMemoryUserRepository()
+    repo.save(UserEntity(id='container-override', name='Stub'))
+    with di.CONTAINER.override(UnitOfWork, lambda: UnitOfWork(repo)):
+        res = TestClient(app).get('/users/container-override')
+        assert di.get_uow().users_get('container-override').name == 'Stub'
+    assert res.json() == {'id': 'container-override', 'name': 'Stub'}
+    assert di.get_uow().users_get('container-override') is None
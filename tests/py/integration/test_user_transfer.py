@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+
+def _client():
+    api_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../apps/backend-api'))
+    if api_dir not in sys.path:
+        sys.path.insert(0, api_dir)
+    from main import app  # type: ignore
+    return TestClient(app)
+
+
+def _ndjson(users):
+    return ''.join(json.dumps(u) + '\n' for u in users).encode()
+
+
+def test_import_commits_in_chunks_and_export_streams_them_back():
+    client = _client()
+    prefix = uuid4().hex
+    users = [{'id': f'{prefix}-{i}', 'name': f'User {i}'} for i in range(5)]
+
+    def body():
+        # Split mid-line to exercise incremental parsing.
+        data = _ndjson(users)
+        for i in range(0, len(data), 7):
+            yield data[i:i + 7]
+
+    res = client.post('/users/import?chunk_size=2', content=body(), headers={'content-type': 'application/x-ndjson'})
+    assert res.status_code == 200
+    assert res.json() == {'imported': 5, 'chunks': 3}
+    assert client.get(f'/users/{prefix}-4').json()['name'] == 'User 4'
+
+    with client.stream('GET', '/users/export') as res:
+        assert res.status_code == 200
+        assert res.headers['content-type'].startswith('application/x-ndjson')
+        exported = [json.loads(line) for line in res.iter_lines() if line]
+    mine = [u for u in exported if u['id'].startswith(prefix)]
+    assert sorted(mine, key=lambda u: u['id']) == users
+
+
+def test_invalid_line_keeps_earlier_chunks_and_reports_position():
+    client = _client()
+    prefix = uuid4().hex
+    lines = _ndjson([{'id': f'{prefix}-{i}', 'name': 'ok'} for i in range(3)]) + b'\n{"id": "x"}\n'
+    res = client.post('/users/import?chunk_size=2', content=lines)
+    assert res.status_code == 422
+    body = res.json()
+    assert body['line'] == 5
+    assert body['imported'] == 2
+    assert client.get(f'/users/{prefix}-1').status_code == 200
+    assert client.get(f'/users/{prefix}-2').status_code == 404
+
+
+def test_large_import_round_trips_through_export():
+    client = _client()
+    prefix = uuid4().hex
+    res = client.post('/users/import', content=_ndjson([{'id': f'{prefix}-{i}', 'name': 'n'} for i in range(2000)]))
+    assert res.json() == {'imported': 2000, 'chunks': 2}
+    body = client.get('/users/export').content
+    assert body.count(prefix.encode()) == 2000
+
+
+def _export_peak(tenant, count):
+    import asyncio
+    import tracemalloc
+
+    import di  # type: ignore
+    from main import app  # type: ignore
+    from repository import UserEntity  # type: ignore
+
+    di.TENANTS.repository(tenant).commit({f'u{i}': UserEntity(id=f'u{i}', name='name') for i in range(count)})
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': '/users/export',
+        'raw_path': b'/users/export', 'root_path': '', 'query_string': b'', 'server': ('test', 80),
+        'client': ('test', 1), 'headers': [(b'x-tenant-id', tenant.encode())],
+    }
+    lines = 0
+
+    async def scenario():
+        done = asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if requested:
+                # The client stays connected until the response is complete.
+                await done.wait()
+                return {'type': 'http.disconnect'}
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            # Count and drop each chunk, as a client reading the stream would.
+            nonlocal lines
+            if message['type'] == 'http.response.body':
+                lines += message.get('body', b'').count(b'\n')
+                if not message.get('more_body', False):
+                    done.set()
+
+        await app(scope, receive, send)
+
+    tracemalloc.start()
+    asyncio.run(scenario())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert lines == count
+    return peak
+
+
+def test_export_memory_does_not_grow_with_the_number_of_users(monkeypatch):
+    _client()
+    import di  # type: ignore
+    monkeypatch.setattr(di.TENANTS.settings, 'tenants', frozenset({'*'}))
+    prefix = uuid4().hex[:8]
+    small = _export_peak(f'{prefix}-small', 2_000)
+    large = _export_peak(f'{prefix}-large', 50_000)
+    # A materialized list of 50k users alone is 400 KB of pointers.
+    assert large < small + 200_000
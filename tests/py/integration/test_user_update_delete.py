@@ -27,6 +27,18 @@ def test_update_user_name():
     assert res.json().get('name') == 'Updated'
 
 
+
+def test_update_body_is_validated_strictly_from_raw_json():
+    client = _client()
+    uid = '35353535-3535-3535-3535-353535353535'
+    assert client.post('/users', json={"id": uid, "name": "Initial"}).status_code == 200
+    res = client.put(f'/users/{uid}', json={"id": uid, "name": 42})
+    assert res.status_code == 422
+    assert [(e['loc'], e['type']) for e in res.json()['detail']] == [(['body', 'name'], 'string_type')]
+    assert client.put(f'/users/{uid}/with-error', content=b'').status_code == 422
+    assert client.get(f'/users/{uid}').json().get('name') == 'Initial'
+
+
 def test_delete_user():
     client = _client()
     uid = '44444444-4444-4444-4444-444444444444'
@@ -40,3 +52,24 @@ def test_delete_user():
     res = client.get(f'/users/{uid}')
     assert res.status_code == 404
 
+
+
+def test_delete_user_removes_their_posts_and_comments():
+    from uuid import uuid4
+
+    client = _client()
+    tag = uuid4().hex[:8]
+    author, other = f'author-{tag}', f'other-{tag}'
+    for uid in (author, other):
+        assert client.post('/users', json={'id': uid, 'name': uid}).status_code == 200
+    assert client.post('/posts', json={'id': f'p1-{tag}', 'user_id': author, 'title': f'doomed {tag}'}).status_code == 200
+    assert client.post('/posts', json={'id': f'p2-{tag}', 'user_id': other, 'title': 'kept'}).status_code == 200
+    client.post(f'/posts/p1-{tag}/comments', json={'id': f'c1-{tag}', 'user_id': other, 'content': 'on doomed post'})
+    client.post(f'/posts/p2-{tag}/comments', json={'id': f'c2-{tag}', 'user_id': author, 'content': 'by author'})
+    client.post(f'/posts/p2-{tag}/comments', json={'id': f'c3-{tag}', 'user_id': other, 'content': 'kept'})
+
+    assert client.delete(f'/users/{author}').status_code == 204
+    assert client.get(f'/posts/p1-{tag}').status_code == 404
+    assert client.get(f'/users/{author}/posts').json()['count'] == 0
+    assert [c['id'] for c in client.get(f'/posts/p2-{tag}/comments').json()['comments']] == [f'c3-{tag}']
+    assert client.get('/posts/search', params={'q': tag}).json()['results'] == []
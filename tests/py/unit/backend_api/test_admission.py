@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from admission import AdmissionLimiter, AdmissionPolicy, AdmissionSettings  # type: ignore  # noqa: E402
+
+
+def test_rejects_when_queue_full():
+    async def scenario():
+        limiter = AdmissionLimiter(AdmissionSettings(limit=1, max_queue=1, queue_timeout=1.0))
+        assert await limiter.acquire() is None
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        assert await limiter.acquire() == 'queue_full'
+        limiter.release(0.001)
+        assert await waiter is None
+        assert limiter.in_flight == 1
+        limiter.release(0.001)
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_sheds_waiter():
+    async def scenario():
+        limiter = AdmissionLimiter(AdmissionSettings(limit=1, max_queue=4, queue_timeout=0.01))
+        assert await limiter.acquire() is None
+        assert await limiter.acquire() == 'queue_timeout'
+        assert limiter.queued == 0
+        limiter.release(0.001)
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiters_admitted_in_fifo_order():
+    async def scenario():
+        limiter = AdmissionLimiter(AdmissionSettings(limit=1, max_queue=8))
+        order = []
+        await limiter.acquire()
+
+        async def wait(i):
+            await limiter.acquire()
+            order.append(i)
+
+        tasks = [asyncio.ensure_future(wait(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        for _ in range(3):
+            limiter.release(0.001)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+
+    asyncio.run(scenario())
+
+
+def test_adaptive_limit_shrinks_when_latency_inflates_and_grows_back():
+    limiter = AdmissionLimiter(AdmissionSettings(limit=32, adaptive=True, min_limit=2, max_limit=64))
+    limiter._in_flight = 10_000  # release() bookkeeping only; no waiters involved
+    for _ in range(40):
+        limiter.release(0.001)
+    baseline = limiter.limit
+    for _ in range(200):
+        limiter.release(0.02)
+    shrunk = limiter.limit
+    assert shrunk < baseline
+    for _ in range(400):
+        limiter.release(0.001)
+    assert limiter.limit > shrunk
+
+
+def test_policy_overrides_and_exemptions():
+    policy = AdmissionPolicy(AdmissionSettings(limit=8))
+    policy.configure('get', '/users/{user_id}', limit=2)
+    assert policy.limiter_for('GET', '/users/{user_id}').settings.limit == 2
+    assert policy.limiter_for('POST', '/users').settings.limit == 8
+    assert policy.limiter_for('GET', '/health') is None
+    policy.enabled = False
+    assert policy.limiter_for('POST', '/users') is None
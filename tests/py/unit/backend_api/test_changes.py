@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from changes import ChangeLog, ResyncRequired, sse_events  # type: ignore  # noqa: E402
+from repository import InMemoryUserRepository, ShardedUserRepository, UserEntity  # type: ignore  # noqa: E402
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+def test_since_returns_contiguous_records_and_requires_resync_outside_retention():
+    log = ChangeLog(retention=3)
+    log.append([('create', str(i), 'n') for i in range(5)])
+    assert log.latest == 5
+    assert log.earliest == 3
+    assert [c.seq for c in log.since(2)] == [3, 4, 5]
+    assert [c.seq for c in log.since(3, limit=1)] == [4]
+    assert log.since(5) == []
+    with pytest.raises(ResyncRequired) as info:
+        log.since(1)
+    assert (info.value.earliest, info.value.latest) == (3, 5)
+    with pytest.raises(ResyncRequired):
+        log.since(6)
+
+
+def test_wait_is_woken_by_an_append_from_another_thread():
+    log = ChangeLog()
+
+    async def main():
+        timer = threading.Timer(0.05, lambda: log.append([('create', 'a', 'A')]))
+        timer.start()
+        woke = await log.wait(0, 5)
+        timer.join()
+        return woke, await log.wait(1, 0.01)
+
+    assert asyncio.run(main()) == (True, False)
+
+
+def test_sse_stream_emits_events_and_ends_with_resync():
+    log = ChangeLog(retention=2)
+    log.append([('create', 'a', 'A'), ('delete', 'a', None)])
+
+    async def main():
+        stream = sse_events(log, 0, keepalive=0.01)
+        first = await stream.__anext__()
+        keepalive = await stream.__anext__()
+        log.append([('create', 'b', 'B'), ('create', 'c', 'C'), ('create', 'd', 'D')])
+        resync = await stream.__anext__()
+        return first, keepalive, resync
+
+    first, keepalive, resync = asyncio.run(main())
+    assert first.startswith(b'id: 1\nevent: create\ndata: {"seq": 1, "op": "create", "id": "a"')
+    assert b'id: 2\nevent: delete\n' in first
+    assert keepalive == b': keepalive\n\n'
+    assert resync.startswith(b'event: resync\n')
+
+
+@pytest.mark.parametrize('make_repo', [InMemoryUserRepository, lambda: ShardedUserRepository(4)])
+def test_commits_append_create_update_delete(make_repo):
+    repo = make_repo()
+    uow = UnitOfWork(repo)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='a', name='A'))
+        uow.users_save(UserEntity(id='b', name='B'))
+    with uow.transaction():
+        uow.users_update(UserEntity(id='a', name='A2'))
+        uow.users_delete('b')
+        uow.users_delete('missing')
+    with pytest.raises(RuntimeError):
+        with uow.transaction():
+            uow.users_delete('a')
+            raise RuntimeError('rolled back')
+    repo.save(UserEntity(id='c', name='C'))
+    records = [(c.op, c.id, c.name) for c in repo.changes.since(0)]
+    assert sorted(records[:2]) == [('create', 'a', 'A'), ('create', 'b', 'B')]
+    assert sorted(records[2:4]) == [('delete', 'b', None), ('update', 'a', 'A2')]
+    assert records[4:] == [('create', 'c', 'C')]
+
+
+def test_concurrent_commits_each_bump_the_version_once():
+    repo = InMemoryUserRepository(ChangeLog(retention=1000))
+    barrier = threading.Barrier(8)
+
+    def work(n):
+        barrier.wait()
+        for i in range(50):
+            repo.commit({f'{n}-{i}': UserEntity(id=f'{n}-{i}', name='n')})
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert repo.version == 400
+    # Each commit's records follow the commit before it: one create per
+    # commit, and one delete for every commit after the first.
+    assert repo.changes.latest == 400 + 399
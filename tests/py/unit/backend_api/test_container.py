@@ -0,0 +1,132 @@
+import os
+import sys
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from container import REQUEST, SINGLETON, TRANSIENT, Container, ContainerError, RequestScope  # type: ignore  # noqa: E402
+
+
+class Settings:
+    pass
+
+
+class Repo:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+
+
+class Session:
+    def __init__(self, repo: Repo) -> None:
+        self.repo = repo
+
+
+class Handler:
+    def __init__(self, session: Session, repo: Repo) -> None:
+        self.session = session
+        self.repo = repo
+
+
+def _container(handler_scope=TRANSIENT):
+    container = Container()
+    container.register(Settings, scope=SINGLETON)
+    container.register(Repo, scope=SINGLETON)
+    container.register(Session, scope=REQUEST)
+    container.register(Handler, scope=handler_scope)
+    return container
+
+
+def test_scopes():
+    compiled = _container().compile()
+    first, second = RequestScope(), RequestScope()
+    a, b = compiled.resolve(Handler, first), compiled.resolve(Handler, first)
+    c = compiled.resolve(Handler, second)
+    assert a is not b
+    assert a.session is b.session is not c.session
+    assert a.repo is c.repo is a.session.repo
+    assert a.repo.settings is compiled.resolve(Settings)
+    make = compiled.factory(Session)
+    assert make() is not make()
+
+
+def test_explicit_deps_and_factories():
+    container = Container()
+    container.instance('dsn', 'sqlite://')
+    container.register(Repo, lambda dsn: ('repo', dsn), scope=SINGLETON, deps=['dsn'])
+    assert container.compile().resolve(Repo) == ('repo', 'sqlite://')
+
+
+def test_invalid_graphs_fail_at_compile():
+    container = Container()
+    container.register(Repo, scope=SINGLETON)
+    with pytest.raises(ContainerError, match='Settings is not registered'):
+        container.compile()
+
+    container = Container()
+    container.register(Settings, lambda repo: repo, deps=[Repo])
+    container.register(Repo)
+    with pytest.raises(ContainerError, match='cycle'):
+        container.compile()
+
+    with pytest.raises(ContainerError, match='cannot depend on request-scoped'):
+        _container(handler_scope=SINGLETON).compile()
+
+    # Captured through a transient in between.
+    container = _container()
+    container.register('Cache', lambda handler: handler, scope=SINGLETON, deps=[Handler])
+    with pytest.raises(ContainerError, match='Handler'):
+        container.compile()
+
+    with pytest.raises(ContainerError, match='unknown scope'):
+        Container().register(Settings, scope='session')
+
+
+def test_fastapi_dependencies_share_the_request_scope():
+    compiled = _container().compile()
+    app = FastAPI()
+    sessions = []
+
+    @app.get('/')
+    async def route(handler=Depends(compiled.depends(Handler)), session=Depends(compiled.depends(Session))):
+        sessions.append(session)
+        return {'same': handler.session is session}
+
+    assert compiled.depends(Session) is compiled.depends(Session)
+    client = TestClient(app)
+    assert client.get('/').json() == {'same': True}
+    assert client.get('/').json() == {'same': True}
+    assert sessions[0] is not sessions[1]
+
+
+def test_override_reaches_factories_and_dependencies_handed_out_earlier():
+    compiled = _container().compile()
+    make, dependency = compiled.factory(Session), compiled.depends(Session)
+    app = FastAPI()
+
+    @app.get('/')
+    async def route(first=Depends(dependency), handler=Depends(compiled.depends(Handler))):
+        return {'session': first, 'handler_session': handler.session is first}
+
+    stub = 'stub-session'
+    with compiled.override(Session, lambda: stub):
+        assert make() == compiled.resolve(Session) == stub
+        # Handler was compiled against the original Session provider.
+        assert TestClient(app).get('/').json() == {'session': stub, 'handler_session': False}
+    assert isinstance(make(), Session)
+    with pytest.raises(ContainerError, match='not registered'):
+        with compiled.override('Missing', lambda: None):
+            pass
+
+
+def test_override_of_a_request_scoped_key_builds_once_per_scope():
+    compiled = _container().compile()
+    built = []
+    with compiled.override(Session, lambda: built.append(1) or object()):
+        scope = RequestScope()
+        assert compiled.resolve(Session, scope) is compiled.resolve(Session, scope)
+    assert built == [1]
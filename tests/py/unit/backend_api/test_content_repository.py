@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from content_repository import (  # type: ignore  # noqa: E402
+    CommentEntity,
+    InMemoryCommentRepository,
+    InMemoryPostRepository,
+    PostEntity,
+)
+from repository import InMemoryUserRepository, UserEntity  # type: ignore  # noqa: E402
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+def test_index_follows_saves_moves_and_deletes():
+    posts = InMemoryPostRepository()
+    posts.save(PostEntity(id='p1', user_id='u1', title='a'))
+    posts.save(PostEntity(id='p2', user_id='u1', title='b'))
+    posts.save(PostEntity(id='p3', user_id='u2', title='c'))
+    assert [p.id for p in posts.by_user('u1')] == ['p1', 'p2']
+    assert posts.count_for_user('u1') == 2
+
+    posts.save(PostEntity(id='p1', user_id='u2', title='moved'))
+    posts.delete('p2')
+    posts.delete('missing')
+    assert posts.by_user('u1') == []
+    assert posts.count_for_user('u1') == 0
+    assert [p.id for p in posts.by_user('u2')] == ['p3', 'p1']
+    assert posts.by_user('u2')[1].title == 'moved'
+    assert posts._indexes['user_id'].keys() == {'u2'}
+
+
+def test_staged_lookups_merge_with_committed_index():
+    posts = InMemoryPostRepository()
+    posts.save(PostEntity(id='p1', user_id='u1', title='a'))
+    posts.save(PostEntity(id='p2', user_id='u1', title='b'))
+    staging = posts.snapshot()
+    posts.save(PostEntity(id='p3', user_id='u1', title='new'), staging=staging)
+    posts.save(PostEntity(id='p2', user_id='u9', title='moved'), staging=staging)
+    posts.delete('p1', staging=staging)
+    assert [p.id for p in posts.by_user('u1', staging=staging)] == ['p3']
+    assert posts.count_for_user('u1', staging=staging) == 1
+    assert posts.count_for_user('u1') == 2
+    posts.commit(staging)
+    assert [p.id for p in posts.by_user('u1')] == ['p3']
+    assert [p.id for p in posts.by_user('u9')] == ['p2']
+
+
+def test_unit_of_work_commits_all_repositories_together():
+    users, posts, comments = InMemoryUserRepository(), InMemoryPostRepository(), InMemoryCommentRepository()
+    uow = UnitOfWork(users, posts, comments)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='u1', name='Ada'))
+        uow.posts_save(PostEntity(id='p1', user_id='u1', title='Hello'))
+        uow.comments_save(CommentEntity(id='c1', post_id='p1', user_id='u1', content='First'))
+        assert uow.comments_count_for_post('p1') == 1
+        assert comments.count_for_post('p1') == 0
+    assert comments.count_for_post('p1') == 1
+    assert [c.id for c in comments.by_user('u1')] == ['c1']
+
+    with pytest.raises(RuntimeError):
+        with uow.transaction():
+            uow.posts_delete('p1')
+            uow.comments_save(CommentEntity(id='c2', post_id='p1', user_id='u1', content='Second'))
+            raise RuntimeError('rollback')
+    assert posts.get('p1') is not None
+    assert comments.count_for_post('p1') == 1
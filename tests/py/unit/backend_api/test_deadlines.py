@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from starlette.concurrency import run_in_threadpool
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+import deadlines  # type: ignore  # noqa: E402
+from deadlines import DEADLINE_EXCEEDED, DeadlineExceeded, DeadlinePolicy, check, deadline, remaining  # type: ignore  # noqa: E402
+from repository import InMemoryUserRepository, ShardedUserRepository, UserEntity  # type: ignore  # noqa: E402
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+def _expired(route='/t'):
+    return deadline(0.0, route=route)
+
+
+def test_check_is_a_no_op_without_a_deadline():
+    assert remaining() is None
+    check('anything')
+
+
+def test_check_raises_and_counts_once_expired():
+    before = DEADLINE_EXCEEDED.value('/t', 'stage.x')
+    with deadline(60.0, route='/t') as active:
+        check('stage.x')
+        assert 59.0 < remaining() <= 60.0
+        active.expires = time.monotonic() - 1
+        with pytest.raises(DeadlineExceeded) as info:
+            check('stage.x')
+    assert info.value.stage == 'stage.x'
+    assert DEADLINE_EXCEEDED.value('/t', 'stage.x') == before + 1
+    assert remaining() is None
+
+
+def test_nested_deadline_never_extends_the_outer_one():
+    with deadline(0.5) as outer:
+        with deadline(30.0) as inner:
+            assert inner.expires == outer.expires
+        with deadline(0.1) as shorter:
+            assert shorter.expires < outer.expires
+
+
+def test_deadline_follows_work_into_the_thread_pool():
+    async def scenario():
+        with _expired():
+            await run_in_threadpool(check, 'threaded')
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+
+
+def test_policy_budgets():
+    policy = DeadlinePolicy(2.0, max_timeout=10.0)
+    policy.configure('post', '/slow', 5.0)
+    policy.configure('POST', '/unbounded', 0)
+    assert policy.budget_for('GET', '/x') == 2.0
+    assert policy.budget_for('POST', '/slow') == 5.0
+    assert policy.budget_for('POST', '/unbounded') is None
+    # The header can only shorten a route's budget, and is capped where there is none.
+    assert policy.budget_for('GET', '/x', '0.5') == 0.5
+    assert policy.budget_for('GET', '/x', '30') == 2.0
+    assert policy.budget_for('POST', '/unbounded', '30') == 10.0
+    assert DeadlinePolicy().budget_for('GET', '/x') is None
+    for bad in ('0', '-1', 'soon', 'nan', 'inf'):
+        with pytest.raises(ValueError):
+            policy.budget_for('GET', '/x', bad)
+
+
+@pytest.mark.parametrize('make_repo', [InMemoryUserRepository, lambda: ShardedUserRepository(4)])
+def test_expired_deadline_rolls_back_the_transaction(make_repo):
+    repo = make_repo()
+    uow = UnitOfWork(repo)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='kept', name='Kept'))
+    with pytest.raises(DeadlineExceeded) as info:
+        with deadline(60.0) as active:
+            with uow.transaction():
+                uow.users_save(UserEntity(id='late', name='Late'))
+                active.expires = time.monotonic() - 1
+    assert info.value.stage == 'uow.commit'
+    assert not uow.is_active()
+    assert repo.get('late') is None and repo.get('kept') is not None
+
+
+def test_expired_deadline_stops_before_the_snapshot():
+    uow = UnitOfWork(InMemoryUserRepository())
+    with pytest.raises(DeadlineExceeded) as info:
+        with _expired():
+            with uow.transaction():
+                pytest.fail('transaction body ran past the deadline')
+    assert info.value.stage == 'uow.begin'
+
+
+def test_repository_scan_checks_the_deadline():
+    repo = InMemoryUserRepository()
+    with pytest.raises(DeadlineExceeded) as info:
+        with _expired():
+            repo.scan()
+    assert info.value.stage == 'users.scan'
+    assert deadlines.current() is None
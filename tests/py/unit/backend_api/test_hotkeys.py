@@ -0,0 +1,185 @@
+import os
+import random
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from hotkeys import CountMinSketch, HotKeys, KeyTracker, SpaceSaving  # type: ignore  # noqa: E402
+from metrics import Counter as MetricCounter  # type: ignore  # noqa: E402
+
+
+def _zipf_stream(n_keys, length, s=1.1, seed=7):
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) ** s for rank in range(n_keys)]
+    return [f'k{rank}' for rank in rng.choices(range(n_keys), weights=weights, k=length)]
+
+
+def test_space_saving_is_exact_below_capacity():
+    summary = SpaceSaving(8)
+    for key in 'abacabadaa':
+        summary.add(key)
+    assert summary.top() == [('a', 6, 0), ('b', 2, 0), ('c', 1, 0), ('d', 1, 0)]
+    assert len(summary) == 4 and summary.total == 10
+
+
+def test_space_saving_bounds_hold_on_a_skewed_stream():
+    stream = _zipf_stream(5000, 50_000)
+    truth = Counter(stream)
+    summary = SpaceSaving(64)
+    for key in stream:
+        summary.add(key)
+    assert len(summary) == 64
+    top = summary.top()
+    for key, count, error in top:
+        assert count - error <= truth[key] <= count
+    # Every key above total / capacity is tracked, and the true top 5 come first.
+    tracked = {key for key, _, _ in top}
+    assert {key for key, n in truth.items() if n > len(stream) / 64} <= tracked
+    assert [key for key, _, _ in top[:5]] == [key for key, _ in truth.most_common(5)]
+
+
+def test_space_saving_halve_keeps_buckets_consistent():
+    summary = SpaceSaving(4)
+    for key in 'aaaabbbcd':
+        summary.add(key)
+    summary.halve()
+    assert summary.top() == [('a', 2, 0), ('b', 1, 0)]
+    for key in 'eeef':
+        summary.add(key)
+    assert len(summary) == 4
+    assert dict((k, c) for k, c, _ in summary.top())['e'] == 3
+
+
+def test_count_min_never_undercounts():
+    stream = _zipf_stream(20_000, 40_000)
+    truth = Counter(stream)
+    sketch = CountMinSketch(width=1024, depth=4)
+    for key in stream:
+        sketch.add(key)
+    errors = [sketch.estimate(key) - n for key, n in truth.items()]
+    assert min(errors) >= 0
+    # Within e / width of the total for the vast majority of keys.
+    bound = 2.72 / 1024 * len(stream)
+    assert sum(e <= bound for e in errors) / len(errors) > 0.95
+    assert sketch.estimate('never-seen') <= bound
+    sketch.halve()
+    assert sketch.total == len(stream) // 2
+
+
+def test_tracker_reports_hot_keys_with_their_read_write_mix():
+    tracker = KeyTracker('users', top_k=8, width=256, depth=4, window=0)
+    for _ in range(90):
+        tracker.read('hot')
+    for _ in range(10):
+        tracker.write('hot')
+    for i in range(50):
+        tracker.write(f'cold-{i}')
+    report = tracker.report(limit=3)
+    assert report['reads'] == 90 and report['writes'] == 60
+    assert report['read_ratio'] == pytest.approx(0.6)
+    first = report['keys'][0]
+    assert first['key'] == 'hot' and first['reads'] == 90 and first['writes'] == 10
+    assert first['read_ratio'] == pytest.approx(0.9)
+    assert first['share'] == pytest.approx(100 / 150)
+    assert tracker.estimate('hot') == (90, 10)
+    assert tracker.top_share(1) == pytest.approx(100 / 150)
+
+
+def test_tracker_decays_every_window():
+    tracker = KeyTracker('posts', top_k=4, width=64, depth=2, window=100)
+    for _ in range(100):
+        tracker.read('old')
+    assert tracker.estimate('old') == (50, 0)
+    for _ in range(100):
+        tracker.read('new')
+    top = [k['key'] for k in tracker.report()['keys']]
+    assert top[0] == 'new'
+    assert tracker.reads == 200
+
+
+def test_recording_is_applied_in_batches_and_never_decays():
+    tracker = KeyTracker('batched', top_k=4, width=64, depth=2, window=100, batch=10)
+    for _ in range(9):
+        tracker.read('a')
+    assert tracker._read_sketch.total == 0
+    tracker.read('a')
+    assert tracker._read_sketch.total == 10
+    for _ in range(290):
+        tracker.read('a')
+    # Three windows passed on the request path without a halving ...
+    assert tracker._read_sketch.total == 300
+    # ... which the next reader applies, once per window.
+    assert tracker.estimate('a') == (300 >> 3, 0)
+    assert tracker.reads == 300
+
+
+def test_buffers_of_all_threads_are_counted():
+    tracker = KeyTracker('threads', top_k=8, width=256, depth=4, window=0, batch=64)
+
+    def work(n):
+        for i in range(1000):
+            tracker.read(f'k{n}')
+            if i % 10 == 0:
+                tracker.write('shared')
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = tracker.report()
+    assert (report['reads'], report['writes']) == (4000, 400)
+    assert {k['key']: (k['reads'], k['writes']) for k in report['keys']}['shared'] == (0, 400)
+
+
+
+def test_buffers_of_exited_threads_are_dropped():
+    tracker = KeyTracker('churn', top_k=8, width=256, depth=4, window=0, batch=64)
+
+    def work(n):
+        for _ in range(10):
+            tracker.read(f'k{n % 4}')
+
+    for n in range(500):
+        thread = threading.Thread(target=work, args=(n,))
+        thread.start()
+        thread.join()
+    assert len(tracker._buffers) <= 2
+    assert tracker.reads == 5000
+    assert not tracker._buffers
+    assert tracker.estimate('k0') == (1250, 0)
+
+def test_disabled_trackers_record_nothing():
+    hot = HotKeys(enabled=False)
+    tracker = hot.tracker('users')
+    tracker.read('a')
+    tracker.write('a')
+    assert tracker.reads == 0 and hot.report() == []
+
+
+def test_enabled_trackers_are_exported_as_metrics():
+    hot = HotKeys(top_k=4, width=64, depth=2)
+    tracker = hot.tracker('unit_table')
+    assert hot.tracker('unit_table') is tracker
+    tracker.read('a')
+    tracker.write('b')
+    tracker.read('a')
+    from hotkeys import HOTKEY_OPERATIONS, HOTKEY_TOP1_SHARE  # type: ignore
+    assert HOTKEY_OPERATIONS.value('unit_table', 'read') == 2
+    assert HOTKEY_OPERATIONS.value('unit_table', 'write') == 1
+    assert HOTKEY_TOP1_SHARE.value('unit_table') == pytest.approx(2 / 3)
+    rendered = '\n'.join(HOTKEY_OPERATIONS.render())
+    assert 'hotkey_operations_total{table="unit_table",op="read"} 2' in rendered
+
+
+def test_counter_callbacks_render_with_incremented_series():
+    counter = MetricCounter('test_cb_total', 'test', ('kind',))
+    counter.inc('a', amount=2)
+    counter.set_function(lambda: 5, 'b')
+    assert counter.render()[2:] == ['test_cb_total{kind="a"} 2', 'test_cb_total{kind="b"} 5']
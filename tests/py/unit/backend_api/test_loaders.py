@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from content_repository import (  # type: ignore  # noqa: E402
+    CommentEntity,
+    InMemoryCommentRepository,
+    InMemoryPostRepository,
+    PostEntity,
+)
+from loaders import BatchLoader, Loaders, expand_users, parse_include  # type: ignore  # noqa: E402
+from repository import InMemoryUserRepository, UserEntity  # type: ignore  # noqa: E402
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+def test_batch_loader_fetches_missing_keys_once():
+    calls = []
+
+    def batch(keys):
+        calls.append(list(keys))
+        return {k: k.upper() for k in keys}
+
+    loader = BatchLoader(batch)
+    assert loader.load_many(['a', 'b', 'a']) == {'a': 'A', 'b': 'B'}
+    assert loader.load_many(['b', 'c']) == {'b': 'B', 'c': 'C'}
+    assert loader.load('a') == 'A'
+    assert calls == [['a', 'b'], ['c']]
+    assert loader.batches == 2
+
+
+def test_parse_include_adds_parents_and_rejects_unknown_paths():
+    assert parse_include('posts.comments') == {'posts', 'posts.comments'}
+    assert parse_include(' posts , ') == {'posts'}
+    assert parse_include(None) == frozenset()
+    with pytest.raises(ValueError, match='friends'):
+        parse_include('posts,friends')
+
+
+def test_expansion_uses_one_batch_per_level():
+    posts, comments = InMemoryPostRepository(), InMemoryCommentRepository()
+    users = [UserEntity(id=f'u{i}', name=f'U{i}') for i in range(3)]
+    for i in range(9):
+        posts.save(PostEntity(id=f'p{i}', user_id=f'u{i % 3}', title=f'T{i}'))
+        comments.save(CommentEntity(id=f'c{i}', post_id=f'p{i}', user_id='u0', content='x'))
+    loaders = Loaders(UnitOfWork(InMemoryUserRepository(), posts, comments))
+
+    out = expand_users(users, parse_include('posts.comments'), loaders)
+    assert [p['id'] for p in out[1]['posts']] == ['p1', 'p4', 'p7']
+    assert out[1]['posts'][0]['comments'][0]['id'] == 'c1'
+    assert loaders.posts_by_user.batches == 1
+    assert loaders.comments_by_post.batches == 1
+
+    expand_users(users[:1], parse_include('posts.comments'), loaders)
+    assert loaders.posts_by_user.batches == 1
+    assert loaders.comments_by_post.batches == 1
@@ -0,0 +1,101 @@
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from content_repository import InMemoryCommentRepository, InMemoryPostRepository, PostEntity  # type: ignore  # noqa: E402
+from memory import MemoryDebugger, deep_sizeof, structure_sizes  # type: ignore  # noqa: E402
+from repository import InMemoryUserRepository, ShardedUserRepository, UserEntity  # type: ignore  # noqa: E402
+from uow import UnitOfWork, open_units, track_open_units  # type: ignore  # noqa: E402
+
+
+@pytest.fixture
+def tracking():
+    track_open_units(True)
+    yield
+    track_open_units(False)
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    payload = 'x' * 10_000
+    assert deep_sizeof([payload, payload]) < deep_sizeof([payload, 'y' * 10_000])
+    assert deep_sizeof({'a': payload}) > 10_000
+
+
+def test_sampled_estimate_is_close_for_uniform_items():
+    store = {f'user-{i:06d}': UserEntity(id=f'user-{i:06d}', name=f'Name {i:06d}') for i in range(20_000)}
+    exact = deep_sizeof(store, sample=len(store) + 1)
+    assert deep_sizeof(store) == pytest.approx(exact, rel=0.05)
+
+
+@pytest.mark.parametrize('repo_cls', [InMemoryUserRepository, lambda: ShardedUserRepository(4)])
+def test_structure_sizes_cover_stores_indexes_and_open_transactions(repo_cls, tracking):
+    users = repo_cls()
+    posts, comments = InMemoryPostRepository(), InMemoryCommentRepository()
+    for i in range(100):
+        users.save(UserEntity(id=f'u{i}', name='n'))
+        posts.save(PostEntity(id=f'p{i}', user_id=f'u{i % 10}', title='t'))
+
+    sizes = structure_sizes(users, posts, comments)
+    assert sizes['users.store']['entries'] == 100
+    assert sizes['posts.rows']['entries'] == 100
+    assert sizes['posts.indexes']['entries'] == 10
+    assert sizes['comments.rows'] == {'entries': 0, 'bytes': sizes['comments.rows']['bytes']}
+    assert sizes['users.changes']['entries'] == 100
+    idle = sizes['uow.staged']['bytes']
+
+    uow = UnitOfWork(users, posts, comments)
+    with uow.transaction():
+        for i in range(50):
+            uow.users_save(UserEntity(id=f'staged-{i}', name=f'{i:0100d}'))
+        during = structure_sizes(users, posts, comments)['uow.staged']
+    assert during['entries'] >= 50
+    assert during['bytes'] > idle + 50 * 100
+
+
+def test_units_are_not_registered_while_tracking_is_off():
+    uow = UnitOfWork(InMemoryUserRepository())
+    with uow.transaction():
+        assert uow not in open_units()
+
+
+def test_only_units_with_an_open_transaction_are_listed(tracking):
+    uow = UnitOfWork(InMemoryUserRepository())
+    assert uow not in open_units()
+    with uow.transaction():
+        with uow.transaction():
+            assert open_units().count(uow) == 1
+    assert uow not in open_units()
+    with pytest.raises(ValueError):
+        with uow.transaction():
+            raise ValueError
+    assert uow not in open_units()
+
+
+def test_tracemalloc_top_and_diff():
+    debugger = MemoryDebugger(keep=2)
+    assert not tracemalloc.is_tracing()
+    with pytest.raises(RuntimeError):
+        debugger.take()
+    debugger.start(frames=4)
+    try:
+        base = debugger.take()
+        hoard = [bytearray(4096) for _ in range(256)]  # noqa: F841
+        top = debugger.top()
+        assert top and top[0]['size'] >= 1 << 20
+        assert top[0]['site'].startswith(__file__)
+        diff = debugger.diff(base)
+        assert diff[0]['size_diff'] >= 1 << 20 and diff[0]['count_diff'] >= 256
+        debugger.take()
+        debugger.take()
+        with pytest.raises(KeyError):
+            debugger.diff(base)  # evicted: only the newest two are kept
+    finally:
+        debugger.stop()
+    assert not tracemalloc.is_tracing()
+    assert debugger.status()['snapshots'] == []
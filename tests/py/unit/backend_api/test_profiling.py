@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+import time
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from profiling import ProfileSettings, Profiler, ProfileStore, ProfilingMiddleware, SamplingProfiler  # type: ignore  # noqa: E402
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_store_keeps_newest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), keep=3)
+    ids = []
+    for i in range(5):
+        profile_id = store.new_id()
+        ids.append(profile_id)
+        store.save(profile_id, 'collapsed', lambda path: open(path, 'w').write('a;b 1\n'), {'n': i})
+    listed = store.list()
+    assert [p['id'] for p in listed] == ids[:1:-1]
+    assert [p['n'] for p in listed] == [4, 3, 2]
+    assert sorted(os.listdir(tmp_path)) == sorted(f'{i}.{ext}' for i in ids[2:] for ext in ('json', 'collapsed'))
+    assert store.path(f'{ids[-1]}.collapsed') == os.path.join(str(tmp_path), f'{ids[-1]}.collapsed')
+    assert store.path(f'{ids[0]}.collapsed') is None
+    assert store.path('../../etc/passwd') is None
+
+
+def test_sampler_folds_busy_stacks_and_skips_idle_threads():
+    sampler = SamplingProfiler(interval=0.001)
+    sampler.start()
+    _spin(0.1)
+    sampler.stop()
+    assert sampler.samples > 10
+    busy = {stack: n for stack, n in sampler.stacks.items() if stack.endswith('test_profiling.py:_spin')}
+    assert busy and sum(busy.values()) >= sampler.samples // 2
+    assert all(not stack.endswith('threading.py:wait') for stack in sampler.stacks)
+
+
+def _profiler(tmp_path, sample_rate=1.0):
+    return Profiler(ProfileSettings(sample_rate=sample_rate, directory=str(tmp_path)))
+
+
+def _scope(path):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'headers': []}
+
+
+def test_capture_ends_at_the_first_body_message(tmp_path):
+    profiler = _profiler(tmp_path)
+    busy_between_chunks = []
+
+    async def streaming(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'a', 'more_body': True})
+        busy_between_chunks.append(profiler._busy.locked())
+        await send({'type': 'http.response.body', 'body': b'b', 'more_body': False})
+
+    async def send(message):
+        pass
+
+    asyncio.run(ProfilingMiddleware(streaming, profiler)(_scope('/stream'), None, send))
+    assert busy_between_chunks == [False]
+    assert [p['status'] for p in profiler.store.list()] == [200]
+
+
+def test_exempt_paths_are_not_sampled(tmp_path):
+    profiler = _profiler(tmp_path)
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = ProfilingMiddleware(app, profiler, exempt={'/users/changes'})
+    asyncio.run(middleware(_scope('/users/changes'), None, send))
+    asyncio.run(middleware(_scope('/users'), None, send))
+    assert [dict(m['headers']).get(b'x-profile-id') is not None for m in sent if 'headers' in m] == [False, True]
+    assert len(profiler.store.list()) == 1
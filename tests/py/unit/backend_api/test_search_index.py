@@ -0,0 +1,122 @@
+import math
+import os
+import random
+import sys
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from content_repository import InMemoryPostRepository, PostEntity  # type: ignore  # noqa: E402
+from search import SearchIndex, post_terms, tokenize  # type: ignore  # noqa: E402
+
+WORDS = [f'w{i}' for i in range(60)]
+
+
+def _corpus(rng, n):
+    def text(length):
+        # Skewed word choice so some terms are common and others rare.
+        return ' '.join(WORDS[min(int(rng.paretovariate(1.0)) - 1, len(WORDS) - 1)] for _ in range(length))
+
+    return [PostEntity(id=f'p{i}', user_id='u', title=text(rng.randint(1, 4)), content=text(rng.randint(0, 20)) or None) for i in range(n)]
+
+
+def _brute_force(posts, query, k, k1=1.2, b=0.75):
+    docs = {p.id: post_terms(p) for p in posts}
+    docs = {key: tf for key, tf in docs.items() if tf}
+    n = len(docs)
+    avgdl = sum(sum(tf.values()) for tf in docs.values()) / n
+    terms = list(dict.fromkeys(tokenize(query)))
+    scores = {}
+    for term in terms:
+        df = sum(1 for tf in docs.values() if term in tf)
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for key, tf in docs.items():
+            if term in tf:
+                dl = sum(tf.values())
+                f = tf[term]
+                scores[key] = scores.get(key, 0.0) + idf * f * (k1 + 1) / (f + k1 * (1 - b + b * dl / avgdl))
+    return sorted(scores.items(), key=lambda kv: -kv[1])[:k]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pruned_ranking_matches_exhaustive_bm25(seed):
+    rng = random.Random(seed)
+    posts = _corpus(rng, 400)
+    index = SearchIndex()
+    for post in posts:
+        index.add(post)
+    for _ in range(20):
+        query = ' '.join(rng.sample(WORDS[:30], rng.randint(1, 4)))
+        k = rng.choice([1, 5, 10, 50])
+        got = index.search(query, k)
+        want = _brute_force(posts, query, k)
+        assert [s for _, s in got] == pytest.approx([s for _, s in want])
+        # Ties may order differently; the score multiset must match exactly.
+        assert {key for key, s in got if s > want[-1][1] + 1e-9} == {key for key, s in want if s > want[-1][1] + 1e-9}
+
+
+def test_updates_and_deletes_through_the_repository():
+    repo = InMemoryPostRepository()
+    index = SearchIndex()
+    repo.subscribe(index.apply)
+    repo.save(PostEntity(id='a', user_id='u', title='Fast Python search', content='inverted index'))
+    repo.save(PostEntity(id='b', user_id='u', title='Cooking', content='python recipes'))
+    assert [key for key, _ in index.search('python')] == ['a', 'b']
+
+    repo.save(PostEntity(id='a', user_id='u', title='Gardening', content=None))
+    assert [key for key, _ in index.search('python')] == ['b']
+    assert [key for key, _ in index.search('gardening')] == ['a']
+    repo.delete('b')
+    assert index.search('python') == []
+    assert len(index) == 1
+
+
+def test_compaction_keeps_results(tmp_path):
+    rng = random.Random(7)
+    posts = _corpus(rng, 300)
+    index = SearchIndex()
+    for post in posts:
+        index.add(post)
+    compactions = []
+    compact = index._compact
+    index._compact = lambda: (compactions.append(1), compact())
+    for post in posts[:250]:
+        index.remove(post)
+    assert compactions and len(index._doc_keys) < 300
+    assert index._dead_postings < index._live_postings or index._dead_postings <= 1024
+    assert index.search('w0 w1', 10) == pytest.approx(_brute_force(posts[250:], 'w0 w1', 10))
+    index.compact()
+    assert len(index._doc_keys) == 50 and index._dead_postings == 0
+    assert index.search('w0 w1', 10) == pytest.approx(_brute_force(posts[250:], 'w0 w1', 10))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = random.Random(3)
+    posts = _corpus(rng, 200)
+    index = SearchIndex(k1=1.5, b=0.6)
+    for post in posts:
+        index.add(post)
+    index.remove(posts[0])
+    path = str(tmp_path / 'posts.idx')
+    index.save(path)
+    loaded = SearchIndex.load(path)
+    assert len(loaded) == 199
+    for query in ('w0', 'w3 w9', 'w1 w2 w20'):
+        assert loaded.search(query, 10) == index.search(query, 10)
+    loaded.add(PostEntity(id='new', user_id='u', title='w59 w59 w59'))
+    assert loaded.search('w59', 1)[0][0] == 'new'
+
+
+def test_save_and_load_terms_longer_than_64_kib(tmp_path):
+    index = SearchIndex()
+    long_word = 'x' * 70_000
+    index.add(PostEntity(id='long', user_id='u', title=f'short {long_word}'))
+    path = str(tmp_path / 'posts.idx')
+    index.save(path)
+    loaded = SearchIndex.load(path)
+    assert [key for key, _ in loaded.search(long_word, 1)] == ['long']
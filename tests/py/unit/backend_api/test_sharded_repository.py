@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from repository import InMemoryUserRepository, ShardedUserRepository, UserEntity  # type: ignore  # noqa: E402
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+def _ids_on_distinct_shards(repo, count):
+    found = {}
+    i = 0
+    while len(found) < count:
+        uid = f'user-{i}'
+        found.setdefault(repo.shard_of(uid), uid)
+        i += 1
+    return list(found.values())
+
+
+def test_transaction_commits_and_rolls_back():
+    repo = ShardedUserRepository(4)
+    uow = UnitOfWork(repo)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='a', name='Ada'))
+        uow.users_save(UserEntity(id='b', name='Bob'))
+        assert repo.get('a') is None
+        assert uow.users_get('a').name == 'Ada'
+    assert repo.get('a').name == 'Ada'
+    assert repo.size() == 2
+
+    with pytest.raises(RuntimeError):
+        with uow.transaction():
+            uow.users_delete('a')
+            uow.users_update(UserEntity(id='b', name='Changed'))
+            assert uow.users_get('a') is None
+            raise RuntimeError('boom')
+    assert repo.get('a').name == 'Ada'
+    assert repo.get('b').name == 'Bob'
+
+
+def test_update_of_missing_user_raises():
+    repo = ShardedUserRepository(4)
+    uow = UnitOfWork(repo)
+    with pytest.raises(KeyError):
+        with uow.transaction():
+            uow.users_update(UserEntity(id='ghost', name='x'))
+    with pytest.raises(KeyError):
+        repo.update(UserEntity(id='ghost', name='x'))
+
+
+def test_commit_fails_whole_when_updated_user_was_deleted_concurrently():
+    repo = ShardedUserRepository(4)
+    a, b = _ids_on_distinct_shards(repo, 2)
+    repo.save(UserEntity(id=a, name='A'))
+    uow = UnitOfWork(repo)
+    with pytest.raises(KeyError):
+        with uow.transaction():
+            uow.users_update(UserEntity(id=a, name='A2'))
+            uow.users_save(UserEntity(id=b, name='B'))
+            repo.delete(a)
+    assert repo.get(a) is None
+    assert repo.get(b) is None
+
+
+class _BlockingRepo(ShardedUserRepository):
+    """Holds the shard lock while applying writes to ``blocked_shard`` until released."""
+
+    def __init__(self, shards):
+        super().__init__(shards)
+        self.blocked_shard = None
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def _apply(self, shard, writes):
+        if shard is self._shards[self.blocked_shard]:
+            self.entered.set()
+            self.release.wait(5)
+        super()._apply(shard, writes)
+
+
+def test_disjoint_shards_commit_in_parallel():
+    repo = _BlockingRepo(8)
+    slow_id, fast_id = _ids_on_distinct_shards(repo, 2)
+    repo.blocked_shard = repo.shard_of(slow_id)
+
+    slow = threading.Thread(target=lambda: repo.commit(_staged(repo, slow_id)))
+    slow.start()
+    assert repo.entered.wait(5)
+    try:
+        # The slow commit holds its shard lock; a commit elsewhere must not wait for it.
+        done = threading.Event()
+        fast = threading.Thread(target=lambda: (repo.commit(_staged(repo, fast_id)), done.set()))
+        fast.start()
+        assert done.wait(2)
+        assert repo.get(fast_id) is not None
+        assert repo.get(slow_id) is None
+    finally:
+        repo.release.set()
+        slow.join(5)
+    assert repo.get(slow_id) is not None
+
+
+def _staged(repo, *ids):
+    staging = repo.snapshot()
+    for uid in ids:
+        repo.save(UserEntity(id=uid, name=uid), staging=staging)
+    return staging
+
+
+def test_multi_shard_transactions_do_not_deadlock():
+    repo = ShardedUserRepository(8)
+    ids = _ids_on_distinct_shards(repo, 4)
+    errors = []
+
+    def worker(order):
+        try:
+            for _ in range(500):
+                repo.commit(_staged(repo, *order))
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(ids if i % 2 else ids[::-1],)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert not any(t.is_alive() for t in threads)
+    assert errors == []
+    assert repo.size() == 4
+
+
+def test_version_changes_on_commit():
+    repo = ShardedUserRepository(2)
+    before = repo.version
+    repo.commit(_staged(repo, 'x'))
+    assert repo.version > before
+    assert sum(repo.shard_sizes()) == 1
+
+
+@pytest.mark.parametrize('make', [InMemoryUserRepository, lambda: ShardedUserRepository(shards=4)])
+def test_scan_is_lazy_and_unaffected_by_later_writes(make):
+    repo = make()
+    for i in range(10):
+        repo.save(UserEntity(id=f'u{i}', name='before'))
+    scan = repo.scan()
+    first = next(scan)
+    repo.save(UserEntity(id='new', name='x'))
+    repo.update(UserEntity(id='u5', name='after'))
+    repo.delete('u7')
+    rest = list(scan)
+    assert sorted(u.id for u in [first, *rest]) == sorted(f'u{i}' for i in range(10))
+    assert all(u.name == 'before' for u in rest)
+    assert repo.get('u5').name == 'after' and repo.get('u7') is None
+    assert {u.id for u in repo.scan()} == {f'u{i}' for i in range(10) if i != 7} | {'new'}
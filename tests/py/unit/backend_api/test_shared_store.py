@@ -0,0 +1,272 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from repository import UserEntity  # type: ignore  # noqa: E402
+from shared_store import SharedMemoryUserRepository  # type: ignore  # noqa: E402
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / 'users.store')
+
+
+def test_direct_writes_and_reads(store_path):
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    repo.save(UserEntity(id='a', name='Ada'))
+    repo.save(UserEntity(id='b', name='Bøb'))
+    repo.update(UserEntity(id='a', name='Ada L.'))
+    assert repo.get('a').name == 'Ada L.'
+    assert repo.get('b').name == 'Bøb'
+    assert repo.size() == 2
+    repo.delete('a')
+    assert repo.get('a') is None
+    assert repo.size() == 1
+    with pytest.raises(KeyError):
+        repo.update(UserEntity(id='a', name='x'))
+    repo.close()
+
+
+def test_unit_of_work_commits_and_rolls_back(store_path):
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    uow = UnitOfWork(repo)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='a', name='Ada'))
+        assert repo.get('a') is None
+    assert repo.get('a').name == 'Ada'
+    with pytest.raises(RuntimeError):
+        with uow.transaction():
+            uow.users_delete('a')
+            raise RuntimeError('boom')
+    assert repo.get('a').name == 'Ada'
+    repo.close()
+
+
+def test_instances_on_the_same_file_share_data_and_version(store_path):
+    first = SharedMemoryUserRepository(store_path, capacity=64)
+    second = SharedMemoryUserRepository(store_path, capacity=9999)
+    assert second.capacity == 64
+    first.save(UserEntity(id='a', name='Ada'))
+    assert second.get('a').name == 'Ada'
+    assert second.version == first.version
+    first.close()
+    second.close()
+
+
+def test_writes_from_another_process_are_visible(store_path):
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    repo.save(UserEntity(id='parent', name='P'))
+    script = textwrap.dedent(f'''
+        import sys
+        sys.path.insert(0, {API_DIR!r})
+        from repository import UserEntity
+        from shared_store import SharedMemoryUserRepository
+        repo = SharedMemoryUserRepository({store_path!r})
+        assert repo.get('parent').name == 'P'
+        for i in range(20):
+            repo.save(UserEntity(id=f'child-{{i}}', name=str(i)))
+    ''')
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=60)
+    assert repo.get('child-7').name == '7'
+    assert repo.size() == 21
+    repo.close()
+
+
+def test_tombstones_are_reclaimed(store_path):
+    repo = SharedMemoryUserRepository(store_path, capacity=16)
+    for i in range(200):
+        repo.save(UserEntity(id=f'u{i}', name='x'))
+        repo.delete(f'u{i}')
+    repo.save(UserEntity(id='keep', name='k'))
+    assert repo.get('keep').name == 'k'
+    assert repo.size() == 1
+    repo.close()
+
+
+def test_limits_are_enforced(store_path):
+    repo = SharedMemoryUserRepository(store_path, capacity=8, name_max=4)
+    with pytest.raises(ValueError):
+        repo.save(UserEntity(id='a', name='too long'))
+    for i in range(6):
+        repo.save(UserEntity(id=f'u{i}', name='x'))
+    with pytest.raises(RuntimeError):
+        repo.save(UserEntity(id='overflow', name='x'))
+    uow = UnitOfWork(repo)
+    with pytest.raises(RuntimeError):
+        with uow.transaction():
+            uow.users_delete('u0')
+            uow.users_save(UserEntity(id='n1', name='x'))
+            uow.users_save(UserEntity(id='n2', name='x'))
+    assert repo.get('u0') is not None
+    assert repo.size() == 6
+    repo.close()
+
+
+def _slot_offset(repo, user_id):
+    import zlib
+
+    import shared_store  # type: ignore
+
+    key = user_id.encode()
+    index, _ = repo._locate(key, zlib.crc32(key))
+    return shared_store._HEADER_SIZE + index * repo._slot_size
+
+
+def test_a_slot_left_mid_write_is_repaired_on_open(store_path):
+    import shared_store  # type: ignore
+
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    repo.save(UserEntity(id='a', name='Ada'))
+    repo.save(UserEntity(id='b', name='Bob'))
+    offset = _slot_offset(repo, 'a')
+    # A writer died between bumping the sequence and publishing the slot.
+    shared_store._U32.pack_into(repo._map, offset, shared_store._U32.unpack_from(repo._map, offset)[0] + 1)
+    before = repo.version
+    reopened = SharedMemoryUserRepository(store_path)
+    assert reopened.get('a') is None
+    assert reopened.get('b').name == 'Bob'
+    assert reopened.size() == 1 and reopened.version == before + 1
+    reopened.save(UserEntity(id='a', name='Ada'))
+    assert repo.get('a').name == 'Ada'
+    repo.close()
+    reopened.close()
+
+
+def test_an_interrupted_rehash_is_reset_on_open(store_path):
+    import shared_store  # type: ignore
+
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    repo.save(UserEntity(id='a', name='Ada'))
+    shared_store._U64.pack_into(repo._map, shared_store._EPOCH_AT, 1)
+    reopened = SharedMemoryUserRepository(store_path)
+    assert reopened.size() == 0 and reopened.get('a') is None
+    assert reopened._u64(shared_store._EPOCH_AT) == 2
+    repo.close()
+    reopened.close()
+
+
+def test_reads_fall_back_to_the_lock_instead_of_spinning(store_path):
+    import shared_store  # type: ignore
+
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    repo.save(UserEntity(id='a', name='Ada'))
+    offset = _slot_offset(repo, 'a')
+    seq = shared_store._U32.unpack_from(repo._map, offset)[0]
+    shared_store._U32.pack_into(repo._map, offset, seq + 1)
+    # The slot stays odd: the lock-free path never succeeds, the locked probe answers.
+    assert repo.get('a') is None
+    shared_store._U32.pack_into(repo._map, offset, seq)
+    assert repo.get('a').name == 'Ada'
+    repo.close()
+
+
+def test_change_log_is_shared_through_the_file(store_path):
+    first = SharedMemoryUserRepository(store_path, capacity=64, retention=8)
+    second = SharedMemoryUserRepository(store_path)
+    first.save(UserEntity(id='a', name='Ada'))
+    uow = UnitOfWork(second)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='b', name='Bob'))
+        uow.users_delete('a')
+    assert first.changes.latest == second.changes.latest == 3
+    changes = [(c.seq, c.op, c.id, c.name) for c in first.changes.since(0)]
+    assert changes == [(1, 'create', 'a', 'Ada'), (2, 'create', 'b', 'Bob'), (3, 'delete', 'a', None)]
+    assert [c.seq for c in second.changes.since(1, limit=1)] == [2]
+    first.close()
+    second.close()
+
+
+def test_change_log_ring_drops_the_oldest_records(store_path):
+    from changes import ResyncRequired  # type: ignore
+
+    repo = SharedMemoryUserRepository(store_path, capacity=64, retention=4)
+    for i in range(10):
+        repo.save(UserEntity(id=f'u{i}', name=str(i)))
+    assert repo.changes.earliest == 7
+    assert [c.id for c in repo.changes.since(6)] == ['u6', 'u7', 'u8', 'u9']
+    with pytest.raises(ResyncRequired):
+        repo.changes.since(5)
+    repo.close()
+
+
+
+def test_change_log_reads_do_not_wait_for_the_file_lock(store_path):
+    import threading
+
+    reader = SharedMemoryUserRepository(store_path, capacity=64)
+    writer = SharedMemoryUserRepository(store_path)
+    writer.save(UserEntity(id='a', name='Ada'))
+    seen = []
+    with writer._file_lock():
+        thread = threading.Thread(target=lambda: seen.extend(c.id for c in reader.changes.since(0)))
+        thread.start()
+        thread.join(5.0)
+        assert seen == ['a']
+    reader.close()
+    writer.close()
+
+
+def test_change_log_reads_retry_records_overwritten_meanwhile(store_path):
+    import shared_store  # type: ignore
+    from changes import ResyncRequired  # type: ignore
+
+    repo = SharedMemoryUserRepository(store_path, capacity=64, retention=4)
+    for i in range(4):
+        repo.save(UserEntity(id=f'u{i}', name=str(i)))
+    log = repo.changes
+    read = log._read
+
+    def racing_read(expected):
+        # Another worker appends past the ring while this one reads.
+        if expected == 2 and repo.changes.latest == 4:
+            repo.save(UserEntity(id='u4', name='4'))
+            repo.save(UserEntity(id='u5', name='5'))
+        return read(expected)
+
+    log._read = racing_read
+    with pytest.raises(ResyncRequired):
+        log.since(0)
+    assert [c.id for c in log.since(2)] == ['u2', 'u3', 'u4', 'u5']
+    # A record that no longer matches while the header is unchanged predates a reset.
+    shared_store._U64.pack_into(repo._map, log._at(6), 2)
+    with pytest.raises(ResyncRequired):
+        log.since(4)
+    repo.close()
+
+def test_long_poll_sees_commits_from_another_instance(store_path):
+    import asyncio
+    import threading
+
+    reader = SharedMemoryUserRepository(store_path, capacity=64)
+    writer = SharedMemoryUserRepository(store_path)
+    timer = threading.Timer(0.1, lambda: writer.save(UserEntity(id='late', name='L')))
+    timer.start()
+    assert asyncio.run(reader.changes.wait(0, 5.0))
+    assert [c.id for c in reader.changes.since(0)] == ['late']
+    assert not asyncio.run(reader.changes.wait(1, 0.05))
+    timer.join()
+    reader.close()
+    writer.close()
+
+
+def test_cursors_resync_after_an_interrupted_rehash(store_path):
+    import shared_store  # type: ignore
+    from changes import ResyncRequired  # type: ignore
+
+    repo = SharedMemoryUserRepository(store_path, capacity=64)
+    repo.save(UserEntity(id='a', name='Ada'))
+    shared_store._U64.pack_into(repo._map, shared_store._EPOCH_AT, 1)
+    reopened = SharedMemoryUserRepository(store_path)
+    with pytest.raises(ResyncRequired):
+        reopened.changes.since(0)
+    assert reopened.changes.since(reopened.changes.latest) == []
+    repo.close()
+    reopened.close()
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from singleflight import SingleFlight  # type: ignore  # noqa: E402
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test')
+    calls = []
+    gate = threading.Event()
+
+    def slow():
+        calls.append(1)
+        gate.wait(1)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.001)
+    time.sleep(0.02)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == ['value'] * 8
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_exception_is_shared_and_not_cached():
+    flight = SingleFlight('test')
+
+    def boom():
+        raise KeyError('missing')
+
+    with pytest.raises(KeyError):
+        flight.do('k', boom)
+    assert flight.do('k', lambda: 'fresh') == 'fresh'
+
+
+def test_distinct_keys_run_independently():
+    flight = SingleFlight('test')
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+
@@ -0,0 +1,267 @@
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from content_repository import CommentEntity, PostEntity  # type: ignore  # noqa: E402
+from repository import InMemoryUserRepository, UserEntity  # type: ignore  # noqa: E402
+from tenants import (  # type: ignore  # noqa: E402
+    DEFAULT_TENANT, TENANT_EVICTIONS, TENANT_QUOTA_REJECTED, TENANT_RELOADS, TenantLimitReached, TenantQuotaExceeded,
+    TenantRegistry, TenantSettings, UnknownTenant, current_tenant, tenant,
+)
+from uow import UnitOfWork  # type: ignore  # noqa: E402
+
+
+@pytest.fixture
+def registry(tmp_path):
+    reg = TenantRegistry(InMemoryUserRepository(), TenantSettings(tenants=['*'], offload_dir=str(tmp_path)))
+    yield reg
+    reg.close()
+
+
+def _add(repo, *ids, name='x'):
+    uow = UnitOfWork(repo)
+    with uow.transaction():
+        for user_id in ids:
+            uow.users_save(UserEntity(id=user_id, name=name))
+
+
+def test_default_tenant_uses_the_shared_repository(registry):
+    assert current_tenant() == DEFAULT_TENANT
+    assert registry.repository(DEFAULT_TENANT) is registry.default
+    assert registry.usage() == []
+
+
+def test_tenants_are_isolated(registry):
+    acme, globex = registry.repository('acme'), registry.repository('globex')
+    assert registry.repository('acme') is acme
+    _add(acme, 'u1')
+    assert acme.get('u1') is not None
+    assert globex.get('u1') is None and registry.default.get('u1') is None
+    assert [u['tenant'] for u in registry.usage()] == ['acme', 'globex']
+    assert acme.bytes > 0 and acme.changes is not globex.changes
+
+
+def test_posts_comments_and_search_are_per_tenant(registry):
+    acme, globex = registry.content('acme'), registry.content('globex')
+    assert registry.content(DEFAULT_TENANT) is registry.default_content
+    assert registry.content('acme') is acme and acme is registry.repository('acme').content
+    uow = UnitOfWork(registry.repository('acme'), acme.posts, acme.comments)
+    with uow.transaction():
+        uow.posts_save(PostEntity(id='p1', user_id='u1', title='launch day'))
+        uow.comments_save(CommentEntity(id='c1', post_id='p1', user_id='u1', content='congrats'))
+    assert [key for key, _ in acme.search.search('launch')] == ['p1']
+    assert globex.posts.get('p1') is None and globex.search.search('launch') == []
+    assert registry.default_content.posts.get('p1') is None
+    assert acme.bytes > 0 and globex.bytes == 0
+    assert registry.usage()[0]['posts'] == registry.usage()[0]['comments'] == 1
+
+
+def test_only_configured_tenants_are_served(tmp_path):
+    registry = TenantRegistry(InMemoryUserRepository(), TenantSettings(tenants=['acme'], offload_dir=str(tmp_path)))
+    assert registry.allows('acme') and registry.allows(DEFAULT_TENANT) and not registry.allows('globex')
+    registry.repository('acme')
+    with pytest.raises(UnknownTenant):
+        registry.repository('globex')
+    with pytest.raises(UnknownTenant):
+        registry.content('globex')
+    assert not TenantRegistry(InMemoryUserRepository()).allows('acme')
+
+
+def test_partitions_are_capped_and_empty_ones_dropped(tmp_path):
+    registry = TenantRegistry(
+        InMemoryUserRepository(), TenantSettings(tenants=['*'], max_partitions=2, offload_dir=str(tmp_path)),
+    )
+    with registry.pinned('empty'):
+        assert [u['tenant'] for u in registry.usage()] == ['empty']
+    assert registry.usage() == []
+    _add(registry.repository('t1'), 'a')
+    registry.repository('idle')
+    # Partitions nobody uses that hold nothing make room.
+    _add(registry.repository('t2'), 'a')
+    assert [u['tenant'] for u in registry.usage()] == ['t1', 't2']
+    with pytest.raises(TenantLimitReached):
+        registry.repository('t3')
+    # One with a change history is kept, even when it holds nothing.
+    registry.repository('t2').delete('a')
+    with pytest.raises(TenantLimitReached):
+        registry.repository('t3')
+    registry.close()
+
+
+def test_shared_stores_are_refused_with_tenants(tmp_path):
+    from shared_store import SharedMemoryUserRepository  # type: ignore
+
+    store = SharedMemoryUserRepository(str(tmp_path / 'users.store'), capacity=64)
+    with pytest.raises(ValueError):
+        TenantRegistry(store, TenantSettings(tenants=['*']))
+    TenantRegistry(store, TenantSettings()).close()
+    store.close()
+
+
+def test_tenant_context_validates_ids():
+    with tenant('acme'):
+        assert current_tenant() == 'acme'
+    assert current_tenant() == DEFAULT_TENANT
+    with pytest.raises(ValueError):
+        with tenant('../etc'):
+            pass
+
+
+def test_quota_rejects_the_commit_and_keeps_the_store(tmp_path):
+    registry = TenantRegistry(
+        InMemoryUserRepository(), TenantSettings(tenants=['*'], offload_dir=str(tmp_path), quota_bytes=4096),
+    )
+    repo = registry.repository('small')
+    _add(repo, 'a', 'b')
+    before = TENANT_QUOTA_REJECTED.value()
+    with pytest.raises(TenantQuotaExceeded) as info:
+        _add(repo, *[f'bulk-{i}' for i in range(200)], name='n' * 50)
+    assert info.value.tenant == 'small' and info.value.projected > 4096
+    assert TENANT_QUOTA_REJECTED.value() == before + 1
+    assert repo.size() == 2 and repo.get('bulk-0') is None
+    with pytest.raises(TenantQuotaExceeded):
+        for i in range(200):
+            repo.save(UserEntity(id=f'direct-{i}', name='n' * 50))
+    assert repo.bytes <= 4096
+
+
+def test_quota_covers_posts_and_comments(tmp_path):
+    registry = TenantRegistry(
+        InMemoryUserRepository(), TenantSettings(tenants=['*'], offload_dir=str(tmp_path), quota_bytes=8192),
+    )
+    repo = registry.repository('small')
+    content = repo.content
+    _add(repo, 'u1')
+    uow = UnitOfWork(repo, content.posts, content.comments)
+    with pytest.raises(TenantQuotaExceeded):
+        with uow.transaction():
+            uow.users_save(UserEntity(id='u2', name='x'))
+            for i in range(100):
+                uow.posts_save(PostEntity(id=f'p{i}', user_id='u1', title='t' * 100))
+    # Refused before anything was applied, users included.
+    assert content.posts.size() == 0 and content.bytes == 0 and repo.get('u2') is None
+    with uow.transaction():
+        uow.posts_save(PostEntity(id='p0', user_id='u1', title='t' * 3000))
+    # The post leaves no room for users that fit once it is deleted.
+    bulk = [f'bulk-{i}' for i in range(25)]
+    with pytest.raises(TenantQuotaExceeded):
+        _add(repo, *bulk, name='n' * 50)
+    with uow.transaction():
+        uow.posts_delete('p0')
+    assert content.bytes == 0
+    _add(repo, *bulk, name='n' * 50)
+    assert repo.size() == 26
+
+
+def test_offload_and_transparent_reload(registry, tmp_path):
+    repo = registry.repository('cold')
+    _add(repo, 'a', 'b', name='Ünïcode')
+    version = repo.version
+    reloads = TENANT_RELOADS.value()
+    assert repo.offload() > 0
+    assert not repo.resident and repo.bytes == 0 and repo.size() == 2
+    assert os.path.exists(repo.path) and repo.path.startswith(str(tmp_path))
+    # Any operation brings it back.
+    assert repo.get('a').name == 'Ünïcode'
+    assert repo.resident and not os.path.exists(repo.path)
+    assert TENANT_RELOADS.value() == reloads + 1
+    assert repo.version == version
+    assert repo.offload() > 0
+    _add(repo, 'c')
+    assert sorted(u.id for u in repo.scan()) == ['a', 'b', 'c']
+
+
+def test_content_is_offloaded_with_the_tenant_and_still_counts(tmp_path):
+    registry = TenantRegistry(
+        InMemoryUserRepository(), TenantSettings(tenants=['*'], offload_dir=str(tmp_path), quota_bytes=8192),
+    )
+    repo = registry.repository('cold')
+    content = registry.content('cold')
+    _add(repo, 'u1')
+    uow = UnitOfWork(repo, content.posts, content.comments)
+    with uow.transaction():
+        uow.posts_save(PostEntity(id='p1', user_id='u1', title='launch day ' + 't' * 3000))
+        uow.comments_save(CommentEntity(id='c1', post_id='p1', user_id='u1', content='congrats'))
+    held = content.bytes
+    assert registry.resident_bytes() == repo.bytes + held
+    # In use by a request: only the users go.
+    with registry.pinned('cold'):
+        assert registry._offload(repo) > 0
+        assert content.resident and not repo.resident
+    assert registry._offload(repo) == held
+    assert not content.resident and content.bytes == 0 and registry.resident_bytes() == 0
+    assert os.path.exists(content.path)
+    assert registry.usage()[0]['posts'] == registry.usage()[0]['comments'] == 1
+    # The offloaded content still counts against the quota.
+    with pytest.raises(TenantQuotaExceeded):
+        _add(repo, *[f'bulk-{i}' for i in range(25)], name='n' * 50)
+    reloaded = registry.content('cold')
+    assert reloaded is content and content.resident and content.bytes == pytest.approx(held, rel=0.01)
+    assert not os.path.exists(content.path)
+    assert [key for key, _ in content.search.search('launch')] == ['p1']
+    assert [c.id for c in content.comments.for_post('p1')] == ['c1']
+
+
+def test_staged_transaction_survives_an_offload(registry):
+    repo = registry.repository('busy')
+    _add(repo, 'a')
+    uow = UnitOfWork(repo)
+    with uow.transaction():
+        uow.users_save(UserEntity(id='b', name='B'))
+        assert repo.offload() > 0
+    assert sorted(u.id for u in repo.scan()) == ['a', 'b']
+
+
+def test_budget_offloads_least_recently_used_tenants(tmp_path):
+    registry = TenantRegistry(InMemoryUserRepository(), TenantSettings(tenants=['*'], offload_dir=str(tmp_path)))
+    for name in ('t1', 't2', 't3'):
+        _add(registry.repository(name), *[f'{name}-{i}' for i in range(50)])
+    sizes = {u['tenant']: u['bytes'] for u in registry.usage()}
+    registry.repository('t1')  # most recently used now
+    registry.settings.memory_budget = sizes['t1'] + sizes['t3'] + 1
+    evictions = TENANT_EVICTIONS.value('budget')
+    # A commit over the budget evicts others, coldest first, never the committer first.
+    _add(registry.repository('t3'), 't3-extra')
+    resident = {u['tenant'] for u in registry.usage() if u['resident']}
+    assert 't2' not in resident and 't3' in resident
+    assert TENANT_EVICTIONS.value('budget') > evictions
+    assert registry.resident_bytes() <= registry.settings.memory_budget
+    assert registry.repository('t2').get('t2-0') is not None
+
+
+def test_budget_counts_and_offloads_content(tmp_path):
+    registry = TenantRegistry(InMemoryUserRepository(), TenantSettings(tenants=['*'], offload_dir=str(tmp_path)))
+    for name in ('t1', 't2'):
+        repo = registry.repository(name)
+        content = registry.content(name)
+        uow = UnitOfWork(repo, content.posts, content.comments)
+        with uow.transaction():
+            uow.users_save(UserEntity(id='u', name='x'))
+            for i in range(20):
+                uow.posts_save(PostEntity(id=f'p{i}', user_id='u', title='t' * 200))
+    t1 = registry.repository('t1')
+    assert t1.content.bytes > t1.bytes
+    registry.settings.memory_budget = registry.resident_bytes() - 1
+    registry.repository('t2')
+    assert registry.rebalance() == 1
+    assert not t1.content.resident and not t1.resident
+    assert registry.content('t1').posts.size() == 20
+
+
+def test_sweep_offloads_idle_tenants_and_forgets_empty_ones(registry):
+    registry.settings.idle_seconds = 10.0
+    _add(registry.repository('idle'), 'a')
+    registry.repository('empty')
+    with registry.pinned('pinned'):
+        now = registry.repository('idle').last_used + 60
+        assert registry.sweep(now) == 1
+        # Empty partitions in use by a request are kept.
+        assert [u['tenant'] for u in registry.usage()] == ['idle', 'pinned']
+    assert registry.sweep(now) == 0
+    assert [(u['tenant'], u['resident']) for u in registry.usage()] == [('idle', False)]
+    assert registry.repository('idle').get('a') is not None
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from repository import UserEntity  # type: ignore  # noqa: E402
+from transfer import LineTooLong, export_ndjson, ndjson_lines  # type: ignore  # noqa: E402
+
+
+async def _stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+def test_lines_are_reassembled_across_chunks_and_numbered():
+    lines = asyncio.run(_collect(ndjson_lines(_stream(b'{"a"', b':1}\n\n{"b":2', b'}\n', b'{"c":3}'), max_line=100)))
+    assert lines == [(1, b'{"a":1}'), (3, b'{"b":2}'), (4, b'{"c":3}')]
+
+
+def test_overlong_line_is_rejected_without_buffering_it():
+    with pytest.raises(LineTooLong) as info:
+        asyncio.run(_collect(ndjson_lines(_stream(b'{"ok":1}\n', b'x' * 50, b'x' * 60), max_line=100)))
+    assert info.value.line == 2
+
+
+def test_export_yields_batches():
+    chunks = list(export_ndjson((UserEntity(id=str(i), name='n') for i in range(1050)), batch=500))
+    assert [chunk.count(b'\n') for chunk in chunks] == [500, 500, 50]
+    assert chunks[0].startswith(b'{"id":"0","name":"n"}\n')
+
+
+def test_export_memory_does_not_grow_with_dataset_size():
+    def peak(count):
+        users = (UserEntity(id=f'user-{i}', name='name') for i in range(count))
+        tracemalloc.start()
+        for _ in export_ndjson(users):
+            pass
+        _, top = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return top
+
+    small, large = peak(1_000), peak(50_000)
+    assert large < small * 2
+
+
+def test_many_lines_in_one_chunk_and_one_line_in_many_chunks():
+    data = b''.join(b'{"n":%d}\n' % i for i in range(1000))
+    lines = asyncio.run(_collect(ndjson_lines(_stream(data, *(bytes([b]) for b in b'{"tail":true}')), max_line=100)))
+    assert len(lines) == 1001
+    assert lines[999] == (1000, b'{"n":999}')
+    assert lines[-1] == (1001, b'{"tail":true}')
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+
+import pytest
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/backend-api'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
+
+from content_repository import InMemoryCommentRepository, InMemoryPostRepository, PostEntity  # type: ignore  # noqa: E402
+from hotkeys import HOTKEYS  # type: ignore  # noqa: E402
+from repository import InMemoryUserRepository, ShardedUserRepository, UserEntity  # type: ignore  # noqa: E402
+from search import SearchIndex  # type: ignore  # noqa: E402
+from warmup import (  # type: ignore  # noqa: E402
+    WARMUP_REPLAYED, Progress, Warmup, WarmupSettings, build_indexes, load_data, prebuild_validators, replay,
+)
+
+
+def _write_ndjson(path, rows):
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+
+
+def test_steps_run_in_order_and_report_progress():
+    calls = []
+
+    def blocking(progress):
+        calls.append(('blocking', threading.current_thread() is threading.main_thread()))
+        progress.total = 2
+        progress.done = 2
+        progress.detail['rows'] = 7
+
+    async def coroutine(progress):
+        calls.append(('coroutine', None))
+
+    warmup = Warmup(WarmupSettings())
+    warmup.add('first', blocking)
+    warmup.add('second', coroutine)
+    assert warmup.status()['status'] == 'pending'
+    asyncio.run(warmup.run())
+    assert warmup.ready
+    # Blocking steps run on the thread pool, not on the event loop.
+    assert calls == [('blocking', False), ('coroutine', None)]
+    status = warmup.status()
+    assert status['step'] is None
+    first = status['steps'][0]
+    assert (first['name'], first['state'], first['done'], first['total'], first['rows']) == ('first', 'done', 2, 2, 7)
+    assert first['seconds'] >= 0
+
+
+def test_a_failing_required_step_stops_the_pipeline():
+    def broken(progress):
+        raise ValueError('bad data')
+
+    later = []
+    warmup = Warmup(WarmupSettings())
+    warmup.add('load', broken)
+    warmup.add('after', later.append)
+    asyncio.run(warmup.run())
+    assert warmup.state == 'failed' and not warmup.ready
+    steps = warmup.status()['steps']
+    assert steps[0]['state'] == 'failed' and steps[0]['error'] == 'ValueError: bad data'
+    assert steps[1]['state'] == 'pending' and later == []
+
+
+def test_a_failing_optional_step_is_recorded_and_skipped():
+    async def broken(progress):
+        raise RuntimeError('replay file missing')
+
+    warmup = Warmup(WarmupSettings())
+    warmup.add('replay', broken, required=False)
+    asyncio.run(warmup.run())
+    assert warmup.ready
+    assert warmup.status()['steps'][0]['state'] == 'failed'
+
+
+def test_disabled_warmup_is_ready_at_once():
+    warmup = Warmup(WarmupSettings(enabled=False))
+    warmup.add('load', lambda progress: pytest.fail('must not run'))
+    asyncio.run(warmup.run())
+    assert warmup.ready
+    assert warmup.status()['steps'][0]['state'] == 'skipped'
+
+
+def test_readiness_is_reported_while_running():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def waits(progress):
+            progress.total = 1
+            await release.wait()
+
+        warmup = Warmup(WarmupSettings())
+        warmup.add('slow', waits)
+        task = warmup.start()
+        assert warmup.start() is task
+        await asyncio.sleep(0)
+        status = warmup.status()
+        assert (status['status'], status['step']) == ('running', 'slow')
+        release.set()
+        await task
+        assert warmup.ready
+
+    asyncio.run(scenario())
+
+
+def test_load_data_bulk_loads_rows_in_batches(tmp_path):
+    _write_ndjson(tmp_path / 'users.ndjson', [{'id': f'u{i}', 'name': f'User {i}', 'email': 'x@example.com'} for i in range(5)])
+    _write_ndjson(tmp_path / 'posts.ndjson', [{'id': f'p{i}', 'user_id': 'u1', 'title': f'Hello {i}', 'published': True} for i in range(5)])
+    posts, comments = InMemoryPostRepository(), InMemoryCommentRepository()
+    users = InMemoryUserRepository()
+    search = SearchIndex()
+    posts.subscribe(search.apply)
+    applied = []
+    posts.subscribe(applied.append)
+    progress = Progress()
+    reads_before = HOTKEYS.tracker('users').reads
+    load_data(str(tmp_path), users, posts, comments, progress, batch=2)
+    assert users.size() == 5 and posts.size() == 5
+    assert posts.get('p1').published is True
+    assert [len(batch) for batch in applied] == [2, 2, 1]
+    assert len(search.search('hello', 10)) == 5
+    assert progress.done == progress.total > 0
+    assert progress.detail == {'users': 5, 'posts': 5}
+    # Neither the change feed nor hot-key tracking sees the load.
+    assert users.changes.latest == 0
+    assert HOTKEYS.tracker('users').reads == reads_before
+
+
+@pytest.mark.parametrize('repo_cls', [InMemoryUserRepository, lambda: ShardedUserRepository(4)])
+def test_bulk_load_skips_the_change_log(repo_cls):
+    repo = repo_cls()
+    version = repo.version
+    assert repo.bulk_load(UserEntity(id=f'u{i}', name='n') for i in range(10)) == 10
+    assert repo.size() == 10 and repo.get('u3').name == 'n'
+    assert repo.changes.latest == 0 and repo.version != version
+
+
+def test_shared_store_is_loaded_by_the_first_worker_only(tmp_path):
+    pytest.importorskip('fcntl')
+    from shared_store import SharedMemoryUserRepository  # type: ignore
+
+    _write_ndjson(tmp_path / 'users.ndjson', [{'id': f'u{i}', 'name': 'n'} for i in range(3)])
+    path = str(tmp_path / 'users.store')
+    first, second = SharedMemoryUserRepository(path, capacity=64), SharedMemoryUserRepository(path, capacity=64)
+    try:
+        for repo, expected in ((first, 3), (second, 0)):
+            progress = Progress()
+            load_data(str(tmp_path), repo, InMemoryPostRepository(), InMemoryCommentRepository(), progress)
+            assert progress.detail == {'users': expected}
+            assert progress.done == progress.total
+        assert second.size() == 3 and second.get('u2').name == 'n'
+        assert first.changes.latest == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_load_data_reports_the_bad_line(tmp_path):
+    (tmp_path / 'users.ndjson').write_text('{"id": "u1", "name": "A"}\n{"id": "u2"}\n')
+    with pytest.raises(ValueError, match='users.ndjson line 2'):
+        load_data(str(tmp_path), InMemoryUserRepository(), InMemoryPostRepository(), InMemoryCommentRepository(), Progress())
+
+
+def test_build_indexes_compacts_the_search_index():
+    posts, search = InMemoryPostRepository(), SearchIndex()
+    posts.subscribe(search.apply)
+    for i in range(3):
+        posts.save(PostEntity(id=f'p{i}', user_id='u', title=f'draft {i}'))
+    posts.save(PostEntity(id='p0', user_id='u', title='final'))
+    assert search._dead_postings
+    progress = Progress()
+    build_indexes(posts, search, progress)
+    assert search._dead_postings == 0
+    assert progress.done == 3 and progress.detail == {'posts': 3}
+    assert [key for key, _ in search.search('final')] == ['p0']
+
+
+def test_prebuild_validators_completes_deferred_models():
+    class Deferred(BaseModel):
+        model_config = {'defer_build': True}
+        name: str
+
+    built = []
+    progress = Progress()
+    prebuild_validators(lambda: built.append(True) or {}, [Deferred, Deferred], progress)
+    assert Deferred.__pydantic_complete__
+    assert built == [True]
+    assert progress.done == progress.total == 2
+
+
+def test_replay_only_sends_reads_and_counts_outcomes(tmp_path):
+    app = FastAPI()
+    seen = []
+
+    @app.get('/items/{item_id}')
+    def item(item_id: str, q: str = ''):
+        seen.append((item_id, q))
+        if item_id == 'boom':
+            raise RuntimeError('boom')
+        return {'id': item_id}
+
+    @app.post('/items')
+    def create():
+        seen.append('POST')
+
+    _write_ndjson(tmp_path / 'sample.ndjson', [
+        {'method': 'GET', 'path': '/items/1?q=a'},
+        {'method': 'POST', 'path': '/items'},
+        {'method': 'GET', 'path': '/items/2', 'query': 'q=b', 'headers': {'X-Tenant-Id': 't'}},
+        {'method': 'GET', 'path': '/items/boom'},
+        {'method': 'GET', 'path': '/items/over-limit'},
+    ])
+    before = WARMUP_REPLAYED.value('error')
+    progress = Progress()
+    asyncio.run(replay(app, str(tmp_path / 'sample.ndjson'), progress, limit=3, concurrency=2))
+    assert sorted(map(str, seen)) == ["('1', 'a')", "('2', 'b')", "('boom', '')"]
+    assert progress.done == progress.total == 3
+    assert progress.detail == {'ok': 2, 'error': 1}
+    assert WARMUP_REPLAYED.value('error') == before + 1
@@ -0,0 +1,58 @@
+import random
+
+from tests.py.benchmarks import harness
+
+
+def _doc(samples):
+    ordered = sorted(samples)
+    return {'median': ordered[len(ordered) // 2], 'samples': samples}
+
+
+def test_expand_sweeps_parameter_grid():
+    case = harness.Case('x', lambda **_: (lambda: None), {'size': [1, 2], 'mode': ['a']})
+    assert case.expand() == [{'size': 1, 'mode': 'a'}, {'size': 2, 'mode': 'a'}]
+    assert case.expand({'size': [5]}) == [{'size': 5, 'mode': 'a'}]
+
+
+def test_result_key_is_stable():
+    assert harness.result_key('repo.get', {'size': 10, 'a': 1}) == 'repo.get[a=1,size=10]'
+    assert harness.result_key('repo.get', {}) == 'repo.get'
+
+
+def test_mann_whitney_detects_shift():
+    rng = random.Random(7)
+    base = [1.0 + rng.gauss(0, 0.02) for _ in range(15)]
+    slower = [1.2 + rng.gauss(0, 0.02) for _ in range(15)]
+    assert harness.mann_whitney_greater(slower, base) < 0.001
+    assert harness.mann_whitney_greater(base, slower) > 0.99
+
+
+def test_compare_flags_only_significant_regressions():
+    rng = random.Random(11)
+    base = {'results': {
+        'slow': _doc([1.0 + rng.gauss(0, 0.01) for _ in range(15)]),
+        'noisy': _doc([1.0 + rng.gauss(0, 0.3) for _ in range(15)]),
+        'same': _doc([1.0 + rng.gauss(0, 0.01) for _ in range(15)]),
+    }}
+    current = {'results': {
+        'slow': _doc([1.3 + rng.gauss(0, 0.01) for _ in range(15)]),
+        'noisy': _doc([1.06 + rng.gauss(0, 0.3) for _ in range(15)]),
+        'same': _doc([1.0 + rng.gauss(0, 0.01) for _ in range(15)]),
+        'new': _doc([1.0] * 15),
+    }}
+    result = {c.key: c for c in harness.compare(base, current)}
+    assert set(result) == {'slow', 'noisy', 'same'}
+    assert result['slow'].regressed
+    assert not result['noisy'].regressed
+    assert not result['same'].regressed
+
+
+def test_run_and_round_trip(tmp_path):
+    case = harness.Case('noop', lambda size: (lambda: size), {'size': [1]})
+    doc = harness.run([case], repeat=3, min_time=0.001)
+    path = tmp_path / 'out.json'
+    harness.save(doc, str(path))
+    loaded = harness.load(str(path))
+    stats = loaded['results']['noop[size=1]']
+    assert len(stats['samples']) == 3
+    assert stats['median'] > 0
@@ -0,0 +1,155 @@
+import json
+import random
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from tests.py.benchmarks import datagen
+from tests.py.benchmarks._support import use_backend_api
+
+from libs.backend.type_utils.validators.comment import Comment
+from libs.backend.type_utils.validators.post import Post
+from libs.backend.type_utils.validators.types import validate_json
+from libs.backend.type_utils.validators.user import User
+
+
+def _dataset(users=300, **options):
+    profile = datagen.Profile.social(users, posts_per_user=3, comments_per_post=2, seed=options.pop('seed', 7))
+    return datagen.Dataset.from_schema(profile, chunk_size=options.pop('chunk_size', 64), **options)
+
+
+def _tables(dataset):
+    return {table: list(dataset.stream(table)) for table in dataset.order}
+
+
+def test_foreign_keys_are_inferred_from_the_schema():
+    refs = datagen.foreign_keys(datagen.load_schema())
+    assert refs == {'users': {}, 'posts': {'user_id': 'users'}, 'comments': {'post_id': 'posts', 'user_id': 'users'}}
+
+
+def test_tables_are_generated_after_what_they_reference():
+    assert _dataset().order == ['users', 'posts', 'comments']
+
+
+def test_same_seed_gives_same_rows_and_other_seeds_differ():
+    assert _tables(_dataset()) == _tables(_dataset())
+    assert _tables(_dataset(seed=8))['users'] != _tables(_dataset())['users']
+
+
+def test_rows_do_not_depend_on_chunk_boundaries_for_ids_and_references():
+    small, large = _tables(_dataset(chunk_size=16)), _tables(_dataset(chunk_size=1000))
+    assert [row['id'] for row in small['users']] == [row['id'] for row in large['users']]
+    assert len(small['posts']) == len(large['posts']) == 900
+
+
+def test_references_point_at_generated_rows_created_earlier():
+    tables = _tables(_dataset())
+    users = {row['id']: row for row in tables['users']}
+    posts = {row['id']: row for row in tables['posts']}
+    assert tables['comments']
+    for post in tables['posts']:
+        assert users[post['user_id']]['created_at'] < post['created_at']
+    for comment in tables['comments']:
+        assert posts[comment['post_id']]['created_at'] < comment['created_at']
+        assert users[comment['user_id']]['created_at'] < comment['created_at']
+    ids = [row['id'] for rows in tables.values() for row in rows]
+    assert len(ids) == len(set(ids))
+
+
+def test_rows_pass_the_domain_validators():
+    tables = _tables(_dataset(users=50))
+    for table, model in (('users', User), ('posts', Post), ('comments', Comment)):
+        for row in tables[table]:
+            validate_json(model, json.dumps(row))
+
+
+def test_updated_at_never_precedes_created_at():
+    for row in _tables(_dataset())['posts']:
+        if row['updated_at'] is not None:
+            assert datetime.fromisoformat(row['updated_at']) >= datetime.fromisoformat(row['created_at'])
+
+
+def test_authorship_follows_the_configured_skew():
+    def top_share(skew):
+        profile = datagen.Profile.social(1000, posts_per_user=10, author_skew=skew)
+        dataset = datagen.Dataset.from_schema(profile)
+        authors = Counter(row['user_id'] for row in dataset.stream('posts'))
+        return authors.most_common(1)[0][1] / 10_000
+
+    assert top_share(1.2) > 0.1
+    assert top_share(0.0) < 0.01
+
+
+def test_zipf_sampler_matches_the_distribution():
+    sampler, rng = datagen.ZipfSampler(1000, 1.0), random.Random(1)
+    counts = Counter(sampler.sample(rng) for _ in range(100_000))
+    harmonic = sum(1 / k for k in range(1, 1001))
+    assert counts[0] / 100_000 == pytest.approx(1 / harmonic, rel=0.05)
+    assert counts[1] / 100_000 == pytest.approx(0.5 / harmonic, rel=0.05)
+    assert max(counts) < 1000
+
+
+def test_null_rates_and_fanout_distributions():
+    profile = datagen.Profile(
+        counts={'users': 200, 'posts': 2000},
+        fanout={'comments': datagen.Fanout('post_id', 3, 'fixed')},
+        null_rates={'posts.content': 0.5},
+        null_rate=0.0,
+    )
+    tables = _tables(datagen.Dataset.from_schema(profile))
+    assert len(tables['comments']) == 6000
+    assert all(row['updated_at'] is not None for row in tables['users'])
+    nulls = sum(row['content'] is None for row in tables['posts']) / 2000
+    assert 0.45 < nulls < 0.55
+    with pytest.raises(ValueError):
+        datagen.Fanout('post_id', 3, 'pareto')
+
+
+def test_invalid_profiles_are_rejected():
+    with pytest.raises(ValueError, match='unknown table'):
+        datagen.Dataset.from_schema(datagen.Profile(counts={'accounts': 1}))
+    with pytest.raises(ValueError, match='has no row count'):
+        datagen.Dataset.from_schema(datagen.Profile(counts={'posts': 1}))
+    schema = datagen.load_schema()
+    schema['users']['avatar'] = {'type': 'geometry', 'nullable': True}
+    with pytest.raises(ValueError, match='unsupported column type'):
+        datagen.Dataset(schema, datagen.Profile(counts={'users': 1}))
+
+
+def test_ndjson_output_is_the_same_for_any_number_of_workers(tmp_path):
+    dataset = _dataset()
+    serial = datagen.write_ndjson(dataset, str(tmp_path / 'serial'))
+    parallel = datagen.write_ndjson(dataset, str(tmp_path / 'parallel'), workers=2)
+    assert serial == parallel
+    for table in dataset.order:
+        assert (tmp_path / 'serial' / f'{table}.ndjson').read_bytes() == (tmp_path / 'parallel' / f'{table}.ndjson').read_bytes()
+    assert sorted(p.name for p in (tmp_path / 'serial').iterdir()) == ['comments.ndjson', 'posts.ndjson', 'users.ndjson']
+
+
+def test_shards_together_hold_every_row(tmp_path):
+    dataset = _dataset()
+    full = datagen.write_ndjson(dataset, str(tmp_path))
+    shards = [datagen.write_ndjson(dataset, str(tmp_path), shard=(i, 3)) for i in range(3)]
+    for table in dataset.order:
+        assert sum(shard[table] for shard in shards) == full[table]
+        lines = set()
+        for i in range(3):
+            lines |= set((tmp_path / f'{table}.{i}-of-3.ndjson').read_text().splitlines())
+        assert lines == set((tmp_path / f'{table}.ndjson').read_text().splitlines())
+
+
+def test_load_into_saves_rows_through_a_unit_of_work():
+    use_backend_api()
+    from repository import InMemoryUserRepository
+    from uow import UnitOfWork
+
+    dataset = _dataset(users=40)
+    uow = UnitOfWork(InMemoryUserRepository())
+    loaded = datagen.load_into(dataset, uow, batch=25)
+    tables = _tables(dataset)
+    assert loaded == {table: len(rows) for table, rows in tables.items()}
+    post = tables['posts'][-1]
+    assert uow.posts_get(post['id']).title == post['title']
+    assert len(list(uow.users_scan())) == 40
+    assert sum(uow.comments_count_for_post(row['id']) for row in tables['posts']) == len(tables['comments'])
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from libs.backend.type_utils.validators.comment import Comment
+from libs.backend.type_utils.validators.post import Post
+from libs.backend.type_utils.validators.types import validate_json
+from libs.backend.type_utils.validators.user import User
+
+CASES = Path(__file__).resolve().parents[3] / "cross"
+MODELS = {"user": User, "post": Post, "comment": Comment}
+
+
+def _cases():
+    for name, model in MODELS.items():
+        for case in json.loads((CASES / f"{name}_test_cases.json").read_text()):
+            yield pytest.param(model, case, id=f"{name}: {case['description']}")
+
+
+@pytest.mark.parametrize("model,case", _cases())
+def test_json_path_agrees_with_dict_path(model, case):
+    """
+    Tests that strict validation of raw JSON accepts exactly what dict validation accepts.
+    """
+    raw = json.dumps(case["data"]).encode()
+    try:
+        from_json = validate_json(model, raw).model_dump()
+    except ValidationError:
+        from_json = None
+    try:
+        from_dict = model.model_validate(case["data"]).model_dump()
+    except ValidationError:
+        from_dict = None
+    assert (from_json is not None) == case["expected_valid"]
+    assert from_json == from_dict
+
+
+def test_surrounding_whitespace_is_trimmed():
+    """Tests that the core string constraints keep trimming names, titles and content."""
+    user = validate_json(User, json.dumps({
+        "id": "123e4567-e89b-12d3-a456-426614174000", "name": "  Ada  ", "email": "ada@example.com",
+        "created_at": "2023-01-01T12:00:00Z",
+    }))
+    assert user.name == "Ada"
+    post = validate_json(Post, json.dumps({
+        "id": "123e4567-e89b-12d3-a456-426614174000", "user_id": "123e4567-e89b-12d3-a456-426614174001",
+        "title": " Hello ", "content": "\tBody\n", "published": False, "created_at": "2023-01-01T12:00:00Z",
+    }))
+    assert (post.title, post.content) == ("Hello", "Body")
+
+
+VALID = {
+    User: {"id": "123e4567-e89b-12d3-a456-426614174000", "name": "Ada", "email": "ada@example.com",
+           "created_at": "2023-01-01T12:00:00Z"},
+    Post: {"id": "123e4567-e89b-12d3-a456-426614174000", "user_id": "123e4567-e89b-12d3-a456-426614174001",
+           "title": "Hello", "content": "Body", "published": True, "created_at": "2023-01-01T12:00:00Z"},
+    Comment: {"id": "123e4567-e89b-12d3-a456-426614174000", "post_id": "123e4567-e89b-12d3-a456-426614174001",
+              "user_id": "123e4567-e89b-12d3-a456-426614174002", "content": "Nice", "created_at": "2023-01-01T12:00:00Z"},
+}
+
+
+@pytest.mark.parametrize("model,field,message", [
+    (User, "name", "Name cannot be empty"),
+    (Post, "title", "Title cannot be empty"),
+    (Post, "content", "Content cannot be empty"),
+    (Comment, "content", "Content cannot be empty"),
+])
+def test_blank_fields_are_value_errors_naming_the_field(model, field, message):
+    """Tests that blank values fail as ``value_error`` with the message and ctx of a raised ValueError."""
+    for validate in (lambda data: validate_json(model, json.dumps(data)), model.model_validate):
+        for blank in ("", "   "):
+            with pytest.raises(ValidationError) as exc:
+                validate({**VALID[model], field: blank})
+            errors = exc.value.errors()
+            assert [(e["loc"], e["type"], e["msg"]) for e in errors] == [((field,), "value_error", f"Value error, {message}")]
+            assert str(errors[0]["ctx"]["error"]) == message
+
+
+@pytest.mark.parametrize("field", ["title", "content"])
+def test_non_string_post_fields_are_validation_errors(field):
+    """Tests that non-string values fail validation on the offending field."""
+    with pytest.raises(ValidationError) as exc:
+        validate_json(Post, json.dumps({**VALID[Post], field: 42}))
+    assert [(e["loc"], e["type"]) for e in exc.value.errors()] == [((field,), "string_type")]
+    with pytest.raises(ValidationError):
+        Post.model_validate({**VALID[Post], field: 42})
+
+
+def test_strict_mode_rejects_coercion():
+    """Tests that the JSON path does not coerce strings into booleans."""
+    data = {
+        "id": "123e4567-e89b-12d3-a456-426614174000", "user_id": "123e4567-e89b-12d3-a456-426614174001",
+        "title": "Hello", "published": "true", "created_at": "2023-01-01T12:00:00Z",
+    }
+    with pytest.raises(ValidationError):
+        validate_json(Post, json.dumps(data))